@@ -17,10 +17,16 @@
 """Defines the main 'research_coordinator' agent for the Clinical Research Synthesizer."""
 
 from google.adk.agents import LlmAgent
-from google.adk.tools.agent_tool import AgentTool
 
 
+from . import compaction
+from . import context_cache
+from . import deadline
+from . import ledger
+from . import model_policy
+from . import prefetch
 from . import prompt
+from . import topology
 # Import all three specialist agents
 from .specialists.literature_researcher import (
     agent as literature_researcher_agent,
@@ -32,20 +38,53 @@ from .specialists.search_specialist import (
     agent as search_specialist_agent,
 )
 
-# Use a powerful model for the coordinator's reasoning and planning.
-MODEL = "gemini-2.5-pro"
-
-research_coordinator = LlmAgent(
-    name="research_coordinator",
-    model=MODEL,
-    description="The main agent that synthesizes clinical research.",
-    instruction=prompt.RESEARCH_COORDINATOR_PROMPT,
-    tools=[
-        AgentTool(agent=literature_researcher_agent.literature_researcher),
-        AgentTool(agent=clinical_trial_specialist_agent.clinical_trial_specialist),
-        AgentTool(agent=search_specialist_agent.search_specialist),
-    ],
-)
+# Use a powerful model for the coordinator's reasoning and planning (see model_policy).
+MODEL = model_policy.model_for("research_coordinator")
+
+SPECIALISTS = [
+    literature_researcher_agent.literature_researcher,
+    clinical_trial_specialist_agent.clinical_trial_specialist,
+    search_specialist_agent.search_specialist,
+]
+
+
+# The coordinator prompt and tool declarations are re-sent on every turn;
+# serve them from a Gemini context cache instead.
+static_prefix_cache = context_cache.StaticPrefixCache(display_name="research-coordinator")
+
+
+def _before_model_callbacks() -> list:
+    # "synthesize" sees only the evidence ledger; other turns get old tool
+    # outputs compacted. The static prefix is then served from the cache.
+    callbacks = [ledger.feed_ledger_on_synthesize, compaction.compact_history]
+    # Context caches are per model, so tiered (escalating) models are skipped.
+    if isinstance(MODEL, str):
+        callbacks.append(static_prefix_cache)
+    return callbacks
+
+
+def build_research_coordinator(topology_mode: str = topology.TOPOLOGY) -> LlmAgent:
+    """Builds the coordinator in 'hierarchical' or 'direct' tool topology."""
+    return LlmAgent(
+        name="research_coordinator",
+        model=MODEL,
+        description="The main agent that synthesizes clinical research.",
+        instruction=topology.coordinator_instruction(
+            prompt.RESEARCH_COORDINATOR_PROMPT, SPECIALISTS, topology_mode,
+            usage_notes=prompt.DIRECT_TOOL_NOTES,
+        ),
+        tools=topology.coordinator_tools(SPECIALISTS, topology_mode),
+        # In 'direct' mode the search tools run on the coordinator itself.
+        after_tool_callback=prefetch.after_tool_callback,
+        before_model_callback=_before_model_callbacks(),
+        # Runs not started through `deadline.invocation()` get their deadline here.
+        before_agent_callback=[deadline.start_invocation, prefetch.start_turn],
+        # Prefetches the turn did not use are cancelled when it ends.
+        after_agent_callback=prefetch.end_turn,
+    )
+
+
+research_coordinator = build_research_coordinator()
 
 # The root_agent is the entry point for the ADK.
 root_agent = research_coordinator
\ No newline at end of file
@@ -0,0 +1,187 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Rolling compaction of old tool outputs in the coordinator's prompt.
+
+Each coordinator turn replays the whole session, including raw PubMed
+abstracts, PMC full texts and MedGemma summaries. Once the replayed history
+passes `COMPACTION_TOKEN_THRESHOLD`, `compact_history` (a
+`before_model_callback`) replaces tool outputs older than the last
+`COMPACTION_KEEP_RECENT_TURNS` user turns with a short digest (IDs, titles,
+key findings). Only the outgoing request is rewritten; the raw outputs stay
+in the session's events.
+"""
+
+import hashlib
+import logging
+import os
+import re
+from collections import OrderedDict
+
+from google.genai import types
+
+logger = logging.getLogger(__name__)
+
+ENABLED = os.getenv("COMPACTION_ENABLED", "true").lower() == "true"
+# Rough prompt size (in tokens) above which old tool outputs are compacted.
+TOKEN_THRESHOLD = int(os.getenv("COMPACTION_TOKEN_THRESHOLD", "24000"))
+# The most recent user turns are always sent verbatim.
+KEEP_RECENT_TURNS = int(os.getenv("COMPACTION_KEEP_RECENT_TURNS", "2"))
+# Tool outputs shorter than this are cheaper to keep than to digest.
+MIN_OUTPUT_CHARS = int(os.getenv("COMPACTION_MIN_OUTPUT_CHARS", "1500"))
+
+CHARS_PER_TOKEN = 4
+MAX_TITLES = 10
+FINDINGS_CHARS = 600
+DIGEST_CACHE_SIZE = 256
+
+_NCT_RE = re.compile(r"\bNCT\d{8}\b")
+_PMID_RE = re.compile(r"PMID:\s*(\d+)")
+_TITLE_RE = re.compile(r"^\s*-?\s*Title:\s*(.+)$", re.MULTILINE)
+# Section headings MedGemma summaries and paper bodies use for the outcome.
+_FINDINGS_RE = re.compile(r"(?:\*\*)?(?:Results|Conclusions?|Key Findings)(?:\*\*)?\s*:?", re.IGNORECASE)
+
+_digests = OrderedDict()  # sha256(tool name + output) -> digest
+
+
+def estimate_tokens(contents) -> int:
+    """Approximates the token count of a list of `types.Content`."""
+    chars = 0
+    for content in contents or []:
+        for part in content.parts or []:
+            if part.text:
+                chars += len(part.text)
+            elif part.function_response:
+                chars += len(str(part.function_response.response))
+            elif part.function_call:
+                chars += len(str(part.function_call.args))
+    return chars // CHARS_PER_TOKEN
+
+
+def _output_text(response) -> str:
+    if isinstance(response, dict):
+        if len(response) == 1:
+            (value,) = response.values()
+            return value if isinstance(value, str) else str(value)
+        return str(response)
+    return str(response or "")
+
+
+def _squash(text: str, limit: int) -> str:
+    text = " ".join(text.split())
+    return text if len(text) <= limit else text[:limit].rstrip() + "..."
+
+
+def digest(tool_name: str, text: str) -> str:
+    """Builds a compact structured digest of a tool output.
+
+    Args:
+        tool_name: Name of the tool (or specialist) that produced the output.
+        text: The raw tool output.
+
+    Returns:
+        A few lines with the IDs, titles and key findings found in the output.
+    """
+    key = hashlib.sha256(f"{tool_name}\n{text}".encode()).hexdigest()
+    if key in _digests:
+        _digests.move_to_end(key)
+        return _digests[key]
+
+    lines = [f"[Compacted output of `{tool_name}`, originally {len(text)} chars]"]
+    pmids = list(dict.fromkeys(_PMID_RE.findall(text)))
+    nct_ids = list(dict.fromkeys(_NCT_RE.findall(text)))
+    titles = list(dict.fromkeys(t.strip() for t in _TITLE_RE.findall(text)))
+    if pmids:
+        lines.append("PMIDs: " + ", ".join(pmids))
+    if nct_ids:
+        lines.append("NCT IDs: " + ", ".join(nct_ids))
+    for title in titles[:MAX_TITLES]:
+        lines.append(f"- Title: {_squash(title, 200)}")
+
+    match = _FINDINGS_RE.search(text)
+    findings = text[match.end():] if match else text
+    lines.append("Key findings: " + _squash(findings, FINDINGS_CHARS))
+
+    result = "\n".join(lines)
+    _digests[key] = result
+    if len(_digests) > DIGEST_CACHE_SIZE:
+        _digests.popitem(last=False)
+    return result
+
+
+def _recent_boundary(contents, keep_recent_turns: int) -> int:
+    """Index of the first content belonging to the last `keep_recent_turns` user turns."""
+    seen = 0
+    for i in range(len(contents) - 1, -1, -1):
+        content = contents[i]
+        is_user_text = content.role == "user" and any(p.text for p in content.parts or [])
+        if is_user_text:
+            seen += 1
+            if seen >= keep_recent_turns:
+                return i
+    return 0
+
+
+def compact_contents(contents, token_threshold: int = TOKEN_THRESHOLD,
+                     keep_recent_turns: int = KEEP_RECENT_TURNS):
+    """Replaces old, large tool outputs with digests.
+
+    The request contents share objects with the session's events, so touched
+    `Content`s are copied; the events keep their raw outputs.
+
+    Returns:
+        A (contents, number of compacted tool outputs) tuple.
+    """
+    if estimate_tokens(contents) <= token_threshold:
+        return contents, 0
+
+    contents = list(contents)
+    compacted = 0
+    for index in range(_recent_boundary(contents, keep_recent_turns)):
+        parts = list(contents[index].parts or [])
+        touched = False
+        for i, part in enumerate(parts):
+            response = part.function_response
+            if response is None:
+                continue
+            text = _output_text(response.response)
+            if len(text) < MIN_OUTPUT_CHARS or text.startswith("[Compacted output"):
+                continue
+            parts[i] = types.Part(
+                function_response=types.FunctionResponse(
+                    id=response.id,
+                    name=response.name,
+                    response={"result": digest(response.name.split("__")[-1], text)},
+                )
+            )
+            touched = True
+            compacted += 1
+        if touched:
+            contents[index] = types.Content(role=contents[index].role, parts=parts)
+    return contents, compacted
+
+
+def compact_history(callback_context, llm_request):
+    """before_model_callback: compacts old tool outputs once the prompt is large."""
+    if not ENABLED:
+        return None
+    before = estimate_tokens(llm_request.contents)
+    llm_request.contents, compacted = compact_contents(llm_request.contents)
+    if compacted:
+        logger.info(
+            "Compacted %d tool outputs for %s: ~%d -> ~%d tokens",
+            compacted, callback_context.agent_name, before, estimate_tokens(llm_request.contents),
+        )
+    return None
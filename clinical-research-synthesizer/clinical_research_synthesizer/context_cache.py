@@ -0,0 +1,167 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Explicit Gemini context caching for a coordinator's static request prefix.
+
+The coordinator's system instruction and tool declarations are identical on
+every model call. `StaticPrefixCache` is a `before_model_callback` that stores
+that prefix in a Gemini context cache and rewrites the request to reference it
+via `cached_content`, so only the conversation itself is sent each turn.
+
+Lifecycle:
+* create: on first use of a (model, prefix hash) pair.
+* refresh: the TTL is extended when it is about to expire.
+* retire: when the prefix changes (prompt or tools), requests move to a new
+  cache. The old one is not deleted, since requests already sent may still
+  reference it; it is no longer refreshed and expires with its TTL.
+Any failure leaves the request untouched, i.e. falls back to a plain request.
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+import time
+import weakref
+
+from google import genai
+from google.genai import types
+
+logger = logging.getLogger(__name__)
+
+ENABLED = os.getenv("CONTEXT_CACHE_ENABLED", "true").lower() == "true"
+TTL_SECONDS = int(os.getenv("CONTEXT_CACHE_TTL_SECONDS", "3600"))
+# Refresh the TTL once less than this much time is left.
+REFRESH_MARGIN_SECONDS = int(os.getenv("CONTEXT_CACHE_REFRESH_MARGIN_SECONDS", "300"))
+# Gemini rejects caches below a minimum token count; skip small prefixes.
+MIN_PREFIX_CHARS = int(os.getenv("CONTEXT_CACHE_MIN_PREFIX_CHARS", "4000"))
+# After a failed create, retry caching this prefix only after this delay.
+RETRY_AFTER_SECONDS = 600
+
+
+def _prefix_of(config: types.GenerateContentConfig) -> str:
+    parts = [str(config.system_instruction or "")]
+    for tool in config.tools or []:
+        parts.append(tool.model_dump_json(exclude_none=True))
+    if config.tool_config:
+        parts.append(config.tool_config.model_dump_json(exclude_none=True))
+    return "\n".join(parts)
+
+
+class _CacheEntry:
+    def __init__(self, name: str, prefix_hash: str, expires_at: float):
+        self.name = name
+        self.prefix_hash = prefix_hash
+        self.expires_at = expires_at
+
+
+class StaticPrefixCache:
+    """A before_model_callback that serves the static prefix from a context cache."""
+
+    def __init__(self, display_name: str, ttl_seconds: int = TTL_SECONDS,
+                 refresh_margin_seconds: int = REFRESH_MARGIN_SECONDS,
+                 min_prefix_chars: int = MIN_PREFIX_CHARS, client: genai.Client = None):
+        self.display_name = display_name
+        self.ttl_seconds = ttl_seconds
+        self.refresh_margin_seconds = refresh_margin_seconds
+        self.min_prefix_chars = min_prefix_chars
+        self._client = client
+        self._entries = {}  # (model, prefix_hash) -> _CacheEntry
+        self._failed = {}  # (model, prefix_hash) -> retry time
+        # asyncio locks are bound to one event loop; the callback may run under several.
+        self._locks = weakref.WeakKeyDictionary()
+        self.stats = {"hits": 0, "creates": 0, "refreshes": 0, "expired": 0, "fallbacks": 0}
+
+    @property
+    def client(self) -> genai.Client:
+        if self._client is None:
+            self._client = genai.Client()
+        return self._client
+
+    def _lock(self) -> asyncio.Lock:
+        loop = asyncio.get_running_loop()
+        lock = self._locks.get(loop)
+        if lock is None:
+            lock = self._locks[loop] = asyncio.Lock()
+        return lock
+
+    async def __call__(self, callback_context, llm_request):
+        if not ENABLED or not llm_request.model or llm_request.config.cached_content:
+            return None
+        config = llm_request.config
+        prefix = _prefix_of(config)
+        if len(prefix) < self.min_prefix_chars:
+            return None
+
+        prefix_hash = hashlib.sha256(f"{llm_request.model}\n{prefix}".encode()).hexdigest()
+        try:
+            name = await self._cache_name(llm_request.model, prefix_hash, config)
+        except Exception as e:
+            logger.warning("Context cache unavailable, sending plain request: %s", e)
+            self._failed[(llm_request.model, prefix_hash)] = time.time() + RETRY_AFTER_SECONDS
+            self.stats["fallbacks"] += 1
+            return None
+        if name is None:
+            self.stats["fallbacks"] += 1
+            return None
+
+        self.stats["hits"] += 1
+        config.cached_content = name
+        config.system_instruction = None
+        config.tools = None
+        config.tool_config = None
+        return None
+
+    async def _cache_name(self, model: str, prefix_hash: str, config: types.GenerateContentConfig):
+        if self._failed.get((model, prefix_hash), 0) > time.time():
+            return None
+
+        async with self._lock():
+            now = time.time()
+            self._drop_expired(now)
+            key = (model, prefix_hash)
+            entry = self._entries.get(key)
+
+            if entry and entry.expires_at - now > self.refresh_margin_seconds:
+                return entry.name
+
+            if entry:
+                await self.client.aio.caches.update(
+                    name=entry.name,
+                    config=types.UpdateCachedContentConfig(ttl=f"{self.ttl_seconds}s"),
+                )
+                entry.expires_at = now + self.ttl_seconds
+                self.stats["refreshes"] += 1
+                return entry.name
+
+            cache = await self.client.aio.caches.create(
+                model=model,
+                config=types.CreateCachedContentConfig(
+                    display_name=f"{self.display_name}-{prefix_hash[:12]}",
+                    system_instruction=config.system_instruction,
+                    tools=config.tools,
+                    tool_config=config.tool_config,
+                    ttl=f"{self.ttl_seconds}s",
+                ),
+            )
+            self._entries[key] = _CacheEntry(cache.name, prefix_hash, now + self.ttl_seconds)
+            self.stats["creates"] += 1
+            return cache.name
+
+    def _drop_expired(self, now: float):
+        """Forgets caches whose TTL has run out; Gemini has already deleted them."""
+        for key in [key for key, entry in self._entries.items() if entry.expires_at <= now]:
+            del self._entries[key]
+            self.stats["expired"] += 1
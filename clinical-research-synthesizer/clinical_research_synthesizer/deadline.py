@@ -0,0 +1,287 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Per-invocation deadlines shared by sub-agents, tools and outbound calls.
+
+`invocation()` starts a deadline (INVOCATION_DEADLINE_SECONDS) where an agent
+run begins (`stream_query`, `stream_run`); for other runners the root agent's
+`start_invocation` callback does. Like the request class, the deadline travels
+in a context variable into sub-agents, tools, `asyncio.to_thread` workers and
+tasks. Each sub-agent call gets AGENT_BUDGET_SHARE of the time left and each
+tool call TOOL_BUDGET_SHARE (`budgeted_tool`), so the caller keeps time to
+answer with what it has.
+
+Outbound calls take their timeout from `call_timeout()`: the time left, capped
+by the call's usual timeout (OUTBOUND_TIMEOUT_SECONDS for HTTP APIs). Clients
+without a timeout parameter (Entrez, PubChemPy) go through `run_bounded`. When
+the user disconnects, the run cancels its deadline, and the next
+`call_timeout()` or `check()` under it raises `DeadlineExceeded`.
+
+`deadline_stats()` reports calls, deadline-exceeded and cancelled counts per
+tool and sub-agent.
+"""
+
+import asyncio
+import contextlib
+import contextvars
+import functools
+import inspect
+import json
+import os
+import threading
+import time
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeout
+
+INVOCATION_DEADLINE_SECONDS = float(os.getenv("INVOCATION_DEADLINE_SECONDS", "300"))
+AGENT_BUDGET_SHARE = float(os.getenv("AGENT_BUDGET_SHARE", "0.8"))
+TOOL_BUDGET_SHARE = float(os.getenv("TOOL_BUDGET_SHARE", "0.5"))
+OUTBOUND_TIMEOUT_SECONDS = float(os.getenv("OUTBOUND_TIMEOUT_SECONDS", "30"))
+
+# How often `run_bounded` checks whether its run was cancelled.
+_POLL_SECONDS = 0.1
+
+
+class DeadlineExceeded(TimeoutError):
+    """Work that ran out of time, or whose run was cancelled."""
+
+    def __init__(self, name: str, cancelled: bool = False):
+        super().__init__(f"{name}: {'cancelled' if cancelled else 'deadline exceeded'}")
+        self.name = name
+        self.cancelled = cancelled
+
+
+class Deadline:
+    """The time by which a unit of work must finish, and its run's cancellation flag."""
+
+    def __init__(self, name: str, seconds: float, cancelled: threading.Event = None, not_after: float = None):
+        now = time.monotonic()
+        self.name = name
+        self.expires_at = now + seconds if not_after is None else min(not_after, now + seconds)
+        self.budget_s = self.expires_at - now
+        # Shared with every deadline derived from this one.
+        self._cancelled = cancelled or threading.Event()
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self) -> bool:
+        return time.monotonic() >= self.expires_at
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def cancel(self):
+        """Cancels this deadline's run, including the budgets derived from it."""
+        self._cancelled.set()
+
+    def check(self):
+        """Raises DeadlineExceeded if the run was cancelled or the time is up."""
+        if self.cancelled:
+            raise DeadlineExceeded(self.name, cancelled=True)
+        if self.expired():
+            raise DeadlineExceeded(self.name)
+
+    def child(self, name: str, share: float) -> "Deadline":
+        """A deadline for `share` of the time left."""
+        return Deadline(name, self.remaining() * share, self._cancelled, not_after=self.expires_at)
+
+
+_current = contextvars.ContextVar("deadline", default=None)
+
+
+def current_deadline() -> Deadline:
+    """The deadline of the work running here, or None outside an agent run."""
+    return _current.get()
+
+
+@contextlib.contextmanager
+def _within(deadline: Deadline):
+    token = _current.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current.reset(token)
+
+
+def invocation(seconds: float = None, name: str = "invocation"):
+    """Starts the deadline of one agent run (context manager yielding the Deadline).
+
+    A run started inside another one keeps the outer deadline if it is sooner.
+    """
+    seconds = INVOCATION_DEADLINE_SECONDS if seconds is None else seconds
+    parent = current_deadline()
+    if parent is None:
+        return _within(Deadline(name, seconds))
+    return _within(Deadline(name, seconds, parent._cancelled, not_after=parent.expires_at))
+
+
+_ROOT_AGENT = "root_agent"
+
+
+def start_invocation(callback_context=None):
+    """`before_agent_callback` of a root agent: starts its run's deadline if the caller did not.
+
+    Covers runs that do not go through `invocation()` (ADK web, AdkApp). The
+    deadline stays set for the rest of the run, and the next run replaces it.
+    """
+    current = current_deadline()
+    if current is None or current.name == _ROOT_AGENT:
+        _current.set(Deadline(_ROOT_AGENT, INVOCATION_DEADLINE_SECONDS))
+    return None
+
+
+def budget(name: str, share: float):
+    """Runs a sub-agent or tool call under `share` of the time left (context manager yielding the Deadline).
+
+    Outside an agent run, the share is of a fresh INVOCATION_DEADLINE_SECONDS.
+    """
+    parent = current_deadline() or Deadline("invocation", INVOCATION_DEADLINE_SECONDS)
+    return _within(parent.child(name, share))
+
+
+def check():
+    """Raises DeadlineExceeded if the current run was cancelled or is out of time."""
+    deadline = current_deadline()
+    if deadline is not None:
+        deadline.check()
+
+
+def call_timeout(default: float = OUTBOUND_TIMEOUT_SECONDS) -> float:
+    """Timeout for an outbound call: the time left, capped by `default`.
+
+    Returns:
+        `default` outside an agent run (None if both are unbounded).
+
+    Raises:
+        DeadlineExceeded: if the run was cancelled or is out of time.
+    """
+    deadline = current_deadline()
+    if deadline is None:
+        return default
+    deadline.check()
+    remaining = deadline.remaining()
+    return remaining if default is None else min(default, remaining)
+
+
+def run_bounded(fn, *args, timeout_s: float = OUTBOUND_TIMEOUT_SECONDS, **kwargs):
+    """Runs a blocking call that takes no timeout, giving up after `call_timeout(timeout_s)`.
+
+    The call runs in a daemon thread, which is abandoned if it does not finish
+    in time or the run is cancelled.
+
+    Raises:
+        DeadlineExceeded: when giving up; otherwise whatever `fn` raises.
+    """
+    name = getattr(fn, "__qualname__", repr(fn))
+    timeout = call_timeout(timeout_s)
+    give_up_at = time.monotonic() + timeout if timeout is not None else float("inf")
+    future = Future()
+    context = contextvars.copy_context()
+
+    def run():
+        try:
+            future.set_result(context.run(fn, *args, **kwargs))
+        except BaseException as e:
+            future.set_exception(e)
+
+    threading.Thread(target=run, name="bounded-call", daemon=True).start()
+    while True:
+        try:
+            return future.result(timeout=max(0.0, min(_POLL_SECONDS, give_up_at - time.monotonic())))
+        except FutureTimeout:
+            check()
+            if time.monotonic() >= give_up_at:
+                raise DeadlineExceeded(name) from None
+
+
+class DeadlineStats:
+    """Calls, deadline-exceeded and cancelled counts per tool or sub-agent."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = {}
+
+    def record(self, name: str, deadline: Deadline):
+        with self._lock:
+            counts = self._counts.setdefault(name, {"calls": 0, "exceeded": 0, "cancelled": 0})
+            counts["calls"] += 1
+            # A run that ran out of time is cancelled afterwards; count it as exceeded.
+            if deadline.expired():
+                counts["exceeded"] += 1
+            elif deadline.cancelled:
+                counts["cancelled"] += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {name: dict(counts) for name, counts in self._counts.items()}
+
+
+stats = DeadlineStats()
+
+
+def exceeded_message(name: str, deadline: Deadline) -> str:
+    """The structured error a tool returns to the agent when it ran out of time."""
+    error = {"tool": name, "reason": "deadline_exceeded" if deadline.expired() else "cancelled",
+             "budget_s": round(deadline.budget_s, 1)}
+    return f"Error: deadline exceeded {json.dumps(error)}"
+
+
+def budgeted_tool(func=None, *, name: str = None, share: float = TOOL_BUDGET_SHARE):
+    """Decorator: runs each call of a tool (or sub-agent) under `share` of the time left.
+
+    Async tools are cancelled when their budget runs out; blocking tools stop at
+    their next outbound call. Either way the agent gets `exceeded_message(...)`
+    instead of an exception. Tools that turn the timeout into their own error
+    message are counted as exceeded too.
+    """
+    if func is None:
+        return functools.partial(budgeted_tool, name=name, share=share)
+    if getattr(func, "budgeted", None) is not None:
+        return func
+    name = name or func.__name__
+
+    if inspect.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            with budget(name, share) as deadline:
+                try:
+                    return await asyncio.wait_for(func(*args, **kwargs), deadline.remaining())
+                except TimeoutError:
+                    if not (deadline.expired() or deadline.cancelled):
+                        raise
+                    return exceeded_message(name, deadline)
+                finally:
+                    stats.record(name, deadline)
+    else:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with budget(name, share) as deadline:
+                try:
+                    return func(*args, **kwargs)
+                except DeadlineExceeded:
+                    return exceeded_message(name, deadline)
+                finally:
+                    stats.record(name, deadline)
+
+    # The undecorated tool, e.g. for reading its docs.
+    wrapper.budgeted = func
+    return wrapper
+
+
+def deadline_stats() -> dict:
+    """Calls, deadline-exceeded and cancelled counts per tool and sub-agent."""
+    return stats.snapshot()
@@ -0,0 +1,199 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Priority classes and weighted fair queuing for Gemma endpoint calls.
+
+Every call belongs to a priority class (`interactive`, `batch` or `prefetch`)
+and a session. Code that issues bulk or speculative calls marks them with
+`request_class(BATCH)` / `request_class(PREFETCH)`; everything else is
+interactive. The class travels in a context variable, so it follows the call
+into `asyncio.to_thread` workers and tasks without changing tool signatures.
+
+When an endpoint's concurrency limit is reached, `FairQueue` decides which
+waiting call gets the next free slot: weighted fair queuing over (class,
+session) flows, so interactive calls overtake queued bulk work (class weight
+GEMMA_WEIGHT_<CLASS>) and sessions within a class share it equally. A call
+is shed up front when the expected queue wait already exceeds its class's
+latency SLO (GEMMA_QUEUE_SLO_<CLASS>_SECONDS), and it gives up once it has
+waited that long. Queue waits, sheds and timeouts are reported per class.
+"""
+
+import contextlib
+import contextvars
+import heapq
+import itertools
+import os
+import statistics
+from collections import deque
+
+INTERACTIVE = "interactive"
+BATCH = "batch"
+PREFETCH = "prefetch"
+CLASSES = (INTERACTIVE, BATCH, PREFETCH)
+
+CLASS_WEIGHTS = {
+    INTERACTIVE: float(os.getenv("GEMMA_WEIGHT_INTERACTIVE", "16")),
+    BATCH: float(os.getenv("GEMMA_WEIGHT_BATCH", "2")),
+    PREFETCH: float(os.getenv("GEMMA_WEIGHT_PREFETCH", "1")),
+}
+QUEUE_SLO_SECONDS = {
+    INTERACTIVE: float(os.getenv("GEMMA_QUEUE_SLO_INTERACTIVE_SECONDS", os.getenv("GEMMA_QUEUE_TIMEOUT_SECONDS", "5"))),
+    BATCH: float(os.getenv("GEMMA_QUEUE_SLO_BATCH_SECONDS", "120")),
+    PREFETCH: float(os.getenv("GEMMA_QUEUE_SLO_PREFETCH_SECONDS", "2")),
+}
+
+_request = contextvars.ContextVar("gemma_request", default=(INTERACTIVE, None))
+
+
+@contextlib.contextmanager
+def request_class(priority: str, session: str = None):
+    """Marks the Gemma calls made in this context (and threads/tasks started from it).
+
+    Args:
+        priority: INTERACTIVE, BATCH or PREFETCH.
+        session: The flow calls are shared fairly across; keeps the current one if None.
+    """
+    if priority not in CLASSES:
+        raise ValueError(f"Unknown request class '{priority}'. Available: {CLASSES}")
+    token = _request.set((priority, session if session is not None else _request.get()[1]))
+    try:
+        yield
+    finally:
+        _request.reset(token)
+
+
+def current_request() -> tuple:
+    """(priority class, session) of calls made from here."""
+    return _request.get()
+
+
+class Waiter:
+    __slots__ = ("priority", "finish", "enqueued_at", "granted", "abandoned")
+
+    def __init__(self, priority: str, finish: float, enqueued_at: float):
+        self.priority = priority
+        self.finish = finish
+        self.enqueued_at = enqueued_at
+        self.granted = False
+        self.abandoned = False
+
+
+class _ClassStats:
+    def __init__(self):
+        self.admitted = 0
+        self.queued = 0
+        self.shed = 0
+        self.timed_out = 0
+        self.waits = deque(maxlen=1024)
+
+
+class FairQueue:
+    """Weighted fair queue of calls waiting for a concurrency slot.
+
+    Not thread-safe: the owning limiter calls it under its own lock.
+    """
+
+    def __init__(self, weights: dict = None, slos: dict = None):
+        self.weights = {**CLASS_WEIGHTS, **(weights or {})}
+        self.slos = {**QUEUE_SLO_SECONDS, **(slos or {})}
+        self._heap = []
+        self._seq = itertools.count()
+        self._virtual_time = 0.0
+        self._last_finish = {}
+        self._classes = {priority: _ClassStats() for priority in CLASSES}
+
+    def __len__(self) -> int:
+        return sum(stats.queued for stats in self._classes.values())
+
+    def _finish_tag(self, priority: str, session, cost: float) -> float:
+        flow = (priority, session)
+        start = max(self._virtual_time, self._last_finish.get(flow, 0.0))
+        return start + cost / self.weights[priority]
+
+    def expected_wait(self, priority: str, session, cost: float, service_s: float, slots: int) -> float:
+        """Seconds a new call would wait: calls served before it, times the per-slot service time."""
+        if service_s is None:
+            return 0.0
+        finish = self._finish_tag(priority, session, cost)
+        ahead = sum(1 for tag, _, waiter in self._heap if tag <= finish and not waiter.abandoned)
+        return (ahead + 1) * service_s / max(1, slots)
+
+    def shed(self, priority: str):
+        self._classes[priority].shed += 1
+
+    def admit_now(self, priority: str):
+        """Counts a call that got a slot without queueing."""
+        stats = self._classes[priority]
+        stats.admitted += 1
+        stats.waits.append(0.0)
+
+    def enqueue(self, priority: str, session, cost: float, now: float) -> Waiter:
+        flow = (priority, session)
+        waiter = Waiter(priority, self._finish_tag(priority, session, cost), now)
+        self._last_finish[flow] = waiter.finish
+        heapq.heappush(self._heap, (waiter.finish, next(self._seq), waiter))
+        self._classes[priority].queued += 1
+        return waiter
+
+    def has_waiters(self) -> bool:
+        while self._heap and self._heap[0][2].abandoned:
+            heapq.heappop(self._heap)
+        return bool(self._heap)
+
+    def grant(self, now: float) -> Waiter:
+        """Hands the next slot to the waiter with the smallest finish tag."""
+        if not self.has_waiters():
+            return None
+        _, _, waiter = heapq.heappop(self._heap)
+        waiter.granted = True
+        self._virtual_time = waiter.finish
+        stats = self._classes[waiter.priority]
+        stats.queued -= 1
+        stats.admitted += 1
+        stats.waits.append(now - waiter.enqueued_at)
+        if len(self._last_finish) > 1024:
+            # Flows that are not ahead of the virtual clock start from it anyway.
+            self._last_finish = {f: t for f, t in self._last_finish.items() if t > self._virtual_time}
+        return waiter
+
+    def abandon(self, waiter: Waiter):
+        """Removes a waiter that gave up; it is skipped when its turn comes."""
+        waiter.abandoned = True
+        stats = self._classes[waiter.priority]
+        stats.queued -= 1
+        stats.timed_out += 1
+
+    def stats(self) -> dict:
+        return {priority: {
+            "queued": stats.queued,
+            "admitted": stats.admitted,
+            "shed": stats.shed,
+            "timed_out": stats.timed_out,
+            "waits": list(stats.waits),
+        } for priority, stats in self._classes.items()}
+
+
+def summarize(class_stats: list) -> dict:
+    """Per-class totals and queue-wait percentiles over several FairQueue.stats() reports."""
+    report = {}
+    for priority in CLASSES:
+        entries = [stats[priority] for stats in class_stats]
+        waits = sorted(wait for entry in entries for wait in entry["waits"])
+        summary = {key: sum(entry[key] for entry in entries) for key in ("queued", "admitted", "shed", "timed_out")}
+        if waits:
+            summary["wait_p50_s"] = round(statistics.median(waits), 3)
+            summary["wait_p99_s"] = round(waits[min(len(waits) - 1, int(len(waits) * 0.99))], 3)
+        report[priority] = summary
+    return report
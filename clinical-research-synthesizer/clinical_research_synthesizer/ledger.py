@@ -0,0 +1,257 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Structured evidence ledger kept in `session.state`.
+
+The literature, search and clinical-trial tools record what they found as
+typed, deduplicated records (papers, trials, summaries) under
+`session.state["evidence_ledger"]`. On the `"synthesize"` command,
+`feed_ledger_on_synthesize` (a `before_model_callback`) sends the coordinator
+the rendered ledger instead of the whole transcript.
+
+State written by a specialist's tools is forwarded to the coordinator's
+session by `AgentTool`, so the ledger works in both topologies.
+"""
+
+import copy
+import dataclasses
+import hashlib
+import re
+from dataclasses import dataclass
+
+from google.genai import types
+
+LEDGER_KEY = "evidence_ledger"
+
+FULL_TEXT = "full text"
+ABSTRACT_ONLY = "abstract only"
+NOT_FOUND = "not found"
+_BASIS_RANK = {"": 0, NOT_FOUND: 1, ABSTRACT_ONLY: 2, FULL_TEXT: 3}
+
+SUMMARY_CHARS = 2500
+CRITERIA_CHARS = 2000
+FINGERPRINT_CHARS = 2000
+
+
+@dataclass
+class Paper:
+    title: str
+    pmid: str = ""
+    source: str = ""
+    text_basis: str = ""  # FULL_TEXT, ABSTRACT_ONLY or NOT_FOUND
+    fingerprints: dict = dataclasses.field(default_factory=dict)  # fingerprint -> text basis
+    summary: str = ""
+    summary_basis: str = ""
+
+
+@dataclass
+class Trial:
+    nct_id: str
+    title: str = ""
+    criteria: str = ""
+
+
+def _empty() -> dict:
+    return {"papers": {}, "trials": {}, "unlinked_summaries": []}
+
+
+def _paper_key(title: str = "", pmid: str = "") -> str:
+    if pmid:
+        return f"pmid:{pmid}"
+    return "title:" + re.sub(r"\W+", " ", title.lower()).strip()
+
+
+def fingerprint(text: str) -> str:
+    """Whitespace-insensitive hash of the start of a text, to link summaries to papers."""
+    head = " ".join(text.split())[:FINGERPRINT_CHARS]
+    return hashlib.sha256(head.encode()).hexdigest()[:16]
+
+
+def _clip(text: str, limit: int) -> str:
+    text = text.strip()
+    return text if len(text) <= limit else text[:limit].rstrip() + "..."
+
+
+def _update(tool_context, mutate):
+    """Applies `mutate` to a copy of the ledger and writes it back to state.
+
+    State deltas are only tracked on assignment, so the ledger is never
+    mutated in place.
+    """
+    if tool_context is None:
+        return
+    ledger = copy.deepcopy(tool_context.state.get(LEDGER_KEY)) or _empty()
+    mutate(ledger)
+    tool_context.state[LEDGER_KEY] = ledger
+
+
+def _find_paper(ledger: dict, title: str = "", pmid: str = ""):
+    papers = ledger["papers"]
+    for key in (_paper_key(pmid=pmid) if pmid else None, _paper_key(title=title) if title else None):
+        if key and key in papers:
+            return key
+    if title:
+        wanted = _paper_key(title=title)
+        for key, paper in papers.items():
+            if _paper_key(title=paper["title"]) == wanted:
+                return key
+    return None
+
+
+def _upsert_paper(ledger: dict, title: str, pmid: str = "", **fields) -> dict:
+    key = _find_paper(ledger, title, pmid) or _paper_key(title, pmid)
+    paper = ledger["papers"].get(key) or dataclasses.asdict(Paper(title=title, pmid=pmid))
+    for name, value in fields.items():
+        if name == "fingerprints":
+            paper["fingerprints"] = {**paper["fingerprints"], **value}
+        elif name == "text_basis":
+            # Keep the best text ever retrieved for the paper.
+            if _BASIS_RANK[value] > _BASIS_RANK[paper["text_basis"]]:
+                paper["text_basis"] = value
+        elif name == "source":
+            paper["source"] = paper["source"] or value
+        elif value:
+            paper[name] = value
+    paper["pmid"] = paper["pmid"] or pmid
+    ledger["papers"][key] = paper
+    return paper
+
+
+def record_papers(tool_context, papers: list):
+    """Records PubMed search results.
+
+    Args:
+        tool_context: The calling tool's context (None outside an agent run).
+        papers: Dicts with `title`, `pmid`, `source` and `abstract` keys.
+    """
+    def mutate(ledger):
+        for paper in papers:
+            abstract = paper.get("abstract", "")
+            _upsert_paper(
+                ledger, paper["title"], paper.get("pmid", ""),
+                source=paper.get("source", ""),
+                text_basis=ABSTRACT_ONLY if abstract else "",
+                fingerprints={fingerprint(abstract): ABSTRACT_ONLY} if abstract else {},
+            )
+    _update(tool_context, mutate)
+
+
+def record_full_text(tool_context, title: str, text: str, source: str = ""):
+    """Records the outcome of a full-text retrieval; an empty `text` means it failed."""
+    def mutate(ledger):
+        _upsert_paper(
+            ledger, title, source=source,
+            text_basis=FULL_TEXT if text else NOT_FOUND,
+            fingerprints={fingerprint(text): FULL_TEXT} if text else {},
+        )
+    _update(tool_context, mutate)
+
+
+def record_summary(tool_context, source_text: str, summary: str):
+    """Attaches a summary to the paper whose full text or abstract it was made from."""
+    source_fingerprint = fingerprint(source_text)
+
+    def mutate(ledger):
+        papers = list(ledger["papers"].values())
+        paper = next((p for p in papers if source_fingerprint in p["fingerprints"]), None)
+        if paper is not None:
+            basis = paper["fingerprints"][source_fingerprint]
+        else:
+            # The LLM may have reformatted the text; fall back to the latest unsummarized paper.
+            paper = next((p for p in reversed(papers)
+                          if p["text_basis"] in (FULL_TEXT, ABSTRACT_ONLY) and not p["summary"]), None)
+            basis = paper["text_basis"] if paper else ""
+        if paper is None:
+            ledger["unlinked_summaries"] = (ledger["unlinked_summaries"] + [_clip(summary, SUMMARY_CHARS)])[-5:]
+            return
+        paper["summary"] = _clip(summary, SUMMARY_CHARS)
+        paper["summary_basis"] = basis
+    _update(tool_context, mutate)
+
+
+def record_trials(tool_context, trials: list):
+    """Records trial search results as (nct_id, title) pairs."""
+    def mutate(ledger):
+        for nct_id, title in trials:
+            trial = ledger["trials"].get(nct_id) or dataclasses.asdict(Trial(nct_id=nct_id))
+            trial["title"] = title or trial["title"]
+            ledger["trials"][nct_id] = trial
+    _update(tool_context, mutate)
+
+
+def record_criteria(tool_context, nct_id: str, criteria: str):
+    """Records the eligibility criteria of a trial."""
+    def mutate(ledger):
+        trial = ledger["trials"].get(nct_id) or dataclasses.asdict(Trial(nct_id=nct_id))
+        trial["criteria"] = _clip(criteria, CRITERIA_CHARS)
+        ledger["trials"][nct_id] = trial
+    _update(tool_context, mutate)
+
+
+def render(ledger: dict, commands: list = ()) -> str:
+    """Renders the ledger as the compact evidence context for synthesis."""
+    ledger = ledger or _empty()
+    lines = ["EVIDENCE LEDGER (all evidence gathered in this session; use it instead of the chat history)."]
+    if commands:
+        lines.append("\nUser commands so far:")
+        lines.extend(f"- {command}" for command in commands)
+
+    lines.append("\nPapers:")
+    if not ledger["papers"]:
+        lines.append("- none")
+    for i, paper in enumerate(ledger["papers"].values(), start=1):
+        ids = ", ".join(filter(None, [f"PMID {paper['pmid']}" if paper["pmid"] else "", paper["source"]]))
+        lines.append(f"{i}. {paper['title']}" + (f" ({ids})" if ids else ""))
+        lines.append(f"   Text retrieved: {paper['text_basis'] or 'not attempted'}")
+        if paper["summary"]:
+            lines.append(f"   Summary (based on {paper['summary_basis']}):\n{paper['summary']}")
+        else:
+            lines.append("   Summary: not summarized")
+
+    lines.append("\nClinical trials:")
+    if not ledger["trials"]:
+        lines.append("- none")
+    for trial in ledger["trials"].values():
+        lines.append(f"- {trial['nct_id']}: {trial['title'] or 'title unknown'}")
+        lines.append(f"  Eligibility criteria: {trial['criteria'] or 'not retrieved'}")
+
+    for summary in ledger["unlinked_summaries"]:
+        lines.append(f"\nSummary of an unidentified paper:\n{summary}")
+    return "\n".join(lines)
+
+
+def _user_text(content) -> str:
+    if content.role != "user":
+        return ""
+    return " ".join(p.text for p in content.parts or [] if p.text).strip()
+
+
+def feed_ledger_on_synthesize(callback_context, llm_request):
+    """before_model_callback: replaces the transcript with the ledger for "synthesize"."""
+    contents = llm_request.contents
+    user_turns = [(i, _user_text(c)) for i, c in enumerate(contents) if _user_text(c)]
+    if not user_turns:
+        return None
+    last_index, last_text = user_turns[-1]
+    if not last_text.strip('"\' ').lower().startswith("synthesize"):
+        return None
+
+    commands = [text for _, text in user_turns[:-1]]
+    ledger_text = render(callback_context.state.get(LEDGER_KEY), commands)
+    # Keep the "synthesize" turn itself and anything the model did since.
+    llm_request.contents = [
+        types.Content(role="user", parts=[types.Part(text=ledger_text)] + list(contents[last_index].parts))
+    ] + list(contents[last_index + 1:])
+    return None
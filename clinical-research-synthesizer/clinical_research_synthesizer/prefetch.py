@@ -0,0 +1,211 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Speculative prefetch of follow-up data while the LLM is still thinking.
+
+The prompts make the next step predictable:
+* `search_trials` returns NCT IDs -> the specialist fetches each trial's criteria.
+* `fetch_pubmed_articles` returns PMIDs and titles -> the coordinator asks the
+  `search_specialist` for the full text by title.
+
+`after_tool_callback` watches those results and warms the matching fetchers in
+a small thread pool. Tools read through `prefetcher.take(...)`, which serves a
+finished (or still running) prefetch instead of issuing a second request.
+Prefetches belong to the coordinator turn that triggered them (`start_turn`);
+`end_turn` cancels the ones nobody took, and deleting a session cancels its
+leftovers. `prefetch_stats()` reports issued, useful and wasted prefetches.
+Fetchers are registered by the tool modules themselves, so this module does not
+import any tool code.
+"""
+
+import contextvars
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from .deadline import call_timeout
+from .endpoint_scheduler import PREFETCH, request_class
+
+CRITERIA = "eligibility_criteria"
+PMC_FULL_TEXT = "pmc_full_text"
+
+MAX_WORKERS = int(os.getenv("PREFETCH_MAX_WORKERS", "4"))
+MAX_ENTRIES = int(os.getenv("PREFETCH_MAX_ENTRIES", "64"))
+MAX_PER_TRIGGER = int(os.getenv("PREFETCH_MAX_PER_TRIGGER", "5"))
+MAX_AGE_SECONDS = float(os.getenv("PREFETCH_MAX_AGE_SECONDS", "900"))
+# How long a tool waits for an in-flight prefetch before fetching itself (capped by its deadline).
+TAKE_TIMEOUT_SECONDS = float(os.getenv("PREFETCH_TAKE_TIMEOUT_SECONDS", "30"))
+
+_NCT_ID = re.compile(r"\bNCT\d{8}\b")
+_PUBMED_TITLE = re.compile(r"^Title:\s*(.+)$", re.MULTILINE)
+
+# (session id, invocation id) of the coordinator turn running here.
+_turn = contextvars.ContextVar("prefetch_turn", default=None)
+
+
+def normalize_key(key: str) -> str:
+    return " ".join(key.lower().split())
+
+
+def _as_prefetch(fetch, key):
+    # Speculative work yields model endpoint slots to interactive and batch calls.
+    with request_class(PREFETCH):
+        return fetch(key)
+
+
+class _Entry:
+    def __init__(self, future: Future, turn: tuple = None):
+        self.future = future
+        self.turn = turn
+        self.created = time.monotonic()
+
+    def belongs_to(self, session_id: str = None, invocation_id: str = None) -> bool:
+        if session_id is None and invocation_id is None:
+            return True
+        if self.turn is None:
+            return False
+        return session_id in (None, self.turn[0]) and invocation_id in (None, self.turn[1])
+
+
+class Prefetcher:
+    """A bounded, cancellable background prefetcher with hit/waste accounting."""
+
+    def __init__(self, max_workers: int = MAX_WORKERS, max_entries: int = MAX_ENTRIES,
+                 max_age_seconds: float = MAX_AGE_SECONDS):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="prefetch")
+        self._max_entries = max_entries
+        self._max_age = max_age_seconds
+        self._fetchers = {}
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.issued = 0
+        self.useful = 0
+        self.wasted = 0
+
+    def register(self, kind: str, fetch, is_usable=None):
+        """Registers the function that fetches `kind` data for one key."""
+        self._fetchers[kind] = (fetch, is_usable or (lambda _: True))
+
+    def prefetch(self, kind: str, keys) -> int:
+        """Schedules background fetches for `keys`; returns how many were issued."""
+        if kind not in self._fetchers:
+            return 0
+        fetch, _ = self._fetchers[kind]
+        turn = _turn.get()
+        issued = 0
+        with self._lock:
+            self._expire_locked()
+            for key in keys:
+                cache_key = (kind, normalize_key(key))
+                if cache_key in self._entries:
+                    continue
+                self._entries[cache_key] = _Entry(self._executor.submit(_as_prefetch, fetch, key), turn)
+                self.issued += 1
+                issued += 1
+                while len(self._entries) > self._max_entries:
+                    _, evicted = self._entries.popitem(last=False)
+                    self._discard(evicted)
+        return issued
+
+    def take(self, kind: str, key: str):
+        """Returns the prefetched result for `key`, or None on a miss."""
+        with self._lock:
+            self._expire_locked()
+            entry = self._entries.pop((kind, normalize_key(key)), None)
+        if entry is None:
+            return None
+        try:
+            result = entry.future.result(timeout=call_timeout(TAKE_TIMEOUT_SECONDS))
+        except Exception:
+            with self._lock:
+                self.wasted += 1
+            return None
+        _, is_usable = self._fetchers[kind]
+        with self._lock:
+            if is_usable(result):
+                self.useful += 1
+                return result
+            self.wasted += 1
+        return None
+
+    def cancel(self, kind: str = None, session_id: str = None, invocation_id: str = None) -> int:
+        """Cancels outstanding prefetches (all by default, or those of one kind, session or turn)."""
+        with self._lock:
+            keys = [k for k, entry in self._entries.items()
+                    if (kind is None or k[0] == kind) and entry.belongs_to(session_id, invocation_id)]
+            for cache_key in keys:
+                self._discard(self._entries.pop(cache_key))
+        return len(keys)
+
+    def stats(self) -> dict:
+        with self._lock:
+            settled = self.useful + self.wasted
+            return {
+                "issued": self.issued,
+                "useful": self.useful,
+                "wasted": self.wasted,
+                "outstanding": len(self._entries),
+                "useful_ratio": self.useful / settled if settled else 0.0,
+                "wasted_ratio": self.wasted / settled if settled else 0.0,
+            }
+
+    def _discard(self, entry: _Entry):
+        entry.future.cancel()
+        self.wasted += 1
+
+    def _expire_locked(self):
+        now = time.monotonic()
+        stale = [k for k, e in self._entries.items() if now - e.created > self._max_age]
+        for cache_key in stale:
+            self._discard(self._entries.pop(cache_key))
+
+
+prefetcher = Prefetcher()
+
+
+def prefetch_stats() -> dict:
+    """Issued, useful, wasted and outstanding prefetches of the process-wide prefetcher."""
+    return prefetcher.stats()
+
+
+def start_turn(callback_context):
+    """`before_agent_callback` of the coordinator: prefetches from here on belong to this turn."""
+    _turn.set((callback_context.session.id, callback_context.invocation_id))
+    return None
+
+
+def end_turn(callback_context):
+    """`after_agent_callback` of the coordinator: cancels the turn's prefetches that were not taken."""
+    prefetcher.cancel(invocation_id=callback_context.invocation_id)
+    return None
+
+
+def after_tool_callback(tool, args, tool_context, tool_response):
+    """Triggers prefetches from search results. Never alters the response."""
+    result = tool_response.get("result") if isinstance(tool_response, dict) else tool_response
+    if not isinstance(result, str):
+        return None
+
+    # Namespaced names are used by the 'direct' topology.
+    tool_name = tool.name.split("__")[-1]
+    if tool_name == "search_trials":
+        prefetcher.prefetch(CRITERIA, _NCT_ID.findall(result)[:MAX_PER_TRIGGER])
+    elif tool_name == "fetch_pubmed_articles":
+        titles = [t.strip() for t in _PUBMED_TITLE.findall(result)]
+        prefetcher.prefetch(PMC_FULL_TEXT, titles[:MAX_PER_TRIGGER])
+    return None
@@ -45,6 +45,9 @@ You will wait for the user to issue a command to proceed with each step of the r
 
 
 **Final Report Generation (on `"synthesize"` command):**
+For this command you receive an **EVIDENCE LEDGER** listing every paper (with whether its full text
+or only its abstract was retrieved, and its summary) and every clinical trial (NCT ID, title,
+eligibility criteria) gathered in this session. Build the report from the ledger only.
 Your output **MUST** follow this exact format:
 * **First, a section titled "Execution Plan". In this section, you must:
     1.  State your initial multi-step research plan.
@@ -58,4 +61,18 @@ Your output **MUST** follow this exact format:
     4.  You MUST append a citation marker, like [Source 1], to the end of every sentence or data point.
 * **Third, a section titled "**Limitations and Gaps**" where you explicitly state which steps of your plan could not be completed and why (e.g., "Full text for Source [1] was inaccessible, so the analysis is based on its abstract.").
 * **Fourth, a section titled "**Sources**" where you provide a numbered list that maps each source number to the full title of the corresponding paper or clinical trial.**
-"""
\ No newline at end of file
+"""
+
+# Short usage notes for the specialists' tools in the "direct" topology
+# (see topology.py); the specialists' own prompts are not merged.
+DIRECT_TOOL_NOTES = {
+    "literature_researcher": (
+        "Search PubMed first. Extract PDF text only from direct .pdf links, and"
+        " summarize a paper from its full text when you have it."
+    ),
+    "clinical_trial_specialist": (
+        "Search trials first, then fetch the eligibility criteria of the most"
+        " relevant NCT IDs and split them into inclusion and exclusion criteria."
+    ),
+    "search_specialist": "Look up a paper's PMC full text by its exact title.",
+}
@@ -0,0 +1,191 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Single-flight deduplication of identical in-flight external calls.
+
+`@single_flight(name, key=...)` makes concurrent calls of a function with the
+same normalized key share one execution. The first caller runs it, and callers
+arriving while it runs wait for its result instead of sending their own
+request. Nothing is kept once the call finishes, so this is not a cache; calls
+that do not overlap each reach the upstream API.
+
+* Errors: an exception from the shared execution is raised in every caller
+  that waited on it. It is not remembered; the next call starts a new execution.
+* Cancellation (async functions only): a cancelled caller stops waiting, but
+  the shared execution keeps running for the others. It is cancelled only when
+  every caller waiting on it has been cancelled.
+* Deadlines: a waiting caller gives up when its own deadline passes (see
+  deadline.py), even if the shared execution is still running.
+
+`singleflight_stats()` reports, per function, how many calls were served by
+another caller's execution (`dedup_ratio`).
+"""
+
+import asyncio
+import functools
+import inspect
+import os
+import threading
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeout
+
+from .deadline import DeadlineExceeded, call_timeout
+
+SINGLE_FLIGHT_ENABLED = os.getenv("SINGLE_FLIGHT_ENABLED", "true").lower() == "true"
+
+
+def normalize_text(text: str) -> str:
+    """Case- and whitespace-insensitive key for free-text queries and names."""
+    return " ".join(str(text).lower().split())
+
+
+class _AsyncFlight:
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class FlightGroup:
+    """In-flight executions of one function, keyed by normalized arguments."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._flights = {}
+        self._lock = threading.Lock()
+        self.counters = {"calls": 0, "executions": 0, "shared": 0, "errors": 0, "cancelled": 0}
+
+    def do(self, key, fn, *args, **kwargs):
+        """Runs `fn(*args, **kwargs)`, or waits for the running execution with the same key."""
+        with self._lock:
+            self.counters["calls"] += 1
+            future = self._flights.get(key)
+            leader = future is None
+            if leader:
+                future = self._flights[key] = Future()
+                self.counters["executions"] += 1
+            else:
+                self.counters["shared"] += 1
+        if not leader:
+            # The leader's call is bounded by its own deadline; a follower also stops at its own.
+            try:
+                return future.result(timeout=call_timeout(None))
+            except FutureTimeout:
+                raise DeadlineExceeded(self.name) from None
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as e:
+            with self._lock:
+                self.counters["errors"] += 1
+                del self._flights[key]
+            future.set_exception(e)
+            raise
+        with self._lock:
+            del self._flights[key]
+        future.set_result(result)
+        return result
+
+    async def do_async(self, key, fn, *args, **kwargs):
+        """Awaits `fn(*args, **kwargs)`, or the running execution with the same key."""
+        loop = asyncio.get_running_loop()
+        flight_key = (id(loop), key)
+        with self._lock:
+            self.counters["calls"] += 1
+            flight = self._flights.get(flight_key)
+            if flight is None:
+                flight = self._flights[flight_key] = _AsyncFlight(loop.create_task(fn(*args, **kwargs)))
+                flight.task.add_done_callback(functools.partial(self._finished, flight_key))
+                self.counters["executions"] += 1
+            else:
+                self.counters["shared"] += 1
+            flight.waiters += 1
+        try:
+            # Shielded, so one caller's cancellation does not cancel the others' execution.
+            return await asyncio.shield(flight.task)
+        except asyncio.CancelledError:
+            with self._lock:
+                flight.waiters -= 1
+                abandoned = flight.waiters == 0
+            if abandoned:
+                flight.task.cancel()
+            raise
+        else:
+            with self._lock:
+                flight.waiters -= 1
+
+    def _finished(self, flight_key, task: asyncio.Task):
+        with self._lock:
+            self._flights.pop(flight_key, None)
+            if task.cancelled():
+                self.counters["cancelled"] += 1
+            elif task.exception() is not None:
+                self.counters["errors"] += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            report = dict(self.counters)
+            report["in_flight"] = len(self._flights)
+        report["dedup_ratio"] = round(report["shared"] / report["calls"], 4) if report["calls"] else 0.0
+        return report
+
+
+_groups = {}
+_groups_lock = threading.Lock()
+
+
+def flight_group(name: str) -> FlightGroup:
+    """The process-wide FlightGroup called `name`."""
+    with _groups_lock:
+        if name not in _groups:
+            _groups[name] = FlightGroup(name)
+        return _groups[name]
+
+
+def single_flight(name: str, key=None):
+    """Decorates a sync or async function so concurrent identical calls share one execution.
+
+    Args:
+        name: The group's name in `singleflight_stats()`, e.g. 'pubchem.by_name'.
+        key: Maps the call's arguments to its dedup key; defaults to the arguments themselves.
+    """
+    group = flight_group(name)
+
+    def decorate(fn):
+        def make_key(*args, **kwargs):
+            return key(*args, **kwargs) if key else (args, tuple(sorted(kwargs.items())))
+
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def wrapper(*args, **kwargs):
+                if not SINGLE_FLIGHT_ENABLED:
+                    return await fn(*args, **kwargs)
+                return await group.do_async(make_key(*args, **kwargs), fn, *args, **kwargs)
+        else:
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                if not SINGLE_FLIGHT_ENABLED:
+                    return fn(*args, **kwargs)
+                return group.do(make_key(*args, **kwargs), fn, *args, **kwargs)
+
+        wrapper.flights = group
+        return wrapper
+
+    return decorate
+
+
+def singleflight_stats() -> dict:
+    """Calls, executions, shared calls and dedup ratio of every single-flight group."""
+    with _groups_lock:
+        groups = dict(_groups)
+    return {name: group.stats() for name, group in groups.items()}
@@ -16,13 +16,15 @@
 
 from google.adk.agents import Agent
 from . import prompt
+from ... import model_policy
+from ...prefetch import after_tool_callback as prefetch_after_tool
 from .tools import search_clinical_trials, get_eligibility_criteria
 #from .tools import search_clinical_trials, scrape_trial_criteria 
 #from .tools import search_clinical_trials, extract_preconditions
 
 
 # Use a powerful model for analysis and extraction.
-MODEL = "gemini-2.5-pro"
+MODEL = model_policy.model_for("clinical_trial_specialist")
 
 clinical_trial_specialist = Agent(
     name="clinical_trial_specialist",
@@ -38,4 +40,6 @@ clinical_trial_specialist = Agent(
         # scrape_trial_criteria.scrape_criteria_from_url,
        # extract_preconditions.extract_criteria,
     ],
+    # Warms eligibility criteria for the NCT IDs returned by `search_trials`.
+    after_tool_callback=prefetch_after_tool,
 )
\ No newline at end of file
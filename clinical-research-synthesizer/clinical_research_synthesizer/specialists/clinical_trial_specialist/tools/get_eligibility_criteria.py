@@ -1,7 +1,16 @@
 import json
-import requests
+import httpx
+from google.adk.tools.tool_context import ToolContext
 
-def get_eligibility_criteria_from_api(trial_id: str) -> str:
+from ....http_transport import get
+from ....ledger import record_criteria
+from ....prefetch import CRITERIA, prefetcher
+from ....singleflight import normalize_text, single_flight
+
+_RETRIEVED = "Successfully retrieved"
+
+
+def get_eligibility_criteria_from_api(trial_id: str, tool_context: ToolContext = None) -> str:
     """
     Fetches clinical trial data from the ClinicalTrials.gov API and extracts
     the full text of the eligibility criteria.
@@ -12,12 +21,23 @@ def get_eligibility_criteria_from_api(trial_id: str) -> str:
     Returns:
         The raw text of the eligibility criteria, or an error message.
     """
+    result = prefetcher.take(CRITERIA, trial_id)
+    if result is None:
+        result = _fetch_eligibility_criteria(trial_id)
+    if result.startswith(_RETRIEVED):
+        record_criteria(tool_context, trial_id, result.split(":", 1)[-1])
+    return result
+
+
+# Prefetches and tool calls for the same trial share one request while it is in flight.
+@single_flight("ctgov.eligibility", key=normalize_text)
+def _fetch_eligibility_criteria(trial_id: str) -> str:
     # API endpoint for a specific study.
     # We can specify the exact field we want: protocolSection.eligibilityModule.eligibilityCriteria
     url = f"https://clinicaltrials.gov/api/v2/studies/{trial_id}?fields=protocolSection.eligibilityModule.eligibilityCriteria"
     
     try:
-        response = requests.get(url)
+        response = get(url)
         response.raise_for_status()  # Raise an exception for bad status codes
 
         data = response.json()
@@ -34,13 +54,19 @@ def get_eligibility_criteria_from_api(trial_id: str) -> str:
             
         return f"Successfully retrieved eligibility criteria for {trial_id}:\\n\\n{eligibility_criteria}"
 
-    except requests.exceptions.HTTPError as errh:
-        if response.status_code == 404:
+    except httpx.HTTPStatusError as errh:
+        if errh.response.status_code == 404:
             return f"Error: Trial ID '{trial_id}' not found."
         return f"Http Error: {errh}"
-    except requests.exceptions.RequestException as err:
+    except httpx.HTTPError as err:
         return f"An unexpected error occurred while fetchiqng API data: {err}"
 
+prefetcher.register(
+    CRITERIA,
+    _fetch_eligibility_criteria,
+    is_usable=lambda result: result.startswith(_RETRIEVED),
+)
+
 # test this script as a regular Python file
 #if __name__ == '__main__':
 #    test_trial_id = "NCT04468659"
@@ -1,9 +1,22 @@
 """
 Tool for scraping the eligibility criteria directly from a ClinicalTrials.gov webpage.
 """
-import requests
+import httpx
 from bs4 import BeautifulSoup
 
+from ....http_transport import get
+from ....singleflight import normalize_text, single_flight
+
+
+@single_flight("ctgov.study_page", key=normalize_text)
+def _download_study_page(trial_id: str) -> bytes:
+    """A trial's ClinicalTrials.gov page; concurrent requests for one trial share the download."""
+    url = f"https://clinicaltrials.gov/study/{trial_id}"
+    response = get(url, headers={'User-Agent': 'Mozilla/5.0'})
+    response.raise_for_status()
+    return response.content
+
+
 def scrape_criteria_from_url(trial_id: str) -> str:
     """
     Given a clinical trial ID, scrapes the webpage and extracts the full text
@@ -17,11 +30,7 @@ def scrape_criteria_from_url(trial_id: str) -> str:
         The raw text of the eligibility criteria, or an error message.
     """
     try:
-        url = f"https://clinicaltrials.gov/study/{trial_id}"
-        response = requests.get(url, headers={'User-Agent': 'Mozilla/5.0'})
-        response.raise_for_status()
-
-        soup = BeautifulSoup(response.content, 'html.parser')
+        soup = BeautifulSoup(_download_study_page(trial_id), 'html.parser')
 
         # Find the H2 heading with the text "Participation Criteria"
         heading = soup.find('h2', string="Participation Criteria")
@@ -43,7 +52,7 @@ def scrape_criteria_from_url(trial_id: str) -> str:
 
         return f"Successfully scraped participation criteria for {trial_id}:\\n\\n{full_text}"
 
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         return f"Failed to download webpage for trial ID {trial_id}. Error: {e}"
     except Exception as e:
         return f"An error occurred while scraping the page for {trial_id}. Error: {e}"
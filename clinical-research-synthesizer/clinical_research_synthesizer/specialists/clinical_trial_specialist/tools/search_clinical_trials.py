@@ -15,12 +15,30 @@
 
 """Tool for searching for clinical trials on ClinicalTrials.gov."""
 
-import requests
+import httpx
+from google.adk.tools.tool_context import ToolContext
+
+from ....http_transport import get
+from ....ledger import record_trials
+from ....singleflight import normalize_text, single_flight
 
 BASE_URL = "https://clinicaltrials.gov/api/v2/studies"
 
 
-def search_trials(search_query: str) -> str:
+@single_flight("ctgov.search", key=normalize_text)
+def _search_studies(search_query: str) -> dict:
+    """The top 3 ClinicalTrials.gov studies for a query; concurrent identical searches share one request."""
+    params = {
+        "query.term": search_query,
+        "pageSize": 3,
+        "format": "json",
+    }
+    response = get(BASE_URL, params=params)
+    response.raise_for_status()
+    return response.json()
+
+
+def search_trials(search_query: str, tool_context: ToolContext = None) -> str:
     """
     Searches ClinicalTrials.gov for a query and returns top 3 results.
 
@@ -31,26 +49,24 @@ def search_trials(search_query: str) -> str:
         A formatted string with the titles and NCT IDs of the top 3 results,
         or an error message.
     """
-    params = {
-        "query.term": search_query,
-        "pageSize": 3,
-        "format": "json",
-    }
     try:
-        response = requests.get(BASE_URL, params=params)
-        response.raise_for_status()
-        data = response.json()
+        data = _search_studies(search_query)
 
         if not data.get("studies"):
             return f"No clinical trials found for the query: '{search_query}'."
 
         results = []
+        trials = []
         for study in data["studies"]:
             protocol = study.get("protocolSection", {})
             id_module = protocol.get("identificationModule", {})
             title = id_module.get("officialTitle", "No title available")
             nct_id = id_module.get("nctId", "No ID available")
             results.append(f"- Title: {title}\n  ID: {nct_id}")
+            if id_module.get("nctId"):
+                trials.append((nct_id, id_module.get("officialTitle", "")))
+
+        record_trials(tool_context, trials)
 
         return (
             "Found the following clinical trials:\n"
@@ -59,5 +75,5 @@ def search_trials(search_query: str) -> str:
             "the pre-conditions."
         )
 
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         return f"An error occurred while searching for clinical trials: {e}"
\ No newline at end of file
@@ -16,6 +16,8 @@
 
 from google.adk.agents import Agent
 from . import prompt
+from ... import model_policy
+from ...prefetch import after_tool_callback as prefetch_after_tool
 
 # tools import
 from .tools import (
@@ -24,7 +26,7 @@ from .tools import (
     summarize_paper_with_medgemma,
 )
 
-MODEL = "gemini-2.5-pro"
+MODEL = model_policy.model_for("literature_researcher")
 
 literature_researcher = Agent(
     name="literature_researcher",
@@ -35,8 +37,10 @@ literature_researcher = Agent(
         "scientific papers from PubMed and the web."
     ),
     tools=[
-        #fetch_articles.fetch_pubmed_articles,
+        fetch_articles.fetch_pubmed_articles,
         extract_text_from_pdf.extract_pdf_text_from_url, 
         summarize_paper_with_medgemma.summarize_paper,
     ],
+    # Warms PMC full text for the titles returned by `fetch_pubmed_articles`.
+    after_tool_callback=prefetch_after_tool,
 )
\ No newline at end of file
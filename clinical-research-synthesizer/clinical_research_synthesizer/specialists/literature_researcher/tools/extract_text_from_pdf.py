@@ -16,10 +16,24 @@
 
 import io
 import PyPDF2
-import requests
+from google.adk.tools.tool_context import ToolContext
 
+from ....http_transport import get
+from ....ledger import record_full_text
+from ....singleflight import single_flight
 
-def extract_pdf_text_from_url(pdf_url: str) -> str:
+
+@single_flight("pdf.text", key=str.strip)
+def _download_pdf_text(pdf_url: str) -> str:
+    """Downloads a PDF and extracts its text; concurrent requests for one URL share the download."""
+    response = get(pdf_url)
+    response.raise_for_status()  # Raise an exception for bad status codes
+    pdf_file = io.BytesIO(response.content)
+    reader = PyPDF2.PdfReader(pdf_file)
+    return "".join(page.extract_text() for page in reader.pages)
+
+
+def extract_pdf_text_from_url(pdf_url: str, tool_context: ToolContext = None) -> str:
     """
     Downloads a PDF from a URL and extracts its text content.
 
@@ -33,17 +47,15 @@ def extract_pdf_text_from_url(pdf_url: str) -> str:
         return "Error: URL does not appear to point to a PDF file."
 
     try:
-        response = requests.get(pdf_url)
-        response.raise_for_status()  # Raise an exception for bad status codes
-        pdf_file = io.BytesIO(response.content)
-        reader = PyPDF2.PdfReader(pdf_file)
-        full_text = "".join(page.extract_text() for page in reader.pages)
+        full_text = _download_pdf_text(pdf_url)
 
         if not full_text.strip():
             return (
                 "Successfully downloaded the PDF, but could not extract text. "
                 "The PDF may be image-based or corrupted."
             )
+        # The PDF has no reliable title; the URL identifies it in the ledger.
+        record_full_text(tool_context, pdf_url, full_text, source=pdf_url)
         # --- CHANGE ---
         # Return ONLY the raw text for clean input into the next tool.
         return full_text
@@ -14,9 +14,41 @@
 
 """Tool for searching for articles on PubMed."""
 
+import os
+
 from Bio import Medline, Entrez
+from google.adk.tools.tool_context import ToolContext
+
+from ....ledger import record_papers
+from ....deadline import run_bounded
+from ....singleflight import normalize_text, single_flight
+
+
+@single_flight("pubmed.search", key=normalize_text)
+def _search_pubmed(search_query: str) -> tuple:
+    """PMIDs and MEDLINE records of the top 3 PubMed hits; concurrent identical searches share one request."""
+    # Entrez takes no timeout; the search is bounded by the caller's deadline instead.
+    return run_bounded(_fetch_medline, search_query)
+
+
+def _fetch_medline(search_query: str) -> tuple:
+    # NCBI requires you to identify yourself with an email address.
+    Entrez.email = os.getenv("ENTREZ_EMAIL")  # Please replace with your email
+
+    handle = Entrez.esearch(db="pubmed", sort="relevance", term=search_query, retmax=3)
+    record = Entrez.read(handle)
+    pmids = record.get("IdList", [])
+    handle.close()
+    if not pmids:
+        return [], []
 
-def fetch_pubmed_articles(search_query: str) -> str:
+    fetch_handle = Entrez.efetch(db="pubmed", id=",".join(pmids), rettype="medline", retmode="text")
+    records = list(Medline.parse(fetch_handle))
+    fetch_handle.close()
+    return pmids, records
+
+
+def fetch_pubmed_articles(search_query: str, tool_context: ToolContext = None) -> str:
     """
     Searches PubMed for a query and returns abstracts of the top 3 articles.
 
@@ -26,29 +58,26 @@ def fetch_pubmed_articles(search_query: str) -> str:
     Returns:
         A formatted string with the titles and abstracts of the search results.
     """
-    # NCBI requires you to identify yourself with an email address.
-    Entrez.email = os.getenv("ENTREZ_EMAIL")  # Please replace with your email
-
     try:
-        handle = Entrez.esearch(db="pubmed", sort="relevance", term=search_query, retmax=3)
-        record = Entrez.read(handle)
-        pmids = record.get("IdList", [])
-        handle.close()
-
+        pmids, records = _search_pubmed(search_query)
         if not pmids:
             return f"No PubMed articles were found for the query: '{search_query}'."
 
-        fetch_handle = Entrez.efetch(db="pubmed", id=",".join(pmids), rettype="medline", retmode="text")
-        records = list(Medline.parse(fetch_handle))
-        fetch_handle.close()
-
         result_str = f"Top 3 PubMed results for '{search_query}':\n"
+        papers = []
         for i, record in enumerate(records):
             title = record.get("TI", "No title available")
             abstract = record.get("AB", "No abstract available")
             pmid = pmids[i]
             result_str += f"\n--- Article #{i+1} ---\nPMID: {pmid}\nTitle: {title}\nAbstract: {abstract}\n"
-        
+            papers.append({
+                "title": title,
+                "pmid": pmid,
+                "source": record.get("SO", ""),
+                "abstract": record.get("AB", ""),
+            })
+
+        record_papers(tool_context, papers)
         return result_str
 
     except Exception as e:
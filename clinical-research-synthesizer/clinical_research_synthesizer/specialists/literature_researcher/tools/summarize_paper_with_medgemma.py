@@ -20,6 +20,10 @@ import os
 import vertexai
 from google.cloud import aiplatform
 from dotenv import load_dotenv
+from google.adk.tools.tool_context import ToolContext
+
+from ....endpoint_guard import EndpointUnavailable, endpoint_pool
+from ....ledger import record_summary
 
 # Load env
 load_dotenv()
@@ -31,7 +35,7 @@ vertexai.init(
 )
 
 
-def summarize_paper(full_text: str) -> str:
+def summarize_paper(full_text: str, tool_context: ToolContext = None) -> str:
     """
     Analyzes the full text of a paper and returns a structured summary.
 
@@ -44,17 +48,17 @@ def summarize_paper(full_text: str) -> str:
     Returns:
         A structured summary of the paper.
     """
-    endpoint_id = os.environ.get("MEDGEMMA_ENDPOINT_ID")
-    if not endpoint_id:
+    endpoint_ids = os.environ.get("MEDGEMMA_ENDPOINT_ID")
+    if not endpoint_ids:
         return "Error: MEDGEMMA_ENDPOINT_ID environment variable is not set."
 
-    endpoint = aiplatform.Endpoint(
+    endpoint = endpoint_pool("medgemma", endpoint_ids, lambda location, endpoint_id: aiplatform.Endpoint(
         endpoint_name=(
             f"projects/{os.environ['GOOGLE_CLOUD_PROJECT']}"
-            f"/locations/{os.environ['GOOGLE_CLOUD_LOCATION']}"
+            f"/locations/{location or os.environ['GOOGLE_CLOUD_LOCATION']}"
             f"/endpoints/{endpoint_id}"
         )
-    )
+    ))
 
     # A more robust prompt for structured extraction
     prompt = f"""
@@ -78,6 +82,10 @@ def summarize_paper(full_text: str) -> str:
     instances = [{"prompt": prompt}]
     try:
         response = endpoint.predict(instances=instances)
-        return response.predictions[0]
+        summary = response.predictions[0]
+        record_summary(tool_context, full_text, str(summary))
+        return summary
+    except EndpointUnavailable as e:
+        return e.message()
     except Exception as e:
         return f"An error occurred while calling the MedGemma endpoint: {e}"
\ No newline at end of file
@@ -16,8 +16,9 @@
 
 from google.adk.agents import Agent
 from .tools import pmc_search
+from ... import model_policy
 
-MODEL = "gemini-2.5-flash"  
+MODEL = model_policy.model_for("search_specialist")
 
 # --- UPDATED INSTRUCTION ---
 UPDATED_INSTRUCTION = """
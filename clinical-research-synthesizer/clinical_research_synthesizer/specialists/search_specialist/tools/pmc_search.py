@@ -2,17 +2,52 @@
 from Bio import Entrez
 import xml.etree.ElementTree as ET
 
+from google.adk.tools.tool_context import ToolContext
+
+from ....deadline import run_bounded
+from ....ledger import record_full_text
+from ....prefetch import PMC_FULL_TEXT, prefetcher
+from ....singleflight import normalize_text, single_flight
+
+# Responses that mean "no full text"; these are never served from the prefetch cache.
+_NO_FULL_TEXT = (
+    "No results found",
+    "Could not find the article",
+    "Full text not available",
+    "An error occurred",
+)
+
 def extract_text_from_element(element):
     text = ""
     if element is not None:
         text = "".join(element.itertext()).strip()
     return text
 
-def search_pmc_by_title(title_query: str, max_results: int = 1) -> str:
+def search_pmc_by_title(title_query: str, max_results: int = 1, tool_context: ToolContext = None) -> str:
     """
     Simplified search for debugging. Performs only a broad topic search on PubMed Central
     and returns the full text of the first result.
     """
+    result = prefetcher.take(PMC_FULL_TEXT, title_query) if max_results == 1 else None
+    if result is None:
+        result = _search_pmc(title_query, max_results)
+    found = not result.startswith(_NO_FULL_TEXT)
+    record_full_text(tool_context, title_query, result if found else "", source="PubMed Central")
+    return result
+
+
+def _pmc_key(title_query: str, max_results: int = 1) -> tuple:
+    return normalize_text(title_query), max_results
+
+
+# Prefetches and tool calls for the same title share one search while it is in flight.
+@single_flight("pmc.search", key=_pmc_key)
+def _search_pmc(title_query: str, max_results: int = 1) -> str:
+    # Entrez takes no timeout; the search is bounded by the caller's deadline instead.
+    return run_bounded(_fetch_pmc_full_text, title_query, max_results)
+
+
+def _fetch_pmc_full_text(title_query: str, max_results: int) -> str:
     Entrez.email = "ryanymt@google.com" 
 
     try:
@@ -48,4 +83,11 @@ def search_pmc_by_title(title_query: str, max_results: int = 1) -> str:
 
     except Exception as e:
         # Return a clear error message for the agent
-        return f"An error occurred during the search: {e}"
\ No newline at end of file
+        return f"An error occurred during the search: {e}"
+
+
+prefetcher.register(
+    PMC_FULL_TEXT,
+    _search_pmc,
+    is_usable=lambda result: not result.startswith(_NO_FULL_TEXT),
+)
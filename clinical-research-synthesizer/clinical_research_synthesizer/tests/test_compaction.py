@@ -0,0 +1,126 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Test cases for rolling compaction of old tool outputs in the coordinator's prompt."""
+
+import copy
+from types import SimpleNamespace
+
+from google.adk.models import LlmRequest
+from google.genai import types
+
+from clinical_research_synthesizer import compaction
+
+FILLER = "Patients were randomized and followed for eighteen months with regular imaging. " * 40
+
+
+def literature_output(turn: int) -> str:
+    """A literature researcher answer of about 3,500 characters with IDs, titles and results."""
+    return (
+        f"- Title: Anti-amyloid therapy trial {turn}\n  PMID: {38000000 + turn}\n"
+        f"- Title: Follow-up of NCT0{5000000 + turn}\n  PMID: {39000000 + turn}\n"
+        f"{FILLER}\n**Results**: Clinical decline slowed by {20 + turn}% in trial {turn}."
+    )
+
+
+def turn(number: int) -> list:
+    """One coordinator turn: the question, a specialist call, its output and the answer."""
+    name = "literature_researcher"
+    return [
+        types.Content(role="user", parts=[types.Part(text=f"Question {number}: what about trial {number}?")]),
+        types.Content(role="model", parts=[types.Part(function_call=types.FunctionCall(
+            id=f"call-{number}", name=name, args={"request": f"trial {number}"}))]),
+        types.Content(role="user", parts=[types.Part(function_response=types.FunctionResponse(
+            id=f"call-{number}", name=name, response={"result": literature_output(number)}))]),
+        types.Content(role="model", parts=[types.Part(text=f"Trial {number} slowed decline.")]),
+    ]
+
+
+def history(turns: int) -> list:
+    return [content for number in range(1, turns + 1) for content in turn(number)]
+
+
+def responses(contents) -> list:
+    return [part.function_response.response["result"] for content in contents for part in content.parts
+            if part.function_response]
+
+
+def test_history_under_the_threshold_is_sent_unchanged():
+    contents = history(3)
+    compacted, count = compaction.compact_contents(contents, token_threshold=compaction.estimate_tokens(contents))
+    assert compacted is contents and count == 0
+
+
+def test_tool_outputs_before_the_recent_turns_are_digested():
+    contents = history(5)
+    compacted, count = compaction.compact_contents(contents, token_threshold=1000, keep_recent_turns=2)
+
+    assert count == 3
+    outputs = responses(compacted)
+    assert all(text.startswith("[Compacted output of `literature_researcher`") for text in outputs[:3])
+    # The last two user turns, with their tool outputs, are sent verbatim.
+    assert outputs[3:] == [literature_output(4), literature_output(5)]
+    assert [c.parts[0].text for c in compacted if c.parts[0].text] == \
+        [c.parts[0].text for c in contents if c.parts[0].text]
+
+
+def test_recent_boundary_counts_user_text_turns_only():
+    contents = history(3)
+    # Function responses have the user role but are not user turns.
+    assert compaction._recent_boundary(contents, 1) == 8
+    assert compaction._recent_boundary(contents, 2) == 4
+    assert compaction._recent_boundary(contents, 5) == 0
+
+
+def test_session_events_are_not_mutated():
+    contents = history(30)
+    assert compaction.estimate_tokens(contents) > compaction.TOKEN_THRESHOLD
+    original = copy.deepcopy(contents)
+    request = LlmRequest(contents=list(contents))
+    compaction.compact_history(SimpleNamespace(agent_name="coordinator"), request)
+
+    # The request is compacted, but the contents it shares with the events are not.
+    assert responses(request.contents)[0].startswith("[Compacted output")
+    assert contents == original
+    assert request.contents[-1] is contents[-1]
+
+
+def test_digest_keeps_ids_titles_and_findings():
+    text = literature_output(7)
+    result = compaction.digest("literature_researcher", text)
+
+    assert result.startswith(f"[Compacted output of `literature_researcher`, originally {len(text)} chars]")
+    assert "PMIDs: 38000007, 39000007" in result
+    assert "NCT IDs: NCT05000007" in result
+    assert "- Title: Anti-amyloid therapy trial 7" in result
+    assert "Key findings: Clinical decline slowed by 27% in trial 7." in result
+    assert len(result) < len(text) / 5
+    assert compaction.digest("literature_researcher", text) is result
+
+
+def test_prompt_size_stays_roughly_flat_over_many_turns():
+    threshold = 4000
+    raw, sent = [], []
+    for turns in range(1, 31):
+        contents = history(turns)
+        compacted, _ = compaction.compact_contents(contents, token_threshold=threshold, keep_recent_turns=2)
+        raw.append(compaction.estimate_tokens(contents))
+        sent.append(compaction.estimate_tokens(compacted))
+
+    per_turn_raw = raw[-1] - raw[-2]
+    per_turn_sent = (sent[-1] - sent[9]) / 20
+    # Raw history grows by a full tool output per turn; the compacted prompt only by a digest.
+    assert per_turn_raw > 800
+    assert per_turn_sent < per_turn_raw / 5
+    assert sent[-1] < raw[-1] / 4
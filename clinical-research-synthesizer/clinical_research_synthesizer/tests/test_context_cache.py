@@ -0,0 +1,88 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Test cases for the coordinator's static-prefix context cache, with a stand-in caches API."""
+
+import asyncio
+from types import SimpleNamespace
+
+from google.adk.models import LlmRequest
+from google.genai import types
+
+from clinical_research_synthesizer import context_cache
+
+MODEL = "gemini-2.5-flash"
+
+
+class StandInCaches:
+    def __init__(self):
+        self.created, self.updated, self.deleted = [], [], []
+
+    async def create(self, model, config):
+        self.created.append((model, config.display_name))
+        return SimpleNamespace(name=f"cachedContents/{len(self.created)}")
+
+    async def update(self, name, config):
+        self.updated.append(name)
+
+    async def delete(self, name):
+        self.deleted.append(name)
+
+
+def make_cache(**kwargs):
+    caches = StandInCaches()
+    client = SimpleNamespace(aio=SimpleNamespace(caches=caches))
+    return context_cache.StaticPrefixCache("coordinator", min_prefix_chars=1, client=client, **kwargs), caches
+
+
+def cached_content(cache, instruction: str, model: str = MODEL):
+    request = LlmRequest(model=model, config=types.GenerateContentConfig(system_instruction=instruction))
+    # Each call runs in its own event loop, as separate runners may.
+    asyncio.run(cache(None, request))
+    return request.config.cached_content
+
+
+def test_changed_prefix_gets_its_own_cache_and_the_old_one_is_kept():
+    cache, caches = make_cache()
+
+    first = cached_content(cache, "prompt v1")
+    second = cached_content(cache, "prompt v2")
+
+    assert first != second
+    # Requests still on the old prefix keep using the old cache; nothing is deleted.
+    assert cached_content(cache, "prompt v1") == first
+    assert caches.deleted == []
+    assert len(caches.created) == 2 and cache.stats["hits"] == 3
+
+
+def test_caches_are_kept_per_model():
+    cache, caches = make_cache()
+
+    assert cached_content(cache, "prompt", MODEL) != cached_content(cache, "prompt", "gemini-2.5-pro")
+    assert [model for model, _ in caches.created] == [MODEL, "gemini-2.5-pro"]
+
+
+def test_cache_is_refreshed_near_expiry_and_forgotten_after_it(monkeypatch):
+    cache, caches = make_cache(ttl_seconds=600, refresh_margin_seconds=60)
+    now = [1000.0]
+    monkeypatch.setattr(context_cache.time, "time", lambda: now[0])
+
+    name = cached_content(cache, "prompt")
+    now[0] += 570
+    assert cached_content(cache, "prompt") == name
+    assert caches.updated == [name]
+
+    now[0] += 601
+    assert cached_content(cache, "prompt") != name
+    assert cache.stats["expired"] == 1 and len(caches.created) == 2
@@ -0,0 +1,86 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Test cases for the evidence ledger, fed by the specialists' registered tools."""
+
+from types import SimpleNamespace
+
+import pytest
+from google.adk.models import LlmRequest
+from google.adk.tools import FunctionTool
+from google.genai import types
+
+from clinical_research_synthesizer import ledger
+from clinical_research_synthesizer.prefetch import Prefetcher
+from clinical_research_synthesizer.specialists.literature_researcher import agent as literature_agent
+from clinical_research_synthesizer.specialists.literature_researcher.tools import fetch_articles
+from clinical_research_synthesizer.specialists.search_specialist import agent as search_agent
+from clinical_research_synthesizer.specialists.search_specialist.tools import pmc_search
+
+pytest_plugins = ("pytest_asyncio",)
+
+TITLES = ["Lecanemab in Early Alzheimer's Disease", "ARIA in anti-amyloid therapy"]
+MEDLINE = (
+    ["38000001", "38000002"],
+    [
+        {"TI": TITLES[0], "AB": "Lecanemab reduced amyloid markers.", "SO": "N Engl J Med"},
+        {"TI": TITLES[1], "AB": "ARIA-E was seen in 12.6% of patients.", "SO": "Lancet Neurol"},
+    ],
+)
+
+
+async def run_registered_tool(agent, name: str, args: dict, state: dict) -> str:
+    funcs = [t for t in agent.tools if getattr(t, "__name__", None) == name]
+    assert funcs, f"{name} is not registered on {agent.name}"
+    tool_context = SimpleNamespace(state=state, tool_confirmation=None)
+    return await FunctionTool(funcs[0]).run_async(args=args, tool_context=tool_context)
+
+
+def content(role: str, text: str) -> types.Content:
+    return types.Content(role=role, parts=[types.Part(text=text)])
+
+
+@pytest.fixture(autouse=True)
+def offline(monkeypatch):
+    monkeypatch.setattr(fetch_articles, "_fetch_medline", lambda query: MEDLINE)
+    monkeypatch.setattr(pmc_search, "_fetch_pmc_full_text", lambda title, max_results: f"Full text of {title}.")
+    monkeypatch.setattr(pmc_search, "prefetcher", Prefetcher(max_workers=1))
+
+
+async def test_pubmed_search_and_full_text_reach_the_synthesis_prompt():
+    state = {}
+    await run_registered_tool(
+        literature_agent.literature_researcher, "fetch_pubmed_articles", {"search_query": "lecanemab"}, state
+    )
+    await run_registered_tool(search_agent.search_specialist, "search_pmc_by_title", {"title_query": TITLES[0]}, state)
+
+    papers = list(state[ledger.LEDGER_KEY]["papers"].values())
+    assert [(p["pmid"], p["title"], p["text_basis"]) for p in papers] == [
+        ("38000001", TITLES[0], ledger.FULL_TEXT),
+        ("38000002", TITLES[1], ledger.ABSTRACT_ONLY),
+    ]
+
+    request = LlmRequest(contents=[
+        content("user", "run literature research on lecanemab"),
+        content("model", "Top 3 PubMed results ... Abstract: Lecanemab reduced amyloid markers."),
+        content("user", "synthesize"),
+    ])
+    ledger.feed_ledger_on_synthesize(SimpleNamespace(state=state), request)
+
+    prompt = request.contents[0].parts[0].text
+    assert "1. Lecanemab in Early Alzheimer's Disease (PMID 38000001, N Engl J Med)" in prompt
+    assert "Text retrieved: full text" in prompt and "Text retrieved: abstract only" in prompt
+    assert "- run literature research on lecanemab" in prompt
+    # The raw tool output in the transcript is replaced by the ledger.
+    assert len(request.contents) == 1 and request.contents[0].parts[-1].text == "synthesize"
@@ -0,0 +1,132 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Test cases for speculative prefetch, driven through the specialists' registered tools."""
+
+import contextvars
+import threading
+from types import SimpleNamespace
+
+import pytest
+from google.adk.tools import FunctionTool
+
+from clinical_research_synthesizer import prefetch
+from clinical_research_synthesizer.agent import research_coordinator
+from clinical_research_synthesizer.prefetch import CRITERIA, PMC_FULL_TEXT, Prefetcher
+from clinical_research_synthesizer.specialists.clinical_trial_specialist import agent as trial_agent
+from clinical_research_synthesizer.specialists.clinical_trial_specialist.tools import search_clinical_trials
+from clinical_research_synthesizer.specialists.literature_researcher import agent as literature_agent
+from clinical_research_synthesizer.specialists.literature_researcher.tools import fetch_articles
+
+pytest_plugins = ("pytest_asyncio",)
+
+MEDLINE = (
+    ["38000001", "38000002"],
+    [
+        {"TI": "Lecanemab in Early Alzheimer's Disease", "AB": "Amyloid reduction.", "SO": "N Engl J Med"},
+        {"TI": "ARIA in anti-amyloid therapy", "AB": "Imaging findings.", "SO": "Lancet Neurol"},
+    ],
+)
+
+STUDIES = {
+    "studies": [
+        {"protocolSection": {"identificationModule": {"nctId": "NCT03887455", "officialTitle": "Clarity AD"}}},
+        {"protocolSection": {"identificationModule": {"nctId": "NCT01767311", "officialTitle": "Study 201"}}},
+    ]
+}
+
+
+@pytest.fixture
+def fetched(monkeypatch):
+    """A fresh prefetcher whose fetchers record the keys they were asked for."""
+    keys = []
+    fresh = Prefetcher(max_workers=1)
+    for kind in (CRITERIA, PMC_FULL_TEXT):
+        fresh.register(kind, lambda key, kind=kind: keys.append((kind, key)) or f"{kind} for {key}")
+    monkeypatch.setattr(prefetch, "prefetcher", fresh)
+    return keys
+
+
+def registered_tool(agent, name: str) -> FunctionTool:
+    funcs = [t for t in agent.tools if getattr(t, "__name__", None) == name]
+    assert funcs, f"{name} is not registered on {agent.name}"
+    return FunctionTool(funcs[0])
+
+
+async def call_tool(agent, name: str, args: dict):
+    """Runs a registered tool and the agent's after-tool callbacks, as ADK does."""
+    tool = registered_tool(agent, name)
+    tool_context = SimpleNamespace(state={}, tool_confirmation=None)
+    result = await tool.run_async(args=args, tool_context=tool_context)
+    for callback in agent.canonical_after_tool_callbacks:
+        assert callback(tool=tool, args=args, tool_context=tool_context, tool_response={"result": result}) is None
+    return result, tool_context
+
+
+async def test_pubmed_results_prefetch_pmc_full_text(monkeypatch, fetched):
+    monkeypatch.setattr(fetch_articles, "_fetch_medline", lambda query: MEDLINE)
+
+    result, _ = await call_tool(
+        literature_agent.literature_researcher, "fetch_pubmed_articles", {"search_query": "lecanemab"}
+    )
+
+    assert "PMID: 38000001" in result
+    # The search specialist later asks for the full text by title.
+    for record in MEDLINE[1]:
+        assert prefetch.prefetcher.take(PMC_FULL_TEXT, record["TI"]) == f"{PMC_FULL_TEXT} for {record['TI']}"
+    assert sorted(fetched) == sorted((PMC_FULL_TEXT, record["TI"]) for record in MEDLINE[1])
+    assert prefetch.prefetcher.stats()["useful"] == 2
+
+
+async def test_trial_search_results_prefetch_eligibility_criteria(monkeypatch, fetched):
+    monkeypatch.setattr(search_clinical_trials, "_search_studies", lambda query: STUDIES)
+
+    await call_tool(trial_agent.clinical_trial_specialist, "search_trials", {"search_query": "lecanemab"})
+
+    for nct_id in ("NCT03887455", "NCT01767311"):
+        assert prefetch.prefetcher.take(CRITERIA, nct_id.lower()) == f"{CRITERIA} for {nct_id}"
+    assert sorted(key for _, key in fetched) == ["NCT01767311", "NCT03887455"]
+
+
+def test_turn_end_cancels_only_that_turns_prefetches(monkeypatch):
+    release = threading.Event()
+    fresh = Prefetcher(max_workers=1)
+    fresh.register(CRITERIA, lambda key: release.wait(5) and f"criteria for {key}")
+    monkeypatch.setattr(prefetch, "prefetcher", fresh)
+    turns = {name: SimpleNamespace(session=SimpleNamespace(id=session), invocation_id=name)
+             for name, session in (("turn-1", "s1"), ("turn-2", "s2"))}
+
+    def run_turn(name: str, keys: list):
+        # Each turn runs in its own context, as concurrent sessions do.
+        prefetch.start_turn(turns[name])
+        fresh.prefetch(CRITERIA, keys)
+
+    contextvars.copy_context().run(run_turn, "turn-1", ["NCT00000001", "NCT00000002", "NCT00000003"])
+    contextvars.copy_context().run(run_turn, "turn-2", ["NCT00000004", "NCT00000005"])
+
+    prefetch.end_turn(turns["turn-1"])
+    assert prefetch.prefetch_stats()["outstanding"] == 2
+    release.set()
+    assert fresh.take(CRITERIA, "NCT00000001") is None
+    assert fresh.take(CRITERIA, "NCT00000004") == "criteria for NCT00000004"
+
+    # Deleting a session cancels what is left of it.
+    assert fresh.cancel(session_id="s1") == 0 and fresh.cancel(session_id="s2") == 1
+    stats = prefetch.prefetch_stats()
+    assert (stats["issued"], stats["useful"], stats["wasted"], stats["outstanding"]) == (5, 1, 4, 0)
+
+
+def test_coordinator_scopes_prefetches_to_its_turns():
+    assert prefetch.start_turn in research_coordinator.canonical_before_agent_callbacks
+    assert prefetch.end_turn in research_coordinator.canonical_after_agent_callbacks
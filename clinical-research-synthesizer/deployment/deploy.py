@@ -1,12 +1,19 @@
 # Copyright 2025 Google LLC
 # Licensed under the Apache License, Version 2.0.
 
+import copy
 import os
 import vertexai
 from absl import app, flags
 from dotenv import load_dotenv
-# FIX: Import 'root_agent' (the correct name defined in your agent.py)
-from clinical_research_synthesizer.agent import root_agent 
+from clinical_research_synthesizer import topology
+from clinical_research_synthesizer.agent import build_research_coordinator
+from clinical_research_synthesizer.deadline import deadline_stats
+from clinical_research_synthesizer.endpoint_guard import endpoint_stats
+from clinical_research_synthesizer.http_transport import transport_stats
+from clinical_research_synthesizer.model_policy import policy_stats
+from clinical_research_synthesizer.prefetch import prefetch_stats, prefetcher
+from clinical_research_synthesizer.singleflight import singleflight_stats
 from vertexai import agent_engines
 from vertexai.preview.reasoning_engines import AdkApp
 
@@ -15,12 +22,68 @@ flags.DEFINE_string("project_id", None, "GCP project ID.")
 flags.DEFINE_string("location", None, "GCP location.")
 flags.DEFINE_string("bucket", None, "GCP storage bucket for staging.")
 flags.DEFINE_bool("create", False, "Creates a new agent.")
+flags.DEFINE_enum("topology", topology.TOPOLOGY, list(topology.TOPOLOGIES),
+                  "Coordinator tool topology: 'hierarchical' or 'direct'.")
+
+
+class ClinicalResearchApp(AdkApp):
+    """AdkApp that also reports the agent's runtime stats."""
+
+    STATS_OPERATIONS = ["prefetch_stats", "endpoint_stats", "deadline_stats", "transport_stats", "dedup_stats",
+                        "policy_stats"]
+
+    def register_operations(self):
+        operations = super().register_operations()
+        operations[""] = operations[""] + self.STATS_OPERATIONS
+        return operations
+
+    def clone(self):
+        # agent_engines.create deploys a clone; AdkApp.clone() would drop the subclass.
+        attrs = self._tmpl_attrs
+        return type(self)(
+            agent=copy.deepcopy(attrs.get("agent")),
+            enable_tracing=attrs.get("enable_tracing"),
+            session_service_builder=attrs.get("session_service_builder"),
+            artifact_service_builder=attrs.get("artifact_service_builder"),
+            memory_service_builder=attrs.get("memory_service_builder"),
+            env_vars=attrs.get("env_vars"),
+        )
+
+    async def async_delete_session(self, *, user_id: str, session_id: str, **kwargs):
+        # Prefetches the session's last turn left running are no longer useful.
+        prefetcher.cancel(session_id=session_id)
+        return await super().async_delete_session(user_id=user_id, session_id=session_id, **kwargs)
+
+    def prefetch_stats(self) -> dict:
+        """Issued, useful, wasted and outstanding speculative prefetches (criteria, PMC full texts)."""
+        return prefetch_stats()
+
+    def endpoint_stats(self) -> dict:
+        """Concurrency limit, rejections, breaker state and per-class queue waits of each Gemma endpoint."""
+        return endpoint_stats()
+
+    def deadline_stats(self) -> dict:
+        """Calls, deadline-exceeded and cancelled counts per tool, sub-agent and run."""
+        return deadline_stats()
+
+    def transport_stats(self) -> dict:
+        """Requests, retries, errors, HTTP/2 share and latency p50/p99 per REST host."""
+        return transport_stats()
+
+    def dedup_stats(self) -> dict:
+        """Calls, executions and dedup ratio of each single-flight group."""
+        return singleflight_stats()
+
+    def policy_stats(self) -> dict:
+        """Calls and latency per model tier, and the escalation rate per agent."""
+        return policy_stats()
+
 
 def create_agent(env_vars):
     print("🚀 Deploying CLINICAL RESEARCHER (ADK + Telemetry)...")
     
-    # FIX: Use the correct agent instance
-    adk_app = AdkApp(agent=root_agent)
+    root_agent = build_research_coordinator(FLAGS.topology)
+    adk_app = ClinicalResearchApp(agent=root_agent)
     
     remote_agent = agent_engines.create(
         adk_app,
@@ -37,7 +100,7 @@ def create_agent(env_vars):
             "google-search-results>=2.4.2",
             "pandas>=2.0.3",
             "lxml>=4.9.3",
-            "requests>=2.31.0",
+            "httpx[http2,brotli]>=0.28.0",
             "beautifulsoup4>=4.12.3",
             "pydantic==2.11.7",
             "cloudpickle==3.1.1"
@@ -54,6 +117,7 @@ def main(_):
         "TXGEMMA_CHAT_ENDPOINT_ID": os.getenv("TXGEMMA_CHAT_ENDPOINT_ID", "placeholder"),
         "MEDGEMMA_ENDPOINT_ID": os.getenv("MEDGEMMA_ENDPOINT_ID", "placeholder"),
         "SERPAPI_API_KEY": os.getenv("SERPAPI_API_KEY", "placeholder"),
+        "AGENT_TOPOLOGY": FLAGS.topology,
         "OTEL_SERVICE_NAME": "clinical-research-agent",
         "OTEL_PYTHON_LOGGING_AUTO_INSTRUMENTATION_ENABLED": "true",
         "OTEL_INSTRUMENTATION_GENAI_CAPTURE_MESSAGE_CONTENT": "true"
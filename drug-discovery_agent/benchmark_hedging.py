@@ -0,0 +1,85 @@
+"""
+Measures TxGemma endpoint-pool latency with and without hedged requests.
+
+Runs the same workload through an EndpointPool of local stand-in endpoints
+(no GCP needed): each replica answers in ~50 ms, with a heavy tail of
+occasional 1 s stalls, and one replica is slower overall. Reports p50/p95/p99
+latency and how many calls were hedged.
+
+Usage: python benchmark_hedging.py [--calls 400] [--concurrency 8] [--replicas 3]
+"""
+
+import argparse
+import random
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+from drug_discovery_agent.endpoint_guard import EndpointPool, GuardedEndpoint
+
+
+class StandInEndpoint:
+    """Answers after a lognormal delay, with a `stall_rate` chance of a `stall_s` stall."""
+
+    def __init__(self, median_s: float, stall_rate: float, stall_s: float, seed: int):
+        self.median_s = median_s
+        self.stall_rate = stall_rate
+        self.stall_s = stall_s
+        self.random = random.Random(seed)
+
+    def predict(self, instances, timeout=None):
+        delay = self.median_s * self.random.lognormvariate(0, 0.3)
+        if self.random.random() < self.stall_rate:
+            delay += self.stall_s
+        time.sleep(min(delay, timeout or delay))
+        return SimpleNamespace(predictions=["(A)"] * len(instances))
+
+
+def build_pool(replicas: int, hedging: bool) -> EndpointPool:
+    guarded = []
+    for i in range(replicas):
+        # The last replica is a slower region.
+        stand_in = StandInEndpoint(0.05 * (2 if i == replicas - 1 else 1), 0.03, 1.0, seed=i)
+        guarded.append(GuardedEndpoint(f"stand-in-{i}", lambda stand_in=stand_in: stand_in))
+    return EndpointPool("txgemma-predict", guarded, hedging=hedging)
+
+
+def run(pool: EndpointPool, calls: int, concurrency: int) -> list:
+    def call(i):
+        start = time.perf_counter()
+        pool.predict([{"prompt": f"q{i}"}])
+        return time.perf_counter() - start
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        return list(executor.map(call, range(calls)))
+
+
+def percentile(values: list, p: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--calls", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--replicas", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'mode':<12}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'hedged':>9}{'won':>6}")
+    for hedging in (False, True):
+        pool = build_pool(args.replicas, hedging)
+        latencies = run(pool, args.calls, args.concurrency)
+        stats = pool.stats()
+        print(
+            f"{'hedged' if hedging else 'plain':<12}"
+            f"{statistics.median(latencies) * 1000:>9.0f}"
+            f"{percentile(latencies, 95) * 1000:>9.0f}"
+            f"{percentile(latencies, 99) * 1000:>9.0f}"
+            f"{stats['hedged']:>9}{stats['hedge_wins']:>6}"
+        )
+
+
+if __name__ == "__main__":
+    main()
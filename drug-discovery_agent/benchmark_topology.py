@@ -0,0 +1,110 @@
+"""
+Compares the 'hierarchical' and 'direct' coordinator topologies locally.
+
+Runs each query through an InMemoryRunner once per topology and reports the
+number of LLM calls (coordinator + sub-agents) and the wall-clock latency.
+
+Usage: python benchmark_topology.py "What is the SMILES of aspirin?" ["..."]
+"""
+
+import asyncio
+import sys
+import time
+
+from dotenv import load_dotenv
+from google.adk.agents import LlmAgent
+from google.adk.runners import InMemoryRunner
+from google.adk.tools.agent_tool import AgentTool
+from google.genai import types
+
+from drug_discovery_agent import topology
+from drug_discovery_agent.agent import build_discovery_coordinator
+
+DEFAULT_QUERIES = [
+    "What is the SMILES string for aspirin, and is it predicted to be toxic?",
+    "Find recent PubMed articles on LRRK2 inhibitors for Parkinson's disease.",
+]
+
+
+class LlmCallCounter:
+    """A before_model_callback that counts model calls per agent."""
+
+    def __init__(self):
+        self.calls = {}
+
+    def __call__(self, callback_context, llm_request):
+        name = callback_context.agent_name
+        self.calls[name] = self.calls.get(name, 0) + 1
+        return None
+
+    def reset(self):
+        self.calls = {}
+
+    @property
+    def total(self) -> int:
+        return sum(self.calls.values())
+
+
+def _walk_agents(agent):
+    yield agent
+    for tool in getattr(agent, "tools", []):
+        if isinstance(tool, AgentTool):
+            yield from _walk_agents(tool.agent)
+    for sub_agent in getattr(agent, "sub_agents", []):
+        yield from _walk_agents(sub_agent)
+
+
+def _instrument(root, counter: LlmCallCounter):
+    for agent in _walk_agents(root):
+        if not isinstance(agent, LlmAgent):
+            continue
+        existing = agent.before_model_callback
+        if existing is None:
+            agent.before_model_callback = counter
+        elif isinstance(existing, list):
+            if counter not in existing:
+                agent.before_model_callback = [counter, *existing]
+        elif existing is not counter:
+            agent.before_model_callback = [counter, existing]
+
+
+async def run_query(runner: InMemoryRunner, query: str) -> str:
+    session = await runner.session_service.create_session(
+        app_name=runner.app_name, user_id="benchmark"
+    )
+    response = ""
+    async for event in runner.run_async(
+        user_id=session.user_id,
+        session_id=session.id,
+        new_message=types.Content(role="user", parts=[types.Part(text=query)]),
+    ):
+        if event.content and event.content.parts:
+            response += "".join(p.text for p in event.content.parts if p.text)
+    return response
+
+
+async def benchmark(queries: list) -> None:
+    counter = LlmCallCounter()
+    results = []
+    for mode in topology.TOPOLOGIES:
+        coordinator = build_discovery_coordinator(mode)
+        _instrument(coordinator, counter)
+        runner = InMemoryRunner(agent=coordinator, app_name="drug_discovery_benchmark")
+        for query in queries:
+            counter.reset()
+            start = time.perf_counter()
+            await run_query(runner, query)
+            elapsed = time.perf_counter() - start
+            results.append((mode, query, counter.total, dict(counter.calls), elapsed))
+
+    print(f"{'topology':<14} {'llm_calls':>9} {'latency_s':>10}  query")
+    for mode, query, total, _, elapsed in results:
+        print(f"{mode:<14} {total:>9} {elapsed:>10.2f}  {query[:60]}")
+    print("\nLLM calls per agent:")
+    for mode, query, _, per_agent, _ in results:
+        print(f"- [{mode}] {query[:40]}: {per_agent}")
+
+
+if __name__ == "__main__":
+    load_dotenv()
+    asyncio.run(benchmark(sys.argv[1:] or DEFAULT_QUERIES))
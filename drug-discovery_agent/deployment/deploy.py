@@ -1,16 +1,35 @@
 import os
+import time
 import asyncio
+import contextlib
 import vertexai
 from vertexai.preview import reasoning_engines
 
 # --- STRICT ADK IMPORTS ---
 from google.adk.agents import LlmAgent
-from google.adk.runners import InMemoryRunner
+from google.adk.agents.run_config import RunConfig, StreamingMode
+from google.adk.runners import InMemoryRunner, Runner
 from google.adk.tools import FunctionTool
-from google.adk.tools.api_registry import ApiRegistry
+from google.adk.tools.tool_context import ToolContext
 from google.adk.code_executors import UnsafeLocalCodeExecutor
 from google.genai import types
-from serpapi import GoogleSearch
+
+from drug_discovery_agent import deadline
+from drug_discovery_agent.deadline import budgeted_tool, deadline_stats
+from drug_discovery_agent.endpoint_guard import endpoint_stats
+from drug_discovery_agent.endpoint_scheduler import INTERACTIVE, request_class
+from drug_discovery_agent.http_transport import get, transport_stats
+from drug_discovery_agent.model_policy import policy_stats
+from drug_discovery_agent.screening.descriptors import prefilter_stats
+from drug_discovery_agent.sessions import SqliteSessionService
+from drug_discovery_agent.singleflight import singleflight_stats
+from drug_discovery_agent.specialists.infrastructure_specialist.tools import hpc_tools
+from drug_discovery_agent.specialists.infrastructure_specialist.tools.mcp_client import (
+    MCP_BATCH_MAX_SIZE,
+    McpClientCache,
+    get_registry,
+)
+from drug_discovery_agent.streaming import tool_text_sink
 
 # --- Configuration ---
 PROJECT_ID = "rsabawi-agents-sandbox-841800"
@@ -19,16 +38,35 @@ STAGING_BUCKET = "gs://rsabawi-staging-gs"
 MCP_COMPUTE_NAME = "projects/rsabawi-agents-sandbox-841800/locations/global/mcpServers/google-compute.googleapis.com-mcp"
 MCP_GKE_NAME = "projects/rsabawi-agents-sandbox-841800/locations/global/mcpServers/google-kubernetes-engine.googleapis.com-mcp"
 SERPAPI_KEY = os.getenv("SERPAPI_API_KEY")
+SERPAPI_URL = "https://serpapi.com/search.json"
+# Max events buffered between the agent run and a slow stream consumer.
+STREAM_BUFFER_SIZE = int(os.getenv("STREAM_BUFFER_SIZE", "64"))
+
+# "sqlite": persistent, memory-bounded sessions; "memory": ADK's InMemoryRunner.
+SESSION_BACKEND = os.getenv("SESSION_BACKEND", "sqlite")
+APP_NAME = "drug_discovery_app"
+
+_STREAM_DONE = object()
 
 class DrugDiscoveryApp:
     """
     A Fully Compliant ADK Wrapper.
     Exposes the complete Session Interface required by Vertex AI Playground.
     """
-    def __init__(self, project_id: str, api_key: str):
+    def __init__(self, project_id: str, api_key: str, session_backend: str = SESSION_BACKEND):
         self.project_id = project_id
         self.api_key = api_key
+        self.session_backend = session_backend
         self.runner = None
+        self.mcp_clients = None
+
+    def set_up(self):
+        """Called once when the engine loads: builds the agent and the API registry."""
+        self._lazy_init()
+        try:
+            get_registry(self.project_id)
+        except Exception as e:
+            print(f"API Registry warm-up failed; will retry on first tool call: {e}")
 
     def _lazy_init(self):
         """Initializes the Agent & Runner inside the container."""
@@ -39,35 +77,44 @@ class DrugDiscoveryApp:
         def search_web(query: str) -> str:
             try:
                 if not self.api_key: return "Error: SERPAPI_API_KEY not set."
-                search = GoogleSearch({"q": query, "api_key": self.api_key})
-                results = search.get_dict()
+                response = get(SERPAPI_URL, params={"engine": "google", "q": query, "api_key": self.api_key})
+                response.raise_for_status()
+                results = response.json()
                 snippets = [f"- {r.get('title')}: {r.get('snippet')}" for r in results.get("organic_results", [])[:3]]
                 return "\n".join(snippets) if snippets else "No results found."
             except Exception as e: return f"Error: {str(e)}"
 
-        def execute_mcp_tool(service: str, tool_name: str, arguments: dict) -> str:
+        # Cached registry and indexed toolsets: one MCP invocation per call.
+        self.mcp_clients = McpClientCache(
+            self.project_id, {"compute": MCP_COMPUTE_NAME, "gke": MCP_GKE_NAME}
+        )
+
+        async def execute_mcp_tool(service: str, tool_name: str, arguments: dict, tool_context: ToolContext) -> dict:
             try:
-                registry = ApiRegistry(self.project_id)
-                server_name = MCP_COMPUTE_NAME if service == "compute" else MCP_GKE_NAME
-                
-                # Dynamic Filtering: Only fetch the tool the agent asked for
-                toolset = registry.get_toolset(mcp_server_name=server_name, tool_filter=[tool_name])
-                target = next((t for t in toolset if t.name == tool_name), None)
-                
-                if not target: return f"Error: Tool '{tool_name}' not found."
-                return target.run(arguments)
-            except Exception as e: return f"Error: {str(e)}"
+                return await self.mcp_clients.run(service, tool_name, arguments, tool_context)
+            except KeyError as e: return {"error": f"Error: {e.args[0]}"}
+            except Exception as e: return {"error": f"Error: {str(e)}"}
+
+        async def execute_mcp_tools_batch(invocations: list[dict], tool_context: ToolContext) -> dict:
+            """Runs several {"service", "tool_name", "arguments"} invocations concurrently, results in order."""
+            if len(invocations) > MCP_BATCH_MAX_SIZE:
+                return {"error": f"Error: at most {MCP_BATCH_MAX_SIZE} invocations per batch."}
+            return {"results": await self.mcp_clients.run_batch(invocations, tool_context)}
 
         infra_prompt = """
         You are the **Infrastructure Specialist**.
         **PROTOCOL:**
         1. **Select Tool:** Pick the exact `tool_name` from the list.
         2. **Execute:** Call `execute_mcp_tool(service, tool_name, arguments)`.
+           For several independent calls, make ONE `execute_mcp_tools_batch(invocations)` call
+           with a list of `{"service": ..., "tool_name": ..., "arguments": {...}}`.
         
         **AVAILABLE TOOLS:**
         * `list_clusters` (gke)
         * `compute.instances.list` (compute)
         * `compute.instances.insert` (compute)
+        * `deploy_hpc_cluster`, `submit_slurm_job`, `check_job_status`, `cancel_job`, `list_hpc_jobs`
+          (direct tools; local Slurm-compatible scheduler)
         """
 
         # 2. Create Agent & Runner
@@ -75,64 +122,215 @@ class DrugDiscoveryApp:
             name="infra_specialist",
             model="gemini-2.5-pro",
             instruction=infra_prompt,
-            tools=[FunctionTool(execute_mcp_tool), FunctionTool(search_web)],
-            code_executor=UnsafeLocalCodeExecutor(work_dir="/tmp")
+            # Each tool call gets its share of the run's deadline.
+            tools=[
+                FunctionTool(budgeted_tool(execute_mcp_tool)),
+                FunctionTool(budgeted_tool(execute_mcp_tools_batch)),
+                FunctionTool(budgeted_tool(search_web)),
+                FunctionTool(budgeted_tool(hpc_tools.deploy_hpc_cluster)),
+                FunctionTool(budgeted_tool(hpc_tools.submit_slurm_job)),
+                FunctionTool(budgeted_tool(hpc_tools.check_job_status)),
+                FunctionTool(budgeted_tool(hpc_tools.cancel_job)),
+                FunctionTool(budgeted_tool(hpc_tools.list_hpc_jobs)),
+            ],
+            code_executor=UnsafeLocalCodeExecutor(work_dir="/tmp"),
+            before_agent_callback=self.mcp_clients.warm_up_callback(),
         )
-        self.runner = InMemoryRunner(agent=agent)
+        if self.session_backend == "sqlite":
+            self.runner = Runner(agent=agent, app_name=APP_NAME, session_service=SqliteSessionService())
+        else:
+            self.runner = InMemoryRunner(agent=agent, app_name=APP_NAME)
 
     # --- MANDATORY PLAYGROUND INTERFACE (Fix #2) ---
     
     async def create_session(self, user_id: str = "vertex_user") -> str:
         """Required by Playground to start new chats."""
         self._lazy_init()
-        session = await self.runner.create_session(user_id=user_id)
-        return session.session_id
+        session = await self.runner.session_service.create_session(
+            app_name=self.runner.app_name, user_id=user_id
+        )
+        return session.id
 
     async def list_sessions(self, user_id: str = "vertex_user") -> list:
         """Required by Playground to show chat history sidebar."""
         self._lazy_init()
         # ADK returns objects; we must return a JSON-serializable list for Vertex
-        sessions = await self.runner.list_sessions(user_id=user_id)
-        return [{"session_id": s.session_id} for s in sessions]
+        response = await self.runner.session_service.list_sessions(
+            app_name=self.runner.app_name, user_id=user_id
+        )
+        return [{"session_id": s.id, "last_update_time": s.last_update_time} for s in response.sessions]
 
     async def get_session(self, session_id: str, user_id: str = "vertex_user"):
         """Required by Playground to load past chats."""
         self._lazy_init()
-        return await self.runner.get_session(session_id=session_id, user_id=user_id)
+        session = await self.runner.session_service.get_session(
+            app_name=self.runner.app_name, user_id=user_id, session_id=session_id
+        )
+        return session.model_dump(mode="json") if session else None
 
     async def delete_session(self, session_id: str, user_id: str = "vertex_user"):
         """Required by Playground to delete chats."""
         self._lazy_init()
-        return await self.runner.delete_session(session_id=session_id, user_id=user_id)
+        return await self.runner.session_service.delete_session(
+            app_name=self.runner.app_name, user_id=user_id, session_id=session_id
+        )
+
+    def session_stats(self) -> dict:
+        """Hot-session cache size and memory footprint (sqlite backend only)."""
+        self._lazy_init()
+        service = self.runner.session_service
+        return service.stats() if isinstance(service, SqliteSessionService) else {}
 
-    async def query(self, input: str, session_id: str = None, user_id: str = "vertex_user") -> str:
+    def endpoint_stats(self) -> dict:
+        """Concurrency limit, rejections, breaker state and per-class queue waits of each Gemma endpoint."""
+        return endpoint_stats()
+
+    def deadline_stats(self) -> dict:
+        """Calls, deadline-exceeded and cancelled counts per tool, sub-agent and run."""
+        return deadline_stats()
+
+    def transport_stats(self) -> dict:
+        """Requests, retries, errors, HTTP/2 share and latency p50/p99 per REST host."""
+        return transport_stats()
+
+    def policy_stats(self) -> dict:
+        """Calls and latency per model tier, and the flash-to-pro escalation rate per agent."""
+        return policy_stats()
+
+    def prefilter_stats(self) -> dict:
+        """Endpoint calls saved by rejecting pre-filter rules, per tool (toxicity tool, screens)."""
+        return prefilter_stats()
+
+    def dedup_stats(self) -> dict:
+        """Calls, executions and dedup ratio of each single-flight group (PubChem, PubMed, TxGemma, screens)."""
+        return singleflight_stats()
+
+    async def aclose(self):
+        """Shutdown: closes the cached MCP sessions and the runner's toolsets."""
+        if self.mcp_clients is not None:
+            await self.mcp_clients.aclose()
+        if self.runner is not None:
+            await self.runner.close()
+
+    async def _ensure_session(self, session_id: str, user_id: str) -> str:
+        if session_id:
+            return session_id
+        sess = await self.runner.session_service.create_session(
+            app_name=self.runner.app_name, user_id=user_id
+        )
+        return sess.id
+
+    @staticmethod
+    def _stream_items(event) -> list:
+        """Converts one ADK event into stream items (text, tool progress)."""
+        items = []
+        for call in event.get_function_calls():
+            items.append({"type": "tool_call_start", "name": call.name, "id": call.id, "author": event.author})
+        for resp in event.get_function_responses():
+            items.append({"type": "tool_call_finish", "name": resp.name, "id": resp.id, "author": event.author})
+        if event.content and event.content.parts:
+            text = "".join(p.text for p in event.content.parts if getattr(p, "text", None))
+            if text:
+                items.append({"type": "text", "text": text, "partial": bool(event.partial), "author": event.author})
+        return items
+
+    async def stream_query(self, input: str, session_id: str = None, user_id: str = "vertex_user"):
         """
-        The Main Entry Point.
+        Streams a run as it happens.
+
+        Yields dicts of type:
+        * "text": a chunk of model output. Chunks have partial=True; the complete
+          text of each model turn follows with partial=False.
+        * "tool_call_start" / "tool_call_finish": tool progress.
+        * "tool_text": a chunk of a tool's answer while it is still generating
+          (e.g. ask_therapeutics_expert); the tool's complete answer goes to the model.
+        * "error": the run failed or ran past its deadline.
+        * "usage": final token usage and timings (always the last item).
+
+        The run is decoupled from the consumer by a bounded queue, so a slow
+        consumer pauses the run instead of buffering without limit. It has an
+        INVOCATION_DEADLINE_SECONDS deadline, shared out among its tools, and
+        is cancelled if the consumer goes away.
         """
         self._lazy_init()
-        
-        # Auto-create session if missing (for API calls)
-        if not session_id:
-            sess = await self.runner.create_session(user_id=user_id)
-            session_id = sess.session_id
-
+        session_id = await self._ensure_session(session_id, user_id)
         msg_content = types.Content(role="user", parts=[types.Part.from_text(text=input)])
-        
-        response_text = ""
+
+        queue = asyncio.Queue(maxsize=STREAM_BUFFER_SIZE)
+        usage = {"prompt_tokens": 0, "candidates_tokens": 0, "total_tokens": 0}
+
+        async def produce():
+            try:
+                async for event in self.runner.run_async(
+                    new_message=msg_content,
+                    user_id=user_id,
+                    session_id=session_id,
+                    run_config=RunConfig(streaming_mode=StreamingMode.SSE),
+                ):
+                    if event.usage_metadata and not event.partial:
+                        meta = event.usage_metadata
+                        usage["prompt_tokens"] += meta.prompt_token_count or 0
+                        usage["candidates_tokens"] += meta.candidates_token_count or 0
+                        usage["total_tokens"] += meta.total_token_count or 0
+                    for item in self._stream_items(event):
+                        await queue.put(item)
+            except Exception as e:
+                await queue.put({"type": "error", "message": f"ADK Runtime Error: {str(e)}"})
+            # Skipped when the producer is cancelled: the consumer has gone, and
+            # waiting for room on a full queue would never end.
+            await queue.put(_STREAM_DONE)
+
+        start = time.perf_counter()
+        first_text_at = None
+        # Streaming tools in the run put their partial answers on the same queue. Its
+        # Gemma calls are interactive traffic, shared fairly with other sessions.
+        with (tool_text_sink(queue.put), request_class(INTERACTIVE, session=session_id),
+              deadline.invocation(name="stream_query") as run_deadline):
+            producer = asyncio.create_task(produce())
+        finished = False
         try:
-            # --- RUNTIME FIX (Fix #1) ---
-            async for event in self.runner.run_async(
-                new_message=msg_content,
-                user_id=user_id,       # Mandatory Arg 1
-                session_id=session_id  # Mandatory Arg 2
-            ):
-                if hasattr(event, "content") and event.content and event.content.parts:
-                    for part in event.content.parts:
-                        if hasattr(part, "text") and part.text:
-                            response_text += part.text
-        except Exception as e:
-            return f"ADK Runtime Error: {str(e)}"
-            
+            while True:
+                try:
+                    item = await asyncio.wait_for(queue.get(), run_deadline.remaining())
+                except TimeoutError:
+                    yield {"type": "error", "message": f"Deadline exceeded after {run_deadline.budget_s:g}s."}
+                    break
+                if item is _STREAM_DONE:
+                    finished = True
+                    break
+                if item["type"] in ("text", "tool_text") and first_text_at is None:
+                    first_text_at = time.perf_counter() - start
+                yield item
+        finally:
+            if not finished:
+                # Stops the run if it timed out or the consumer went away mid-stream;
+                # blocking tools still running stop at their next outbound call.
+                run_deadline.cancel()
+            deadline.stats.record(run_deadline.name, run_deadline)
+            producer.cancel()
+
+        yield {
+            "type": "usage",
+            "session_id": session_id,
+            **usage,
+            "time_to_first_text_s": first_text_at,
+            "elapsed_s": time.perf_counter() - start,
+        }
+
+    async def query(self, input: str, session_id: str = None, user_id: str = "vertex_user") -> str:
+        """
+        The Main Entry Point. A thin wrapper over `stream_query`.
+        """
+        response_text = ""
+        # Closing the stream on an early return ends its run now, not at garbage collection.
+        async with contextlib.aclosing(
+                self.stream_query(input=input, session_id=session_id, user_id=user_id)) as items:
+            async for item in items:
+                if item["type"] == "error":
+                    return item["message"]
+                if item["type"] == "text" and not item["partial"]:
+                    response_text += item["text"]
+
         return response_text if response_text else "No response generated."
 
 def deploy():
@@ -149,10 +347,17 @@ def deploy():
         requirements=[
             "google-cloud-aiplatform==1.132.0", 
             "google-adk",
-            "google-search-results",
+            "httpx[http2,brotli]",
             "pydantic",
-            "cloudpickle"
+            "cloudpickle",
+            "zstandard",
+            "rdkit",
+            "pyarrow",
+            "numpy",
+            "scikit-learn",
+            "joblib",
         ],
+        extra_packages=["./drug_discovery_agent"],
     )
     print(f"✅ Created remote agent: {remote_app.resource_name}")
     return remote_app
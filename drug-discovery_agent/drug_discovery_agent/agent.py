@@ -1,28 +1,51 @@
 """Defines the main 'discovery_coordinator' agent."""
 
 from google.adk.agents import LlmAgent
-from google.adk.tools.agent_tool import AgentTool
+from . import context_cache
+from . import deadline
+from . import model_policy
 from . import prompt
+from . import topology
 from .specialists.compound_analyzer import agent as compound_analyzer_agent
 from .specialists.literature_researcher import agent as literature_researcher_agent
 from .specialists.infrastructure_specialist import agent as infrastructure_specialist_agent
 
-# Standardizing on the high-reasoning model
-MODEL = "gemini-2.5-pro"
+# Resolved through the central model policy (high-reasoning model by default).
+MODEL = model_policy.model_for("discovery_coordinator")
+
+SPECIALISTS = [
+    compound_analyzer_agent.compound_analyzer,
+    literature_researcher_agent.literature_researcher,
+    infrastructure_specialist_agent.infrastructure_specialist,
+]
+
+
+# The coordinator prompt and tool declarations are re-sent on every turn;
+# serve them from a Gemini context cache instead.
+static_prefix_cache = context_cache.StaticPrefixCache(display_name="discovery-coordinator")
+
+
+def build_discovery_coordinator(topology_mode: str = topology.TOPOLOGY) -> LlmAgent:
+    """Builds the coordinator in 'hierarchical' or 'direct' tool topology."""
+    return LlmAgent(
+        name="discovery_coordinator",
+        model=MODEL,
+        description="The main agent that coordinates drug discovery tasks.",
+        instruction=topology.coordinator_instruction(
+            prompt.DISCOVERY_COORDINATOR_PROMPT, SPECIALISTS, topology_mode,
+            usage_notes=prompt.DIRECT_TOOL_NOTES,
+        ),
+        tools=topology.coordinator_tools(SPECIALISTS, topology_mode),
+        # Context caches are per model, so tiered (escalating) models are skipped.
+        before_model_callback=static_prefix_cache if isinstance(MODEL, str) else None,
+        # Runs not started through `deadline.invocation()` get their deadline here.
+        before_agent_callback=deadline.start_invocation,
+    )
+
 
 # Define the Agent directly
-discovery_coordinator = LlmAgent(
-    name="discovery_coordinator",
-    model=MODEL,
-    description="The main agent that coordinates drug discovery tasks.",
-    instruction=prompt.DISCOVERY_COORDINATOR_PROMPT,
-    tools=[
-        AgentTool(agent=compound_analyzer_agent.compound_analyzer),
-        AgentTool(agent=literature_researcher_agent.literature_researcher),
-        AgentTool(agent=infrastructure_specialist_agent.infrastructure_specialist),
-    ],
-)
-
-# Export the NATIVE ADK agent. 
+discovery_coordinator = build_discovery_coordinator()
+
+# Export the NATIVE ADK agent.
 # This ensures Vertex AI detects the framework as "google-adk".
-root_agent = discovery_coordinator
\ No newline at end of file
+root_agent = discovery_coordinator
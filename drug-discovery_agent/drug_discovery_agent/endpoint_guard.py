@@ -0,0 +1,638 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Overload protection for the Gemma (TxGemma / MedGemma) Vertex AI endpoints.
+
+Every call goes through a `GuardedEndpoint`, which combines:
+
+* an AIMD concurrency limiter: the number of calls in flight grows by about
+  one per window of successful calls and halves on 429/503/timeouts (and
+  shrinks gently when latency exceeds GEMMA_LATENCY_TARGET_SECONDS); calls
+  over the limit wait in a weighted fair queue by priority class and session,
+  and are rejected when they would wait longer than their class's queue SLO
+  (see endpoint_scheduler.py);
+* a circuit breaker: after GEMMA_BREAKER_FAILURES consecutive failures the
+  endpoint is not called for GEMMA_BREAKER_RESET_SECONDS, then a single probe
+  call decides whether to close it again.
+
+Each model can be served by several endpoints (regions or deployments), listed
+as comma-separated `[location/]endpoint_id` entries. An `EndpointPool` sends
+each call to the healthy replica with the fewest outstanding requests, fails
+over to the next one, and with GEMMA_HEDGING sends a second copy of a call to
+another replica once it has taken longer than the replicas' GEMMA_HEDGE_PERCENTILE
+latency, using whichever answer arrives first. Streaming calls (`stream`) are
+balanced the same way, fail over only until the first chunk arrives and are
+never hedged. Identical `predict` calls of the same request class made while
+one is in flight share its answer (see singleflight.py).
+
+Replicas whose ID is a URL are `HttpEndpoint`s: plain HTTP servers speaking
+Vertex AI's `:predict` / `:streamRawPredict` shape, such as local stand-ins.
+
+Calls honour the caller's deadline (see deadline.py): queue waits and call
+timeouts are capped by the time left, and a call cut short by it is reported
+as a timeout without counting against the endpoint.
+
+Failures are raised as `EndpointUnavailable`, whose `message()` is the
+structured error the tools return to the agent. `endpoint_stats()` reports the
+live limit, in-flight calls, rejections and breaker state of every endpoint.
+"""
+
+import contextvars
+import json
+import os
+import random
+import statistics
+import threading
+import time
+import urllib.request
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from concurrent.futures import TimeoutError as FutureTimeout
+from types import SimpleNamespace
+
+from .deadline import DeadlineExceeded, call_timeout, current_deadline
+from .deadline import check as check_deadline
+from .endpoint_scheduler import FairQueue, current_request, summarize
+from .singleflight import SINGLE_FLIGHT_ENABLED, flight_group
+
+GEMMA_TIMEOUT_SECONDS = float(os.getenv("GEMMA_TIMEOUT_SECONDS", "60"))
+GEMMA_INITIAL_CONCURRENCY = int(os.getenv("GEMMA_INITIAL_CONCURRENCY", "4"))
+GEMMA_MAX_CONCURRENCY = int(os.getenv("GEMMA_MAX_CONCURRENCY", "32"))
+GEMMA_LATENCY_TARGET_SECONDS = float(os.getenv("GEMMA_LATENCY_TARGET_SECONDS", "20"))
+GEMMA_BREAKER_FAILURES = int(os.getenv("GEMMA_BREAKER_FAILURES", "5"))
+GEMMA_BREAKER_RESET_SECONDS = float(os.getenv("GEMMA_BREAKER_RESET_SECONDS", "30"))
+GEMMA_HEDGING = os.getenv("GEMMA_HEDGING", "false").lower() == "true"
+GEMMA_HEDGE_PERCENTILE = float(os.getenv("GEMMA_HEDGE_PERCENTILE", "95"))
+# At most this fraction of calls is hedged, so hedging cannot double the load.
+GEMMA_HEDGE_BUDGET = float(os.getenv("GEMMA_HEDGE_BUDGET", "0.1"))
+GEMMA_HEDGE_MIN_SAMPLES = int(os.getenv("GEMMA_HEDGE_MIN_SAMPLES", "20"))
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# Failure reasons.
+CIRCUIT_OPEN = "circuit_open"
+OVERLOADED = "overloaded"
+TIMEOUT = "timeout"
+CLIENT_ERROR = "client_error"
+ERROR = "error"
+
+_OVERLOAD_CODES = (429, 503)
+_OVERLOAD_TYPES = ("TooManyRequests", "ResourceExhausted", "ServiceUnavailable")
+_TIMEOUT_TYPES = ("DeadlineExceeded", "TimeoutError", "ReadTimeout")
+
+
+class EndpointUnavailable(Exception):
+    """A call that was rejected or failed; carries the structured error for the agent."""
+
+    def __init__(self, endpoint: str, reason: str, detail: str = "", retry_after_s: float = None):
+        super().__init__(f"{endpoint}: {reason} {detail}".strip())
+        self.endpoint = endpoint
+        self.reason = reason
+        self.detail = detail
+        self.retry_after_s = retry_after_s
+
+    def as_dict(self) -> dict:
+        error = {"endpoint": self.endpoint, "reason": self.reason}
+        if self.retry_after_s is not None:
+            error["retry_after_s"] = round(self.retry_after_s, 1)
+        if self.detail:
+            error["detail"] = self.detail[:300]
+        return error
+
+    def message(self) -> str:
+        return f"Error: model endpoint unavailable {json.dumps(self.as_dict())}"
+
+
+def classify(error: Exception) -> str:
+    """Maps an endpoint exception to OVERLOADED, TIMEOUT, CLIENT_ERROR or ERROR."""
+    name = type(error).__name__
+    code = getattr(error, "code", None)
+    code = code if isinstance(code, int) else None
+    if isinstance(error, TimeoutError) or name in _TIMEOUT_TYPES or code == 504:
+        return TIMEOUT
+    if code in _OVERLOAD_CODES or name in _OVERLOAD_TYPES:
+        return OVERLOADED
+    if code is not None and 400 <= code < 500:
+        return CLIENT_ERROR
+    return ERROR
+
+
+def _percentile(values: list, percentile: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * percentile / 100))]
+
+
+class AdaptiveLimiter:
+    """AIMD limit on concurrent calls; calls over the limit wait in a FairQueue."""
+
+    def __init__(self, initial: int = GEMMA_INITIAL_CONCURRENCY, minimum: int = 1,
+                 maximum: int = GEMMA_MAX_CONCURRENCY, latency_target_s: float = GEMMA_LATENCY_TARGET_SECONDS,
+                 queue: FairQueue = None):
+        self.limit = float(max(minimum, min(initial, maximum)))
+        self.minimum = minimum
+        self.maximum = maximum
+        self.latency_target_s = latency_target_s
+        self.inflight = 0
+        self.rejected = 0
+        self.queue = queue if queue is not None else FairQueue()
+        self.service_s = None  # Moving average of call latency, for expected queue waits.
+        self._cond = threading.Condition()
+
+    def acquire(self, timeout: float = None, cost: float = 1) -> bool:
+        """Takes a slot, waiting in fair order for at most the caller's queue SLO (or `timeout`).
+
+        Returns:
+            False if the call was shed or timed out in the queue.
+        """
+        priority, session = current_request()
+        timeout = self.queue.slos[priority] if timeout is None else min(timeout, self.queue.slos[priority])
+        with self._cond:
+            now = time.monotonic()
+            if self.inflight < int(self.limit) and not self.queue.has_waiters():
+                self.inflight += 1
+                self.queue.admit_now(priority)
+                return True
+            if self.queue.expected_wait(priority, session, cost, self.service_s, int(self.limit)) > timeout:
+                # Waiting would blow the SLO anyway; fail now instead of holding the caller.
+                self.queue.shed(priority)
+                self.rejected += 1
+                return False
+            waiter = self.queue.enqueue(priority, session, cost, now)
+            deadline = now + timeout
+            while not waiter.granted:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.queue.abandon(waiter)
+                    self.rejected += 1
+                    return False
+                self._cond.wait(remaining)
+            return True
+
+    def _dispatch(self):
+        # Called with the lock held: hands free slots to queued calls in fair order.
+        now = time.monotonic()
+        while self.inflight < int(self.limit) and self.queue.grant(now):
+            self.inflight += 1
+        self._cond.notify_all()
+
+    def queued(self) -> int:
+        with self._cond:
+            return len(self.queue)
+
+    def queue_stats(self) -> dict:
+        with self._cond:
+            return self.queue.stats()
+
+    def release(self, latency_s: float = None, overloaded: bool = False):
+        with self._cond:
+            self.inflight -= 1
+            if overloaded:
+                self.limit = max(self.minimum, self.limit / 2)
+            elif latency_s is not None and latency_s > self.latency_target_s:
+                self.limit = max(self.minimum, self.limit * 0.9)
+            elif latency_s is not None:
+                # +1 per `limit` successes, i.e. roughly one per window of calls.
+                self.limit = min(self.maximum, self.limit + 1 / self.limit)
+            if latency_s is not None:
+                self.service_s = latency_s if self.service_s is None else 0.8 * self.service_s + 0.2 * latency_s
+            self._dispatch()
+
+
+class CircuitBreaker:
+    """Opens after consecutive failures; lets one probe through after the reset timeout."""
+
+    def __init__(self, failure_threshold: int = GEMMA_BREAKER_FAILURES,
+                 reset_timeout_s: float = GEMMA_BREAKER_RESET_SECONDS, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout_s = reset_timeout_s
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.opened = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._clock = clock
+        self._lock = threading.Lock()
+
+    def retry_after(self) -> float:
+        return max(0.0, self.reset_timeout_s - (self._clock() - self._opened_at))
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == OPEN and self.retry_after() <= 0:
+                self.state = HALF_OPEN
+            if self.state == CLOSED:
+                return True
+            if self.state == HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = CLOSED
+            self.consecutive_failures = 0
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.consecutive_failures += 1
+            if self.state == HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                if self.state != OPEN:
+                    self.opened += 1
+                self.state = OPEN
+                self._opened_at = self._clock()
+            self._probing = False
+
+    def release_probe(self):
+        """Frees the half-open probe slot after a call that neither succeeded nor failed."""
+        with self._lock:
+            self._probing = False
+
+    def available(self) -> bool:
+        """Whether `allow()` would let a call through now."""
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN:
+                return self.retry_after() <= 0
+            return not self._probing
+
+
+class GuardedEndpoint:
+    """Wraps an object with Vertex AI style `predict(instances=...)` and `stream_raw_predict` methods."""
+
+    def __init__(self, name: str, endpoint_factory, limiter: AdaptiveLimiter = None,
+                 breaker: CircuitBreaker = None, timeout_s: float = GEMMA_TIMEOUT_SECONDS,
+                 queue_timeout_s: float = None):
+        self.name = name
+        self._factory = endpoint_factory
+        self._endpoint = None
+        self.limiter = limiter or AdaptiveLimiter()
+        self.breaker = breaker or CircuitBreaker()
+        self.timeout_s = timeout_s
+        # None: each priority class waits up to its queue SLO.
+        self.queue_timeout_s = queue_timeout_s
+        self.counters = {"calls": 0, "successes": 0, "short_circuited": 0, OVERLOADED: 0, TIMEOUT: 0,
+                         CLIENT_ERROR: 0, ERROR: 0, "deadline_exceeded": 0}
+        self._latencies = deque(maxlen=1024)
+        self._lock = threading.Lock()
+
+    def _count(self, key: str):
+        with self._lock:
+            self.counters[key] += 1
+
+    @property
+    def endpoint(self):
+        # Built once per process instead of once per call.
+        with self._lock:
+            if self._endpoint is None:
+                self._endpoint = self._factory()
+            return self._endpoint
+
+    def _admit(self, cost: float = 1):
+        """Takes a breaker and limiter slot, or raises EndpointUnavailable."""
+        try:
+            queue_timeout_s = call_timeout(self.queue_timeout_s)
+        except DeadlineExceeded as e:
+            self._count("deadline_exceeded")
+            raise EndpointUnavailable(self.name, TIMEOUT, f"caller's deadline exceeded ({e})") from e
+        self._count("calls")
+        if not self.breaker.allow():
+            self._count("short_circuited")
+            raise EndpointUnavailable(self.name, CIRCUIT_OPEN, "recent calls failed",
+                                      retry_after_s=self.breaker.retry_after())
+        if not self.limiter.acquire(queue_timeout_s, cost):
+            self.breaker.release_probe()
+            priority = current_request()[0]
+            slo = self.limiter.queue.slos[priority]
+            raise EndpointUnavailable(self.name, OVERLOADED,
+                                      f"{self.limiter.inflight} calls in flight (limit {int(self.limiter.limit)}), "
+                                      f"{self.limiter.queued()} queued; {priority} queue SLO {slo:g}s",
+                                      retry_after_s=min(slo, self.queue_timeout_s or slo))
+
+    def _succeeded(self, latency: float):
+        self.limiter.release(latency_s=latency)
+        self.breaker.record_success()
+        self._count("successes")
+        with self._lock:
+            self._latencies.append(latency)
+
+    def _failed(self, error: Exception) -> EndpointUnavailable:
+        reason = classify(error)
+        deadline = current_deadline()
+        if reason == TIMEOUT and deadline is not None and (deadline.expired() or deadline.cancelled):
+            # The caller's deadline cut the call short; that says nothing about the endpoint.
+            self._count("deadline_exceeded")
+            self.limiter.release()
+            self.breaker.release_probe()
+            return EndpointUnavailable(self.name, TIMEOUT, f"caller's deadline exceeded ({deadline.name})")
+        self._count(reason)
+        self.limiter.release(overloaded=reason in (OVERLOADED, TIMEOUT))
+        if reason == CLIENT_ERROR:
+            # The request was bad, not the endpoint.
+            self.breaker.release_probe()
+        else:
+            self.breaker.record_failure()
+        return EndpointUnavailable(self.name, reason, f"{type(error).__name__}: {error}",
+                                   retry_after_s=None if reason == CLIENT_ERROR else 1.0)
+
+    def predict(self, instances: list, timeout: float = None):
+        """Calls the endpoint, or raises EndpointUnavailable without calling it."""
+        self._admit(cost=len(instances) or 1)
+        start = time.monotonic()
+        try:
+            response = self.endpoint.predict(instances=instances, timeout=call_timeout(timeout or self.timeout_s))
+        except Exception as e:
+            raise self._failed(e) from e
+        self._succeeded(time.monotonic() - start)
+        return response
+
+    def stream(self, body: bytes):
+        """Yields the response lines of a streaming raw-predict call.
+
+        The limiter slot is held until the stream ends; the time to the first
+        line is the latency the limiter adapts to.
+
+        Raises:
+            EndpointUnavailable: when the call is rejected or fails, also mid-stream.
+        """
+        self._admit()
+        start = time.monotonic()
+        latency = None
+        try:
+            for line in self.endpoint.stream_raw_predict(body=body, headers={"Content-Type": "application/json"}):
+                if latency is None:
+                    latency = time.monotonic() - start
+                # The streaming API takes no timeout; the deadline is checked per line instead.
+                check_deadline()
+                yield line
+        except GeneratorExit:
+            # The caller stopped reading; that says nothing about the endpoint.
+            self.limiter.release()
+            self.breaker.release_probe()
+            raise
+        except Exception as e:
+            raise self._failed(e) from e
+        self._succeeded(latency if latency is not None else time.monotonic() - start)
+
+    def load(self) -> float:
+        return (self.limiter.inflight + self.limiter.queued()) / self.limiter.limit
+
+    def latencies(self) -> list:
+        with self._lock:
+            return list(self._latencies)
+
+    def stats(self) -> dict:
+        with self._lock:
+            latencies = list(self._latencies)
+            counters = dict(self.counters)
+        report = {
+            "concurrency_limit": round(self.limiter.limit, 2),
+            "inflight": self.limiter.inflight,
+            "rejected": self.limiter.rejected,
+            "breaker_state": self.breaker.state,
+            "breaker_opened": self.breaker.opened,
+            **counters,
+            "queues": summarize([self.limiter.queue_stats()]),
+        }
+        if latencies:
+            report["latency_p50_s"] = round(statistics.median(latencies), 3)
+            report["latency_p99_s"] = round(_percentile(latencies, 99), 3)
+        return report
+
+
+# Runs hedged calls; both copies of a call need a thread to be waited on together.
+_hedge_executor = ThreadPoolExecutor(max_workers=32, thread_name_prefix="gemma-hedge")
+
+
+class EndpointPool:
+    """Balances calls over replica `GuardedEndpoint`s of one model."""
+
+    def __init__(self, name: str, replicas: list, hedging: bool = GEMMA_HEDGING,
+                 hedge_percentile: float = GEMMA_HEDGE_PERCENTILE, hedge_budget: float = GEMMA_HEDGE_BUDGET,
+                 min_hedge_samples: int = GEMMA_HEDGE_MIN_SAMPLES):
+        self.name = name
+        self.replicas = list(replicas)
+        self.hedging = hedging
+        self.hedge_percentile = hedge_percentile
+        self.hedge_budget = hedge_budget
+        self.min_hedge_samples = min_hedge_samples
+        self.counters = {"calls": 0, "failovers": 0, "hedged": 0, "hedge_wins": 0}
+        self.flights = flight_group(f"{name}.predict")
+        self._latencies = deque(maxlen=1024)
+        self._lock = threading.Lock()
+
+    def _count(self, key: str):
+        with self._lock:
+            self.counters[key] += 1
+
+    def _ranked(self) -> list:
+        """Replicas whose breaker lets calls through, least outstanding requests first."""
+        available = [r for r in self.replicas if r.breaker.available()]
+        random.shuffle(available)  # Spreads ties.
+        return sorted(available, key=GuardedEndpoint.load)
+
+    def hedge_delay(self):
+        """Seconds after which a call is hedged, or None if it should not be."""
+        if not self.hedging or len(self.replicas) < 2:
+            return None
+        with self._lock:
+            if self.counters["hedged"] >= self.hedge_budget * self.counters["calls"]:
+                return None
+        latencies = [latency for replica in self.replicas for latency in replica.latencies()]
+        if len(latencies) < self.min_hedge_samples:
+            return None
+        return _percentile(latencies, self.hedge_percentile)
+
+    def predict(self, instances: list, timeout: float = None):
+        """Calls the best replica, or raises EndpointUnavailable if none can answer.
+
+        Concurrent calls with the same instances and request class share one
+        request, so a batch caller never waits in the interactive caller's queue
+        position, or the other way round.
+        """
+        if not SINGLE_FLIGHT_ENABLED:
+            return self._predict(instances, timeout)
+        key = json.dumps([current_request()[0], instances], sort_keys=True, default=str)
+        return self.flights.do(key, self._predict, instances, timeout)
+
+    def _predict(self, instances: list, timeout: float):
+        self._count("calls")
+        ranked = self._ranked()
+        if not ranked:
+            raise EndpointUnavailable(self.name, CIRCUIT_OPEN, "all replicas are failing",
+                                      retry_after_s=min(r.breaker.retry_after() for r in self.replicas))
+        start = time.monotonic()
+        delay = self.hedge_delay() if len(ranked) > 1 else None
+        if delay is None:
+            response = self._call(ranked, instances, timeout)
+        else:
+            response = self._hedged(ranked, instances, timeout, delay)
+        with self._lock:
+            self._latencies.append(time.monotonic() - start)
+        return response
+
+    def _call(self, ranked: list, instances: list, timeout: float):
+        """Tries the replicas in order until one answers."""
+        for i, replica in enumerate(ranked):
+            try:
+                return replica.predict(instances, timeout)
+            except EndpointUnavailable as e:
+                if e.reason == CLIENT_ERROR or i == len(ranked) - 1:
+                    raise
+                self._count("failovers")
+
+    def _hedged(self, ranked: list, instances: list, timeout: float, delay: float):
+        # The copies run in executor threads, under the caller's request class.
+        first = _hedge_executor.submit(contextvars.copy_context().run, ranked[0].predict, instances, timeout)
+        try:
+            return first.result(timeout=delay)
+        except FutureTimeout:
+            pass
+        except EndpointUnavailable as e:
+            if e.reason == CLIENT_ERROR:
+                raise
+            self._count("failovers")
+            return self._call(ranked[1:], instances, timeout)
+
+        self._count("hedged")
+        second = _hedge_executor.submit(contextvars.copy_context().run, self._call, ranked[1:], instances, timeout)
+        pending, error = {first, second}, None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    response = future.result()
+                except EndpointUnavailable as e:
+                    error = e
+                    continue
+                # The slower copy finishes in the background and is discarded.
+                if future is second:
+                    self._count("hedge_wins")
+                return response
+        raise error
+
+    def stream(self, body: bytes):
+        """Streams from the least loaded replica, failing over until the first line arrives."""
+        self._count("calls")
+        ranked = self._ranked()
+        if not ranked:
+            raise EndpointUnavailable(self.name, CIRCUIT_OPEN, "all replicas are failing",
+                                      retry_after_s=min(r.breaker.retry_after() for r in self.replicas))
+        for i, replica in enumerate(ranked):
+            lines = replica.stream(body)
+            try:
+                first = next(lines)
+            except StopIteration:
+                return
+            except EndpointUnavailable as e:
+                if e.reason == CLIENT_ERROR or i == len(ranked) - 1:
+                    raise
+                self._count("failovers")
+                continue
+            yield first
+            yield from lines
+            return
+
+    def stats(self) -> dict:
+        with self._lock:
+            latencies = list(self._latencies)
+            report = dict(self.counters)
+        if latencies:
+            report["latency_p50_s"] = round(statistics.median(latencies), 3)
+            report["latency_p99_s"] = round(_percentile(latencies, 99), 3)
+        delay = self.hedge_delay() if self.hedging else None
+        if delay is not None:
+            report["hedge_delay_s"] = round(delay, 3)
+        report["queues"] = summarize([replica.limiter.queue_stats() for replica in self.replicas])
+        report["replicas"] = {replica.name: replica.stats() for replica in self.replicas}
+        return report
+
+
+class HttpEndpoint:
+    """An endpoint served over plain HTTP, e.g. a local stand-in server.
+
+    `predict` posts {"instances": [...]} to `<url>:predict` and reads
+    {"predictions": [...]}; `stream_raw_predict` posts the body to
+    `<url>:streamRawPredict` and yields the response lines.
+    """
+
+    def __init__(self, url: str):
+        self.url = url.rstrip("/")
+
+    def _post(self, suffix: str, body: bytes, timeout: float):
+        request = urllib.request.Request(self.url + suffix, data=body, headers={"Content-Type": "application/json"})
+        return urllib.request.urlopen(request, timeout=timeout)
+
+    def predict(self, instances: list, timeout: float = None):
+        with self._post(":predict", json.dumps({"instances": instances}).encode(), timeout) as response:
+            return SimpleNamespace(predictions=json.load(response)["predictions"])
+
+    def stream_raw_predict(self, body: bytes, headers: dict = None):
+        with self._post(":streamRawPredict", body, call_timeout(GEMMA_TIMEOUT_SECONDS)) as response:
+            for line in response:
+                yield line.rstrip(b"\r\n")
+
+
+def parse_endpoint_ids(value: str) -> list:
+    """Splits 'id1,europe-west4/id2,http://localhost:8080' into
+    [(None, 'id1'), ('europe-west4', 'id2'), (None, 'http://localhost:8080')]."""
+    replicas = []
+    for entry in (value or "").split(","):
+        entry = entry.strip()
+        if "://" in entry:
+            replicas.append((None, entry))
+        elif entry:
+            location, _, endpoint_id = entry.rpartition("/")
+            replicas.append((location or None, endpoint_id))
+    return replicas
+
+
+def _replica_factory(endpoint_factory, location: str, endpoint_id: str):
+    if "://" in endpoint_id:
+        return lambda: HttpEndpoint(endpoint_id)
+    return lambda: endpoint_factory(location, endpoint_id)
+
+
+_endpoints = {}
+_endpoints_lock = threading.Lock()
+
+
+def endpoint_pool(name: str, endpoint_ids: str, endpoint_factory) -> EndpointPool:
+    """The process-wide EndpointPool called `name`, created on first use.
+
+    Args:
+        name: The model's name in metrics and errors, e.g. 'txgemma'.
+        endpoint_ids: Comma-separated `[location/]endpoint_id` replicas or stand-in server URLs.
+        endpoint_factory: Builds a replica's endpoint from (location or None, endpoint_id).
+    """
+    with _endpoints_lock:
+        if name not in _endpoints:
+            replicas = [
+                GuardedEndpoint(f"{name}/{location}/{endpoint_id}" if location else f"{name}/{endpoint_id}",
+                                _replica_factory(endpoint_factory, location, endpoint_id))
+                for location, endpoint_id in parse_endpoint_ids(endpoint_ids)
+            ]
+            _endpoints[name] = EndpointPool(name, replicas)
+        return _endpoints[name]
+
+
+def endpoint_stats() -> dict:
+    """Live balancing, hedging, limiter, queue and breaker metrics of every model's endpoints."""
+    with _endpoints_lock:
+        endpoints = dict(_endpoints)
+    return {name: endpoint.stats() for name, endpoint in endpoints.items()}
@@ -0,0 +1,211 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Shared HTTP transport for the REST tools.
+
+REST calls (ClinicalTrials.gov, study pages, PDF downloads, SerpApi) go through
+`get()` rather than opening a new TCP and TLS connection per call. Each host
+gets its own keep-alive connection pool (HTTP_MAX_CONNECTIONS_PER_HOST) that
+speaks HTTP/2 where the server offers it (HTTP2_ENABLED), and responses are
+requested gzip-, deflate- or brotli-compressed. Redirects are followed.
+
+Idempotent requests that fail to connect, time out, lose their connection or
+get a 429/502/503/504 answer are retried up to HTTP_MAX_RETRIES times, after a
+jittered exponential backoff (HTTP_BACKOFF_BASE_SECONDS, capped at
+HTTP_BACKOFF_MAX_SECONDS) or the server's Retry-After. A retry is only made if
+the caller's deadline leaves time for it, and each attempt takes its timeout
+from `call_timeout()` (see deadline.py).
+
+`transport_stats()` reports requests, retries, errors, status codes, the HTTP/2
+share and latency percentiles per host.
+"""
+
+import os
+import random
+import threading
+import time
+from collections import deque
+
+import httpx
+
+from .deadline import OUTBOUND_TIMEOUT_SECONDS, call_timeout, current_deadline
+
+HTTP_MAX_CONNECTIONS_PER_HOST = int(os.getenv("HTTP_MAX_CONNECTIONS_PER_HOST", "10"))
+HTTP_KEEPALIVE_SECONDS = float(os.getenv("HTTP_KEEPALIVE_SECONDS", "60"))
+HTTP2_ENABLED = os.getenv("HTTP2_ENABLED", "true").lower() == "true"
+HTTP_MAX_RETRIES = int(os.getenv("HTTP_MAX_RETRIES", "3"))
+HTTP_BACKOFF_BASE_SECONDS = float(os.getenv("HTTP_BACKOFF_BASE_SECONDS", "0.5"))
+HTTP_BACKOFF_MAX_SECONDS = float(os.getenv("HTTP_BACKOFF_MAX_SECONDS", "8"))
+
+_IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+_RETRY_STATUSES = frozenset({429, 502, 503, 504})
+# Failures where the request may not have reached the server, or got no answer.
+_RETRY_ERRORS = (httpx.TimeoutException, httpx.NetworkError, httpx.RemoteProtocolError)
+
+
+class HostStats:
+    """Request counts and attempt latencies for one host."""
+
+    def __init__(self):
+        self.requests = 0
+        self.retries = 0
+        self.errors = 0
+        self.http2 = 0
+        self.statuses = {}
+        self.latencies = deque(maxlen=1024)
+
+    def snapshot(self) -> dict:
+        latencies = sorted(self.latencies)
+        attempts = self.requests + self.retries
+        report = {
+            "requests": self.requests,
+            "retries": self.retries,
+            "errors": self.errors,
+            "http2_ratio": round(self.http2 / attempts, 3) if attempts else 0.0,
+            "statuses": dict(self.statuses),
+        }
+        if latencies:
+            report["latency_p50_s"] = round(latencies[len(latencies) // 2], 3)
+            report["latency_p99_s"] = round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))], 3)
+        return report
+
+
+class Transport:
+    """Per-host keep-alive connection pools with retries and per-host metrics."""
+
+    def __init__(
+        self,
+        max_retries: int = HTTP_MAX_RETRIES,
+        backoff_base_s: float = HTTP_BACKOFF_BASE_SECONDS,
+        backoff_max_s: float = HTTP_BACKOFF_MAX_SECONDS,
+        http2: bool = HTTP2_ENABLED,
+        max_connections: int = HTTP_MAX_CONNECTIONS_PER_HOST,
+    ):
+        self.max_retries = max_retries
+        self.backoff_base_s = backoff_base_s
+        self.backoff_max_s = backoff_max_s
+        self.http2 = http2
+        self.max_connections = max_connections
+        self._lock = threading.Lock()
+        self._clients = {}
+        self._stats = {}
+
+    def _client(self, host: str):
+        with self._lock:
+            client = self._clients.get(host)
+            if client is None:
+                limits = httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                    keepalive_expiry=HTTP_KEEPALIVE_SECONDS,
+                )
+                client = httpx.Client(http2=self.http2, limits=limits, follow_redirects=True)
+                self._clients[host] = client
+            return client, self._stats.setdefault(host, HostStats())
+
+    def _record(self, stats: HostStats, start: float, response=None, retried: bool = False):
+        with self._lock:
+            stats.latencies.append(time.monotonic() - start)
+            if retried:
+                stats.retries += 1
+            else:
+                stats.requests += 1
+            if response is None:
+                stats.errors += 1
+                return
+            if response.http_version == "HTTP/2":
+                stats.http2 += 1
+            status = f"{response.status_code // 100}xx"
+            stats.statuses[status] = stats.statuses.get(status, 0) + 1
+
+    def _backoff(self, attempt: int, response=None) -> bool:
+        """Sleeps before retry `attempt + 1`; False if it is not worth waiting for."""
+        delay = _retry_after(response) if response is not None else None
+        if delay is None:
+            delay = random.uniform(0, min(self.backoff_max_s, self.backoff_base_s * 2 ** attempt))
+        elif delay > self.backoff_max_s:
+            return False
+        deadline = current_deadline()
+        if deadline is not None and deadline.remaining() <= delay:
+            return False
+        time.sleep(delay)
+        return True
+
+    def request(self, method: str, url: str, *, timeout_s: float = OUTBOUND_TIMEOUT_SECONDS, **kwargs):
+        """Sends a request through the host's pool, retrying idempotent ones on transient failures.
+
+        Args:
+            timeout_s: Timeout of each attempt, further capped by the caller's deadline.
+            **kwargs: Passed to `httpx.Client.request` (params, headers, content, ...).
+
+        Returns:
+            The httpx.Response; a 429/5xx answer is returned once retries are used up.
+
+        Raises:
+            httpx.HTTPError: when the last attempt failed.
+            DeadlineExceeded: if the caller's run was cancelled or is out of time.
+        """
+        client, stats = self._client(httpx.URL(url).host)
+        retries = self.max_retries if method.upper() in _IDEMPOTENT_METHODS else 0
+        attempt = 0
+        while True:
+            timeout = call_timeout(timeout_s)
+            start = time.monotonic()
+            try:
+                response = client.request(method, url, timeout=timeout, **kwargs)
+            except _RETRY_ERRORS:
+                self._record(stats, start, retried=attempt > 0)
+                if attempt >= retries or not self._backoff(attempt):
+                    raise
+            else:
+                self._record(stats, start, response, retried=attempt > 0)
+                if response.status_code not in _RETRY_STATUSES or attempt >= retries:
+                    return response
+                if not self._backoff(attempt, response):
+                    return response
+                response.close()
+            attempt += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {host: stats.snapshot() for host, stats in self._stats.items()}
+
+    def close(self):
+        """Closes every pooled connection."""
+        with self._lock:
+            clients, self._clients = list(self._clients.values()), {}
+        for client in clients:
+            client.close()
+
+
+def _retry_after(response) -> float:
+    """The Retry-After delay in seconds, if the response gives one."""
+    try:
+        return max(0.0, float(response.headers.get("Retry-After", "")))
+    except ValueError:
+        return None
+
+
+transport = Transport()
+
+
+def get(url: str, **kwargs):
+    """GET through the shared transport (see `Transport.request`)."""
+    return transport.request("GET", url, **kwargs)
+
+
+def transport_stats() -> dict:
+    """Requests, retries, errors, status codes, HTTP/2 share and latency p50/p99 per host."""
+    return transport.stats()
@@ -0,0 +1,192 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Central model policy for every agent in this package.
+
+A policy entry is either a model name ("gemini-2.5-pro") or an escalation chain
+("gemini-2.5-flash>gemini-2.5-pro"). A chain starts on the first model and
+retries the same request on the next one when the response contains a
+malformed or unknown tool call, or when the validation callback rejects it.
+Streamed (SSE) requests run on the first model only: their partial responses
+reach the user as they arrive, before a tier could be rejected, so they are
+never escalated. `policy_stats()` reports per-tier calls and latency and the
+escalation rate per agent.
+
+Resolution order for an agent (highest first):
+1. `MODEL_<AGENT_NAME>` environment variable, e.g. MODEL_COMPOUND_ANALYZER.
+2. The JSON file named by `MODEL_POLICY_CONFIG` ({"<agent_name>": "<spec>"}).
+3. `DEFAULT_MODELS` below.
+"""
+
+import json
+import os
+import threading
+import time
+from typing import AsyncGenerator, Callable, Optional
+
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.adk.models.registry import LLMRegistry
+from google.genai import types
+from pydantic import ConfigDict
+
+PRO = "gemini-2.5-pro"
+FLASH = "gemini-2.5-flash"
+ESCALATION_SEPARATOR = ">"
+
+# Simple tool-dispatch specialists start on flash and escalate to pro.
+DEFAULT_MODELS = {
+    "discovery_coordinator": PRO,
+    "compound_analyzer": f"{FLASH}{ESCALATION_SEPARATOR}{PRO}",
+    "literature_researcher": PRO,
+    "infrastructure_specialist": PRO,
+}
+
+
+class PolicyStats:
+    """Per-tier call counts and latency, plus escalation counts per agent."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.tiers = {}
+            self.requests = {}
+            self.escalations = {}
+
+    def record_call(self, model: str, latency: float):
+        with self._lock:
+            tier = self.tiers.setdefault(model, {"calls": 0, "total_latency": 0.0})
+            tier["calls"] += 1
+            tier["total_latency"] += latency
+
+    def record_request(self, agent_name: str, escalated: bool):
+        with self._lock:
+            self.requests[agent_name] = self.requests.get(agent_name, 0) + 1
+            if escalated:
+                self.escalations[agent_name] = self.escalations.get(agent_name, 0) + 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "tiers": {
+                    model: {
+                        "calls": t["calls"],
+                        "avg_latency": t["total_latency"] / t["calls"] if t["calls"] else 0.0,
+                    }
+                    for model, t in self.tiers.items()
+                },
+                "escalation_rate": {
+                    agent: self.escalations.get(agent, 0) / count
+                    for agent, count in self.requests.items()
+                },
+            }
+
+
+stats = PolicyStats()
+
+
+def policy_stats() -> dict:
+    """Per-tier calls and average latency, and the escalation rate per agent."""
+    return stats.snapshot()
+
+
+def tool_call_error(response: LlmResponse, llm_request: LlmRequest) -> Optional[str]:
+    """Returns why a response's tool calls cannot be dispatched, or None."""
+    malformed = types.FinishReason.MALFORMED_FUNCTION_CALL
+    if malformed in (response.finish_reason, response.error_code):
+        return "malformed function call"
+    if response.content and response.content.parts:
+        for part in response.content.parts:
+            call = part.function_call
+            if call and llm_request.tools_dict and call.name not in llm_request.tools_dict:
+                return f"unknown tool '{call.name}'"
+    return None
+
+
+class TieredLlm(BaseLlm):
+    """Runs each request on the first tier and escalates on tool-call or validation failure."""
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    agent_name: str
+    tiers: list[BaseLlm]
+    validator: Optional[Callable[[LlmResponse], bool]] = None
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        if stream:
+            # Partial responses are passed on as they arrive, so there is no escalation.
+            tier = self.tiers[0]
+            llm_request.model = tier.model
+            start = time.perf_counter()
+            async for response in tier.generate_content_async(llm_request, stream):
+                yield response
+            stats.record_call(tier.model, time.perf_counter() - start)
+            stats.record_request(self.agent_name, escalated=False)
+            return
+        # Responses are buffered per tier so a failed tier is never surfaced.
+        responses = []
+        for index, tier in enumerate(self.tiers):
+            llm_request.model = tier.model
+            start = time.perf_counter()
+            responses = [r async for r in tier.generate_content_async(llm_request, stream)]
+            stats.record_call(tier.model, time.perf_counter() - start)
+
+            final = next((r for r in reversed(responses) if not r.partial), None)
+            if index == len(self.tiers) - 1 or (final and self._accepts(final, llm_request)):
+                break
+        stats.record_request(self.agent_name, escalated=index > 0)
+        for response in responses:
+            yield response
+
+    def _accepts(self, response: LlmResponse, llm_request: LlmRequest) -> bool:
+        if tool_call_error(response, llm_request):
+            return False
+        return self.validator is None or self.validator(response)
+
+
+def _config_overrides() -> dict:
+    path = os.getenv("MODEL_POLICY_CONFIG")
+    if not path:
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def model_spec(agent_name: str) -> str:
+    """Returns the policy entry that applies to `agent_name`."""
+    env_override = os.getenv(f"MODEL_{agent_name.upper()}")
+    if env_override:
+        return env_override
+    return _config_overrides().get(agent_name, DEFAULT_MODELS.get(agent_name, PRO))
+
+
+def model_for(agent_name: str, validator: Optional[Callable[[LlmResponse], bool]] = None,
+              llm_factory: Callable[[str], BaseLlm] = LLMRegistry.new_llm):
+    """Resolves the `model` argument for an agent: a model name or a TieredLlm."""
+    names = [n.strip() for n in model_spec(agent_name).split(ESCALATION_SEPARATOR) if n.strip()]
+    if len(names) == 1 and validator is None:
+        return names[0]
+    return TieredLlm(
+        model=names[0],
+        agent_name=agent_name,
+        tiers=[llm_factory(name) for name in names],
+        validator=validator,
+    )
@@ -73,4 +73,19 @@ Your output **MUST** follow this exact format:
 
 **II. Comprehensive Analysis**
 *Present the synthesized results. Use Markdown tables and bold headers. Ensure the tone is scientific and objective.*
-"""
\ No newline at end of file
+"""
+
+# Short usage notes for the specialists' tools in the "direct" topology
+# (see topology.py); the specialists' own prompts are not merged.
+DIRECT_TOOL_NOTES = {
+    "compound_analyzer": (
+        "Resolve each compound to its SMILES before predicting. Use"
+        " `predict_admet_profile` once for several properties or compounds,"
+        " `screen_compound_library` for library files and `find_similar_compounds`"
+        " for analogues. Flag predicted toxicity with a **WARNING**."
+    ),
+    "literature_researcher": (
+        "Search PubMed for evidence on targets and compounds; ask the"
+        " therapeutics expert general therapeutic questions."
+    ),
+}
@@ -0,0 +1,38 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Parsers for TxGemma answers, shared by the single-compound tools and the screening pipeline."""
+
+import re
+
+_CHOICE_IN_PARENS = re.compile(r"\(([AB])\)")
+_CHOICE_WORD = re.compile(r"\b([AB])\b")
+
+
+def parse_choice(prediction: str):
+    """True for an (B) answer, False for (A), None if neither is found.
+
+    A parenthesized choice wins over a bare letter, so a verbose answer like
+    "A compound like this ... (B)" is read as (B).
+    """
+    match = _CHOICE_IN_PARENS.search(prediction) or _CHOICE_WORD.search(prediction)
+    if not match:
+        return None
+    return match.group(1) == "B"
+
+
+def parse_score(prediction: str):
+    """The first number in the answer (TDC regression tasks answer 000-1000), or None."""
+    match = re.search(r"\d+(?:\.\d+)?", prediction)
+    return float(match.group()) if match else None
@@ -0,0 +1,527 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Offline batch-prediction mode for very large screens.
+
+`run_batch_screen` screens a library in three steps instead of calling the
+TxGemma endpoint per compound:
+
+1. The pipeline runs with a `BatchCollector`: every prediction that is not
+   cached (and not served by a surrogate) is collected, and its compound is
+   checkpointed as `deferred` instead of calling the endpoint.
+2. The collected prompts are written as JSONL instance files, one batch
+   prediction job is submitted and polled, and its result files are streamed
+   into the prediction cache.
+3. The pipeline resumes: deferred compounds re-enter the predict stage, now
+   answered from the cache, and are written to the Parquet output. Anything the
+   job did not answer falls back to online calls.
+
+Storage and jobs sit behind `BatchStorage` and `BatchJobs`:
+* `LocalStorage` / `LocalBatchJobs` keep files in a directory and run the job
+  in a worker thread against an online endpoint (for tests and small runs).
+* `GcsStorage` / `VertexBatchJobs` use a Cloud Storage prefix and Vertex AI
+  batch prediction jobs on the TxGemma model (TXGEMMA_BATCH_MODEL).
+
+`get_batch_backend()` picks one from `SCREEN_BATCH_BACKEND` ("vertex" or "local").
+The submitted job is recorded in the checkpoint, so an interrupted run picks
+the same job up again instead of submitting another one.
+"""
+
+import abc
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+
+from ..endpoint_scheduler import BATCH, request_class
+from . import properties as props
+from .pipeline import Checkpoint, run_screen
+from .prediction_cache import default_cache
+
+logger = logging.getLogger(__name__)
+
+SCREEN_BATCH_BACKEND = os.getenv("SCREEN_BATCH_BACKEND", "vertex")
+SCREEN_BATCH_POLL_SECONDS = float(os.getenv("SCREEN_BATCH_POLL_SECONDS", "30"))
+SCREEN_BATCH_FILE_INSTANCES = int(os.getenv("SCREEN_BATCH_FILE_INSTANCES", "50000"))
+# Vertex AI batch prediction runs a model resource (not an endpoint) on its own machines.
+TXGEMMA_BATCH_MODEL = os.getenv("TXGEMMA_BATCH_MODEL")
+TXGEMMA_BATCH_BUCKET = os.getenv("TXGEMMA_BATCH_BUCKET")
+TXGEMMA_BATCH_MACHINE_TYPE = os.getenv("TXGEMMA_BATCH_MACHINE_TYPE", "g2-standard-12")
+TXGEMMA_BATCH_ACCELERATOR_TYPE = os.getenv("TXGEMMA_BATCH_ACCELERATOR_TYPE", "NVIDIA_L4")
+TXGEMMA_BATCH_ACCELERATOR_COUNT = int(os.getenv("TXGEMMA_BATCH_ACCELERATOR_COUNT", "1"))
+TXGEMMA_BATCH_REPLICAS = int(os.getenv("TXGEMMA_BATCH_REPLICAS", "1"))
+
+PENDING = "PENDING"
+RUNNING = "RUNNING"
+SUCCEEDED = "SUCCEEDED"
+FAILED = "FAILED"
+CANCELLED = "CANCELLED"
+TERMINAL_STATES = (SUCCEEDED, FAILED, CANCELLED)
+
+_STATUS_KEYS = ("ok", "unresolved", "invalid", "filtered", "error")
+
+
+def _digest(prompt: str) -> bytes:
+    return hashlib.blake2b(prompt.encode(), digest_size=16).digest()
+
+
+class BatchCollector:
+    """The (compound, property) predictions the pipeline deferred to a batch job."""
+
+    def __init__(self):
+        self._pairs = {}
+        self._lock = threading.Lock()
+
+    def add(self, smiles: str, properties: list):
+        # Called from the pipeline's worker threads.
+        with self._lock:
+            for prop in properties:
+                self._pairs[(prop.task, smiles)] = prop
+
+    def __len__(self) -> int:
+        return len(self._pairs)
+
+    def instances(self):
+        """Yields (smiles, Property, instance) for every collected prediction."""
+        for (_, smiles), prop in self._pairs.items():
+            yield smiles, prop, {"prompt": prop.prompt(smiles)}
+
+    def index(self) -> dict:
+        """{prompt digest: (smiles, Property)}, to match result lines to predictions."""
+        return {_digest(instance["prompt"]): (smiles, prop) for smiles, prop, instance in self.instances()}
+
+
+# --- Backend interfaces ---
+
+class BatchStorage(abc.ABC):
+    """Where instance and result files live; paths are relative to the storage root."""
+
+    @abc.abstractmethod
+    def uri(self, path: str) -> str:
+        """The URI a batch job uses for `path`."""
+
+    @abc.abstractmethod
+    def write_lines(self, path: str, lines) -> str:
+        """Writes an iterable of text lines to `path`; returns its URI."""
+
+    @abc.abstractmethod
+    def read_lines(self, path: str):
+        """Yields the lines of `path`, without reading the whole file at once."""
+
+    @abc.abstractmethod
+    def list(self, prefix: str) -> list:
+        """Paths of all files under `prefix`, recursively."""
+
+
+class BatchJobs(abc.ABC):
+    """Submits and tracks batch prediction jobs."""
+
+    name = "abstract"
+
+    @abc.abstractmethod
+    def submit(self, input_uris: list, output_uri: str, display_name: str) -> str:
+        """Starts a job over JSONL instance files; returns the job ID.
+
+        Results are written under `output_uri` as predictions_*.jsonl files of
+        {"instance": ..., "prediction": ...} lines (errors_*.jsonl for failed instances).
+        """
+
+    @abc.abstractmethod
+    def status(self, job_id: str):
+        """{"state", "error"} of a job, or None if this backend does not know it."""
+
+
+# --- Local backend ---
+
+class LocalStorage(BatchStorage):
+    """Files in a local directory."""
+
+    def __init__(self, root: str):
+        self.root = os.path.abspath(root)
+
+    def uri(self, path: str) -> str:
+        return os.path.join(self.root, path)
+
+    def write_lines(self, path: str, lines) -> str:
+        target = self.uri(path)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with open(target + ".tmp", "w") as f:
+            for line in lines:
+                f.write(line + "\n")
+        os.replace(target + ".tmp", target)
+        return target
+
+    def read_lines(self, path: str):
+        with open(self.uri(path)) as f:
+            for line in f:
+                yield line.rstrip("\n")
+
+    def list(self, prefix: str) -> list:
+        base = self.uri(prefix)
+        paths = []
+        for directory, _, files in os.walk(base):
+            paths += [os.path.relpath(os.path.join(directory, f), self.root) for f in files if not f.endswith(".tmp")]
+        return sorted(paths)
+
+
+class LocalBatchJobs(BatchJobs):
+    """Runs a job in a worker thread as multi-instance predict calls to an online endpoint."""
+
+    name = "local"
+
+    def __init__(self, endpoint=None, max_instances: int = props.TXGEMMA_MAX_INSTANCES):
+        self._endpoint = endpoint
+        self.max_instances = max_instances
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def submit(self, input_uris: list, output_uri: str, display_name: str) -> str:
+        job_id = f"local-{uuid.uuid4().hex[:12]}"
+        with self._lock:
+            self._jobs[job_id] = {"state": PENDING, "error": None}
+        threading.Thread(target=self._run, args=(job_id, list(input_uris), output_uri),
+                         name=f"batch-{display_name}", daemon=True).start()
+        return job_id
+
+    def status(self, job_id: str):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def _set(self, job_id: str, state: str, error: str = None):
+        with self._lock:
+            self._jobs[job_id] = {"state": state, "error": error}
+
+    def _run(self, job_id: str, input_uris: list, output_uri: str):
+        with request_class(BATCH, session=job_id):
+            self._run_job(job_id, input_uris, output_uri)
+
+    def _run_job(self, job_id: str, input_uris: list, output_uri: str):
+        self._set(job_id, RUNNING)
+        try:
+            endpoint = self._endpoint or props.txgemma_endpoint()
+            if endpoint is None:
+                raise RuntimeError("TXGEMMA_PREDICT_ENDPOINT_ID environment variable is not set.")
+            os.makedirs(output_uri, exist_ok=True)
+            for i, input_uri in enumerate(input_uris, start=1):
+                with open(input_uri) as source, \
+                        open(os.path.join(output_uri, f"predictions_{i:05d}.jsonl"), "w") as predictions, \
+                        open(os.path.join(output_uri, f"errors_{i:05d}.jsonl"), "w") as errors:
+                    chunk = []
+                    for line in source:
+                        chunk.append(json.loads(line))
+                        if len(chunk) == self.max_instances:
+                            self._predict(endpoint, chunk, predictions, errors)
+                            chunk = []
+                    if chunk:
+                        self._predict(endpoint, chunk, predictions, errors)
+        except Exception as e:
+            self._set(job_id, FAILED, f"{type(e).__name__}: {e}")
+            return
+        self._set(job_id, SUCCEEDED)
+
+    @staticmethod
+    def _predict(endpoint, instances: list, predictions, errors):
+        # Like Vertex AI, a failed request fails its instances, not the job.
+        try:
+            answers = endpoint.predict(instances=instances).predictions
+        except Exception as e:
+            for instance in instances:
+                errors.write(json.dumps({"instance": instance, "status": f"{type(e).__name__}: {e}"}) + "\n")
+            return
+        for instance, answer in zip(instances, answers):
+            predictions.write(json.dumps({"instance": instance, "prediction": answer}) + "\n")
+
+
+# --- Vertex AI backend ---
+
+class GcsStorage(BatchStorage):
+    """Files under a gs://bucket/prefix."""
+
+    def __init__(self, base_uri: str):
+        from google.cloud import storage
+
+        bucket, _, prefix = base_uri.removeprefix("gs://").partition("/")
+        self.bucket = storage.Client().bucket(bucket)
+        self.prefix = prefix.strip("/")
+
+    def _name(self, path: str) -> str:
+        return f"{self.prefix}/{path}" if self.prefix else path
+
+    def uri(self, path: str) -> str:
+        return f"gs://{self.bucket.name}/{self._name(path)}"
+
+    def write_lines(self, path: str, lines) -> str:
+        with self.bucket.blob(self._name(path)).open("w") as f:
+            for line in lines:
+                f.write(line + "\n")
+        return self.uri(path)
+
+    def read_lines(self, path: str):
+        with self.bucket.blob(self._name(path)).open("r") as f:
+            for line in f:
+                yield line.rstrip("\n")
+
+    def list(self, prefix: str) -> list:
+        start = len(self.prefix) + 1 if self.prefix else 0
+        return sorted(blob.name[start:] for blob in self.bucket.client.list_blobs(self.bucket, prefix=self._name(prefix)))
+
+
+class VertexBatchJobs(BatchJobs):
+    """Vertex AI batch prediction jobs on the TxGemma model."""
+
+    name = "vertex"
+
+    _STATES = {
+        "JOB_STATE_QUEUED": PENDING,
+        "JOB_STATE_PENDING": PENDING,
+        "JOB_STATE_RUNNING": RUNNING,
+        "JOB_STATE_UPDATING": RUNNING,
+        "JOB_STATE_PAUSED": RUNNING,
+        "JOB_STATE_SUCCEEDED": SUCCEEDED,
+        # Failed instances are listed in the errors files; the answered ones are still used.
+        "JOB_STATE_PARTIALLY_SUCCEEDED": SUCCEEDED,
+        "JOB_STATE_FAILED": FAILED,
+        "JOB_STATE_EXPIRED": FAILED,
+        "JOB_STATE_CANCELLING": CANCELLED,
+        "JOB_STATE_CANCELLED": CANCELLED,
+    }
+
+    def __init__(self, model: str = TXGEMMA_BATCH_MODEL):
+        from google.cloud import aiplatform
+
+        if not model:
+            raise RuntimeError("TXGEMMA_BATCH_MODEL environment variable is not set.")
+        aiplatform.init(project=os.environ["GOOGLE_CLOUD_PROJECT"], location=os.environ["GOOGLE_CLOUD_LOCATION"])
+        self.aiplatform = aiplatform
+        self.model = model
+
+    def submit(self, input_uris: list, output_uri: str, display_name: str) -> str:
+        job = self.aiplatform.BatchPredictionJob.create(
+            job_display_name=display_name,
+            model_name=self.model,
+            instances_format="jsonl",
+            predictions_format="jsonl",
+            gcs_source=input_uris,
+            gcs_destination_prefix=output_uri,
+            machine_type=TXGEMMA_BATCH_MACHINE_TYPE,
+            accelerator_type=TXGEMMA_BATCH_ACCELERATOR_TYPE,
+            accelerator_count=TXGEMMA_BATCH_ACCELERATOR_COUNT,
+            starting_replica_count=TXGEMMA_BATCH_REPLICAS,
+            max_replica_count=TXGEMMA_BATCH_REPLICAS,
+            sync=False,
+        )
+        job.wait_for_resource_creation()
+        return job.resource_name
+
+    def status(self, job_id: str):
+        from google.api_core.exceptions import NotFound
+
+        try:
+            job = self.aiplatform.BatchPredictionJob(job_id)
+        except NotFound:
+            return None
+        error = job.error.message if job.error and job.error.message else None
+        return {"state": self._STATES.get(job.state.name, RUNNING), "error": error}
+
+
+def get_batch_backend(output_dir: str, endpoint=None) -> tuple:
+    """(BatchStorage, BatchJobs) for SCREEN_BATCH_BACKEND.
+
+    The local backend keeps its files in `<output_dir>/batch`; the Vertex AI
+    backend under TXGEMMA_BATCH_BUCKET.
+    """
+    if SCREEN_BATCH_BACKEND == "local":
+        return LocalStorage(os.path.join(output_dir, "batch")), LocalBatchJobs(endpoint)
+    if SCREEN_BATCH_BACKEND != "vertex":
+        raise ValueError(f"Unknown SCREEN_BATCH_BACKEND '{SCREEN_BATCH_BACKEND}' (use 'vertex' or 'local').")
+    if not TXGEMMA_BATCH_BUCKET:
+        raise RuntimeError("TXGEMMA_BATCH_BUCKET environment variable is not set.")
+    return GcsStorage(TXGEMMA_BATCH_BUCKET), VertexBatchJobs()
+
+
+# --- Job lifecycle ---
+
+def write_instances(storage: BatchStorage, prefix: str, collector: BatchCollector,
+                    file_instances: int = SCREEN_BATCH_FILE_INSTANCES) -> list:
+    """Writes the collected prompts as JSONL files of up to `file_instances` lines; returns their URIs."""
+    uris, lines = [], []
+    for _, _, instance in collector.instances():
+        lines.append(json.dumps(instance))
+        if len(lines) == file_instances:
+            uris.append(storage.write_lines(f"{prefix}/instances/part-{len(uris):05d}.jsonl", lines))
+            lines = []
+    if lines:
+        uris.append(storage.write_lines(f"{prefix}/instances/part-{len(uris):05d}.jsonl", lines))
+    return uris
+
+
+def wait_for_job(jobs: BatchJobs, job_id: str, poll_seconds: float = SCREEN_BATCH_POLL_SECONDS) -> dict:
+    """Polls a job until it reaches a terminal state; returns its last status."""
+    last_state = None
+    while True:
+        status = jobs.status(job_id)
+        if status is None:
+            raise RuntimeError(f"Batch job {job_id} not found.")
+        if status["state"] != last_state:
+            logger.info("Batch job %s is %s", job_id, status["state"])
+            last_state = status["state"]
+        if status["state"] in TERMINAL_STATES:
+            return status
+        time.sleep(poll_seconds)
+
+
+def import_results(storage: BatchStorage, output_prefix: str, collector: BatchCollector, cache,
+                   flush_rows: int = 500) -> dict:
+    """Streams a finished job's result files into the prediction cache.
+
+    Returns:
+        Counts of imported answers, unparseable answers, failed instances and
+        result lines that match no collected prediction.
+    """
+    index = collector.index()
+    counts = {"imported": 0, "unparsed": 0, "failed_instances": 0, "unmatched": 0}
+    pending = {}
+
+    def flush(task: str):
+        # Batch answers are TxGemma answers like any other, so surrogates train on them too.
+        cache.put_many(task, pending.pop(task), source="endpoint")
+
+    for path in storage.list(output_prefix):
+        name = os.path.basename(path)
+        if not name.endswith(".jsonl"):
+            continue
+        if name.startswith("errors"):
+            counts["failed_instances"] += sum(1 for line in storage.read_lines(path) if line.strip())
+            continue
+        if not name.startswith("prediction"):
+            continue
+        for line in storage.read_lines(path):
+            if not line.strip():
+                continue
+            result = json.loads(line)
+            match = index.get(_digest(str((result.get("instance") or {}).get("prompt", ""))))
+            if match is None:
+                counts["unmatched"] += 1
+                continue
+            smiles, prop = match
+            raw = str(result.get("prediction"))
+            value = prop.parse(raw)
+            # Unparseable answers are not cached, so the resumed screen asks the endpoint again.
+            if value is None:
+                counts["unparsed"] += 1
+                continue
+            pending.setdefault(prop.task, []).append((smiles, value, raw))
+            counts["imported"] += 1
+            if len(pending[prop.task]) >= flush_rows:
+                flush(prop.task)
+    for task in list(pending):
+        flush(task)
+    return counts
+
+
+def run_batch_job(collector: BatchCollector, checkpoint_path: str, storage: BatchStorage, jobs: BatchJobs,
+                  cache=None, poll_seconds: float = SCREEN_BATCH_POLL_SECONDS) -> dict:
+    """Submits (or picks up) the batch job for the collected predictions, waits and imports its results."""
+    cache = cache or default_cache()
+    checkpoint = Checkpoint(checkpoint_path)
+    try:
+        recorded = json.loads(checkpoint.meta("batch_job") or "null")
+        if recorded and jobs.status(recorded["job"]) is None:
+            # E.g. a local job whose worker went away with the previous process.
+            recorded = None
+        if recorded:
+            logger.info("Resuming batch job %s", recorded["job"])
+        else:
+            prefix = f"screen-{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6]}"
+            input_uris = write_instances(storage, prefix, collector)
+            job_id = jobs.submit(input_uris, storage.uri(f"{prefix}/output"), prefix)
+            recorded = {"job": job_id, "prefix": prefix, "backend": jobs.name}
+            checkpoint.set_meta("batch_job", json.dumps(recorded))
+            logger.info("Submitted batch job %s with %d instances in %d files", job_id, len(collector),
+                        len(input_uris))
+
+        start = time.perf_counter()
+        status = wait_for_job(jobs, recorded["job"], poll_seconds)
+        # A finished or failed job is not picked up again; the next run submits a new one.
+        checkpoint.set_meta("batch_job", "")
+        if status["state"] != SUCCEEDED:
+            raise RuntimeError(f"Batch job {recorded['job']} {status['state'].lower()}: {status['error']}")
+        report = import_results(storage, f"{recorded['prefix']}/output", collector, cache)
+        return {**recorded, "instances": len(collector), "state": status["state"],
+                "wait_s": round(time.perf_counter() - start, 2), **report}
+    finally:
+        checkpoint.close()
+
+
+async def run_batch_screen(input_path: str, output_dir: str, properties="clintox,bbbp", storage: BatchStorage = None,
+                           jobs: BatchJobs = None, poll_seconds: float = SCREEN_BATCH_POLL_SECONDS,
+                           cache=None, **screen_kwargs) -> dict:
+    """Screens a library with one batch prediction job instead of per-compound endpoint calls.
+
+    Args:
+        input_path: CSV/TSV (with a smiles and/or name column), .smi or SDF file.
+        output_dir: Directory for the Parquet parts, checkpoint and errors file.
+        properties: TxGemma properties to predict (see properties.PROPERTIES).
+        storage: Where instance and result files go (defaults to SCREEN_BATCH_BACKEND's).
+        jobs: Runs the batch prediction job (defaults to SCREEN_BATCH_BACKEND's).
+        poll_seconds: How often the job's state is checked.
+        cache: PredictionCache (defaults to the shared on-disk cache).
+        **screen_kwargs: Passed to `run_screen` (concurrency, limit, prefilter, ...).
+
+    Returns:
+        The `run_screen` summary over both passes, with a `batch` entry describing the job.
+
+    Raises:
+        RuntimeError: if the batch job fails; re-running resumes from the checkpoint.
+    """
+    cache = cache or default_cache()
+    start = time.perf_counter()
+    collector = BatchCollector()
+    first = await run_screen(input_path, output_dir, properties=properties, cache=cache, batch=collector,
+                             **screen_kwargs)
+    batch = {"instances": 0}
+    if collector:
+        if storage is None or jobs is None:
+            storage, jobs = get_batch_backend(output_dir, screen_kwargs.get("endpoint"))
+        batch = await asyncio.to_thread(run_batch_job, collector, os.path.join(output_dir, "checkpoint.sqlite"),
+                                        storage, jobs, cache, poll_seconds)
+
+    # Deferred compounds resume at the predict stage and are answered from the cache.
+    screen_kwargs["resume"] = True
+    final = await run_screen(input_path, output_dir, properties=properties, cache=cache, **screen_kwargs)
+
+    counts = dict(final["counts"])
+    for key in _STATUS_KEYS:
+        counts[key] += first["counts"][key]
+    counts["skipped"] = first["counts"]["skipped"]
+    elapsed = time.perf_counter() - start
+    finished = sum(counts[key] for key in _STATUS_KEYS if key != "error")
+    return {
+        **final,
+        "counts": counts,
+        "elapsed_s": round(elapsed, 2),
+        "throughput_per_min": round(finished / elapsed * 60, 1) if elapsed > 0 else 0.0,
+        "cache_hits": first["cache_hits"],
+        "endpoint_calls": first["endpoint_calls"] + final["endpoint_calls"],
+        "endpoint_calls_saved": first["endpoint_calls_saved"],
+        "predictions_skipped": first["predictions_skipped"],
+        "surrogate_predictions": first["surrogate_predictions"] + final["surrogate_predictions"],
+        "batch": batch,
+    }
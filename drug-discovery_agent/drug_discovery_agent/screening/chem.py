@@ -0,0 +1,34 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Structure standardization shared by the screening pipeline and the single-compound tools."""
+
+from rdkit import Chem, RDLogger
+from rdkit.Chem.MolStandardize import rdMolStandardize
+
+RDLogger.DisableLog("rdApp.*")
+
+
+def standardize_smiles(smiles: str):
+    """Canonical SMILES of the neutralized largest fragment, or None if it does not parse.
+
+    The prediction cache, surrogate models and similarity index are keyed by this form.
+    """
+    mol = Chem.MolFromSmiles(smiles) if smiles else None
+    if mol is None:
+        return None
+    mol = rdMolStandardize.Cleanup(mol)
+    mol = rdMolStandardize.FragmentParent(mol)
+    mol = rdMolStandardize.Uncharger().uncharge(mol)
+    return Chem.MolToSmiles(mol)
@@ -0,0 +1,77 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Command line entry point for library screens.
+
+Usage:
+    python -m drug_discovery_agent.screening library.csv --output-dir screen_out
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import sys
+
+from dotenv import load_dotenv
+
+from .batch import run_batch_screen
+from .pipeline import STAGES, run_screen
+
+
+def _progress(summary: dict):
+    counts = summary["counts"]
+    print(
+        f"⏳ read {counts['read']} | ok {counts['ok']} | unresolved {counts['unresolved']} | "
+        f"invalid {counts['invalid']} | filtered {counts['filtered']} | error {counts['error']} | "
+        f"{summary['throughput_per_min']}/min",
+        file=sys.stderr,
+    )
+
+
+def main(argv=None):
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Screen a compound library with TxGemma.")
+    parser.add_argument("input", help="CSV/TSV with a smiles and/or name column, a .smi file or an SDF file.")
+    parser.add_argument("--output-dir", default="screen_output", help="Where Parquet parts and the checkpoint go.")
+    parser.add_argument("--properties", default="clintox,bbbp", help="Comma-separated TxGemma properties (clintox, bbbp, herg, ames, dili, cyp3a4, "
+                             "solubility) or 'all'.")
+    parser.add_argument("--prefilter", default=None,
+                        help="Pre-filter rules, e.g. 'lipinski=reject,pains=flag,cns_mpo=flag' (default SCREEN_PREFILTER_RULES; "
+                             "'none' disables).")
+    parser.add_argument("--limit", type=int, default=None, help="Only screen the first N compounds.")
+    parser.add_argument("--no-resume", action="store_true", help="Discard any checkpoint and start over.")
+    parser.add_argument("--batch", action="store_true",
+                        help="Predict with one batch prediction job instead of online endpoint calls "
+                             "(for 100k+ compounds; backend from SCREEN_BATCH_BACKEND).")
+    for stage in STAGES:
+        parser.add_argument(f"--{stage}-concurrency", type=int, default=None, help=f"Workers for the {stage} stage.")
+    args = parser.parse_args(argv)
+
+    concurrency = {s: getattr(args, f"{s}_concurrency") for s in STAGES if getattr(args, f"{s}_concurrency")}
+    if args.batch:
+        # Batch jobs run for a long time; show their state changes.
+        logging.basicConfig(level=logging.INFO, format="⏳ %(message)s", stream=sys.stderr)
+    screen = run_batch_screen if args.batch else run_screen
+    summary = asyncio.run(screen(
+        args.input, args.output_dir, properties=args.properties, concurrency=concurrency,
+        resume=not args.no_resume, limit=args.limit, progress=_progress, prefilter=args.prefilter,
+    ))
+    print(json.dumps(summary, indent=2))
+    return 0 if summary["complete"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,51 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Morgan (ECFP-like) fingerprints for batches of SMILES."""
+
+import numpy as np
+from rdkit import Chem, RDLogger
+from rdkit.Chem import rdFingerprintGenerator
+
+RDLogger.DisableLog("rdApp.*")
+
+MORGAN_RADIUS = 2
+FINGERPRINT_BITS = 2048
+
+_generators = {}
+
+
+def _generator(radius: int, n_bits: int):
+    key = (radius, n_bits)
+    if key not in _generators:
+        _generators[key] = rdFingerprintGenerator.GetMorganGenerator(radius=radius, fpSize=n_bits)
+    return _generators[key]
+
+
+def morgan_fingerprints(smiles_list: list, radius: int = MORGAN_RADIUS, n_bits: int = FINGERPRINT_BITS):
+    """Bit vectors of a batch of SMILES.
+
+    Returns:
+        (fingerprints, valid): a (n, n_bits) uint8 array of 0/1 and a bool mask
+        of the SMILES that parsed (rows of invalid SMILES are all zero).
+    """
+    generator = _generator(radius, n_bits)
+    fingerprints = np.zeros((len(smiles_list), n_bits), dtype=np.uint8)
+    valid = np.zeros(len(smiles_list), dtype=bool)
+    for i, smiles in enumerate(smiles_list):
+        mol = Chem.MolFromSmiles(smiles) if smiles else None
+        if mol is not None:
+            fingerprints[i] = generator.GetFingerprintAsNumPy(mol)
+            valid[i] = True
+    return fingerprints, valid
@@ -0,0 +1,617 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Streaming virtual-screening pipeline.
+
+Compounds from a CSV, SMILES or SDF library flow through five stages, each
+with its own bounded worker pool and bounded queue (so a slow stage applies
+back-pressure instead of buffering the whole library):
+
+    resolve      name -> SMILES (PubChem), when only a name is given
+    standardize  RDKit cleanup, largest fragment, neutralization, canonical SMILES
+    prefilter    RDKit descriptors and drug-likeness rules, in batches (see descriptors.py);
+                 rejected compounds never reach the endpoint
+    identify     canonical SMILES -> PubChem CID and names
+    predict      TxGemma properties (ClinTox, BBBP, ...), via the prediction cache and,
+                 when they are confident, the CPU surrogate models (see surrogate.py)
+
+Progress is checkpointed per compound and stage in `<output_dir>/checkpoint.sqlite`,
+so an interrupted run resumes where it stopped (failed compounds are retried).
+Finished compounds are appended to `<output_dir>/part-*.parquet` as they complete.
+
+With a `batch` collector (see batch.py), uncached predictions are collected for
+a batch prediction job instead, and their compounds are checkpointed as
+`deferred`; resuming the screen once the job's answers are cached finishes them.
+"""
+
+import asyncio
+import csv
+import json
+import logging
+import os
+import sqlite3
+import statistics
+import threading
+import time
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+from rdkit import Chem, RDLogger
+
+from ..endpoint_guard import endpoint_stats
+from ..endpoint_scheduler import BATCH, request_class
+from ..singleflight import singleflight_stats
+from ..specialists.compound_analyzer.tools.get_smiles import lookup_smiles
+from ..specialists.compound_analyzer.tools.identify_compound import lookup_compound
+from . import descriptors
+from .chem import standardize_smiles
+from . import properties as props
+from .prediction_cache import default_cache
+from .surrogate import default_surrogates
+
+logger = logging.getLogger(__name__)
+RDLogger.DisableLog("rdApp.*")
+
+STAGES = ("resolve", "standardize", "prefilter", "identify", "predict")
+# PubChem allows ~5 requests/s; the endpoint and RDKit stages can go wider.
+DEFAULT_CONCURRENCY = {
+    "resolve": int(os.getenv("SCREEN_RESOLVE_CONCURRENCY", "4")),
+    "standardize": int(os.getenv("SCREEN_STANDARDIZE_CONCURRENCY", str(os.cpu_count() or 2))),
+    "prefilter": int(os.getenv("SCREEN_PREFILTER_CONCURRENCY", "2")),
+    "identify": int(os.getenv("SCREEN_IDENTIFY_CONCURRENCY", "4")),
+    "predict": int(os.getenv("SCREEN_PREDICT_CONCURRENCY", "8")),
+}
+FLUSH_ROWS = int(os.getenv("SCREEN_FLUSH_ROWS", "500"))
+# Stages whose function takes a list of records; workers pull up to this many at once.
+BATCH_SIZE = {"prefilter": int(os.getenv("SCREEN_PREFILTER_BATCH_SIZE", "64"))}
+
+OK = "ok"
+UNRESOLVED = "unresolved"
+INVALID = "invalid"
+FILTERED = "filtered"
+ERROR = "error"
+DEFERRED = "deferred"
+
+BASE_COLUMNS = [
+    ("id", pa.int64()),
+    ("input", pa.string()),
+    ("name", pa.string()),
+    ("input_smiles", pa.string()),
+    ("smiles", pa.string()),
+    ("status", pa.string()),
+    ("cid", pa.int64()),
+    ("common_name", pa.string()),
+    ("iupac_name", pa.string()),
+    ("formula", pa.string()),
+    *[(name, pa.float64()) for name in descriptors.NUMERIC_DESCRIPTORS],
+    ("pains", pa.string()),
+    ("flags", pa.string()),
+]
+
+_SMILES_COLUMNS = ("smiles", "canonical_smiles", "isomeric_smiles")
+_NAME_COLUMNS = ("name", "compound", "compound_name", "drug", "title")
+
+
+# --- Input ---
+
+def _looks_like_smiles(value: str) -> bool:
+    return bool(value) and " " not in value and Chem.MolFromSmiles(value, sanitize=False) is not None
+
+
+def read_library(path: str):
+    """Yields {"id", "input", "name", "input_smiles"} dicts from a CSV/TSV, .smi or SDF file."""
+    ext = os.path.splitext(path)[1].lower()
+    if ext in (".sdf", ".sd"):
+        with open(path, "rb") as f:
+            for i, mol in enumerate(Chem.ForwardSDMolSupplier(f)):
+                if mol is None:
+                    yield {"id": i, "input": f"SDF record {i}", "name": None, "input_smiles": None}
+                    continue
+                name = mol.GetProp("_Name") if mol.HasProp("_Name") else None
+                smiles = Chem.MolToSmiles(mol)
+                yield {"id": i, "input": name or smiles, "name": name or None, "input_smiles": smiles}
+        return
+
+    if ext == ".smi":
+        with open(path) as f:
+            for i, line in enumerate(line for line in f if line.strip()):
+                smiles, _, name = line.strip().partition(" ")
+                yield {"id": i, "input": line.strip(), "name": name.strip() or None, "input_smiles": smiles}
+        return
+
+    with open(path, newline="") as f:
+        reader = csv.DictReader(f, delimiter="\t" if ext == ".tsv" else ",")
+        fields = {name.lower().strip(): name for name in reader.fieldnames or []}
+        smiles_col = next((fields[c] for c in _SMILES_COLUMNS if c in fields), None)
+        name_col = next((fields[c] for c in _NAME_COLUMNS if c in fields), None)
+        first_col = (reader.fieldnames or [None])[0]
+        for i, row in enumerate(reader):
+            smiles = (row.get(smiles_col) or "").strip() if smiles_col else ""
+            name = (row.get(name_col) or "").strip() if name_col else ""
+            if not smiles_col and not name_col:
+                # Unlabelled single column: decide per value.
+                value = (row.get(first_col) or "").strip()
+                smiles, name = (value, "") if _looks_like_smiles(value) else ("", value)
+            yield {"id": i, "input": smiles or name, "name": name or None, "input_smiles": smiles or None}
+
+
+# --- Stages (blocking; run in worker threads) ---
+
+def resolve(record: dict, context: "ScreenContext"):
+    if record["input_smiles"]:
+        return
+    if not record["name"]:
+        record["status"] = UNRESOLVED
+        return
+    smiles = lookup_smiles(record["name"])
+    if not smiles:
+        record["status"] = UNRESOLVED
+        return
+    record["input_smiles"] = smiles
+
+
+def standardize(record: dict, context: "ScreenContext"):
+    smiles = standardize_smiles(record["input_smiles"])
+    if smiles is None:
+        record["status"] = INVALID
+        return
+    record["smiles"] = smiles
+
+
+def prefilter(records: list, context: "ScreenContext"):
+    results = descriptors.prefilter([r["smiles"] for r in records], context.rules)
+    tasks = [p.task for p in context.properties]
+    for record, result in zip(records, results):
+        if result["descriptors"] is None:
+            record["status"] = INVALID
+            continue
+        record.update(result["descriptors"], pains="; ".join(result["descriptors"]["pains"]) or None,
+                      flags=",".join(result["flags"]) or None)
+        blocked = descriptors.blocked_tasks(result, tasks)
+        # Only predictions that are not already cached would have cost an endpoint call.
+        uncached = [t for t in blocked if context.cache.get(t, record["smiles"]) is None]
+        context.count("predictions_skipped", len(uncached))
+        if len(blocked) == len(tasks):
+            record["status"] = FILTERED
+            context.count("endpoint_calls_saved", int(bool(uncached)))
+            descriptors.record_saved_call("screen_compound_library", int(bool(uncached)))
+        else:
+            record["blocked_tasks"] = blocked
+
+
+def identify(record: dict, context: "ScreenContext"):
+    info = lookup_compound(record["smiles"])
+    # Compounds unknown to PubChem (e.g. novel designs) are still predicted.
+    if info:
+        record.update(info)
+
+
+def predict(record: dict, context: "ScreenContext"):
+    smiles = record["smiles"]
+    missing = []
+    guesses = {}
+    for prop in context.properties:
+        if prop.task in record.get("blocked_tasks", ()):
+            continue
+        cached = context.cache.get(prop.task, smiles)
+        if cached is not None:
+            record[prop.column] = cached
+            record[f"{prop.column}_source"] = "cache"
+            context.count("cache_hits")
+            continue
+        if context.surrogates:
+            guess, serve = context.surrogates.predict(prop.task, smiles)
+            if serve:
+                record[prop.column], record[f"{prop.column}_confidence"] = guess
+                record[f"{prop.column}_source"] = "surrogate"
+                context.count("surrogate_predictions")
+                continue
+            guesses[prop.task] = guess
+        missing.append(prop)
+    if not missing:
+        if any(record.get(f"{p.column}_source") == "surrogate" for p in context.properties):
+            context.count("endpoint_calls_avoided")
+        return
+    if context.batch is not None:
+        context.batch.add(smiles, missing)
+        context.count("batch_predictions", len(missing))
+        record["status"] = DEFERRED
+        return
+    answers = props.predict_compound(smiles, missing, context.endpoint)
+    context.count("endpoint_calls")
+    for prop in missing:
+        value, raw = answers[prop.task]
+        record[prop.column] = value
+        record[f"{prop.column}_raw"] = raw
+        record[f"{prop.column}_source"] = "endpoint"
+        if context.surrogates:
+            context.surrogates.compare(prop.task, guesses.get(prop.task), value)
+        # Unparseable answers are not cached, so they are asked again next time.
+        if value is not None:
+            context.cache.put(prop.task, smiles, value, raw)
+
+
+STAGE_FUNCTIONS = {
+    "resolve": resolve,
+    "standardize": standardize,
+    "prefilter": prefilter,
+    "identify": identify,
+    "predict": predict,
+}
+
+
+# --- Checkpoint ---
+
+class Checkpoint:
+    """Per-compound progress of a run: last completed stage, record, written flag."""
+
+    def __init__(self, path: str):
+        self._conn = sqlite3.connect(path)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS compounds ("
+            " id INTEGER PRIMARY KEY, stage INTEGER, final INTEGER, written INTEGER, record TEXT)"
+        )
+        self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        self._pending = 0
+
+    def meta(self, key: str):
+        row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_meta(self, key: str, value: str):
+        self._conn.execute("INSERT OR REPLACE INTO meta VALUES (?, ?)", (key, value))
+        self._conn.commit()
+
+    def load(self) -> dict:
+        """{id: (last completed stage index, final, written, record)}."""
+        return {
+            row[0]: (row[1], bool(row[2]), bool(row[3]), json.loads(row[4]))
+            for row in self._conn.execute("SELECT id, stage, final, written, record FROM compounds")
+        }
+
+    def save(self, record: dict, stage: int, final: bool):
+        self._conn.execute(
+            "INSERT OR REPLACE INTO compounds VALUES (?, ?, ?, 0, ?)",
+            (record["id"], stage, int(final), json.dumps(record)),
+        )
+        self._pending += 1
+        if self._pending >= 200:
+            self.commit()
+
+    def mark_written(self, ids: list):
+        self._conn.executemany("UPDATE compounds SET written = 1 WHERE id = ?", [(i,) for i in ids])
+        self.commit()
+
+    def commit(self):
+        self._conn.commit()
+        self._pending = 0
+
+    def close(self):
+        self.commit()
+        self._conn.close()
+
+
+# --- Metrics ---
+
+class StageMetrics:
+    def __init__(self):
+        self.latencies = {stage: [] for stage in STAGES}
+
+    def record(self, stage: str, seconds: float):
+        self.latencies[stage].append(seconds)
+
+    def summary(self) -> dict:
+        report = {}
+        for stage, values in self.latencies.items():
+            if not values:
+                report[stage] = {"processed": 0}
+                continue
+            ordered = sorted(values)
+            report[stage] = {
+                "processed": len(values),
+                "mean_s": round(statistics.fmean(values), 4),
+                "p50_s": round(ordered[len(ordered) // 2], 4),
+                "p95_s": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 4),
+            }
+        return report
+
+
+class ScreenContext:
+    """What stage functions share during a run."""
+
+    def __init__(self, properties: list, cache, endpoint, rules: list = (), surrogates=None, batch=None):
+        self.properties = properties
+        self.batch = batch
+        self.surrogates = surrogates
+        self.rules = list(rules)
+        self.cache = cache
+        self._endpoint = endpoint
+        self.counters = {
+            "cache_hits": 0,
+            "endpoint_calls": 0,
+            "endpoint_calls_saved": 0,
+            "predictions_skipped": 0,
+            "surrogate_predictions": 0,
+            "endpoint_calls_avoided": 0,
+            "batch_predictions": 0,
+        }
+        self._lock = threading.Lock()
+
+    @property
+    def endpoint(self):
+        # Resolved once, on first use, so fully cached screens need no endpoint.
+        with self._lock:
+            if self._endpoint is None:
+                self._endpoint = props.txgemma_endpoint()
+            return self._endpoint
+
+    def count(self, name: str, n: int = 1):
+        # Stage functions run in worker threads.
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+
+# --- Output ---
+
+class ParquetSink:
+    """Appends finished records to numbered Parquet part files."""
+
+    def __init__(self, output_dir: str, properties: list):
+        self.output_dir = output_dir
+        fields = list(BASE_COLUMNS)
+        for prop in properties:
+            fields += [
+                (prop.column, prop.arrow_type),
+                (f"{prop.column}_raw", pa.string()),
+                (f"{prop.column}_source", pa.string()),
+                (f"{prop.column}_confidence", pa.float64()),
+            ]
+        self.schema = pa.schema(fields)
+        existing = [f for f in os.listdir(output_dir) if f.startswith("part-") and f.endswith(".parquet")]
+        self._next_part = len(existing)
+        self.rows_written = 0
+
+    def write(self, records: list) -> str:
+        rows = [{name: record.get(name) for name in self.schema.names} for record in records]
+        path = os.path.join(self.output_dir, f"part-{self._next_part:05d}.parquet")
+        pq.write_table(pa.Table.from_pylist(rows, schema=self.schema), path)
+        self._next_part += 1
+        self.rows_written += len(rows)
+        return path
+
+
+# --- Runner ---
+
+def _is_final(record: dict, stage_index: int) -> bool:
+    return record["status"] in (UNRESOLVED, INVALID, FILTERED) or stage_index == len(STAGES) - 1
+
+
+async def run_screen(input_path: str, output_dir: str, properties="clintox,bbbp", concurrency: dict = None,
+                     resume: bool = True, limit: int = None, cache=None, endpoint=None,
+                     flush_rows: int = FLUSH_ROWS, progress=None, prefilter: str = None,
+                     surrogates=None, use_surrogates: bool = True, batch=None) -> dict:
+    """Screens a compound library.
+
+    Args:
+        input_path: CSV/TSV (with a smiles and/or name column), .smi or SDF file.
+        output_dir: Directory for the Parquet parts, checkpoint and errors file.
+        properties: TxGemma properties to predict (see properties.PROPERTIES).
+        concurrency: Per-stage worker counts, overriding DEFAULT_CONCURRENCY.
+        resume: Continue from the checkpoint in `output_dir` (False starts over).
+        limit: Only screen the first `limit` compounds.
+        cache: PredictionCache (defaults to the shared on-disk cache).
+        endpoint: TxGemma endpoint (defaults to TXGEMMA_PREDICT_ENDPOINT_ID).
+        flush_rows: Finished compounds per Parquet part.
+        progress: Optional callable receiving a progress dict every few seconds.
+        prefilter: Pre-filter rules, e.g. 'lipinski=reject,pains=flag' (defaults to
+            SCREEN_PREFILTER_RULES; 'none' disables it).
+        surrogates: `Surrogates` to route predictions through (defaults to the shared one).
+        use_surrogates: False sends every uncached prediction to the endpoint.
+        batch: A `BatchCollector` that collects uncached predictions instead of calling
+            the endpoint; their compounds are left `deferred` (see batch.py).
+
+    Returns:
+        A summary with counts, throughput (compounds/min), per-stage latency and
+        the endpoint calls saved by the pre-filter and avoided by surrogate models.
+    """
+    properties = props.resolve_properties(properties)
+    rules = descriptors.parse_rules(prefilter, default=descriptors.SCREEN_PREFILTER_RULES)
+    concurrency = {**DEFAULT_CONCURRENCY, **(concurrency or {})}
+    os.makedirs(output_dir, exist_ok=True)
+    checkpoint_path = os.path.join(output_dir, "checkpoint.sqlite")
+    if not resume:
+        for name in os.listdir(output_dir):
+            if name.startswith("part-") or name in ("checkpoint.sqlite", "errors.jsonl"):
+                os.remove(os.path.join(output_dir, name))
+
+    checkpoint = Checkpoint(checkpoint_path)
+    run_key = json.dumps({
+        "input": os.path.abspath(input_path),
+        "stages": STAGES,
+        "properties": [p.task for p in properties],
+        "prefilter": [f"{rule.name}={action}" for rule, action in rules],
+    })
+    if checkpoint.meta("run") not in (None, run_key):
+        checkpoint.close()
+        raise ValueError(f"{output_dir} holds a different screen; use another directory or resume=False.")
+    checkpoint.set_meta("run", run_key)
+    done = checkpoint.load()
+
+    surrogates = (surrogates or default_surrogates()) if use_surrogates else None
+    context = ScreenContext(properties, cache or default_cache(), endpoint, rules, surrogates, batch)
+    metrics = StageMetrics()
+    sink = ParquetSink(output_dir, properties)
+    queues = [asyncio.Queue(maxsize=2 * concurrency[s] * BATCH_SIZE.get(s, 1)) for s in STAGES]
+    queues.append(asyncio.Queue(maxsize=2 * flush_rows))
+    counts = {"read": 0, "skipped": 0, OK: 0, UNRESOLVED: 0, INVALID: 0, FILTERED: 0, ERROR: 0, DEFERRED: 0}
+    errors = []
+    start = time.perf_counter()
+
+    async def feed():
+        for item in read_library(input_path):
+            if limit is not None and counts["read"] >= limit:
+                break
+            counts["read"] += 1
+            previous = done.get(item["id"])
+            if previous and previous[1] and previous[2]:
+                counts["skipped"] += 1
+                continue
+            if previous:
+                stage, final, _, record = previous
+                if record["status"] in (ERROR, DEFERRED):
+                    record.update(status=OK, error=None)
+            else:
+                stage, final, record = -1, False, {**item, "status": OK}
+            # Finished but unwritten records go straight to the sink.
+            await queues[len(STAGES) if final else stage + 1].put((stage, record))
+
+    async def work(index: int):
+        name = STAGES[index]
+        function = STAGE_FUNCTIONS[name]
+        batch_size = BATCH_SIZE.get(name)
+        while True:
+            batch = [await queues[index].get()]
+            while batch_size and len(batch) < batch_size and not queues[index].empty():
+                batch.append(queues[index].get_nowait())
+            records = [record for _, record in batch]
+            try:
+                t0 = time.perf_counter()
+                try:
+                    if batch_size:
+                        await asyncio.to_thread(function, records, context)
+                    else:
+                        await asyncio.to_thread(function, records[0], context)
+                    stage = index
+                except Exception as e:
+                    stage = batch[0][0]
+                    for record in records:
+                        record.update(status=ERROR, error=f"{name}: {type(e).__name__}: {e}")
+                elapsed = (time.perf_counter() - t0) / len(records)
+                for previous, record in batch:
+                    metrics.record(name, elapsed)
+                    # Deferred compounds resume at this stage.
+                    done_stage = previous if record["status"] == DEFERRED else stage
+                    final = _is_final(record, done_stage)
+                    checkpoint.save(record, done_stage, final)
+                    if final or record["status"] in (ERROR, DEFERRED):
+                        await queues[len(STAGES)].put((done_stage, record))
+                    else:
+                        await queues[index + 1].put((done_stage, record))
+            finally:
+                for _ in batch:
+                    queues[index].task_done()
+
+    async def write():
+        buffer = []
+        last_report = time.perf_counter()
+        while True:
+            _, record = await queues[len(STAGES)].get()
+            try:
+                counts[record["status"]] += 1
+                if record["status"] == ERROR:
+                    errors.append({"id": record["id"], "input": record["input"], "error": record["error"]})
+                elif record["status"] != DEFERRED:
+                    buffer.append(record)
+                if len(buffer) >= flush_rows:
+                    await _flush(buffer)
+                if progress and time.perf_counter() - last_report > 5:
+                    last_report = time.perf_counter()
+                    progress(_summary(final=False))
+            finally:
+                queues[len(STAGES)].task_done()
+
+    async def _flush(buffer):
+        if not buffer:
+            return
+        checkpoint.commit()
+        await asyncio.to_thread(sink.write, list(buffer))
+        checkpoint.mark_written([r["id"] for r in buffer])
+        buffer.clear()
+
+    def _summary(final: bool) -> dict:
+        elapsed = time.perf_counter() - start
+        finished = counts[OK] + counts[UNRESOLVED] + counts[INVALID] + counts[FILTERED]
+        return {
+            "input": input_path,
+            "output_dir": output_dir,
+            "complete": final and counts[ERROR] == 0 and counts[DEFERRED] == 0,
+            "counts": dict(counts),
+            "elapsed_s": round(elapsed, 2),
+            "throughput_per_min": round(finished / elapsed * 60, 1) if elapsed > 0 else 0.0,
+            "stages": metrics.summary(),
+            **context.counters,
+            **_surrogate_summary(context),
+            "endpoints": endpoint_stats(),
+            "dedup": singleflight_stats(),
+        }
+
+    # Endpoint calls from the workers are bulk traffic: they queue behind interactive calls.
+    with request_class(BATCH, session=f"screen:{os.path.abspath(output_dir)}"):
+        workers = [asyncio.create_task(work(i)) for i, s in enumerate(STAGES) for _ in range(concurrency[s])]
+        writer = asyncio.create_task(write())
+    try:
+        await _supervised(feed(), workers + [writer])
+        for queue in queues:
+            await _supervised(queue.join(), workers + [writer])
+    finally:
+        for task in workers + [writer]:
+            task.cancel()
+        await asyncio.gather(*workers, writer, return_exceptions=True)
+        # The writer's partial buffer is checkpointed; write it from there.
+        checkpoint.commit()
+        await _flush_unwritten(checkpoint, sink)
+        checkpoint.close()
+
+    with open(os.path.join(output_dir, "errors.jsonl"), "w") as f:
+        for error in errors:
+            f.write(json.dumps(error) + "\n")
+    summary = _summary(final=True)
+    summary["rows_written"] = sink.rows_written
+    return summary
+
+
+async def _supervised(step, tasks: list):
+    """Awaits `step`, raising at once if one of the long-running `tasks` dies.
+
+    Workers and the writer never return on their own, so a finished task
+    failed (e.g. the sink could not write) and `step` would wait forever.
+    """
+    step = asyncio.ensure_future(step)
+    done, _ = await asyncio.wait([step, *tasks], return_when=asyncio.FIRST_COMPLETED)
+    if step in done:
+        return step.result()
+    step.cancel()
+    failed = next(iter(done))
+    raise failed.exception() or RuntimeError(f"screen task {failed.get_name()} stopped unexpectedly")
+
+
+def _surrogate_summary(context: ScreenContext) -> dict:
+    if not context.surrogates:
+        return {}
+    avoided, calls = context.counters["endpoint_calls_avoided"], context.counters["endpoint_calls"]
+    return {
+        "endpoint_calls_avoided_fraction": round(avoided / (avoided + calls), 4) if avoided + calls else 0.0,
+        # Process-wide per-task routing and agreement statistics.
+        "surrogates": context.surrogates.report(),
+    }
+
+
+async def _flush_unwritten(checkpoint: Checkpoint, sink: ParquetSink):
+    """Writes finished records that are checkpointed but not yet in a Parquet part."""
+    pending = [record for stage, final, written, record in checkpoint.load().values() if final and not written]
+    for start in range(0, len(pending), FLUSH_ROWS):
+        chunk = pending[start:start + FLUSH_ROWS]
+        await asyncio.to_thread(sink.write, chunk)
+        checkpoint.mark_written([r["id"] for r in chunk])
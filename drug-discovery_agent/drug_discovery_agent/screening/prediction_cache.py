@@ -0,0 +1,158 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Persistent cache of TxGemma answers, keyed by (task, canonical SMILES).
+
+Every prediction the screening pipeline makes is stored here, so re-screening
+a compound never costs another endpoint call. The cache is also the training
+set for surrogate models.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+
+PREDICTION_CACHE_PATH = os.getenv(
+    "PREDICTION_CACHE_PATH", os.path.expanduser("~/.cache/drug_discovery_agent/predictions.sqlite")
+)
+
+
+class PredictionCache:
+    """A thread-safe SQLite map of (task, smiles) -> parsed answer and raw model output."""
+
+    def __init__(self, path: str = PREDICTION_CACHE_PATH):
+        self.path = path
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS predictions ("
+                " task TEXT NOT NULL, smiles TEXT NOT NULL, value TEXT, raw TEXT,"
+                " source TEXT, created_at REAL, PRIMARY KEY (task, smiles))"
+            )
+            self._conn.commit()
+
+    def get_many(self, task: str, smiles_list: list) -> dict:
+        """Returns {smiles: value} for the cached entries among `smiles_list`."""
+        found = {}
+        with self._lock:
+            for start in range(0, len(smiles_list), 500):
+                chunk = smiles_list[start:start + 500]
+                rows = self._conn.execute(
+                    f"SELECT smiles, value FROM predictions WHERE task = ? AND smiles IN ({','.join('?' * len(chunk))})",
+                    [task, *chunk],
+                )
+                found.update((smiles, json.loads(value)) for smiles, value in rows)
+        return found
+
+    def get(self, task: str, smiles: str):
+        return self.get_many(task, [smiles]).get(smiles)
+
+    def put_many(self, task: str, entries: list, source: str = "endpoint"):
+        """Stores (smiles, value, raw) tuples; values must be JSON-serializable."""
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO predictions VALUES (?, ?, ?, ?, ?, ?)",
+                [(task, smiles, json.dumps(value), raw, source, now) for smiles, value, raw in entries],
+            )
+            self._conn.commit()
+
+    def put(self, task: str, smiles: str, value, raw: str = "", source: str = "endpoint"):
+        self.put_many(task, [(smiles, value, raw)], source)
+
+    def items(self, task: str, source: str = None):
+        """Yields (smiles, value) for a task, optionally only from one source."""
+        query = "SELECT smiles, value FROM predictions WHERE task = ? AND value IS NOT NULL"
+        args = [task]
+        if source:
+            query += " AND source = ?"
+            args.append(source)
+        with self._lock:
+            rows = self._conn.execute(query, args).fetchall()
+        for smiles, value in rows:
+            yield smiles, json.loads(value)
+
+    def reparse(self, task: str, parse) -> int:
+        """Re-derives a task's cached values from the raw answers, e.g. after a parser fix.
+
+        Answers the parser can no longer read are dropped, as unparseable answers
+        are never cached, so they are asked again.
+
+        Returns:
+            The number of rows updated or dropped.
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT smiles, value, raw FROM predictions WHERE task = ? AND raw IS NOT NULL AND raw != ''",
+                (task,),
+            ).fetchall()
+            updated, dropped = [], []
+            for smiles, value, raw in rows:
+                parsed = parse(raw)
+                if parsed is None:
+                    dropped.append((task, smiles))
+                elif json.dumps(parsed) != value:
+                    updated.append((json.dumps(parsed), task, smiles))
+            self._conn.executemany("UPDATE predictions SET value = ? WHERE task = ? AND smiles = ?", updated)
+            self._conn.executemany("DELETE FROM predictions WHERE task = ? AND smiles = ?", dropped)
+            self._conn.commit()
+        return len(updated) + len(dropped)
+
+    def predictions_for(self, smiles_list: list) -> dict:
+        """Returns {smiles: {task: value}} for every cached prediction of the given SMILES."""
+        found = {}
+        with self._lock:
+            for start in range(0, len(smiles_list), 500):
+                chunk = smiles_list[start:start + 500]
+                rows = self._conn.execute(
+                    f"SELECT smiles, task, value FROM predictions WHERE smiles IN ({','.join('?' * len(chunk))})",
+                    chunk,
+                )
+                for smiles, task, value in rows:
+                    found.setdefault(smiles, {})[task] = json.loads(value)
+        return found
+
+    def smiles_since(self, timestamp: float) -> list:
+        """(smiles, latest created_at) of the compounds with predictions stored after `timestamp`."""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT smiles, MAX(created_at) FROM predictions WHERE created_at > ? GROUP BY smiles",
+                (timestamp,),
+            ).fetchall()
+
+    def count(self, task: str = None) -> int:
+        with self._lock:
+            if task:
+                return self._conn.execute("SELECT COUNT(*) FROM predictions WHERE task = ?", (task,)).fetchone()[0]
+            return self._conn.execute("SELECT COUNT(*) FROM predictions").fetchone()[0]
+
+
+_default = None
+_default_lock = threading.Lock()
+
+
+def default_cache() -> PredictionCache:
+    """The process-wide cache at PREDICTION_CACHE_PATH."""
+    global _default
+    with _default_lock:
+        if _default is None:
+            _default = PredictionCache()
+        return _default
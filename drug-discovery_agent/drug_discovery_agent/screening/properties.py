@@ -0,0 +1,189 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+TxGemma property predictions: a registry of TDC task prompts and their parsers.
+
+Each `Property` is one TDC question TxGemma was trained on. `predict_batch`
+asks any number of properties for any number of compounds as multi-instance
+predict requests, so a full ADMET profile costs about one endpoint round trip.
+"""
+
+import contextvars
+import os
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable
+
+import pyarrow as pa
+
+from ..specialists.compound_analyzer.tools.predict_toxicity import clintox_prompt, txgemma_endpoint
+from .answers import parse_choice, parse_score
+
+# Vertex AI caps the instances per predict request; larger batches are split
+# into requests that are sent concurrently.
+TXGEMMA_MAX_INSTANCES = int(os.getenv("TXGEMMA_MAX_INSTANCES", "32"))
+TXGEMMA_MAX_PARALLEL_REQUESTS = int(os.getenv("TXGEMMA_MAX_PARALLEL_REQUESTS", "4"))
+
+_INSTRUCTIONS = "Instructions: Answer the following question about drug properties.\n"
+
+
+def _tdc_prompt(context: str, question: str) -> Callable[[str], str]:
+    def prompt(smiles_string: str) -> str:
+        return f"{_INSTRUCTIONS}Context: {context}\nQuestion: {question}\nDrug SMILES: {smiles_string}"
+    return prompt
+
+
+def bbbp_prompt(smiles_string: str) -> str:
+    """The BBB penetration prompt for TxGemma (same as medical_research's predict_bbb_crossing)."""
+    return (
+        "Instructions: Answer the following question about drug properties.\n"
+        "Context: As a membrane separating circulating blood and brain "
+        "extracellular fluid, the blood-brain barrier (BBB) is the "
+        "protection layer that blocks most foreign drugs. Thus the ability "
+        "of a drug to penetrate the barrier to deliver to the site of "
+        "action forms a crucial challenge in development of drugs for "
+        "central nervous system.\n"
+        "Question: Given a drug SMILES string, predict whether it\n"
+        "(A) does not cross the BBB (B) crosses the BBB\n"
+        f"Drug SMILES: {smiles_string}"
+    )
+
+
+@dataclass(frozen=True)
+class Property:
+    """A TxGemma question: how to ask it and how to read the answer."""
+
+    task: str  # key in the prediction cache
+    column: str  # output column name
+    prompt: Callable[[str], str]
+    parse: Callable[[str], Any]
+    labels: tuple = ("no", "yes")  # readable (False, True) answers; empty for scores
+    arrow_type: Any = pa.bool_()
+
+    def describe(self, value) -> str:
+        if value is None:
+            return "undetermined"
+        if not self.labels:
+            return f"{value:g} (scale 0-1000)"
+        return self.labels[bool(value)]
+
+
+PROPERTIES = {
+    "clintox": Property("clintox", "toxic", clintox_prompt, parse_choice,
+                        ("no clinical toxicity risk", "clinical toxicity risk")),
+    "bbbp": Property("bbbp", "crosses_bbb", bbbp_prompt, parse_choice,
+                     ("does not cross the BBB", "crosses the BBB")),
+    "herg": Property("herg", "blocks_herg", _tdc_prompt(
+        "Human ether-à-go-go related gene (hERG) is crucial for the coordination of the heart's beating. "
+        "Thus, if a drug blocks the hERG, it could lead to severe adverse effects. Therefore, reliable "
+        "prediction of hERG liability in the early stages of drug design is quite important to reduce the "
+        "risk of cardiotoxicity-related attritions in the later development stages.",
+        "Given a drug SMILES string, predict whether it\n(A) does not block hERG (B) blocks hERG",
+    ), parse_choice, ("does not block hERG", "blocks hERG")),
+    "ames": Property("ames", "mutagenic", _tdc_prompt(
+        "Mutagenicity means the ability of a drug to induce genetic alterations. Drugs that can cause "
+        "damage to the DNA can result in cell death or other severe adverse effects. Nowadays, the most "
+        "widely used assay for testing the mutagenicity of compounds is the Ames experiment.",
+        "Given a drug SMILES string, predict whether it\n(A) is not mutagenic (B) is mutagenic",
+    ), parse_choice, ("not mutagenic (Ames)", "mutagenic (Ames)")),
+    "dili": Property("dili", "causes_dili", _tdc_prompt(
+        "Drug-induced liver injury (DILI) is fatal liver disease caused by drugs and it has been the single "
+        "most frequent cause of safety-related drug marketing withdrawals for the past 50 years.",
+        "Given a drug SMILES string, predict whether it\n(A) cannot cause DILI (B) can cause DILI",
+    ), parse_choice, ("no DILI risk", "DILI risk")),
+    "cyp3a4": Property("cyp3a4", "inhibits_cyp3a4", _tdc_prompt(
+        "The CYP P450 genes are involved in the formation and breakdown (metabolism) of various molecules "
+        "and chemicals within cells. Specifically, CYP3A4 is an important enzyme in the body, mainly found "
+        "in the liver and in the intestine. It oxidizes small foreign organic molecules (xenobiotics), such "
+        "as toxins or drugs, so that they can be removed from the body.",
+        "Given a drug SMILES string, predict whether it\n(A) does not inhibit CYP3A4 (B) inhibits CYP3A4",
+    ), parse_choice, ("does not inhibit CYP3A4", "inhibits CYP3A4")),
+    "solubility": Property("solubility", "solubility_score", _tdc_prompt(
+        "Aqueous solubility measures a drug's ability to dissolve in water. Poor water solubility could "
+        "lead to slow drug absorptions, inadequate bioavailability and even induce toxicity.",
+        "Given a drug SMILES string, predict its normalized solubility from 000 to 1000, where 000 is "
+        "minimum solubility and 1000 is maximum solubility.",
+    ), parse_score, (), pa.float64()),
+}
+
+
+def resolve_properties(names) -> list:
+    """Turns 'clintox,bbbp' or a list of names into `Property` objects ('all' for every property)."""
+    if isinstance(names, str):
+        names = [n.strip() for n in names.split(",") if n.strip()]
+    if list(names) == ["all"]:
+        return list(PROPERTIES.values())
+    unknown = [n for n in names if n not in PROPERTIES]
+    if unknown:
+        raise ValueError(f"Unknown properties {unknown}. Available: {sorted(PROPERTIES)}")
+    return [PROPERTIES[n] for n in names]
+
+
+def predict_batch(requests: list, endpoint=None, max_instances: int = None) -> dict:
+    """Asks every (smiles, properties) request as multi-instance predict calls.
+
+    All prompts go into as few requests as the instance cap allows, and those
+    requests run concurrently.
+
+    Args:
+        requests: (smiles, [Property]) pairs.
+        max_instances: instances per request (default TXGEMMA_MAX_INSTANCES).
+
+    Returns:
+        {smiles: {task: (parsed value, raw model output)}}.
+
+    Raises:
+        RuntimeError: if no TxGemma endpoint is configured.
+        EndpointUnavailable: if the endpoint is overloaded, failing or timed out.
+    """
+    pairs = [(smiles, prop) for smiles, properties in requests for prop in properties]
+    if not pairs:
+        return {}
+    endpoint = endpoint or txgemma_endpoint()
+    if endpoint is None:
+        raise RuntimeError("TXGEMMA_PREDICT_ENDPOINT_ID environment variable is not set.")
+
+    max_instances = max_instances or TXGEMMA_MAX_INSTANCES
+    chunks = [pairs[i:i + max_instances] for i in range(0, len(pairs), max_instances)]
+
+    def ask(chunk):
+        response = endpoint.predict(instances=[{"prompt": prop.prompt(smiles)} for smiles, prop in chunk])
+        return response.predictions
+
+    if len(chunks) == 1:
+        answers = [ask(chunks[0])]
+    else:
+        with ThreadPoolExecutor(max_workers=min(len(chunks), TXGEMMA_MAX_PARALLEL_REQUESTS)) as pool:
+            # Each request keeps the caller's request class (interactive tool or batch screen).
+            futures = [pool.submit(contextvars.copy_context().run, ask, chunk) for chunk in chunks]
+            answers = [future.result() for future in futures]
+
+    results = {}
+    for chunk, predictions in zip(chunks, answers):
+        for (smiles, prop), raw in zip(chunk, predictions):
+            results.setdefault(smiles, {})[prop.task] = (prop.parse(str(raw)), str(raw))
+    return results
+
+
+def predict_compound(smiles: str, properties: list, endpoint=None) -> dict:
+    """Asks all `properties` of one compound in a single multi-instance predict.
+
+    Returns:
+        {task: (parsed value, raw model output)}.
+
+    Raises:
+        RuntimeError: if no TxGemma endpoint is configured.
+    """
+    return predict_batch([(smiles, properties)], endpoint).get(smiles, {})
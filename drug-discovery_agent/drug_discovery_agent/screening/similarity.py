@@ -0,0 +1,228 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Append-only Tanimoto similarity index over packed Morgan fingerprints.
+
+Fingerprints are stored as rows of packed `uint64` words in `fingerprints.u64`,
+their bit counts in `popcounts.u16` and the canonical SMILES in `smiles.txt`,
+all appended in the same order. `meta.json` records how many rows are complete,
+so a crash mid-append only loses the partial rows. Searches memory-map the
+files and compute Tanimoto similarities chunk by chunk with a vectorized
+popcount, in parallel over SIMILARITY_SEARCH_THREADS (numpy releases the GIL).
+"""
+
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from .fingerprints import FINGERPRINT_BITS, MORGAN_RADIUS, morgan_fingerprints
+
+SIMILARITY_INDEX_DIR = os.getenv(
+    "SIMILARITY_INDEX_DIR", os.path.expanduser("~/.cache/drug_discovery_agent/similarity")
+)
+SIMILARITY_SEARCH_THREADS = int(os.getenv("SIMILARITY_SEARCH_THREADS", str(min(8, os.cpu_count() or 1))))
+SEARCH_CHUNK_ROWS = 1 << 16
+
+if hasattr(np, "bitwise_count"):
+    def _popcount(words: np.ndarray) -> np.ndarray:
+        return np.bitwise_count(words).sum(axis=-1, dtype=np.uint16)
+else:
+    _BYTE_COUNTS = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+    def _popcount(words: np.ndarray) -> np.ndarray:
+        as_bytes = words.view(np.uint8).reshape(*words.shape[:-1], -1)
+        return _BYTE_COUNTS[as_bytes].sum(axis=-1, dtype=np.uint16)
+
+
+def pack(bits: np.ndarray) -> np.ndarray:
+    """(n, n_bits) 0/1 uint8 -> (n, n_bits / 64) uint64."""
+    return np.packbits(bits, axis=1).view(np.uint64)
+
+
+class SimilarityIndex:
+    """Packed fingerprint index supporting appends, mmap loading and batched top-k Tanimoto search."""
+
+    def __init__(self, directory: str = SIMILARITY_INDEX_DIR, n_bits: int = FINGERPRINT_BITS,
+                 radius: int = MORGAN_RADIUS):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._meta_path = os.path.join(directory, "meta.json")
+        self._lock = threading.RLock()
+        if os.path.exists(self._meta_path):
+            with open(self._meta_path) as f:
+                self.meta = json.load(f)
+        else:
+            self.meta = {"n_bits": n_bits, "radius": radius, "count": 0, "synced_until": 0.0}
+            self._write_meta()
+        if self.meta["n_bits"] % 64:
+            raise ValueError("Fingerprint size must be a multiple of 64 bits.")
+        self.words = self.meta["n_bits"] // 64
+        self._truncate_partial_rows()
+        self._fingerprints = self._popcounts = None
+        self._smiles = None
+        self._rows = None
+
+    def __len__(self) -> int:
+        return self.meta["count"]
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def _write_meta(self):
+        tmp = self._meta_path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.meta, f)
+        os.replace(tmp, self._meta_path)
+
+    def _truncate_partial_rows(self):
+        count = self.meta["count"]
+        for name, row_bytes in (("fingerprints.u64", self.words * 8), ("popcounts.u16", 2)):
+            path = self._path(name)
+            if os.path.exists(path) and os.path.getsize(path) > count * row_bytes:
+                os.truncate(path, count * row_bytes)
+        path = self._path("smiles.txt")
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                lines = f.read().split(b"\n")
+            if len(lines) - 1 < count:
+                raise ValueError(f"{path} has fewer rows than meta.json records.")
+            if len(lines) - 1 > count:
+                with open(path, "wb") as f:
+                    f.write(b"".join(line + b"\n" for line in lines[:count]))
+
+    def _load(self):
+        """Memory-maps the fingerprints and reads the SMILES, once per change of size."""
+        with self._lock:
+            count = self.meta["count"]
+            if self._rows is not None and len(self._fingerprints) == count:
+                return
+            if count == 0:
+                self._fingerprints = np.zeros((0, self.words), dtype=np.uint64)
+                self._popcounts = np.zeros(0, dtype=np.uint16)
+            else:
+                self._fingerprints = np.memmap(self._path("fingerprints.u64"), dtype=np.uint64, mode="r",
+                                               shape=(count, self.words))
+                self._popcounts = np.memmap(self._path("popcounts.u16"), dtype=np.uint16, mode="r", shape=(count,))
+            if self._smiles is None or len(self._smiles) != count:
+                path = self._path("smiles.txt")
+                self._smiles = []
+                if os.path.exists(path):
+                    with open(path) as f:
+                        self._smiles = f.read().split("\n")[:count]
+                self._rows = {smiles: i for i, smiles in enumerate(self._smiles)}
+
+    def smiles(self, row: int) -> str:
+        self._load()
+        return self._smiles[row]
+
+    def add(self, smiles_list: list) -> int:
+        """Appends the SMILES that are valid and not yet indexed; returns how many were added."""
+        with self._lock:
+            self._load()
+            new = list(dict.fromkeys(s for s in smiles_list if s and s not in self._rows))
+            if not new:
+                return 0
+            bits, valid = morgan_fingerprints(new, self.meta["radius"], self.meta["n_bits"])
+            new = [s for s, ok in zip(new, valid) if ok]
+            packed = pack(bits[valid])
+            with open(self._path("fingerprints.u64"), "ab") as f:
+                f.write(packed.tobytes())
+            with open(self._path("popcounts.u16"), "ab") as f:
+                f.write(_popcount(packed).tobytes())
+            with open(self._path("smiles.txt"), "a") as f:
+                f.write("".join(s + "\n" for s in new))
+            # Rows only count once meta.json says so.
+            self.meta["count"] += len(new)
+            self._write_meta()
+            return len(new)
+
+    def sync(self, cache) -> int:
+        """Adds the compounds cached since the last sync; returns how many were added."""
+        with self._lock:
+            entries = cache.smiles_since(self.meta.get("synced_until", 0.0))
+            if not entries:
+                return 0
+            added = self.add([smiles for smiles, _ in entries])
+            self.meta["synced_until"] = max(created_at for _, created_at in entries)
+            self._write_meta()
+            return added
+
+    @staticmethod
+    def _search_chunk(fingerprints, popcounts, queries: np.ndarray, query_counts: np.ndarray,
+                      start: int, stop: int, k: int):
+        block = np.asarray(fingerprints[start:stop])
+        counts = np.asarray(popcounts[start:stop], dtype=np.float32)
+        # (queries, rows) intersection counts, one query at a time to bound memory.
+        common = np.stack([_popcount(block & q) for q in queries]).astype(np.float32)
+        union = query_counts[:, None] + counts[None, :] - common
+        similarity = np.divide(common, union, out=np.zeros_like(common), where=union > 0)
+        k = min(k, stop - start)
+        top = np.argpartition(-similarity, k - 1, axis=1)[:, :k]
+        return top + start, np.take_along_axis(similarity, top, axis=1)
+
+    def search(self, smiles_list: list, k: int = 10, min_similarity: float = 0.0) -> list:
+        """Top-k most similar indexed compounds for each query SMILES.
+
+        Returns:
+            One list per query of (smiles, tanimoto similarity), most similar first
+            (an empty list for an invalid query).
+        """
+        self._load()
+        with self._lock:
+            # A consistent snapshot; appends after this point are not searched.
+            fingerprints, popcounts, indexed = self._fingerprints, self._popcounts, self._smiles
+        if not smiles_list:
+            return []
+        bits, valid = morgan_fingerprints(smiles_list, self.meta["radius"], self.meta["n_bits"])
+        if len(fingerprints) == 0 or k <= 0:
+            return [[] for _ in smiles_list]
+        queries = pack(bits)
+        query_counts = _popcount(queries).astype(np.float32)
+        total = len(fingerprints)
+        bounds = [(s, min(s + SEARCH_CHUNK_ROWS, total)) for s in range(0, total, SEARCH_CHUNK_ROWS)]
+        with ThreadPoolExecutor(max_workers=SIMILARITY_SEARCH_THREADS) as pool:
+            parts = list(pool.map(
+                lambda b: self._search_chunk(fingerprints, popcounts, queries, query_counts, b[0], b[1], k), bounds
+            ))
+        rows = np.concatenate([p[0] for p in parts], axis=1)
+        scores = np.concatenate([p[1] for p in parts], axis=1)
+
+        results = []
+        for q in range(len(smiles_list)):
+            if not valid[q]:
+                results.append([])
+                continue
+            order = np.argsort(-scores[q], kind="stable")[:k]
+            results.append([
+                (indexed[rows[q, i]], round(float(scores[q, i]), 4))
+                for i in order if scores[q, i] >= min_similarity
+            ])
+        return results
+
+
+_default = None
+_default_lock = threading.Lock()
+
+
+def default_index() -> SimilarityIndex:
+    """The process-wide index at SIMILARITY_INDEX_DIR."""
+    global _default
+    with _default_lock:
+        if _default is None:
+            _default = SimilarityIndex()
+        return _default
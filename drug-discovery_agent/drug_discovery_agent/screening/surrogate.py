@@ -0,0 +1,254 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+CPU surrogate models of TxGemma, trained on the prediction cache.
+
+For each task (e.g. 'clintox', 'bbbp') a calibrated classifier on Morgan
+fingerprints is trained from the endpoint answers in the prediction cache.
+`Surrogates` serves a prediction when its calibrated confidence reaches
+SURROGATE_CONFIDENCE_THRESHOLD and defers to the endpoint otherwise. A sample
+of confident predictions (SURROGATE_AUDIT_RATE) is still sent to the endpoint
+to measure how often the surrogate agrees with it.
+
+Train with:
+    python -m drug_discovery_agent.screening.surrogate clintox bbbp
+"""
+
+import argparse
+import json
+import os
+import random
+import threading
+import time
+
+import joblib
+import numpy as np
+
+from .fingerprints import morgan_fingerprints
+from .prediction_cache import default_cache
+
+SURROGATE_DIR = os.getenv("SURROGATE_DIR", os.path.expanduser("~/.cache/drug_discovery_agent/surrogates"))
+SURROGATES_ENABLED = os.getenv("SURROGATES_ENABLED", "true").lower() == "true"
+SURROGATE_CONFIDENCE_THRESHOLD = float(os.getenv("SURROGATE_CONFIDENCE_THRESHOLD", "0.9"))
+SURROGATE_AUDIT_RATE = float(os.getenv("SURROGATE_AUDIT_RATE", "0.05"))
+SURROGATE_MIN_EXAMPLES = int(os.getenv("SURROGATE_MIN_EXAMPLES", "200"))
+
+MODEL_TYPES = ("logreg", "gbm")
+
+
+def _classifier(model_type: str, n_examples: int):
+    from sklearn.calibration import CalibratedClassifierCV
+    from sklearn.ensemble import HistGradientBoostingClassifier
+    from sklearn.linear_model import LogisticRegression
+
+    if model_type == "logreg":
+        base = LogisticRegression(C=0.5, max_iter=2000, class_weight="balanced")
+    elif model_type == "gbm":
+        base = HistGradientBoostingClassifier(max_iter=200, learning_rate=0.1)
+    else:
+        raise ValueError(f"Unknown surrogate model type '{model_type}'. Available: {MODEL_TYPES}")
+    # Isotonic calibration needs more data than Platt scaling to be stable.
+    return CalibratedClassifierCV(base, method="isotonic" if n_examples >= 1000 else "sigmoid", cv=3)
+
+
+def _confidence(probabilities: np.ndarray) -> np.ndarray:
+    return np.maximum(probabilities, 1 - probabilities)
+
+
+def train(task: str, cache=None, model_type: str = "logreg", threshold: float = SURROGATE_CONFIDENCE_THRESHOLD,
+          directory: str = SURROGATE_DIR, min_examples: int = SURROGATE_MIN_EXAMPLES) -> dict:
+    """Trains and saves the surrogate for `task` from the cached endpoint answers.
+
+    Cached answers are first re-parsed from their raw text, so a parser fix
+    also corrects the training labels. A stratified 20% hold-out measures
+    accuracy, calibration (Brier score) and, at `threshold`, the coverage and
+    accuracy of the predictions that would be served. The saved model is then
+    refit on all examples.
+
+    Returns:
+        The model's metadata, including the hold-out metrics.
+
+    Raises:
+        ValueError: with too few examples or only one class.
+    """
+    from sklearn.metrics import accuracy_score, brier_score_loss
+    from sklearn.model_selection import train_test_split
+
+    from .properties import PROPERTIES  # properties imports predict_toxicity, which imports this module
+
+    cache = cache or default_cache()
+    if task in PROPERTIES:
+        cache.reparse(task, PROPERTIES[task].parse)
+    examples = list(cache.items(task, source="endpoint"))
+    if any(not isinstance(value, bool) for _, value in examples):
+        raise ValueError(f"{task}: surrogates are only trained for yes/no tasks.")
+    if len(examples) < min_examples:
+        raise ValueError(f"{task}: {len(examples)} cached endpoint answers, need at least {min_examples}.")
+    X, valid = morgan_fingerprints([smiles for smiles, _ in examples])
+    y = np.array([label for _, label in examples])[valid]
+    X = X[valid]
+    if min(y.sum(), len(y) - y.sum()) < 10:
+        raise ValueError(f"{task}: need at least 10 examples of each class, got {int(y.sum())} positive of {len(y)}.")
+
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, stratify=y, random_state=0)
+    model = _classifier(model_type, len(y_train)).fit(X_train, y_train)
+    probabilities = model.predict_proba(X_test)[:, 1]
+    predictions = probabilities >= 0.5
+    confident = _confidence(probabilities) >= threshold
+    metrics = {
+        "holdout_examples": int(len(y_test)),
+        "accuracy": round(float(accuracy_score(y_test, predictions)), 4),
+        "brier_score": round(float(brier_score_loss(y_test, probabilities)), 4),
+        "coverage_at_threshold": round(float(confident.mean()), 4),
+        "accuracy_at_threshold": (
+            round(float(accuracy_score(y_test[confident], predictions[confident])), 4) if confident.any() else None
+        ),
+    }
+
+    model = _classifier(model_type, len(y)).fit(X, y)
+    meta = {
+        "task": task,
+        "model_type": model_type,
+        "examples": int(len(y)),
+        "positive_fraction": round(float(y.mean()), 4),
+        "threshold": threshold,
+        "trained_at": time.time(),
+        **metrics,
+    }
+    os.makedirs(directory, exist_ok=True)
+    joblib.dump({"model": model, "meta": meta}, os.path.join(directory, f"{task}.joblib"))
+    return meta
+
+
+class Surrogates:
+    """Serves confident surrogate predictions and tracks agreement with the endpoint."""
+
+    def __init__(self, directory: str = SURROGATE_DIR, threshold: float = SURROGATE_CONFIDENCE_THRESHOLD,
+                 audit_rate: float = SURROGATE_AUDIT_RATE):
+        self.directory = directory
+        self.threshold = threshold
+        self.audit_rate = audit_rate
+        self._models = {}  # task -> (file mtime, model, meta)
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def _model(self, task: str):
+        path = os.path.join(self.directory, f"{task}.joblib")
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            return None
+        with self._lock:
+            loaded = self._models.get(task)
+            if loaded is None or loaded[0] != mtime:
+                # Retrained models are picked up without a restart.
+                saved = joblib.load(path)
+                loaded = self._models[task] = (mtime, saved["model"], saved["meta"])
+        return loaded[1]
+
+    def _count(self, task: str, **increments):
+        with self._lock:
+            stats = self._stats.setdefault(
+                task, {"served": 0, "deferred": 0, "audits": 0, "audit_agreements": 0,
+                       "deferred_comparisons": 0, "deferred_agreements": 0},
+            )
+            for key, n in increments.items():
+                stats[key] += n
+
+    def guess(self, task: str, smiles: str):
+        """(value, confidence) from the task's surrogate, or None if there is no model."""
+        model = self._model(task)
+        if model is None:
+            return None
+        X, valid = morgan_fingerprints([smiles])
+        if not valid[0]:
+            return None
+        probability = float(model.predict_proba(X)[0, 1])
+        return probability >= 0.5, round(float(_confidence(np.array(probability))), 4)
+
+    def predict(self, task: str, smiles: str):
+        """Routes one prediction.
+
+        Returns:
+            (guess, serve): `guess` is (value, confidence) or None without a model;
+            `serve` is True when the guess should be used instead of calling the
+            endpoint. Unserved guesses should be reported back with `compare`.
+        """
+        guess = self.guess(task, smiles)
+        if guess is None:
+            return None, False
+        if guess[1] >= self.threshold and random.random() >= self.audit_rate:
+            self._count(task, served=1)
+            return guess, True
+        self._count(task, deferred=1)
+        return guess, False
+
+    def compare(self, task: str, guess, endpoint_value):
+        """Records whether an unserved guess matched the endpoint's answer."""
+        if guess is None or endpoint_value is None:
+            return
+        agreed = int(guess[0] == endpoint_value)
+        if guess[1] >= self.threshold:
+            self._count(task, audits=1, audit_agreements=agreed)
+        else:
+            self._count(task, deferred_comparisons=1, deferred_agreements=agreed)
+
+    def report(self) -> dict:
+        """Per task: served/deferred counts, fraction of endpoint calls avoided, agreement rates."""
+        with self._lock:
+            stats = {task: dict(values) for task, values in self._stats.items()}
+        for values in stats.values():
+            routed = values["served"] + values["deferred"]
+            values["endpoint_calls_avoided_fraction"] = round(values["served"] / routed, 4) if routed else 0.0
+            values["agreement_rate"] = (
+                round(values["audit_agreements"] / values["audits"], 4) if values["audits"] else None
+            )
+            values["deferred_agreement_rate"] = (
+                round(values["deferred_agreements"] / values["deferred_comparisons"], 4)
+                if values["deferred_comparisons"] else None
+            )
+        return stats
+
+
+_default = None
+_default_lock = threading.Lock()
+
+
+def default_surrogates():
+    """The process-wide `Surrogates` over SURROGATE_DIR, or None if SURROGATES_ENABLED is false."""
+    global _default
+    if not SURROGATES_ENABLED:
+        return None
+    with _default_lock:
+        if _default is None:
+            _default = Surrogates()
+        return _default
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Train TxGemma surrogate models from the prediction cache.")
+    parser.add_argument("tasks", nargs="+", help="Tasks to train, e.g. clintox bbbp.")
+    parser.add_argument("--model", choices=MODEL_TYPES, default="logreg")
+    parser.add_argument("--threshold", type=float, default=SURROGATE_CONFIDENCE_THRESHOLD)
+    args = parser.parse_args(argv)
+    for task in args.tasks:
+        try:
+            print(json.dumps(train(task, model_type=args.model, threshold=args.threshold), indent=2))
+        except ValueError as e:
+            print(f"⚠️ {e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,383 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Persistent, memory-bounded ADK session service backed by SQLite.
+
+* Events and state are stored as zstd-compressed JSON, one row per event, so
+  appending an event never rewrites the session.
+* Recently used sessions are kept in an in-memory LRU bounded by count, total
+  size and idle age. Cold sessions are loaded lazily from disk on access.
+* `list_sessions` reads only the session index (no events), so it can serve
+  thousands of sessions per user.
+* App- and user-scoped state (`app:` / `user:` keys) is stored once per app and
+  user and merged into every session, like ADK's other session services.
+"""
+
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Optional
+
+import zstandard
+from google.adk.events import Event
+from google.adk.sessions import BaseSessionService, Session, State
+from google.adk.sessions.base_session_service import GetSessionConfig, ListSessionsResponse
+
+DB_PATH = os.getenv("SESSION_DB_PATH", "/tmp/drug_discovery_sessions.db")
+HOT_MAX_SESSIONS = int(os.getenv("SESSION_HOT_MAX_SESSIONS", "256"))
+HOT_MAX_BYTES = int(os.getenv("SESSION_HOT_MAX_BYTES", str(256 * 1024 * 1024)))
+HOT_MAX_IDLE_SECONDS = float(os.getenv("SESSION_HOT_MAX_IDLE_SECONDS", "1800"))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    app_name TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    id TEXT NOT NULL,
+    state BLOB NOT NULL,
+    update_time REAL NOT NULL,
+    PRIMARY KEY (app_name, user_id, id)
+);
+CREATE TABLE IF NOT EXISTS events (
+    app_name TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    session_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    timestamp REAL NOT NULL,
+    data BLOB NOT NULL,
+    PRIMARY KEY (app_name, user_id, session_id, seq)
+);
+CREATE TABLE IF NOT EXISTS app_states (
+    app_name TEXT PRIMARY KEY,
+    state BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS user_states (
+    app_name TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    state BLOB NOT NULL,
+    PRIMARY KEY (app_name, user_id)
+);
+"""
+
+
+def session_footprint_bytes(session: Session) -> int:
+    """Approximate in-memory size of a session, measured as its JSON size."""
+    return len(session.model_dump_json())
+
+
+def _split_state(state: dict) -> tuple[dict, dict, dict]:
+    """Splits a state (delta) into app, user and session-scoped parts."""
+    app_state, user_state, session_state = {}, {}, {}
+    for key, value in state.items():
+        if key.startswith(State.APP_PREFIX):
+            app_state[key[len(State.APP_PREFIX):]] = value
+        elif key.startswith(State.USER_PREFIX):
+            user_state[key[len(State.USER_PREFIX):]] = value
+        elif not key.startswith(State.TEMP_PREFIX):
+            session_state[key] = value
+    return app_state, user_state, session_state
+
+
+class _HotEntry:
+    def __init__(self, session: Session, size: int):
+        self.session = session
+        self.size = size
+        self.last_access = time.monotonic()
+
+
+class SqliteSessionService(BaseSessionService):
+    """A SQLite session service with zstd compression and a bounded hot LRU."""
+
+    def __init__(self, db_path: str = DB_PATH, max_hot_sessions: int = HOT_MAX_SESSIONS,
+                 max_hot_bytes: int = HOT_MAX_BYTES, max_idle_seconds: float = HOT_MAX_IDLE_SECONDS):
+        self.db_path = db_path
+        self.max_hot_sessions = max_hot_sessions
+        self.max_hot_bytes = max_hot_bytes
+        self.max_idle_seconds = max_idle_seconds
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(_SCHEMA)
+        # Reentrant so read-modify-write sequences can hold it across queries.
+        self._db_lock = threading.RLock()
+        # zstd (de)compressor objects are not thread-safe.
+        self._codec_lock = threading.Lock()
+        self._compressor = zstandard.ZstdCompressor(level=3)
+        self._decompressor = zstandard.ZstdDecompressor()
+        self._hot = OrderedDict()
+        self._hot_bytes = 0
+        self._stats = {"hot_hits": 0, "cold_loads": 0, "evictions": 0}
+
+    # --- Encoding ---
+
+    def _compress(self, data: bytes) -> bytes:
+        with self._codec_lock:
+            return self._compressor.compress(data)
+
+    def _decompress(self, blob: bytes) -> bytes:
+        with self._codec_lock:
+            return self._decompressor.decompress(blob)
+
+    def _pack(self, value: Any) -> bytes:
+        return self._compress(json.dumps(value).encode())
+
+    def _unpack(self, blob: bytes) -> Any:
+        return json.loads(self._decompress(blob))
+
+    # --- Hot LRU ---
+
+    def _hot_get(self, key) -> Optional[Session]:
+        entry = self._hot.get(key)
+        if entry is None:
+            return None
+        self._hot.move_to_end(key)
+        entry.last_access = time.monotonic()
+        self._stats["hot_hits"] += 1
+        return entry.session
+
+    def _hot_put(self, key, session: Session):
+        self._hot_drop(key)
+        entry = _HotEntry(session, session_footprint_bytes(session))
+        self._hot[key] = entry
+        self._hot_bytes += entry.size
+        self._evict()
+
+    def _hot_grow(self, key, session: Session, added_bytes: int):
+        entry = self._hot.get(key)
+        if entry is None or entry.session is not session:
+            # Not the cached session (e.g. a truncated copy): reload from disk on next access.
+            self._hot_drop(key)
+            return
+        entry.size += added_bytes
+        entry.last_access = time.monotonic()
+        self._hot_bytes += added_bytes
+        self._hot.move_to_end(key)
+        self._evict()
+
+    def _hot_drop(self, key):
+        entry = self._hot.pop(key, None)
+        if entry is not None:
+            self._hot_bytes -= entry.size
+
+    def _evict(self):
+        now = time.monotonic()
+        while self._hot:
+            key, oldest = next(iter(self._hot.items()))
+            over_limit = len(self._hot) > self.max_hot_sessions or self._hot_bytes > self.max_hot_bytes
+            if not over_limit and now - oldest.last_access <= self.max_idle_seconds:
+                break
+            self._hot_drop(key)
+            self._stats["evictions"] += 1
+
+    def stats(self) -> dict:
+        """Hot-cache statistics, including memory footprint per hot session."""
+        self._evict()
+        count = len(self._hot)
+        return {
+            **self._stats,
+            "hot_sessions": count,
+            "hot_bytes": self._hot_bytes,
+            "avg_bytes_per_hot_session": self._hot_bytes / count if count else 0,
+        }
+
+    # --- SQLite access (run in a worker thread) ---
+
+    def _query(self, sql: str, params: tuple = ()) -> list:
+        with self._db_lock:
+            return self._db.execute(sql, params).fetchall()
+
+    def _write(self, statements: list):
+        with self._db_lock, self._db:
+            for sql, params in statements:
+                self._db.execute(sql, params)
+
+    def _scoped_state(self, app_name: str, user_id: str) -> tuple[dict, dict]:
+        app_row = self._query("SELECT state FROM app_states WHERE app_name=?", (app_name,))
+        user_row = self._query(
+            "SELECT state FROM user_states WHERE app_name=? AND user_id=?", (app_name, user_id)
+        )
+        app_state = self._unpack(app_row[0][0]) if app_row else {}
+        user_state = self._unpack(user_row[0][0]) if user_row else {}
+        return app_state, user_state
+
+    @staticmethod
+    def _merge_state(session_state: dict, app_state: dict, user_state: dict) -> dict:
+        merged = dict(session_state)
+        merged.update({State.APP_PREFIX + k: v for k, v in app_state.items()})
+        merged.update({State.USER_PREFIX + k: v for k, v in user_state.items()})
+        return merged
+
+    def _load(self, app_name: str, user_id: str, session_id: str) -> Optional[Session]:
+        rows = self._query(
+            "SELECT state, update_time FROM sessions WHERE app_name=? AND user_id=? AND id=?",
+            (app_name, user_id, session_id),
+        )
+        if not rows:
+            return None
+        state_blob, update_time = rows[0]
+        event_rows = self._query(
+            "SELECT data FROM events WHERE app_name=? AND user_id=? AND session_id=? ORDER BY seq",
+            (app_name, user_id, session_id),
+        )
+        app_state, user_state = self._scoped_state(app_name, user_id)
+        self._stats["cold_loads"] += 1
+        return Session(
+            app_name=app_name,
+            user_id=user_id,
+            id=session_id,
+            state=self._merge_state(self._unpack(state_blob), app_state, user_state),
+            events=[Event.model_validate_json(self._decompress(r[0])) for r in event_rows],
+            last_update_time=update_time,
+        )
+
+    # --- BaseSessionService ---
+
+    async def create_session(self, *, app_name: str, user_id: str, state: Optional[dict] = None,
+                             session_id: Optional[str] = None) -> Session:
+        session_id = (session_id or "").strip() or str(uuid.uuid4())
+        app_delta, user_delta, session_state = _split_state(state or {})
+        now = time.time()
+
+        def create():
+            with self._db_lock:
+                if self._query("SELECT 1 FROM sessions WHERE app_name=? AND user_id=? AND id=?",
+                               (app_name, user_id, session_id)):
+                    raise ValueError(f"Session {session_id} already exists.")
+                app_state, user_state = self._scoped_state(app_name, user_id)
+                app_state.update(app_delta)
+                user_state.update(user_delta)
+                self._write([
+                    ("INSERT INTO sessions (app_name, user_id, id, state, update_time) "
+                     "VALUES (?, ?, ?, ?, ?)",
+                     (app_name, user_id, session_id, self._pack(session_state), now)),
+                    ("INSERT OR REPLACE INTO app_states (app_name, state) VALUES (?, ?)",
+                     (app_name, self._pack(app_state))),
+                    ("INSERT OR REPLACE INTO user_states (app_name, user_id, state) VALUES (?, ?, ?)",
+                     (app_name, user_id, self._pack(user_state))),
+                ])
+            return app_state, user_state
+
+        app_state, user_state = await asyncio.to_thread(create)
+        session = Session(
+            app_name=app_name,
+            user_id=user_id,
+            id=session_id,
+            state=self._merge_state(session_state, app_state, user_state),
+            last_update_time=now,
+        )
+        self._hot_put((app_name, user_id, session_id), session)
+        return session
+
+    async def get_session(self, *, app_name: str, user_id: str, session_id: str,
+                          config: Optional[GetSessionConfig] = None) -> Optional[Session]:
+        key = (app_name, user_id, session_id)
+        session = self._hot_get(key)
+        if session is None:
+            session = await asyncio.to_thread(self._load, app_name, user_id, session_id)
+            if session is None:
+                return None
+            self._hot_put(key, session)
+
+        if config is None or (not config.num_recent_events and not config.after_timestamp):
+            return session
+        events = session.events
+        if config.after_timestamp:
+            events = [e for e in events if e.timestamp >= config.after_timestamp]
+        if config.num_recent_events:
+            events = events[-config.num_recent_events:]
+        return session.model_copy(update={"events": events})
+
+    async def list_sessions(self, *, app_name: str, user_id: Optional[str] = None) -> ListSessionsResponse:
+        if user_id is None:
+            rows = await asyncio.to_thread(
+                self._query,
+                "SELECT user_id, id, update_time FROM sessions WHERE app_name=? ORDER BY update_time DESC",
+                (app_name,),
+            )
+        else:
+            rows = await asyncio.to_thread(
+                self._query,
+                "SELECT user_id, id, update_time FROM sessions WHERE app_name=? AND user_id=? "
+                "ORDER BY update_time DESC",
+                (app_name, user_id),
+            )
+        return ListSessionsResponse(sessions=[
+            Session(app_name=app_name, user_id=uid, id=sid, state={}, events=[], last_update_time=ts)
+            for uid, sid, ts in rows
+        ])
+
+    async def delete_session(self, *, app_name: str, user_id: str, session_id: str) -> None:
+        self._hot_drop((app_name, user_id, session_id))
+        await asyncio.to_thread(self._write, [
+            ("DELETE FROM events WHERE app_name=? AND user_id=? AND session_id=?",
+             (app_name, user_id, session_id)),
+            ("DELETE FROM sessions WHERE app_name=? AND user_id=? AND id=?",
+             (app_name, user_id, session_id)),
+        ])
+
+    async def append_event(self, session: Session, event: Event) -> Event:
+        if event.partial:
+            return event
+        event = await super().append_event(session=session, event=event)
+        session.last_update_time = event.timestamp
+        key = (session.app_name, session.user_id, session.id)
+        delta = event.actions.state_delta if event.actions else {}
+        app_delta, user_delta, session_delta = _split_state(delta or {})
+
+        event_json = event.model_dump_json().encode()
+
+        def persist():
+            # The caller's session may be a truncated copy (see get_session), so the
+            # sequence number and the stored state come from the database.
+            statements = [
+                ("INSERT INTO events (app_name, user_id, session_id, seq, timestamp, data) "
+                 "SELECT ?, ?, ?, COALESCE(MAX(seq) + 1, 0), ?, ? FROM events "
+                 "WHERE app_name=? AND user_id=? AND session_id=?",
+                 (*key, event.timestamp, self._compress(event_json), *key)),
+            ]
+            with self._db_lock:
+                if session_delta:
+                    rows = self._query(
+                        "SELECT state FROM sessions WHERE app_name=? AND user_id=? AND id=?", key
+                    )
+                    session_state = self._unpack(rows[0][0]) if rows else {}
+                    session_state.update(session_delta)
+                    statements.append(
+                        ("UPDATE sessions SET state=?, update_time=? WHERE app_name=? AND user_id=? AND id=?",
+                         (self._pack(session_state), event.timestamp, *key))
+                    )
+                else:
+                    statements.append(
+                        ("UPDATE sessions SET update_time=? WHERE app_name=? AND user_id=? AND id=?",
+                         (event.timestamp, *key))
+                    )
+                if app_delta or user_delta:
+                    app_state, user_state = self._scoped_state(session.app_name, session.user_id)
+                    app_state.update(app_delta)
+                    user_state.update(user_delta)
+                    statements += [
+                        ("INSERT OR REPLACE INTO app_states (app_name, state) VALUES (?, ?)",
+                         (session.app_name, self._pack(app_state))),
+                        ("INSERT OR REPLACE INTO user_states (app_name, user_id, state) VALUES (?, ?, ?)",
+                         (session.app_name, session.user_id, self._pack(user_state))),
+                    ]
+                self._write(statements)
+
+        await asyncio.to_thread(persist)
+        self._hot_grow(key, session, len(event_json))
+        return event
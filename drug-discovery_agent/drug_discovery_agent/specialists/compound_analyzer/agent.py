@@ -16,19 +16,31 @@
 
 from google.adk.agents import Agent
 from . import prompt
+from ... import model_policy
 # Import the new tool
-from .tools import predict_toxicity, identify_compound, get_smiles
+from .tools import (
+    admet_profile,
+    find_similar,
+    get_smiles,
+    identify_compound,
+    predict_toxicity,
+    screen_library,
+)
 
-MODEL = "gemini-2.5-pro"
+# Simple tool dispatch: starts on flash and escalates to pro (see model_policy).
+MODEL = model_policy.model_for("compound_analyzer")
 
 compound_analyzer = Agent(
     name="compound_analyzer",
     model=MODEL,
     instruction=prompt.COMPOUND_ANALYZER_PROMPT,
-    description="Identifies compounds from SMILES strings, finds SMILES from names, and predicts toxicity.",
+    description="Identifies compounds from SMILES strings, finds SMILES from names, predicts toxicity and ADMET profiles, screens compound libraries, and finds similar known compounds.",
     tools=[
         predict_toxicity.predict_clinical_toxicity,
+        admet_profile.predict_admet_profile,
         identify_compound.get_compound_info,
-        get_smiles.get_smiles_from_name  
+        get_smiles.get_smiles_from_name,
+        screen_library.screen_compound_library,
+        find_similar.find_similar_compounds,
     ],
 )
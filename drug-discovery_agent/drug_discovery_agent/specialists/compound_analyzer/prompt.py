@@ -30,4 +30,11 @@ Always resolve a compound to its SMILES string before doing any prediction. If y
 
 **3. Safety First**
 Always run `predict_clinical_toxicity` on any candidate. If a compound is predicted "Toxic," flag it with a **WARNING** immediately.
+When more than one property is needed (hERG, Ames, DILI, CYP3A4, BBB, solubility...), call `predict_admet_profile` once with all the compounds instead of separate calls; flag any toxicity, hERG, Ames or DILI liability with a **WARNING**.
+
+**4. Library Screens**
+When given a library file (CSV, SMILES or SDF) rather than a few compounds, use `screen_compound_library` once instead of calling the single-compound tools in a loop. Report the counts and the results location, and flag the screen as incomplete if it finished with errors.
+
+**5. Analogues**
+For questions about analogues or "compounds like X", call `find_similar_compounds` first. It returns the most similar compounds analysed so far with their cached predictions, so only run new predictions for compounds it does not cover.
 """
\ No newline at end of file
@@ -0,0 +1,135 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tool for predicting a multi-task ADMET profile with TxGemma in one round trip."""
+
+import asyncio
+import math
+import time
+
+from ....endpoint_guard import EndpointUnavailable
+from ....screening import descriptors
+from ....screening import properties as props
+from ....screening.chem import standardize_smiles
+from ....screening.prediction_cache import default_cache
+from ....screening.surrogate import default_surrogates
+
+MAX_PROFILE_COMPOUNDS = 50
+
+
+def _profile(smiles_list: list, properties: list) -> dict:
+    start = time.perf_counter()
+    cache = default_cache()
+    surrogates = default_surrogates()
+    compounds = []
+    for smiles in smiles_list:
+        standardized = standardize_smiles(smiles)
+        compound = {"input": smiles, "smiles": standardized, "profile": {}}
+        if standardized is None:
+            compound["error"] = "invalid SMILES"
+        compounds.append(compound)
+    valid = [c for c in compounds if c["smiles"]]
+
+    screened = descriptors.prefilter([c["smiles"] for c in valid])
+    requests, guesses = [], {}
+    for compound, result in zip(valid, screened):
+        compound["descriptors"] = result["descriptors"]
+        compound["failed_rules"] = result["flags"]
+        blocked = descriptors.blocked_tasks(result, [p.task for p in properties])
+        missing = []
+        for prop in properties:
+            if prop.task in blocked:
+                compound["profile"][prop.task] = {"prediction": "not predicted (rejected by the pre-filter)",
+                                                  "value": None, "source": "prefilter"}
+                continue
+            cached = cache.get(prop.task, compound["smiles"])
+            if cached is not None:
+                compound["profile"][prop.task] = {"prediction": prop.describe(cached), "value": cached,
+                                                  "source": "cache"}
+                continue
+            if surrogates:
+                guess, serve = surrogates.predict(prop.task, compound["smiles"])
+                if serve:
+                    compound["profile"][prop.task] = {"prediction": prop.describe(guess[0]), "value": guess[0],
+                                                      "source": "surrogate", "confidence": guess[1]}
+                    continue
+                guesses[(compound["smiles"], prop.task)] = guess
+            missing.append(prop)
+        if missing:
+            requests.append((compound["smiles"], missing))
+
+    instances = sum(len(missing) for _, missing in requests)
+    error = None
+    answers = {}
+    if requests:
+        try:
+            answers = props.predict_batch(requests)
+        except EndpointUnavailable as e:
+            error = e.as_dict()
+        except Exception as e:
+            error = f"TxGemma prediction failed: {e}"
+    for smiles, missing in requests:
+        for prop in missing:
+            value, raw = answers.get(smiles, {}).get(prop.task, (None, None))
+            entry = {"prediction": prop.describe(value), "value": value, "source": "endpoint"}
+            if error:
+                entry = {"prediction": "not predicted", "value": None, "error": error}
+            elif value is not None:
+                cache.put(prop.task, smiles, value, raw)
+                if surrogates:
+                    surrogates.compare(prop.task, guesses.get((smiles, prop.task)), value)
+            else:
+                entry["raw"] = raw
+            for compound in valid:
+                if compound["smiles"] == smiles:
+                    compound["profile"][prop.task] = entry
+
+    return {
+        "tasks": [p.task for p in properties],
+        "compounds": compounds,
+        "endpoint_requests": math.ceil(instances / props.TXGEMMA_MAX_INSTANCES) if instances and not error else 0,
+        "endpoint_instances": instances,
+        "elapsed_s": round(time.perf_counter() - start, 2),
+        **({"error": error} if error else {}),
+    }
+
+
+async def predict_admet_profile(smiles_list: list[str], tasks: str = "all") -> dict:
+    """
+    Predicts an ADMET profile (clinical toxicity, BBB penetration, hERG blockade, Ames
+    mutagenicity, DILI, CYP3A4 inhibition, aqueous solubility) for one or more compounds.
+    All questions for all compounds are sent to TxGemma together, so a full profile costs
+    about one prediction round trip. Prefer this over separate single-property tools.
+
+    Args:
+        smiles_list: SMILES strings of the compounds (at most 50; use screen_compound_library for more).
+        tasks: Comma-separated tasks (clintox, bbbp, herg, ames, dili, cyp3a4, solubility) or 'all'.
+
+    Returns:
+        A dict with, per compound, its descriptors, failed drug-likeness rules and a profile of
+        {task: {prediction, value, source}}, plus how many endpoint requests were made.
+    """
+    if isinstance(smiles_list, str):
+        smiles_list = [smiles_list]
+    if not smiles_list:
+        return {"error": "No SMILES given."}
+    if len(smiles_list) > MAX_PROFILE_COMPOUNDS:
+        return {"error": f"At most {MAX_PROFILE_COMPOUNDS} compounds per call; use screen_compound_library "
+                         f"with properties='{tasks}' for larger sets."}
+    try:
+        properties = props.resolve_properties(tasks or "all")
+    except ValueError as e:
+        return {"error": str(e)}
+    print(f"🧬 [Compound Analyzer] ADMET profile of {len(smiles_list)} compound(s) for {tasks or 'all'}...")
+    return await asyncio.to_thread(_profile, smiles_list, properties)
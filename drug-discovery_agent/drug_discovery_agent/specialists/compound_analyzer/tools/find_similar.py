@@ -0,0 +1,59 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tool for finding structurally similar, already-analysed compounds."""
+
+import asyncio
+
+from ....screening.chem import standardize_smiles
+from ....screening.prediction_cache import default_cache
+from ....screening.similarity import default_index
+
+
+def _search(smiles: str, top_k: int, min_similarity: float):
+    cache = default_cache()
+    index = default_index()
+    # Compounds predicted since the last search are indexed first.
+    index.sync(cache)
+    neighbours = index.search([smiles], k=top_k, min_similarity=min_similarity)[0]
+    return neighbours, cache.predictions_for([s for s, _ in neighbours]), len(index)
+
+
+async def find_similar_compounds(smiles_string: str, top_k: int = 10, min_similarity: float = 0.4) -> str:
+    """
+    Finds the known compounds most similar to a structure (Tanimoto similarity of Morgan
+    fingerprints) among every compound predicted so far, with their cached predictions.
+    Use this for questions about analogues before running new predictions.
+
+    Args:
+        smiles_string: The SMILES string of the query compound.
+        top_k: Maximum number of similar compounds to return (default: 10).
+        min_similarity: Minimum Tanimoto similarity, 0-1 (default: 0.4).
+
+    Returns:
+        The most similar known compounds, their similarity and cached predictions.
+    """
+    smiles = standardize_smiles(smiles_string)
+    if smiles is None:
+        return f"Error: '{smiles_string}' is not a valid SMILES string."
+    neighbours, predictions, indexed = await asyncio.to_thread(_search, smiles, top_k, min_similarity)
+    if not neighbours:
+        return f"No known compounds with Tanimoto similarity >= {min_similarity} to '{smiles}' ({indexed} indexed)."
+
+    lines = [f"Most similar of {indexed} known compounds to '{smiles}':"]
+    for neighbour, similarity in neighbours:
+        cached = predictions.get(neighbour, {})
+        details = ", ".join(f"{task}={value}" for task, value in sorted(cached.items())) or "no cached predictions"
+        lines.append(f"- {neighbour} (Tanimoto {similarity:.2f}): {details}")
+    return "\n".join(lines)
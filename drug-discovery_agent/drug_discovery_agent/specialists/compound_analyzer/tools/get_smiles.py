@@ -6,6 +6,29 @@
 
 import pubchempy as pcp
 
+from ....deadline import run_bounded
+from ....singleflight import normalize_text, single_flight
+
+
+@single_flight("pubchem.by_name", key=normalize_text)
+def _compounds_by_name(compound_name: str) -> list:
+    """PubChem's matches for a name; concurrent lookups of the same name share one request."""
+    # PubChemPy takes no timeout; the request is bounded by the caller's deadline instead.
+    return run_bounded(pcp.get_compounds, compound_name, 'name')
+
+
+def lookup_smiles(compound_name: str):
+    """Returns the isomeric SMILES of the best PubChem match for a name, or None.
+
+    Raises:
+        Exception: if the PubChem request fails.
+    """
+    compounds = _compounds_by_name(compound_name)
+    if not compounds:
+        return None
+    return compounds[0].isomeric_smiles or None
+
+
 def get_smiles_from_name(compound_name: str) -> str:
     """
     Looks up a compound's SMILES string by its name in the PubChem database.
@@ -18,15 +41,12 @@ def get_smiles_from_name(compound_name: str) -> str:
     """
     try:
         # Search PubChem by name
-        compounds = pcp.get_compounds(compound_name, 'name')
+        compounds = _compounds_by_name(compound_name)
         if not compounds:
             return f"No compound found in PubChem for name: '{compound_name}'"
 
-        # Take the first and most likely result
-        compound = compounds[0]
-        
-        # Return its isomeric SMILES string
-        smiles = compound.isomeric_smiles
+        # Take the first and most likely result, and return its isomeric SMILES string
+        smiles = compounds[0].isomeric_smiles
         if smiles:
             return f"The SMILES string for '{compound_name}' is {smiles}"
         else:
@@ -17,6 +17,44 @@
 
 import pubchempy as pcp
 
+from ....deadline import run_bounded
+from ....singleflight import single_flight
+
+
+@single_flight("pubchem.by_smiles", key=str.strip)
+def _compounds_by_smiles(smiles_string: str) -> list:
+    """PubChem's matches for a SMILES; concurrent lookups of the same SMILES share one request."""
+    # PubChemPy takes no timeout; the request is bounded by the caller's deadline instead.
+    return run_bounded(pcp.get_compounds, smiles_string.strip(), 'smiles')
+
+
+def lookup_compound(smiles_string: str):
+    """Returns the best PubChem match for a SMILES as a dict, or None.
+
+    The dict has `cid`, `common_name`, `iupac_name` and `formula` keys.
+
+    Raises:
+        Exception: if the PubChem request fails.
+    """
+    compounds = _compounds_by_smiles(smiles_string)
+    if not compounds or not compounds[0].cid:
+        return None
+
+    # Take the first and most likely result
+    compound = compounds[0]
+    iupac_name = compound.iupac_name or "N/A"
+    # Prioritize synonyms to find the common drug name.
+    # Added this after a test as PubMed use common name mostly
+    # The first synonym is often the most common name (e.g., 'Olaparib').
+    common_name = compound.synonyms[0] if compound.synonyms else iupac_name
+    return {
+        "cid": compound.cid,
+        "common_name": common_name,
+        "iupac_name": iupac_name,
+        "formula": compound.molecular_formula or "N/A",
+    }
+
+
 def get_compound_info(smiles_string: str) -> str:
     """
     Looks up a compound by its SMILES string in PubChem.
@@ -29,32 +67,15 @@ def get_compound_info(smiles_string: str) -> str:
     """
     try:
         # Search PubChem by SMILES string
-        compounds = pcp.get_compounds(smiles_string, 'smiles')
-        if not compounds:
+        info = lookup_compound(smiles_string)
+        if not info:
             return f"No compound found in PubChem for SMILES: {smiles_string}"
 
-        # Take the first and most likely result
-        compound = compounds[0]
-
-        # Prioritize synonyms to find the common drug name. 
-        # Added this after a test as PubMed use common name mostly
-        common_name = "N/A"
-        if compound.synonyms:
-            # The first synonym is often the most common name (e.g., 'Olaparib').
-            common_name = compound.synonyms[0]
-
-        iupac_name = compound.iupac_name or "N/A"
-        formula = compound.molecular_formula or "N/A"
-
-        # If the best we found was the IUPAC name, reflect that.
-        if common_name == "N/A":
-            common_name = iupac_name
-
         return (
             f"Successfully identified compound from SMILES '{smiles_string}':\n"
-            f"- Common Name: {common_name}\n"
-            f"- IUPAC Name: {iupac_name}\n"
-            f"- Molecular Formula: {formula}"
+            f"- Common Name: {info['common_name']}\n"
+            f"- IUPAC Name: {info['iupac_name']}\n"
+            f"- Molecular Formula: {info['formula']}"
         )
 
     except Exception as e:
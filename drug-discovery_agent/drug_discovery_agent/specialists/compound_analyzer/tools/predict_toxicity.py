@@ -18,37 +18,40 @@ import os
 import vertexai
 from google.cloud import aiplatform
 
+from ....endpoint_guard import EndpointUnavailable, endpoint_pool
+from ....screening import descriptors
+from ....screening.answers import parse_choice
+from ....screening.chem import standardize_smiles
+from ....screening.prediction_cache import default_cache
+from ....screening.surrogate import default_surrogates
+
 # Initialize Vertex AI SDK
 vertexai.init(
     project=os.environ.get("GOOGLE_CLOUD_PROJECT"),
     location=os.environ.get("GOOGLE_CLOUD_LOCATION"),
 )
 
-def predict_clinical_toxicity(smiles_string: str) -> str:
-    """
-    Predicts if a drug is toxic in human clinical trials via a Vertex AI endpoint.
-
-    Args:
-        smiles_string: The SMILES string representation of the drug.
-
-    Returns:
-        A string containing the toxicity prediction.
-    """
-    # This environment variable must be set to your deployed TxGemma endpoint ID.
-    endpoint_id = os.environ.get("TXGEMMA_PREDICT_ENDPOINT_ID")
-    if not endpoint_id:
-        return "Error: TXGEMMA_PREDICT_ENDPOINT_ID environment variable is not set."
-
-    endpoint = aiplatform.Endpoint(
+def txgemma_endpoint():
+    """The deployed TxGemma prediction endpoints as a balanced pool behind concurrency
+    limiters and circuit breakers, or None if they are not configured."""
+    # This environment variable must be set to your deployed TxGemma endpoint ID, or to
+    # comma-separated `[location/]endpoint_id` replicas.
+    endpoint_ids = os.environ.get("TXGEMMA_PREDICT_ENDPOINT_ID")
+    if not endpoint_ids:
+        return None
+    return endpoint_pool("txgemma-predict", endpoint_ids, lambda location, endpoint_id: aiplatform.Endpoint(
         endpoint_name=(
             f"projects/{os.environ['GOOGLE_CLOUD_PROJECT']}"
-            f"/locations/{os.environ['GOOGLE_CLOUD_LOCATION']}"
+            f"/locations/{location or os.environ['GOOGLE_CLOUD_LOCATION']}"
             f"/endpoints/{endpoint_id}"
         )
-    )
+    ))
+
 
+def clintox_prompt(smiles_string: str) -> str:
+    """The ClinTox prompt for TxGemma."""
     # This prompt format is specific to the ClinTox task for TxGemma.
-    prompt = (
+    return (
         "Instructions: Answer the following question about drug properties.\n"
         "Context: The assessment of clinical toxicity is a critical component of drug development. "
         "A compound's potential to cause adverse effects in humans can determine its viability as a therapeutic agent.\n"
@@ -57,16 +60,76 @@ def predict_clinical_toxicity(smiles_string: str) -> str:
         f"Drug SMILES: {smiles_string}"
     )
 
+
+def parse_clintox(prediction: str):
+    """True if the answer is (B) toxic, False if (A), None if it cannot be parsed."""
+    return parse_choice(prediction)
+
+
+def predict_clinical_toxicity(smiles_string: str) -> str:
+    """
+    Predicts if a drug is toxic in human clinical trials via a Vertex AI endpoint.
+    The compound's descriptors (MW, cLogP, TPSA, HBD/HBA, rotatable bonds, PAINS alerts,
+    CNS MPO) are computed locally first and returned with the prediction. Rejecting is opt-in:
+    by default every drug-likeness rule only flags, and only compounds failing a rule set to
+    'reject' in PREFILTER_RULES are kept from the endpoint. A confident CPU surrogate model
+    trained on earlier TxGemma answers is used instead of the endpoint.
+
+    Args:
+        smiles_string: The SMILES string representation of the drug.
+
+    Returns:
+        A string containing the toxicity prediction and the compound's descriptors, or a
+        structured error if the endpoint is overloaded, failing or timed out.
+    """
+    result = descriptors.prefilter([smiles_string])[0]
+    if result["descriptors"] is None:
+        return f"Error: '{smiles_string}' is not a valid SMILES string."
+    summary = descriptors.describe(result)
+    if descriptors.blocked_tasks(result, ["clintox"]):
+        descriptors.record_saved_call("predict_clinical_toxicity")
+        rules = ", ".join(rule.name for rule in result["rejected_by"])
+        return (
+            f"Toxicity was not predicted for '{smiles_string}': it fails the {rules} pre-filter, "
+            f"so no endpoint call was made.\n{summary}"
+        )
+
+    smiles = standardize_smiles(smiles_string)
+    surrogates = default_surrogates()
+    guess = None
+    if surrogates:
+        guess, serve = surrogates.predict("clintox", smiles)
+        if serve:
+            toxic, confidence = guess
+            verdict = "BE toxic" if toxic else "NOT be toxic"
+            return (
+                f"The compound '{smiles_string}' is predicted to {verdict} "
+                f"(surrogate model, confidence {confidence:.2f}).\n{summary}"
+            )
+
+    endpoint = txgemma_endpoint()
+    if endpoint is None:
+        return "Error: TXGEMMA_PREDICT_ENDPOINT_ID environment variable is not set."
+
     # The instance format for Vertex AI predictions is a list of dictionaries.
-    instances = [{"prompt": prompt}]
-    response = endpoint.predict(instances=instances)
-    
+    instances = [{"prompt": clintox_prompt(smiles_string)}]
+    try:
+        response = endpoint.predict(instances=instances)
+    except EndpointUnavailable as e:
+        return f"{e.message()}\n{summary}"
+
     prediction = response.predictions[0]
 
     # Process the raw prediction into a more descriptive result.
-    if "A" in prediction:
-        return f"The compound '{smiles_string}' is predicted to NOT be toxic."
-    elif "B" in prediction:
-        return f"The compound '{smiles_string}' is predicted to BE toxic."
+    toxic = parse_clintox(prediction)
+    if toxic is not None:
+        # Endpoint answers are the surrogate models' training data.
+        default_cache().put("clintox", smiles, toxic, str(prediction))
+        if surrogates:
+            surrogates.compare("clintox", guess, toxic)
+    if toxic is False:
+        return f"The compound '{smiles_string}' is predicted to NOT be toxic.\n{summary}"
+    elif toxic:
+        return f"The compound '{smiles_string}' is predicted to BE toxic.\n{summary}"
     else:
-        return f"Could not determine toxicity. Raw model output: {prediction}"
+        return f"Could not determine toxicity. Raw model output: {prediction}\n{summary}"
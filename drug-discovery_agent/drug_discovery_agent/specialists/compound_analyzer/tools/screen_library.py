@@ -0,0 +1,81 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tool for screening a whole compound library through the virtual screening pipeline."""
+
+import json
+import os
+
+from ....screening.batch import run_batch_screen
+from ....screening.pipeline import run_screen
+from ....singleflight import single_flight
+
+DETAIL_KEYS = ("cache_hits", "endpoint_calls", "predictions_skipped", "surrogate_predictions",
+               "endpoint_calls_avoided", "batch", "stages")
+
+
+def _screen_key(input_path: str, output_dir: str, properties: str, prefilter: str, batch: bool) -> tuple:
+    return os.path.abspath(input_path), os.path.abspath(output_dir), properties, prefilter, batch
+
+
+@single_flight("screen", key=_screen_key)
+async def _screen(input_path: str, output_dir: str, properties: str, prefilter: str, batch: bool) -> dict:
+    """Runs a screen; identical screens requested while it runs wait for the same run."""
+    screen = run_batch_screen if batch else run_screen
+    return await screen(input_path, output_dir, properties=properties, prefilter=prefilter or None)
+
+
+async def screen_compound_library(input_path: str, output_dir: str = "", properties: str = "clintox,bbbp",
+                                  prefilter: str = "", batch: bool = False) -> str:
+    """
+    Screens a compound library file (thousands of compounds) for TxGemma properties.
+    Use this instead of calling the single-compound tools in a loop.
+
+    Args:
+        input_path: Path to a CSV/TSV (with a 'smiles' and/or 'name' column), .smi or SDF file.
+        output_dir: Where results are written (default: '<input name>_screen' next to the input).
+            Re-running with the same directory resumes an interrupted screen.
+        properties: Comma-separated properties to predict (e.g. 'clintox,bbbp').
+        prefilter: Drug-likeness rules applied before the endpoint, as 'rule=reject|flag' pairs
+            (rules: lipinski, veber, pains, cns_mpo; default from SCREEN_PREFILTER_RULES; 'none' disables).
+        batch: Predict with one offline batch prediction job instead of online endpoint calls.
+            Cheaper for very large libraries (100k+ compounds), but takes much longer to finish.
+
+    Returns:
+        A summary of the screen: counts per status, endpoint calls saved by the pre-filter,
+        throughput and where the Parquet results (with descriptors) are.
+    """
+    if not os.path.exists(input_path):
+        return f"Error: library file '{input_path}' not found."
+    output_dir = output_dir or os.path.splitext(input_path)[0] + "_screen"
+    print(f"🧪 [Compound Analyzer] Screening {input_path} -> {output_dir} ({properties})...")
+    try:
+        summary = await _screen(input_path, output_dir, properties, prefilter, batch)
+    except Exception as e:
+        return f"Error: screen of '{input_path}' failed: {e}"
+
+    counts = summary["counts"]
+    status = "completed" if summary["complete"] else (
+        f"finished with {counts['error']} errors and {counts['deferred']} compounds awaiting a batch job "
+        f"(re-run to retry or finish them)"
+    )
+    return (
+        f"Screen {status}: {counts['read']} compounds read, {counts['ok']} predicted, "
+        f"{counts['unresolved']} unresolved, {counts['invalid']} invalid SMILES, "
+        f"{counts['filtered']} rejected by the pre-filter, saving {summary['endpoint_calls_saved']} endpoint calls "
+        f"({summary['throughput_per_min']} compounds/min).\n"
+        f"Results: {output_dir}/part-*.parquet, with descriptors and failed rules in the 'flags' column "
+        f"(errors in {output_dir}/errors.jsonl).\n"
+        f"Details: {json.dumps({k: summary[k] for k in DETAIL_KEYS if k in summary})}"
+    )
@@ -5,15 +5,23 @@ import os
 import traceback
 from google.adk.agents import LlmAgent
 from google.adk.tools import FunctionTool
-from google.adk.tools.api_registry import ApiRegistry
+from google.adk.tools.tool_context import ToolContext
 from google.adk.code_executors import UnsafeLocalCodeExecutor
-from serpapi import GoogleSearch
+
+from ... import model_policy
+from ...http_transport import get
+from .tools import hpc_tools
+from .tools.mcp_client import MCP_BATCH_MAX_SIZE, McpClientCache
 
 # --- Configuration ---
 project_id = os.getenv("GOOGLE_CLOUD_PROJECT")
 mcp_compute_name = os.getenv("MCP_SERVER_NAME")
 mcp_gke_name = os.getenv("MCP_SERVER_GKE")
 serpapi_key = os.getenv("SERPAPI_API_KEY")
+SERPAPI_URL = "https://serpapi.com/search.json"
+
+# One registry per project and one indexed toolset per service, reused across calls.
+mcp_clients = McpClientCache(project_id, {"compute": mcp_compute_name, "gke": mcp_gke_name})
 
 print(f"🔗 [Infrastructure] Configuring Explicit MCP Wrappers...")
 
@@ -35,14 +43,15 @@ def search_web(query: str) -> str:
     """Performs a Google Search using SerpApi."""
     try:
         if not serpapi_key: return "❌ Error: SERPAPI_API_KEY not set."
-        search = GoogleSearch({"q": query, "api_key": serpapi_key})
-        results = search.get_dict()
+        response = get(SERPAPI_URL, params={"engine": "google", "q": query, "api_key": serpapi_key})
+        response.raise_for_status()
+        results = response.json()
         snippets = [f"- {r.get('title')}: {r.get('snippet')}" for r in results.get("organic_results", [])[:3]]
         return "\n".join(snippets) if snippets else "No results found."
     except Exception: return f"❌ Search Error:\n{traceback.format_exc()}"
 
 # --- The "Universal" Executor ---
-def execute_mcp_tool(service: str, tool_name: str, arguments: dict) -> str:
+async def execute_mcp_tool(service: str, tool_name: str, arguments: dict, tool_context: ToolContext) -> dict:
     """
     Executes a specific MCP tool by name.
     Args:
@@ -51,18 +60,26 @@ def execute_mcp_tool(service: str, tool_name: str, arguments: dict) -> str:
         arguments: Dictionary of arguments for the tool.
     """
     try:
-        # Lazy Connection: Connects only when the tool is CALLED
-        registry = ApiRegistry(project_id)
-        server_name = mcp_compute_name if service == "compute" else mcp_gke_name
-        toolset = registry.get_toolset(mcp_server_name=server_name)
-        
-        # Find the tool by the explicit name provided
-        target = next((t for t in toolset if t.name == tool_name), None)
-        if not target: 
-            return f"❌ Tool '{tool_name}' not found in {service} API. Available: {[t.name for t in toolset]}"
-            
-        return target.run(arguments)
-    except Exception as e: return handle_error(e)
+        return await mcp_clients.run(service, tool_name, arguments, tool_context)
+    except KeyError as e: return {"error": f"❌ {e.args[0]}"}
+    except Exception as e: return {"error": handle_error(e)}
+
+async def execute_mcp_tools_batch(invocations: list[dict], tool_context: ToolContext) -> dict:
+    """
+    Executes several MCP tools concurrently, e.g. listing VMs in every zone at once.
+    Args:
+        invocations: List of {"service": "compute" | "gke", "tool_name": "...", "arguments": {...}}.
+    Returns:
+        {"results": [...]} in the same order as `invocations`; each item has either
+        "result" or "error".
+    """
+    if len(invocations) > MCP_BATCH_MAX_SIZE:
+        return {"error": f"❌ At most {MCP_BATCH_MAX_SIZE} invocations per batch; split the request."}
+    results = await mcp_clients.run_batch(invocations, tool_context)
+    for item in results:
+        if "403" in item.get("error", "") or "PermissionDenied" in item.get("error", ""):
+            item["error"] = handle_error(Exception(item["error"]))
+    return {"results": results}
 
 # --- The Explicit Prompt (The "Cheat Sheet") ---
 # Sourced from Official Docs: 
@@ -76,7 +93,12 @@ You have access to Google Cloud infrastructure via the following **Explicit Tool
 **PROTOCOL:**
 1. **Select Tool:** Pick the exact `tool_name` from the lists below that matches your goal.
 2. **Execute:** Call `execute_mcp_tool(service, tool_name, arguments)`.
+   When you need several independent calls (e.g. the same list in several zones, or VMs and
+   node pools together), make ONE `execute_mcp_tools_batch(invocations)` call instead, with
+   `invocations` a list of `{"service": ..., "tool_name": ..., "arguments": {...}}`.
 3. **Handle Errors:** If you get a "Permission Denied" error, show the user the fix.
+4. **Freshness:** Read-only results include `cached` and `cache_age_seconds`. Cached inventory is at
+   most a minute old and is dropped automatically after you create or change resources.
 
 ---
 **AVAILABLE TOOLS (GKE)**
@@ -92,20 +114,35 @@ You have access to Google Cloud infrastructure via the following **Explicit Tool
 * `compute.instances.insert`: Create a VM. Args: `{"project": "...", "zone": "...", "instanceResource": {"name": "...", "machineType": "..."}}`
 * `compute.disks.list`: List persistent disks.
 * `compute.firewalls.list`: List firewall rules.
+
+**HPC JOBS (direct tools, Slurm-compatible scheduler)**
+* `deploy_hpc_cluster(cluster_name, node_count, machine_type)`: Make a cluster available for jobs.
+* `submit_slurm_job(cluster_name, job_script, array, cpus_per_task, time_limit_minutes)`: Run a
+  docking or descriptor batch. Use `array` (e.g. "0-99%8") for one task per input shard; tasks read
+  `$SLURM_ARRAY_TASK_ID` and write outputs to `$RESULT_DIR`.
+* `check_job_status(job_id)`, `cancel_job(job_id)`, `list_hpc_jobs(cluster_name)`.
 ---
 """
 
 try:
     infrastructure_specialist = LlmAgent(
         name="infrastructure_specialist",
-        model="gemini-2.5-pro",
+        model=model_policy.model_for("infrastructure_specialist"),
         description="Manages Infrastructure using Explicit Tool Definitions.",
         instruction=INFRA_PROMPT,
         tools=[
-            FunctionTool(execute_mcp_tool), 
-            FunctionTool(search_web)
+            FunctionTool(execute_mcp_tool),
+            FunctionTool(execute_mcp_tools_batch),
+            FunctionTool(search_web),
+            FunctionTool(hpc_tools.deploy_hpc_cluster),
+            FunctionTool(hpc_tools.submit_slurm_job),
+            FunctionTool(hpc_tools.check_job_status),
+            FunctionTool(hpc_tools.cancel_job),
+            FunctionTool(hpc_tools.list_hpc_jobs),
         ],
-        code_executor=UnsafeLocalCodeExecutor(work_dir="/tmp")
+        code_executor=UnsafeLocalCodeExecutor(work_dir="/tmp"),
+        # Loads the MCP tool indexes while the first LLM call is in flight.
+        before_agent_callback=mcp_clients.warm_up_callback(),
     )
 except Exception as e:
     print(f"Start-up Error: {e}")
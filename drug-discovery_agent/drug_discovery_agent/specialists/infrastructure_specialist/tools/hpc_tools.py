@@ -4,8 +4,27 @@
 """
 HPC Infrastructure Tools.
 These are 'Custom Tools' as per the Micro-agent Architecture best practices.
+Jobs run on the scheduler backend selected by HPC_SCHEDULER_BACKEND (see scheduler.py):
+a local Slurm-compatible scheduler on the agent host by default, or a real Slurm cluster.
 """
 
+import json
+
+from .scheduler import get_backend
+
+# Characters of stdout/stderr returned per task in a status report.
+OUTPUT_TAIL_CHARS = 1500
+MAX_TASKS_REPORTED = 20
+
+
+def _tail(path: str) -> str:
+    try:
+        with open(path, errors="replace") as f:
+            return f.read()[-OUTPUT_TAIL_CHARS:]
+    except OSError:
+        return ""
+
+
 def deploy_hpc_cluster(cluster_name: str, node_count: int = 4, machine_type: str = "c2-standard-60") -> str:
     """
     Deploys a High Performance Computing (HPC) cluster on Google Cloud.
@@ -17,30 +36,103 @@ def deploy_hpc_cluster(cluster_name: str, node_count: int = 4, machine_type: str
         machine_type: The GCE machine type (default: c2-standard-60 for compute-optimized).
 
     Returns:
-        Status message with the connection command.
+        Status message with the cluster's scheduler details.
     """
-    # In production, this would use google-cloud-compute or Terraform.
     print(f"👷 [Infrastructure] Deploying HPC Cluster '{cluster_name}' with {node_count} x {machine_type} nodes...")
-    
+    try:
+        info = get_backend().create_cluster(cluster_name, node_count, machine_type)
+    except Exception as e:
+        return f"❌ Could not deploy cluster '{cluster_name}': {e}"
+
     return (
-        f"✅ SUCCESS: HPC Cluster '{cluster_name}' deployed.\n"
-        f"   - Nodes: {node_count}\n"
-        f"   - Type: {machine_type}\n"
-        f"   - Status: READY\n"
-        f"   - Connection: gcloud compute ssh {cluster_name}-master"
+        f"✅ SUCCESS: HPC Cluster '{cluster_name}' is READY.\n"
+        f"   - Scheduler backend: {info['backend']}\n"
+        f"   - Details: {json.dumps({k: v for k, v in info.items() if k not in ('cluster', 'backend')})}\n"
+        f"   - Submit jobs with `submit_slurm_job` (supports #SBATCH --array/--cpus-per-task/--time)."
     )
 
-def submit_slurm_job(cluster_name: str, job_script: str) -> str:
+
+def submit_slurm_job(cluster_name: str, job_script: str, array: str = "", cpus_per_task: int = 0,
+                     time_limit_minutes: int = 0) -> str:
     """
     Submits a batch job to an existing HPC cluster.
 
     Args:
         cluster_name: The target cluster.
-        job_script: The bash script or command to run (e.g., 'sbatch run_docking.sh').
+        job_script: The bash script, the name of one in the jobs directory (HPC_JOBS_DIR), or a
+            command to run (e.g., 'sbatch run_docking.sh').
+            `#SBATCH` directives in the script are honoured.
+        array: Optional Slurm array spec, e.g. '0-99%8' (one task per index; the task reads $SLURM_ARRAY_TASK_ID).
+        cpus_per_task: CPUs reserved per task (0 = from the script, default 1).
+        time_limit_minutes: Wall-clock limit per task (0 = from the script, default 60).
+
+    Returns:
+        The job ID and where its output and results are written.
     """
     print(f"🚀 [Infrastructure] Submitting job to {cluster_name}...")
-    return f"Job submitted to {cluster_name}. Job ID: 4921. Status: PENDING."
+    try:
+        job_id = get_backend().submit(
+            cluster_name, job_script, array=array or None,
+            cpus_per_task=cpus_per_task or None, time_limit_minutes=time_limit_minutes or None,
+        )
+        status = get_backend().status(job_id)
+    except Exception as e:
+        return f"❌ Job submission to {cluster_name} failed: {e}"
+
+    tasks = sum(status.get("tasks", {}).values())
+    result_dir = status.get("result_dir")
+    return (
+        f"Job submitted to {cluster_name}. Job ID: {job_id}. Status: {status['state']}. Tasks: {tasks}."
+        + (f"\nResults directory: {result_dir} (exported to the job as $RESULT_DIR)" if result_dir else "")
+    )
+
 
 def check_job_status(job_id: str) -> str:
-    """Checks the status of a deployed HPC job."""
-    return f"Job {job_id}: COMPLETED. Results available in gs://rsabawi-data/results/{job_id}/"
\ No newline at end of file
+    """Checks the status of a deployed HPC job, including per-task exit codes and output."""
+    try:
+        status = get_backend().status(job_id)
+    except Exception as e:
+        return f"❌ Could not get status of job {job_id}: {e}"
+
+    lines = [
+        f"Job {status['job_id']} ({status['name']}) on {status['cluster']}: {status['state']}",
+        f"Tasks: {json.dumps(status['tasks'])}",
+    ]
+    if status.get("result_dir"):
+        lines.append(f"Results available in {status['result_dir']}")
+    details = status.get("task_details", [])
+    # Failed tasks first: they are what the user needs to see.
+    details = sorted(details, key=lambda t: t["state"] == "COMPLETED")
+    for task in details[:MAX_TASKS_REPORTED]:
+        lines.append(f"- {task['task_id']}: {task['state']} (exit code {task.get('exit_code')})")
+        if task["state"] not in ("PENDING", "COMPLETED") and task.get("stderr"):
+            stderr = _tail(task["stderr"]).strip()
+            if stderr:
+                lines.append(f"  stderr: {stderr}")
+    if len(details) > MAX_TASKS_REPORTED:
+        lines.append(f"... and {len(details) - MAX_TASKS_REPORTED} more tasks.")
+    if len(details) == 1 and details[0].get("stdout"):
+        stdout = _tail(details[0]["stdout"]).strip()
+        if stdout:
+            lines.append(f"stdout:\n{stdout}")
+    return "\n".join(lines)
+
+
+def cancel_job(job_id: str) -> str:
+    """Cancels a pending or running HPC job (all of its array tasks)."""
+    try:
+        status = get_backend().cancel(job_id)
+    except Exception as e:
+        return f"❌ Could not cancel job {job_id}: {e}"
+    return f"Job {job_id}: {status['state']}. Tasks: {json.dumps(status['tasks'])}"
+
+
+def list_hpc_jobs(cluster_name: str = "") -> str:
+    """Lists the jobs known to the scheduler, newest first, optionally for one cluster."""
+    try:
+        jobs = get_backend().list_jobs(cluster_name or None)
+    except Exception as e:
+        return f"❌ Could not list jobs: {e}"
+    if not jobs:
+        return "No jobs found."
+    return "\n".join(f"- {j['job_id']} ({j['name']}) on {j['cluster']}: {j['state']}" for j in jobs[:50])
@@ -0,0 +1,236 @@
+# Copyright 2025 Google LLC
+# Licensed under the Apache License, Version 2.0.
+
+"""
+Connection-managed MCP client cache for the Cloud API Registry.
+
+Building an `ApiRegistry` lists the project's MCP servers, and listing a
+toolset's tools is another round trip, so doing both per tool call is
+expensive. `McpClientCache` keeps:
+* one `ApiRegistry` per project (shared process-wide),
+* one `McpToolset` per service, whose MCP session is reused across calls,
+* the toolset's tools indexed by name, refreshed after `MCP_SCHEMA_TTL_SECONDS`.
+
+After `warm_up()`, a tool call is a single MCP invocation. `run_batch` runs
+several invocations concurrently. Read-only calls are served from a short-TTL
+`ReadCache` (see read_cache.py). `aclose()` closes the cached MCP sessions at
+shutdown.
+"""
+
+import asyncio
+import os
+import threading
+import time
+
+from google.adk.tools.api_registry import ApiRegistry
+
+from ....deadline import DeadlineExceeded, call_timeout
+from .read_cache import ReadCache, is_read_only
+
+# How long a toolset's tool list (names and schemas) is trusted.
+MCP_SCHEMA_TTL_SECONDS = int(os.getenv("MCP_SCHEMA_TTL_SECONDS", "900"))
+# Concurrent invocations per batch, and the timeout of each one (capped by the caller's deadline).
+MCP_BATCH_MAX_CONCURRENCY = int(os.getenv("MCP_BATCH_MAX_CONCURRENCY", "8"))
+MCP_CALL_TIMEOUT_SECONDS = float(os.getenv("MCP_CALL_TIMEOUT_SECONDS", "60"))
+MCP_BATCH_MAX_SIZE = 50
+
+_registries = {}  # project_id -> ApiRegistry
+_registries_lock = threading.Lock()
+
+
+def get_registry(project_id: str) -> ApiRegistry:
+    """Returns the process-wide `ApiRegistry` of a project, creating it once."""
+    with _registries_lock:
+        if project_id not in _registries:
+            _registries[project_id] = ApiRegistry(project_id)
+        return _registries[project_id]
+
+
+def _with_cache_info(result, cached: bool, age: float) -> dict:
+    info = {"cached": cached, "cache_age_seconds": round(age, 1)}
+    if isinstance(result, dict):
+        return {**result, **info}
+    return {"result": result, **info}
+
+
+class _ServiceEntry:
+    def __init__(self, toolset, loop):
+        self.toolset = toolset
+        # MCP sessions belong to the event loop that opened them.
+        self.loop = loop
+        self.tools = {}  # tool name -> McpTool
+        self.loaded_at = 0.0
+        self.lock = asyncio.Lock()
+
+
+class McpClientCache:
+    """Caches MCP toolsets and their tool index per service."""
+
+    def __init__(self, project_id: str, servers: dict, ttl_seconds: int = MCP_SCHEMA_TTL_SECONDS,
+                 toolset_factory=None, read_cache: ReadCache = None):
+        """
+        Args:
+            project_id: Project hosting the API Registry.
+            servers: Service name (e.g. 'compute', 'gke') -> MCP server resource name.
+            ttl_seconds: How long a tool index is used before it is re-listed.
+            toolset_factory: Optional `(service, server_name) -> toolset`, e.g. to
+                use a local MCP server instead of the API Registry.
+            read_cache: Cache for read-only calls; a default `ReadCache` if None.
+        """
+        self.project_id = project_id
+        self.servers = servers
+        self.ttl_seconds = ttl_seconds
+        self.toolset_factory = toolset_factory or self._registry_toolset
+        self.read_cache = read_cache or ReadCache()
+        self._entries = {}  # service -> _ServiceEntry
+        self.stats = {"calls": 0, "schema_loads": 0}
+
+    def _entry(self, service: str) -> _ServiceEntry:
+        if service not in self.servers:
+            raise KeyError(f"Unknown service '{service}'. Expected one of {sorted(self.servers)}.")
+        loop = asyncio.get_running_loop()
+        entry = self._entries.get(service)
+        if entry is None or entry.loop is not loop:
+            toolset = self.toolset_factory(service, self.servers[service])
+            entry = self._entries[service] = _ServiceEntry(toolset, loop)
+        return entry
+
+    def _registry_toolset(self, service: str, server_name: str):
+        return get_registry(self.project_id).get_toolset(mcp_server_name=server_name)
+
+    async def _tools(self, service: str) -> dict:
+        entry = self._entry(service)
+        if time.monotonic() - entry.loaded_at < self.ttl_seconds:
+            return entry.tools
+        async with entry.lock:
+            # Another caller may have refreshed the index while we waited.
+            if time.monotonic() - entry.loaded_at >= self.ttl_seconds:
+                entry.tools = {tool.name: tool for tool in await entry.toolset.get_tools()}
+                entry.loaded_at = time.monotonic()
+                self.stats["schema_loads"] += 1
+        return entry.tools
+
+    async def tool_names(self, service: str) -> list:
+        """Names of the tools a service exposes."""
+        return sorted(await self._tools(service))
+
+    async def run(self, service: str, tool_name: str, arguments: dict, tool_context=None):
+        """Invokes an MCP tool, serving read-only calls from the read cache.
+
+        Read-only results carry `cached` and `cache_age_seconds` so the agent
+        knows how fresh the data is.
+
+        Raises:
+            KeyError: if the service or tool does not exist.
+        """
+        tools = await self._tools(service)
+        tool = tools.get(tool_name)
+        if tool is None:
+            raise KeyError(f"Tool '{tool_name}' not found in {service} API. Available: {sorted(tools)}")
+
+        read_only = self.read_cache.enabled and is_read_only(tool_name)
+        if read_only:
+            key = self.read_cache.key(service, tool_name, arguments)
+            hit = self.read_cache.get(key)
+            if hit is not None:
+                return _with_cache_info(hit[0], cached=True, age=hit[1])
+
+        self.stats["calls"] += 1
+        try:
+            result = await tool.run_async(args=arguments or {}, tool_context=tool_context)
+        finally:
+            if not read_only:
+                # Also on failure: a failed mutation may have been partially applied.
+                self.read_cache.invalidate(service, tool_name)
+
+        if not read_only:
+            return result
+        if not (isinstance(result, dict) and result.get("isError")):
+            self.read_cache.put(key, result)
+        return _with_cache_info(result, cached=False, age=0.0)
+
+    async def run_batch(self, invocations: list, tool_context=None,
+                        max_concurrency: int = MCP_BATCH_MAX_CONCURRENCY,
+                        timeout_seconds: float = MCP_CALL_TIMEOUT_SECONDS) -> list:
+        """Runs several invocations concurrently.
+
+        Args:
+            invocations: Dicts with `service`, `tool_name` and optional `arguments`.
+            tool_context: Passed to every tool call.
+            max_concurrency: Maximum number of calls in flight.
+            timeout_seconds: Timeout of each call.
+
+        Returns:
+            One dict per invocation, in input order, with either `result` or `error`.
+        """
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def run_one(index, invocation):
+            item = {"index": index, "service": invocation.get("service"),
+                    "tool_name": invocation.get("tool_name")}
+            async with semaphore:
+                started = time.monotonic()
+                try:
+                    timeout = call_timeout(timeout_seconds)
+                    item["result"] = await asyncio.wait_for(
+                        self.run(item["service"], item["tool_name"],
+                                 invocation.get("arguments") or {}, tool_context),
+                        timeout=timeout,
+                    )
+                except DeadlineExceeded as e:
+                    item["error"] = f"{e}."
+                except asyncio.TimeoutError:
+                    item["error"] = f"Timed out after {timeout:g}s."
+                except KeyError as e:
+                    item["error"] = e.args[0]
+                except Exception as e:
+                    item["error"] = f"{type(e).__name__}: {e}"
+                item["elapsed_s"] = round(time.monotonic() - started, 3)
+            return item
+
+        return list(await asyncio.gather(*(run_one(i, inv) for i, inv in enumerate(invocations))))
+
+    async def warm_up(self) -> dict:
+        """Loads every service's tool index; returns the tool count per service."""
+        results = await asyncio.gather(
+            *(self._tools(service) for service in self.servers), return_exceptions=True
+        )
+        return {
+            service: (len(tools) if isinstance(tools, dict) else f"failed: {tools}")
+            for service, tools in zip(self.servers, results)
+        }
+
+    async def aclose(self):
+        """Closes every cached toolset's MCP session; the cache reconnects if used again.
+
+        Sessions opened on another running event loop are closed on that loop;
+        those of a closed loop went with it.
+        """
+        entries, self._entries = self._entries, {}
+        loop = asyncio.get_running_loop()
+        closing = []
+        for entry in entries.values():
+            if entry.loop is loop:
+                closing.append(entry.toolset.close())
+            elif entry.loop.is_running():
+                closing.append(asyncio.wrap_future(
+                    asyncio.run_coroutine_threadsafe(entry.toolset.close(), entry.loop)))
+        errors = [e for e in await asyncio.gather(*closing, return_exceptions=True) if e is not None]
+        if errors:
+            raise errors[0]
+
+    def warm_up_callback(self):
+        """Returns a before_agent_callback that warms the cache in the background.
+
+        The first turn's LLM call then overlaps with the schema loads; a tool
+        call made before they finish waits on the in-flight load.
+        """
+        started = {}  # event loop -> warm-up task (kept referenced until done)
+
+        async def callback(callback_context):
+            loop = asyncio.get_running_loop()
+            if loop not in started:
+                started[loop] = loop.create_task(self.warm_up())
+            return None
+
+        return callback
@@ -0,0 +1,99 @@
+# Copyright 2025 Google LLC
+# Licensed under the Apache License, Version 2.0.
+
+"""
+Short-TTL read-through cache for read-only cloud inventory calls.
+
+Calls such as `compute.instances.list` or `list_node_pools` are repeated many
+times while the infrastructure specialist plans capacity. `ReadCache` caches
+their results by (service, tool, canonical arguments) for `MCP_READ_CACHE_TTL_SECONDS`.
+Any other tool is treated as mutating and invalidates the cached reads of the
+same resource family (e.g. `compute.instances.insert` drops every cached
+`compute.instances.*` and `compute.disks.*` read).
+"""
+
+import json
+import os
+import time
+from collections import OrderedDict
+
+MCP_READ_CACHE_TTL_SECONDS = float(os.getenv("MCP_READ_CACHE_TTL_SECONDS", "60"))
+MCP_READ_CACHE_MAX_ENTRIES = int(os.getenv("MCP_READ_CACHE_MAX_ENTRIES", "512"))
+
+READ_ONLY_VERBS = ("list", "aggregatedList", "get", "describe", "search")
+# Mutating a resource of the key family may change the reads of the values.
+RELATED_FAMILIES = {
+    "instances": ("disks", "instanceGroups", "instanceGroupManagers"),
+    "instanceGroupManagers": ("instances", "instanceGroups", "disks"),
+    "disks": ("snapshots", "instances"),
+}
+
+
+def _verb(tool_name: str) -> str:
+    if "." in tool_name:
+        # Compute style: 'compute.instances.list'
+        return tool_name.rsplit(".", 1)[-1]
+    # GKE style: 'list_node_pools', 'kube_get'
+    tokens = tool_name.split("_")
+    return tokens[1] if tokens[0] == "kube" and len(tokens) > 1 else tokens[0]
+
+
+def is_read_only(tool_name: str) -> bool:
+    """True for tools that only read inventory (list/get/describe...)."""
+    return _verb(tool_name).startswith(READ_ONLY_VERBS)
+
+
+def resource_family(service: str, tool_name: str) -> str:
+    """The resource family a tool acts on; GKE tools share one family per service."""
+    parts = tool_name.split(".")
+    return parts[1] if len(parts) == 3 else service
+
+
+def canonical_arguments(arguments: dict) -> str:
+    return json.dumps(arguments or {}, sort_keys=True, separators=(",", ":"), default=str)
+
+
+class ReadCache:
+    """TTL + LRU cache of read-only tool results with family-based invalidation."""
+
+    def __init__(self, ttl_seconds: float = MCP_READ_CACHE_TTL_SECONDS,
+                 max_entries: int = MCP_READ_CACHE_MAX_ENTRIES):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # (service, family, tool, args) -> (stored_at, result)
+        self.stats = {"hits": 0, "misses": 0, "invalidations": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl_seconds > 0
+
+    @staticmethod
+    def key(service: str, tool_name: str, arguments: dict) -> tuple:
+        return (service, resource_family(service, tool_name), tool_name, canonical_arguments(arguments))
+
+    def get(self, key: tuple):
+        """Returns (result, age in seconds), or None on a miss."""
+        entry = self._entries.get(key)
+        if entry is not None and time.monotonic() - entry[0] < self.ttl_seconds:
+            self._entries.move_to_end(key)
+            self.stats["hits"] += 1
+            return entry[1], time.monotonic() - entry[0]
+        self._entries.pop(key, None)
+        self.stats["misses"] += 1
+        return None
+
+    def put(self, key: tuple, result):
+        self._entries[key] = (time.monotonic(), result)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, service: str, tool_name: str) -> int:
+        """Drops the cached reads a mutating tool may have made stale."""
+        family = resource_family(service, tool_name)
+        families = {family, *RELATED_FAMILIES.get(family, ())}
+        stale = [k for k in self._entries if k[0] == service and k[1] in families]
+        for k in stale:
+            del self._entries[k]
+        self.stats["invalidations"] += len(stale)
+        return len(stale)
@@ -0,0 +1,579 @@
+# Copyright 2025 Google LLC
+# Licensed under the Apache License, Version 2.0.
+
+"""
+Slurm-compatible job scheduler backends for the HPC tools.
+
+`SchedulerBackend` is the interface `hpc_tools` talks to:
+* `LocalSchedulerBackend` runs jobs as processes on the agent host. It has
+  named partitions (queues), array jobs, CPU-slot accounting, Slurm job
+  states, per-task stdout/stderr files and a result directory per job.
+  Pending tasks start in submission order with EASY backfill: the first task
+  that does not fit gets a reserved start time, computed from the time limits
+  of running tasks, and later tasks may only start if they do not delay it.
+* `SlurmBackend` forwards to a real cluster via sbatch/sacct/scancel.
+
+`get_backend()` picks one from `HPC_SCHEDULER_BACKEND` ("local" or "slurm").
+Job scripts may carry `#SBATCH` directives (--array, --cpus-per-task,
+--job-name, --time, --partition), as they would on a real cluster. Scripts
+given as a path are read from HPC_JOBS_DIR only, and jobs see only the
+variables of the agent's environment listed in HPC_JOB_ENV, so credentials
+and API keys stay with the agent.
+"""
+
+import abc
+import json
+import os
+import re
+import shlex
+import signal
+import subprocess
+import threading
+import time
+from collections import deque
+
+HPC_SCHEDULER_BACKEND = os.getenv("HPC_SCHEDULER_BACKEND", "local")
+LOCAL_SCHEDULER_ROOT = os.getenv("LOCAL_SCHEDULER_ROOT", "/tmp/hpc_jobs")
+LOCAL_SCHEDULER_CPUS = int(os.getenv("LOCAL_SCHEDULER_CPUS", str(os.cpu_count() or 1)))
+HPC_JOBS_DIR = os.getenv("HPC_JOBS_DIR", os.path.join(LOCAL_SCHEDULER_ROOT, "scripts"))
+HPC_JOB_ENV = os.getenv("HPC_JOB_ENV", "PATH,HOME,USER,LANG,LC_ALL,TZ,TMPDIR")
+DEFAULT_TIME_LIMIT_MINUTES = int(os.getenv("HPC_DEFAULT_TIME_LIMIT_MINUTES", "60"))
+DEFAULT_PARTITION = "local"
+MAX_ARRAY_SIZE = 1000
+
+PENDING = "PENDING"
+RUNNING = "RUNNING"
+COMPLETED = "COMPLETED"
+FAILED = "FAILED"
+CANCELLED = "CANCELLED"
+TIMEOUT = "TIMEOUT"
+TERMINAL_STATES = (COMPLETED, FAILED, CANCELLED, TIMEOUT)
+
+
+def aggregate_state(states: list) -> str:
+    """Job state from its tasks' states, the way squeue/sacct summarize array jobs."""
+    if RUNNING in states:
+        return RUNNING
+    if PENDING in states:
+        return RUNNING if any(s in TERMINAL_STATES for s in states) else PENDING
+    for terminal in (CANCELLED, TIMEOUT, FAILED):
+        if terminal in states:
+            return terminal
+    return COMPLETED
+
+
+# --- Job script parsing ---
+
+def parse_array(spec: str):
+    """Parses a Slurm --array spec ('0-9', '1,3,5-7', '0-15:4%2').
+
+    Returns:
+        A (task indexes, max concurrently running tasks or None) tuple.
+    """
+    spec, _, throttle = spec.partition("%")
+    indexes = []
+    for chunk in filter(None, spec.split(",")):
+        match = re.fullmatch(r"(\d+)(?:-(\d+)(?::(\d+))?)?", chunk.strip())
+        if not match:
+            raise ValueError(f"Invalid array spec '{chunk}'.")
+        start, end, step = match.group(1), match.group(2), match.group(3)
+        end = end if end is not None else start
+        indexes.extend(range(int(start), int(end) + 1, int(step or 1)))
+    indexes = sorted(set(indexes))
+    if not indexes or len(indexes) > MAX_ARRAY_SIZE:
+        raise ValueError(f"Array jobs must have between 1 and {MAX_ARRAY_SIZE} tasks.")
+    return indexes, (int(throttle) if throttle else None)
+
+
+def parse_time_limit(value: str) -> int:
+    """Parses a Slurm --time value (minutes, MM:SS, HH:MM:SS, D-HH[:MM[:SS]]) into minutes."""
+    days = 0
+    if "-" in value:
+        day_part, value = value.split("-", 1)
+        days = int(day_part)
+        parts = [int(p) for p in value.split(":")] + [0, 0]
+        hours, minutes, seconds = parts[:3]
+    else:
+        parts = [int(p) for p in value.split(":")]
+        if len(parts) == 1:
+            hours, minutes, seconds = 0, parts[0], 0
+        elif len(parts) == 2:
+            hours, minutes, seconds = 0, parts[0], parts[1]
+        else:
+            hours, minutes, seconds = parts[:3]
+    return max(1, days * 1440 + hours * 60 + minutes + (1 if seconds else 0))
+
+
+_DIRECTIVE_OPTIONS = {
+    "--array": "array", "-a": "array",
+    "--cpus-per-task": "cpus_per_task", "-c": "cpus_per_task",
+    "--job-name": "job_name", "-J": "job_name",
+    "--time": "time_limit", "-t": "time_limit",
+    "--partition": "partition", "-p": "partition",
+}
+
+
+def parse_directives(script: str) -> dict:
+    """Reads the supported `#SBATCH` options of a job script."""
+    options = {}
+    for line in script.splitlines():
+        if not line.startswith("#SBATCH"):
+            continue
+        tokens = shlex.split(line[len("#SBATCH"):], comments=False)
+        i = 0
+        while i < len(tokens):
+            flag, _, value = tokens[i].partition("=")
+            if not value and flag in ("-a", "-c", "-J", "-t", "-p") and i + 1 < len(tokens):
+                value = tokens[i + 1]
+                i += 1
+            if flag in _DIRECTIVE_OPTIONS and value:
+                options[_DIRECTIVE_OPTIONS[flag]] = value
+            i += 1
+    return options
+
+
+def load_script(job_script: str, jobs_dir: str = None) -> str:
+    """Turns the tool's `job_script` (inline script, 'sbatch file.sh' or a path) into script text.
+
+    Paths are resolved against `jobs_dir` (default HPC_JOBS_DIR).
+
+    Raises:
+        PermissionError: if the path names a file outside `jobs_dir`.
+    """
+    jobs_dir = os.path.realpath(jobs_dir or HPC_JOBS_DIR)
+    text = job_script.strip()
+    if text.startswith("sbatch "):
+        text = text[len("sbatch "):].strip()
+    path = os.path.realpath(os.path.join(jobs_dir, os.path.expanduser(text)))
+    if "\n" not in text and os.path.isfile(path):
+        if os.path.commonpath([jobs_dir, path]) != jobs_dir:
+            raise PermissionError(f"Job scripts can only be read from {jobs_dir} (HPC_JOBS_DIR).")
+        with open(path) as f:
+            text = f.read()
+    if not text.startswith("#!"):
+        text = "#!/bin/bash\n" + text
+    return text + "\n"
+
+
+def job_environment(names: str = None) -> dict:
+    """The variables of the agent's environment named in `names` (default HPC_JOB_ENV)."""
+    names = HPC_JOB_ENV if names is None else names
+    return {name: os.environ[name] for name in (n.strip() for n in names.split(",")) if name in os.environ}
+
+
+# --- Backend interface ---
+
+class SchedulerBackend(abc.ABC):
+    """What the HPC tools need from a scheduler."""
+
+    name = "abstract"
+
+    @abc.abstractmethod
+    def create_cluster(self, cluster_name: str, node_count: int, machine_type: str) -> dict:
+        """Makes a cluster (partition) available for jobs."""
+
+    @abc.abstractmethod
+    def submit(self, cluster_name: str, job_script: str, job_name: str = None, cpus_per_task: int = None,
+               array: str = None, time_limit_minutes: int = None) -> str:
+        """Submits a job script; returns the job ID."""
+
+    @abc.abstractmethod
+    def status(self, job_id: str) -> dict:
+        """State of a job and its array tasks."""
+
+    @abc.abstractmethod
+    def cancel(self, job_id: str) -> dict:
+        """Cancels a pending or running job."""
+
+    @abc.abstractmethod
+    def list_jobs(self, cluster_name: str = None) -> list:
+        """Summaries of known jobs, newest first."""
+
+
+# --- Local backend ---
+
+class _Task:
+    def __init__(self, job, index):
+        self.job = job
+        self.index = index  # array index, or None for a plain job
+        self.state = PENDING
+        self.exit_code = None
+        self.started_at = None
+        self.ended_at = None
+        self.process = None
+
+    @property
+    def task_id(self) -> str:
+        return f"{self.job.job_id}_{self.index}" if self.index is not None else str(self.job.job_id)
+
+    @property
+    def stdout_path(self) -> str:
+        return os.path.join(self.job.result_dir, f"slurm-{self.task_id}.out")
+
+    @property
+    def stderr_path(self) -> str:
+        return os.path.join(self.job.result_dir, f"slurm-{self.task_id}.err")
+
+
+class _Job:
+    def __init__(self, job_id, name, partition, script_path, result_dir, cpus_per_task,
+                 time_limit_minutes, indexes, max_running):
+        self.job_id = job_id
+        self.name = name
+        self.partition = partition
+        self.script_path = script_path
+        self.result_dir = result_dir
+        self.cpus_per_task = cpus_per_task
+        self.time_limit_minutes = time_limit_minutes
+        self.max_running = max_running
+        self.submitted_at = time.time()
+        self.tasks = [_Task(self, index) for index in indexes]
+
+    @property
+    def is_array(self) -> bool:
+        return self.tasks[0].index is not None
+
+    @property
+    def state(self) -> str:
+        return aggregate_state([t.state for t in self.tasks])
+
+    def running_tasks(self) -> int:
+        return sum(t.state == RUNNING for t in self.tasks)
+
+
+class LocalSchedulerBackend(SchedulerBackend):
+    """Runs jobs as local processes, bounded by a pool of CPU slots."""
+
+    name = "local"
+
+    def __init__(self, root: str = LOCAL_SCHEDULER_ROOT, total_cpus: int = LOCAL_SCHEDULER_CPUS,
+                 poll_interval: float = 0.2, jobs_dir: str = HPC_JOBS_DIR, job_env: str = HPC_JOB_ENV):
+        self.root = root
+        self.total_cpus = total_cpus
+        self.poll_interval = poll_interval
+        self.jobs_dir = jobs_dir
+        self.job_env = job_env
+        self.partitions = {DEFAULT_PARTITION: {"nodes": 1, "machine_type": "local", "cpus": total_cpus}}
+        self._jobs = {}  # job_id -> _Job
+        self._pending = deque()  # _Task, in submission order
+        self._used_cpus = 0
+        self._cond = threading.Condition()
+        self._dispatcher = None
+        os.makedirs(root, exist_ok=True)
+        os.makedirs(jobs_dir, exist_ok=True)
+        existing = [int(d) for d in os.listdir(root) if d.isdigit()]
+        self._next_id = max(existing, default=0) + 1
+
+    def create_cluster(self, cluster_name: str, node_count: int, machine_type: str) -> dict:
+        with self._cond:
+            # All partitions share the host's CPU slots.
+            self.partitions[cluster_name] = {
+                "nodes": node_count, "machine_type": machine_type, "cpus": self.total_cpus,
+            }
+            return {"cluster": cluster_name, "backend": self.name, "cpus": self.total_cpus,
+                    "jobs_dir": self.root, "scripts_dir": self.jobs_dir}
+
+    def submit(self, cluster_name: str, job_script: str, job_name: str = None, cpus_per_task: int = None,
+               array: str = None, time_limit_minutes: int = None) -> str:
+        script = load_script(job_script, self.jobs_dir)
+        directives = parse_directives(script)
+        partition = cluster_name or directives.get("partition") or DEFAULT_PARTITION
+        if partition not in self.partitions:
+            raise KeyError(f"Cluster '{partition}' does not exist. Deploy it first.")
+        cpus = int(cpus_per_task or directives.get("cpus_per_task") or 1)
+        if not 1 <= cpus <= self.total_cpus:
+            raise ValueError(f"cpus_per_task must be between 1 and {self.total_cpus} on this host.")
+        if time_limit_minutes is None:
+            time_limit_minutes = (parse_time_limit(directives["time_limit"]) if "time_limit" in directives
+                                  else DEFAULT_TIME_LIMIT_MINUTES)
+        array = array or directives.get("array")
+        indexes, max_running = parse_array(array) if array else ([None], None)
+
+        with self._cond:
+            job_id = self._next_id
+            self._next_id += 1
+            result_dir = os.path.join(self.root, str(job_id))
+            os.makedirs(os.path.join(result_dir, "results"), exist_ok=True)
+            script_path = os.path.join(result_dir, "job.sh")
+            with open(script_path, "w") as f:
+                f.write(script)
+            job = _Job(job_id, job_name or directives.get("job_name") or f"job{job_id}", partition,
+                       script_path, result_dir, cpus, time_limit_minutes, indexes, max_running)
+            self._jobs[job_id] = job
+            self._pending.extend(job.tasks)
+            self._write_record(job)
+            self._ensure_dispatcher()
+            self._cond.notify_all()
+        return str(job_id)
+
+    def status(self, job_id: str) -> dict:
+        with self._cond:
+            return self._describe(self._job(job_id), detail=True)
+
+    def cancel(self, job_id: str) -> dict:
+        with self._cond:
+            job = self._job(job_id)
+            for task in job.tasks:
+                if task.state == PENDING:
+                    task.state = CANCELLED
+                    task.ended_at = time.time()
+                elif task.state == RUNNING:
+                    self._kill(task)
+                    task.state = CANCELLED
+            self._pending = deque(t for t in self._pending if t.state == PENDING)
+            self._cond.notify_all()
+            return self._describe(job)
+
+    def list_jobs(self, cluster_name: str = None) -> list:
+        with self._cond:
+            jobs = [j for j in self._jobs.values() if cluster_name in (None, j.partition)]
+            return [self._describe(j) for j in sorted(jobs, key=lambda j: -j.job_id)]
+
+    def utilization(self) -> dict:
+        with self._cond:
+            return {"used_cpus": self._used_cpus, "total_cpus": self.total_cpus,
+                    "pending_tasks": len(self._pending)}
+
+    # -- internals (called with self._cond held) --
+
+    def _job(self, job_id: str) -> _Job:
+        job = self._jobs.get(int(str(job_id).split("_")[0]))
+        if job is None:
+            raise KeyError(f"Job '{job_id}' not found.")
+        return job
+
+    def _ensure_dispatcher(self):
+        if self._dispatcher is None or not self._dispatcher.is_alive():
+            self._dispatcher = threading.Thread(target=self._dispatch_loop, name="hpc-local-scheduler", daemon=True)
+            self._dispatcher.start()
+
+    def _dispatch_loop(self):
+        with self._cond:
+            while True:
+                self._reap()
+                self._start_pending()
+                if not self._pending and not self._used_cpus:
+                    self._dispatcher = None
+                    return
+                self._cond.wait(self.poll_interval)
+
+    def _reap(self):
+        now = time.time()
+        for job in self._jobs.values():
+            finished = False
+            for task in job.tasks:
+                if task.process is None:
+                    continue
+                code = task.process.poll()
+                if code is None and now - task.started_at > job.time_limit_minutes * 60:
+                    self._kill(task)
+                    task.state = TIMEOUT
+                    code = task.process.wait()
+                if code is None:
+                    continue
+                if task.state == RUNNING:
+                    task.state = COMPLETED if code == 0 else FAILED
+                task.exit_code = code
+                task.ended_at = task.ended_at or now
+                task.process = None
+                self._used_cpus -= job.cpus_per_task
+                finished = True
+            if finished:
+                self._write_record(job)
+
+    def _start_pending(self):
+        # EASY backfill: tasks start in submission order until one does not fit.
+        # That task gets a reservation; later tasks may start only if they end
+        # before it, or use CPUs it will not need.
+        free = self.total_cpus - self._used_cpus
+        reservation = None  # (start time, CPUs spare at that time)
+        now = time.time()
+        for task in list(self._pending):
+            job = task.job
+            if job.max_running is not None and job.running_tasks() >= job.max_running:
+                continue
+            if job.cpus_per_task > free:
+                if reservation is None:
+                    reservation = self._reserve(job.cpus_per_task, free, now)
+                continue
+            if reservation is not None:
+                shadow_time, spare = reservation
+                if now + job.time_limit_minutes * 60 > shadow_time:
+                    if job.cpus_per_task > spare:
+                        continue
+                    reservation = (shadow_time, spare - job.cpus_per_task)
+            self._pending.remove(task)
+            self._launch(task)
+            if task.state == RUNNING:
+                free -= job.cpus_per_task
+
+    def _reserve(self, cpus: int, free: int, now: float) -> tuple:
+        """The earliest time `cpus` CPUs are free if running tasks use their full time limit,
+        and the CPUs spare at that time."""
+        ends = sorted(
+            (max(now, t.started_at + job.time_limit_minutes * 60), job.cpus_per_task)
+            for job in self._jobs.values() for t in job.tasks if t.state == RUNNING
+        )
+        for end, released in ends:
+            free += released
+            if free >= cpus:
+                return end, free - cpus
+        return now, free - cpus
+
+    def _launch(self, task: _Task):
+        job = task.job
+        env = job_environment(self.job_env)
+        env.update({
+            "SLURM_JOB_ID": task.task_id if task.index is None else str(job.job_id),
+            "SLURM_JOB_NAME": job.name,
+            "SLURM_JOB_PARTITION": job.partition,
+            "SLURM_CPUS_PER_TASK": str(job.cpus_per_task),
+            "SLURM_SUBMIT_DIR": job.result_dir,
+            "OMP_NUM_THREADS": str(job.cpus_per_task),
+            "RESULT_DIR": os.path.join(job.result_dir, "results"),
+        })
+        if task.index is not None:
+            env["SLURM_ARRAY_JOB_ID"] = str(job.job_id)
+            env["SLURM_ARRAY_TASK_ID"] = str(task.index)
+        with open(task.stdout_path, "wb") as out, open(task.stderr_path, "wb") as err:
+            try:
+                task.process = subprocess.Popen(
+                    ["bash", job.script_path], cwd=job.result_dir, env=env,
+                    stdout=out, stderr=err, start_new_session=True,
+                )
+            except OSError as e:
+                err.write(str(e).encode())
+                task.state = FAILED
+                task.ended_at = time.time()
+                return
+        task.state = RUNNING
+        task.started_at = time.time()
+        self._used_cpus += job.cpus_per_task
+
+    @staticmethod
+    def _kill(task: _Task):
+        if task.process is not None and task.process.poll() is None:
+            try:
+                os.killpg(task.process.pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+        task.ended_at = time.time()
+
+    def _describe(self, job: _Job, detail: bool = False) -> dict:
+        counts = {}
+        for task in job.tasks:
+            counts[task.state] = counts.get(task.state, 0) + 1
+        summary = {
+            "job_id": str(job.job_id),
+            "name": job.name,
+            "cluster": job.partition,
+            "state": job.state,
+            "tasks": counts,
+            "cpus_per_task": job.cpus_per_task,
+            "result_dir": os.path.join(job.result_dir, "results"),
+            "submitted_at": job.submitted_at,
+        }
+        if detail:
+            summary["task_details"] = [
+                {"task_id": t.task_id, "state": t.state, "exit_code": t.exit_code,
+                 "elapsed_s": round((t.ended_at or time.time()) - t.started_at, 1) if t.started_at else None,
+                 "stdout": t.stdout_path, "stderr": t.stderr_path}
+                for t in job.tasks
+            ]
+        return summary
+
+    def _write_record(self, job: _Job):
+        with open(os.path.join(job.result_dir, "job.json"), "w") as f:
+            json.dump(self._describe(job, detail=True), f, indent=2)
+
+
+# --- Slurm backend ---
+
+class SlurmBackend(SchedulerBackend):
+    """Forwards to a real Slurm cluster through its command-line tools."""
+
+    name = "slurm"
+    # sacct states that map onto the local backend's states.
+    _STATE_MAP = {"CONFIGURING": RUNNING, "COMPLETING": RUNNING, "REQUEUED": PENDING,
+                  "SUSPENDED": RUNNING, "PREEMPTED": CANCELLED}
+
+    def __init__(self, work_dir: str = LOCAL_SCHEDULER_ROOT, jobs_dir: str = HPC_JOBS_DIR,
+                 job_env: str = HPC_JOB_ENV):
+        self.work_dir = work_dir
+        self.jobs_dir = jobs_dir
+        self.job_env = job_env
+        os.makedirs(work_dir, exist_ok=True)
+
+    @staticmethod
+    def _run(args: list) -> str:
+        result = subprocess.run(args, capture_output=True, text=True, timeout=60)
+        if result.returncode != 0:
+            raise RuntimeError(f"{args[0]} failed: {result.stderr.strip()}")
+        return result.stdout.strip()
+
+    def create_cluster(self, cluster_name: str, node_count: int, machine_type: str) -> dict:
+        info = self._run(["sinfo", "-h", "-p", cluster_name, "-o", "%D %c"])
+        if not info:
+            raise KeyError(f"Slurm partition '{cluster_name}' does not exist; partitions are provisioned outside the agent.")
+        return {"cluster": cluster_name, "backend": self.name, "sinfo": info}
+
+    def submit(self, cluster_name: str, job_script: str, job_name: str = None, cpus_per_task: int = None,
+               array: str = None, time_limit_minutes: int = None) -> str:
+        script_path = os.path.join(self.work_dir, f"job-{time.time_ns()}.sh")
+        with open(script_path, "w") as f:
+            f.write(load_script(job_script, self.jobs_dir))
+        # sbatch exports the whole environment by default.
+        exported = ",".join(job_environment(self.job_env)) or "NONE"
+        args = ["sbatch", "--parsable", f"--chdir={self.work_dir}", f"--export={exported}"]
+        if cluster_name:
+            args.append(f"--partition={cluster_name}")
+        if job_name:
+            args.append(f"--job-name={job_name}")
+        if cpus_per_task:
+            args.append(f"--cpus-per-task={cpus_per_task}")
+        if array:
+            args.append(f"--array={array}")
+        if time_limit_minutes:
+            args.append(f"--time={time_limit_minutes}")
+        return self._run(args + [script_path]).split(";")[0]
+
+    def status(self, job_id: str) -> dict:
+        rows = self._run(["sacct", "-j", str(job_id), "-X", "-n", "-P", "-o", "JobID,JobName,Partition,State,ExitCode"])
+        tasks = [dict(zip(("task_id", "name", "cluster", "state", "exit_code"), row.split("|")))
+                 for row in rows.splitlines() if row]
+        if not tasks:
+            raise KeyError(f"Job '{job_id}' not found.")
+        counts = {}
+        for task in tasks:
+            state = task["state"].split()[0]  # e.g. "CANCELLED by 1000"
+            state = self._STATE_MAP.get(state, state)
+            # OUT_OF_MEMORY, NODE_FAIL, BOOT_FAIL, ... are failures.
+            task["state"] = state if state in (PENDING, RUNNING) + TERMINAL_STATES else FAILED
+            counts[task["state"]] = counts.get(task["state"], 0) + 1
+        state = aggregate_state([t["state"] for t in tasks])
+        return {"job_id": str(job_id), "name": tasks[0]["name"], "cluster": tasks[0]["cluster"],
+                "state": state, "tasks": counts, "task_details": tasks}
+
+    def cancel(self, job_id: str) -> dict:
+        self._run(["scancel", str(job_id)])
+        return self.status(job_id)
+
+    def list_jobs(self, cluster_name: str = None) -> list:
+        args = ["squeue", "-h", "-o", "%i|%j|%P|%T"]
+        if cluster_name:
+            args += ["-p", cluster_name]
+        return [dict(zip(("job_id", "name", "cluster", "state"), row.split("|")))
+                for row in self._run(args).splitlines() if row]
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend() -> SchedulerBackend:
+    """The process-wide scheduler backend selected by HPC_SCHEDULER_BACKEND."""
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            _backend = SlurmBackend() if HPC_SCHEDULER_BACKEND == "slurm" else LocalSchedulerBackend()
+        return _backend
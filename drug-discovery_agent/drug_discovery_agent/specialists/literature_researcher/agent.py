@@ -16,9 +16,10 @@
 
 from google.adk.agents import Agent
 from . import prompt
+from ... import model_policy
 from .tools import fetch_articles, therapeutics_chat
 
-MODEL = "gemini-2.5-pro"
+MODEL = model_policy.model_for("literature_researcher")
 
 literature_researcher = Agent(
     name="literature_researcher",
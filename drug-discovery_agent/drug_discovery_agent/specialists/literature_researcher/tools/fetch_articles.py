@@ -17,6 +17,34 @@
 import os
 from Bio import Medline, Entrez
 
+from ....deadline import run_bounded
+from ....singleflight import normalize_text, single_flight
+
+
+@single_flight("pubmed.search", key=normalize_text)
+def _search_pubmed(search_query: str) -> list:
+    """MEDLINE records of the top 3 PubMed hits; concurrent identical searches share one request."""
+    # Entrez takes no timeout; the search is bounded by the caller's deadline instead.
+    return run_bounded(_fetch_medline, search_query)
+
+
+def _fetch_medline(search_query: str) -> list:
+    # NCBI requires you to identify yourself with an email address.
+    Entrez.email = os.getenv("ENTREZ_EMAIL")  # Please replace with your email
+
+    handle = Entrez.esearch(db="pubmed", sort="relevance", term=search_query, retmax=3)
+    record = Entrez.read(handle)
+    pmids = record.get("IdList", [])
+    handle.close()
+    if not pmids:
+        return []
+
+    fetch_handle = Entrez.efetch(db="pubmed", id=",".join(pmids), rettype="medline", retmode="text")
+    records = list(Medline.parse(fetch_handle))
+    fetch_handle.close()
+    return records
+
+
 def fetch_pubmed_articles(search_query: str) -> str:
     """
     Searches PubMed for a query and returns abstracts of the top 3 articles.
@@ -27,22 +55,11 @@ def fetch_pubmed_articles(search_query: str) -> str:
     Returns:
         A formatted string with the titles and abstracts of the search results.
     """
-    # NCBI requires you to identify yourself with an email address.
-    Entrez.email = os.getenv("ENTREZ_EMAIL")  # Please replace with your email
-
     try:
-        handle = Entrez.esearch(db="pubmed", sort="relevance", term=search_query, retmax=3)
-        record = Entrez.read(handle)
-        pmids = record.get("IdList", [])
-        handle.close()
-
-        if not pmids:
+        records = _search_pubmed(search_query)
+        if not records:
             return f"No PubMed articles were found for the query: '{search_query}'."
 
-        fetch_handle = Entrez.efetch(db="pubmed", id=",".join(pmids), rettype="medline", retmode="text")
-        records = list(Medline.parse(fetch_handle))
-        fetch_handle.close()
-
         result_str = f"Top 3 PubMed results for '{search_query}':\n"
         for i, record in enumerate(records, start=1):
             title = record.get("TI", "No title available")
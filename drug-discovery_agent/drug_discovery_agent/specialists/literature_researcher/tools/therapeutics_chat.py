@@ -14,41 +14,52 @@
 
 """Tool for general therapeutic questions using a TxGemma Chat Vertex AI endpoint."""
 
+import asyncio
 import os
 import vertexai
 from google.cloud import aiplatform
 
+from ....endpoint_guard import EndpointUnavailable, endpoint_pool
+from ....streaming import GEMMA_STREAMING, stream_generate
+
 # Initialize Vertex AI SDK
 vertexai.init(
     project=os.environ.get("GOOGLE_CLOUD_PROJECT"),
     location=os.environ.get("GOOGLE_CLOUD_LOCATION"),
 )
 
-def ask_therapeutics_expert(query: str) -> str:
+async def ask_therapeutics_expert(query: str) -> str:
     """
     Answers general therapeutics questions using a TxGemma chat model.
+    The answer is streamed as it is generated (GEMMA_STREAMING).
 
     Args:
         query: The user's question about a therapeutic topic.
 
     Returns:
-        A string containing the answer from the chat model.
+        A string containing the answer from the chat model, or a structured error if
+        the endpoint is overloaded, failing or timed out.
     """
-    # This environment variable must be set to your deployed TxGemma chat endpoint ID.
-    endpoint_id = os.environ.get("TXGEMMA_CHAT_ENDPOINT_ID")
-    if not endpoint_id:
+    # This environment variable must be set to your deployed TxGemma chat endpoint ID
+    # (or comma-separated `[location/]endpoint_id` replicas).
+    endpoint_ids = os.environ.get("TXGEMMA_CHAT_ENDPOINT_ID")
+    if not endpoint_ids:
         return "Error: TXGEMMA_CHAT_ENDPOINT_ID environment variable is not set."
 
-    endpoint = aiplatform.Endpoint(
+    endpoint = endpoint_pool("txgemma-chat", endpoint_ids, lambda location, endpoint_id: aiplatform.Endpoint(
         endpoint_name=(
             f"projects/{os.environ['GOOGLE_CLOUD_PROJECT']}"
-            f"/locations/{os.environ['GOOGLE_CLOUD_LOCATION']}"
+            f"/locations/{location or os.environ['GOOGLE_CLOUD_LOCATION']}"
             f"/endpoints/{endpoint_id}"
         )
-    )
+    ))
 
     # The chat model uses a simpler prompt format.
-    instances = [{"prompt": query}]
-    response = endpoint.predict(instances=instances)
-    
+    try:
+        if GEMMA_STREAMING:
+            return await stream_generate(endpoint, query, "ask_therapeutics_expert")
+        response = await asyncio.to_thread(endpoint.predict, [{"prompt": query}])
+    except EndpointUnavailable as e:
+        return e.message()
+
     return response.predictions[0]
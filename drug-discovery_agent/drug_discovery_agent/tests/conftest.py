@@ -0,0 +1,45 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Shared fixtures: a synthetic compound library with labels a fingerprint model can learn."""
+
+import pytest
+
+from drug_discovery_agent.screening.chem import standardize_smiles
+from drug_discovery_agent.screening.prediction_cache import PredictionCache
+
+
+def synthetic_library(size: int = 120) -> list:
+    """(canonical SMILES, toxic) pairs: amines and amides are 'toxic', alcohols and acids are not."""
+    groups = [("O", False), ("C(=O)O", False), ("N", True), ("C(=O)N", True)]
+    compounds = []
+    for n in range(1, size):
+        for chain in (f"{'C' * n}", f"CC(C){'C' * n}"):
+            for group, toxic in groups:
+                smiles = standardize_smiles(chain + group)
+                if smiles and smiles not in dict(compounds):
+                    compounds.append((smiles, toxic))
+                if len(compounds) == size:
+                    return compounds
+    return compounds
+
+
+@pytest.fixture
+def library():
+    return synthetic_library()
+
+
+@pytest.fixture
+def cache():
+    return PredictionCache(":memory:")
@@ -0,0 +1,172 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Test cases for the multi-task ADMET profile tool and the property registry, with a stand-in endpoint."""
+
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from drug_discovery_agent.endpoint_guard import EndpointUnavailable
+from drug_discovery_agent.screening import descriptors
+from drug_discovery_agent.screening import properties as props
+from drug_discovery_agent.specialists.compound_analyzer.tools import admet_profile
+
+pytest_plugins = ("pytest_asyncio",)
+
+COMPOUNDS = ["CCCCN", "CC(C)CCO", "CCCCC(N)=O"]
+# Fails the Rule of 5 (MW > 500 and cLogP > 5).
+GREASE = "C" * 40 + "C(=O)O"
+
+
+class StandInEndpoint:
+    """Answers (B) for compounds with a nitrogen, (A) otherwise, and a solubility score of 10 per SMILES character."""
+
+    def __init__(self, error: Exception = None):
+        self.error = error
+        self.requests = []
+        self._lock = threading.Lock()
+
+    def predict(self, instances, timeout=None):
+        with self._lock:
+            self.requests.append(len(instances))
+        if self.error:
+            raise self.error
+        answers = []
+        for instance in instances:
+            smiles = instance["prompt"].rsplit("Drug SMILES: ", 1)[1]
+            if "normalized solubility" in instance["prompt"]:
+                answers.append(f"{10 * len(smiles)}")
+            else:
+                answers.append("(B)" if "N" in smiles else "(A)")
+        return SimpleNamespace(predictions=answers)
+
+
+class StandInSurrogates:
+    """Confident about hERG only; records the endpoint answers it is compared with."""
+
+    def __init__(self):
+        self.compared = []
+
+    def predict(self, task, smiles):
+        if task == "herg":
+            return (False, 0.97), True
+        return (True, 0.55), False
+
+    def compare(self, task, guess, value):
+        self.compared.append((task, guess, value))
+
+
+@pytest.fixture
+def endpoint(monkeypatch, cache):
+    endpoint = StandInEndpoint()
+    monkeypatch.setattr(props, "txgemma_endpoint", lambda: endpoint)
+    monkeypatch.setattr(admet_profile, "default_cache", lambda: cache)
+    monkeypatch.setattr(admet_profile, "default_surrogates", lambda: None)
+    return endpoint
+
+
+def expected(smiles: str, task: str):
+    return 10.0 * len(smiles) if task == "solubility" else "N" in smiles
+
+
+def test_registry_prompts_and_parsers():
+    assert list(props.PROPERTIES) == ["clintox", "bbbp", "herg", "ames", "dili", "cyp3a4", "solubility"]
+    for prop in props.PROPERTIES.values():
+        prompt = prop.prompt("CCO")
+        assert prompt.startswith("Instructions:") and prompt.endswith("Drug SMILES: CCO")
+    assert props.PROPERTIES["herg"].parse("(B) blocks hERG") is True
+    assert props.PROPERTIES["solubility"].parse("Answer: 430") == 430.0
+    assert props.PROPERTIES["solubility"].describe(430.0) == "430 (scale 0-1000)"
+    assert props.PROPERTIES["ames"].describe(None) == "undetermined"
+    assert [p.task for p in props.resolve_properties(" herg, ames ")] == ["herg", "ames"]
+    with pytest.raises(ValueError, match="Unknown properties"):
+        props.resolve_properties("clintox,logp")
+
+
+def test_profile_asks_everything_in_one_request(endpoint, cache):
+    properties = props.resolve_properties("all")
+    result = admet_profile._profile(COMPOUNDS + ["not_a_smiles"], properties)
+
+    assert endpoint.requests == [len(COMPOUNDS) * len(properties)]
+    assert result["endpoint_requests"] == 1 and result["endpoint_instances"] == 21
+    *compounds, invalid = result["compounds"]
+    assert invalid["error"] == "invalid SMILES" and invalid["profile"] == {}
+    for compound in compounds:
+        assert compound["descriptors"]["mw"] > 0
+        for task, entry in compound["profile"].items():
+            assert entry["source"] == "endpoint" and entry["value"] == expected(compound["smiles"], task)
+            assert cache.get(task, compound["smiles"]) == entry["value"]
+
+    # Asked again, every answer comes from the cache.
+    again = admet_profile._profile(COMPOUNDS, properties)
+    assert len(endpoint.requests) == 1 and again["endpoint_requests"] == 0
+    assert {entry["source"] for c in again["compounds"] for entry in c["profile"].values()} == {"cache"}
+
+
+def test_profile_splits_requests_over_the_instance_cap(endpoint, monkeypatch):
+    monkeypatch.setattr(props, "TXGEMMA_MAX_INSTANCES", 8)
+    result = admet_profile._profile(COMPOUNDS, props.resolve_properties("all"))
+
+    assert sorted(endpoint.requests) == [5, 8, 8]
+    assert result["endpoint_requests"] == 3
+    # Answers are matched back to their compound across the requests.
+    for compound in result["compounds"]:
+        for task, entry in compound["profile"].items():
+            assert entry["value"] == expected(compound["smiles"], task), (compound["smiles"], task)
+
+
+def test_profile_sources_cache_surrogate_and_prefilter(endpoint, cache, monkeypatch):
+    surrogates = StandInSurrogates()
+    monkeypatch.setattr(admet_profile, "default_surrogates", lambda: surrogates)
+    prefilter = descriptors.prefilter
+    monkeypatch.setattr(descriptors, "prefilter",
+                        lambda smiles_list, rules=None: prefilter(smiles_list, descriptors.parse_rules("lipinski=reject")))
+    cache.put("clintox", "CCCCN", False, "(A)")
+
+    result = admet_profile._profile(["CCCCN", GREASE], props.resolve_properties("clintox,bbbp,herg"))
+    amine, grease = (c["profile"] for c in result["compounds"])
+
+    assert amine["clintox"] == {"prediction": "no clinical toxicity risk", "value": False, "source": "cache"}
+    assert amine["herg"]["source"] == "surrogate" and amine["herg"]["confidence"] == 0.97
+    assert amine["bbbp"]["source"] == "endpoint" and amine["bbbp"]["value"] is True
+    assert {entry["source"] for entry in grease.values()} == {"prefilter"}
+    assert result["compounds"][1]["failed_rules"] == ["lipinski"]
+    # Only the amine's BBB question reaches the endpoint, and its answer audits the surrogate.
+    assert endpoint.requests == [1] and result["endpoint_instances"] == 1
+    assert surrogates.compared == [("bbbp", (True, 0.55), True)]
+
+
+def test_profile_reports_an_unavailable_endpoint(endpoint, cache):
+    endpoint.error = EndpointUnavailable("txgemma", "OVERLOADED", retry_after_s=5)
+    cache.put("clintox", "CCCCN", True, "(B)")
+
+    result = admet_profile._profile(["CCCCN"], props.resolve_properties("clintox,bbbp"))
+    (compound,) = result["compounds"]
+
+    error = {"endpoint": "txgemma", "reason": "OVERLOADED", "retry_after_s": 5}
+    assert result["error"] == error and result["endpoint_requests"] == 0
+    assert compound["profile"]["bbbp"] == {"prediction": "not predicted", "value": None, "error": error}
+    # Cached answers are still served, and nothing new is cached.
+    assert compound["profile"]["clintox"]["source"] == "cache"
+    assert cache.get("bbbp", "CCCCN") is None
+
+
+async def test_tool_validates_its_arguments(endpoint):
+    too_many = await admet_profile.predict_admet_profile(["CCO"] * (admet_profile.MAX_PROFILE_COMPOUNDS + 1))
+    assert "At most" in too_many["error"]
+    assert "Unknown properties" in (await admet_profile.predict_admet_profile("CCO", "logp"))["error"]
+    result = await admet_profile.predict_admet_profile("CCO", "solubility")
+    assert result["compounds"][0]["profile"]["solubility"]["value"] == 30.0
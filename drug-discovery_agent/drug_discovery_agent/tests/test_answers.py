@@ -0,0 +1,47 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Test cases for parsing TxGemma's answers."""
+
+import pytest
+
+from drug_discovery_agent.screening.answers import parse_choice, parse_score
+from drug_discovery_agent.screening.properties import PROPERTIES
+from drug_discovery_agent.specialists.compound_analyzer.tools.predict_toxicity import parse_clintox
+
+
+@pytest.mark.parametrize("answer, expected", [
+    ("(A)", False),
+    ("B", True),
+    ("(B) Has a toxicity risk. A compound with this scaffold was withdrawn.", True),
+    ("A compound like this one is likely (B) toxic.", True),
+    ("(A) does not cross the BBB", False),
+    ("The answer is (B) crosses the BBB", True),
+    ("Answer: A", False),
+    ("I cannot tell.", None),
+])
+def test_choice_answers(answer, expected):
+    assert parse_choice(answer) is expected
+    assert parse_clintox(answer) is expected
+
+
+def test_every_yes_no_property_uses_the_choice_parser():
+    for prop in PROPERTIES.values():
+        if prop.labels:
+            assert prop.parse is parse_choice, prop.task
+
+
+def test_score_answers():
+    assert parse_score("Solubility: 412") == 412.0
+    assert parse_score("no number") is None
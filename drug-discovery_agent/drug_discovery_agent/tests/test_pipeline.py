@@ -0,0 +1,142 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Test cases for the screening pipeline with online predictions from a stand-in endpoint."""
+
+import asyncio
+import glob
+import os
+import threading
+import time
+from types import SimpleNamespace
+
+import pyarrow.dataset as ds
+import pytest
+
+from drug_discovery_agent.screening import descriptors, pipeline
+from drug_discovery_agent.specialists.compound_analyzer.tools import screen_library
+
+pytest_plugins = ("pytest_asyncio",)
+
+# Fails the Rule of 5 (MW > 500 and cLogP > 5).
+GREASE = "C" * 40 + "C(=O)O"
+
+
+class StandInEndpoint:
+    """Answers (B) to toxicity prompts and (A) to everything else."""
+
+    def __init__(self):
+        self.requests = 0
+        self.instances = 0
+        self._lock = threading.Lock()
+
+    def predict(self, instances, timeout=None):
+        with self._lock:
+            self.requests += 1
+            self.instances += len(instances)
+        return SimpleNamespace(predictions=["(B)" if "toxicity" in i["prompt"] else "(A)" for i in instances])
+
+
+@pytest.fixture
+def screen(tmp_path, monkeypatch, library, cache):
+    """Writes a .smi library (the synthetic compounds, one invalid line and one greasy
+    compound) and returns a run_screen bound to it, a stand-in endpoint and the cache."""
+    # Identification would ask PubChem; the generated compounds are unknown there anyway.
+    monkeypatch.setattr(pipeline, "lookup_compound", lambda smiles: None)
+    path = tmp_path / "library.smi"
+    lines = [f"{smiles} compound-{i}" for i, (smiles, _) in enumerate(library[:40])]
+    lines += ["not_a_smiles broken", f"{GREASE} grease"]
+    path.write_text("\n".join(lines) + "\n")
+    endpoint = StandInEndpoint()
+
+    async def run(output_dir: str = str(tmp_path / "out"), **kwargs):
+        kwargs = {"endpoint": endpoint, "cache": cache, "use_surrogates": False, "flush_rows": 8,
+                  "prefilter": "lipinski=reject,pains=flag", **kwargs}
+        return await asyncio.wait_for(pipeline.run_screen(str(path), output_dir, **kwargs), 30)
+
+    run.endpoint = endpoint
+    return run
+
+
+def read_rows(output_dir: str) -> list:
+    parts = glob.glob(os.path.join(output_dir, "part-*.parquet"))
+    return sorted(ds.dataset(parts, format="parquet").to_table().to_pylist(), key=lambda row: row["id"])
+
+
+async def test_screen_writes_predictions_and_filters_before_the_endpoint(screen, tmp_path):
+    saved = descriptors.prefilter_stats()["total"]
+    summary = await screen()
+
+    assert summary["complete"]
+    assert summary["counts"] == {"read": 42, "skipped": 0, "ok": 40, "unresolved": 0, "invalid": 1,
+                                 "filtered": 1, "error": 0, "deferred": 0}
+    rows = read_rows(str(tmp_path / "out"))
+    assert len(rows) == summary["rows_written"] == 42
+    ok = [row for row in rows if row["status"] == "ok"]
+    assert all(row["toxic"] is True and row["crosses_bbb"] is False for row in ok)
+    assert all(row["toxic_source"] == "endpoint" and row["mw"] > 0 for row in ok)
+
+    (grease,) = [row for row in rows if row["name"] == "grease"]
+    assert grease["status"] == "filtered" and grease["toxic"] is None and "lipinski" in grease["flags"]
+    # One multi-instance request per compound that passed; none for the filtered one.
+    assert summary["endpoint_calls"] == screen.endpoint.requests == 40
+    assert screen.endpoint.instances == 80 and summary["endpoint_calls_saved"] == 1
+    assert descriptors.prefilter_stats()["total"] == saved + 1
+
+
+async def test_interrupted_screen_resumes_without_repeating_work(screen, tmp_path):
+    first = await screen(limit=20)
+    assert first["counts"]["read"] == 20 and screen.endpoint.requests == 20
+
+    second = await screen()
+    assert second["counts"]["skipped"] == 20 and second["counts"]["read"] == 42
+    assert screen.endpoint.requests == 40
+    rows = read_rows(str(tmp_path / "out"))
+    assert [row["id"] for row in rows] == list(range(42))
+
+
+async def test_a_failing_sink_fails_the_screen_and_resume_recovers(screen, tmp_path, monkeypatch):
+    write = pipeline.ParquetSink.write
+
+    def disk_full(self, records):
+        raise OSError("No space left on device")
+
+    monkeypatch.setattr(pipeline.ParquetSink, "write", disk_full)
+    start = time.monotonic()
+    with pytest.raises(OSError, match="No space left"):
+        await screen()
+    # The writer's error ends the screen; it does not wait on the queues until a timeout.
+    assert time.monotonic() - start < 10
+
+    monkeypatch.setattr(pipeline.ParquetSink, "write", write)
+    summary = await screen()
+    assert summary["complete"]
+    rows = read_rows(str(tmp_path / "out"))
+    assert [row["id"] for row in rows] == list(range(42))
+    # Compounds predicted before the failure were checkpointed and are not asked again.
+    assert screen.endpoint.requests == 40
+
+
+async def test_tool_reports_errors_and_deferred_compounds(tmp_path, monkeypatch):
+    counts = {"read": 10, "skipped": 0, "ok": 6, "unresolved": 0, "invalid": 0,
+              "filtered": 0, "error": 1, "deferred": 3}
+
+    async def incomplete(*args):
+        return {"complete": False, "counts": counts, "endpoint_calls_saved": 0, "throughput_per_min": 60.0}
+
+    monkeypatch.setattr(screen_library, "_screen", incomplete)
+    path = tmp_path / "library.smi"
+    path.write_text("CCO ethanol\n")
+    message = await screen_library.screen_compound_library(str(path))
+    assert message.startswith("Screen finished with 1 errors and 3 compounds awaiting a batch job")
@@ -0,0 +1,53 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Test cases for the prediction cache, including re-parsing stored answers before training."""
+
+from drug_discovery_agent.screening import surrogate
+from drug_discovery_agent.screening.answers import parse_choice
+
+
+def test_put_get_and_items(cache):
+    cache.put_many("bbbp", [("CCO", True, "(B)"), ("CCN", False, "(A)")])
+    cache.put("bbbp", "CCC", True, source="surrogate")
+    assert cache.get_many("bbbp", ["CCO", "CCN", "CCCl"]) == {"CCO": True, "CCN": False}
+    assert sorted(cache.items("bbbp", source="endpoint")) == [("CCN", False), ("CCO", True)]
+    assert cache.predictions_for(["CCO"]) == {"CCO": {"bbbp": True}}
+    assert cache.count("bbbp") == 3 and cache.count() == 3
+
+
+def test_reparse_fixes_labels_and_drops_unreadable_answers(cache):
+    cache.put_many("bbbp", [
+        ("CCO", True, "(A) does not cross the BBB"),  # stored by the old, wrong parser
+        ("CCN", True, "(B) crosses the BBB"),
+        ("CCC", True, "I am not sure about this one."),
+    ])
+    cache.put("bbbp", "CCCl", False, raw="", source="surrogate")
+
+    assert cache.reparse("bbbp", parse_choice) == 2
+    assert cache.get_many("bbbp", ["CCO", "CCN", "CCC", "CCCl"]) == {"CCO": False, "CCN": True, "CCCl": False}
+    assert all(isinstance(value, bool) for _, value in cache.items("bbbp"))
+
+
+def test_training_reparses_and_is_not_blocked_by_an_unreadable_answer(cache, library, tmp_path):
+    entries = [(smiles, not toxic, f"({'B' if toxic else 'A'}) answer. A note.") for smiles, toxic in library]
+    entries.append(("CCCCCCCCCCCCCCCCCCCCCl", True, "No answer."))
+    cache.put_many("clintox", entries)
+
+    meta = surrogate.train("clintox", cache=cache, directory=str(tmp_path), min_examples=40)
+
+    assert meta["examples"] == len(library)
+    assert meta["positive_fraction"] == round(sum(toxic for _, toxic in library) / len(library), 4)
+    assert meta["accuracy"] >= 0.9
+    assert cache.get("clintox", "CCCCCCCCCCCCCCCCCCCCCl") is None
@@ -0,0 +1,135 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Test cases for the packed Tanimoto similarity index, checked against RDKit."""
+
+import os
+
+import numpy as np
+import pytest
+from rdkit import Chem, DataStructs
+
+from drug_discovery_agent.screening import prediction_cache, similarity
+from drug_discovery_agent.screening.fingerprints import _generator
+
+QUERIES = ["CCCCN", "CC(C)CCCO", "CCCCCCCCC(=O)O", "not_a_smiles"]
+
+
+def rdkit_scores(query: str, indexed: list) -> list:
+    """Tanimoto similarities of a query to every indexed compound, by RDKit."""
+    generator = _generator(similarity.MORGAN_RADIUS, similarity.FINGERPRINT_BITS)
+    fingerprints = [generator.GetFingerprint(Chem.MolFromSmiles(s)) for s in indexed]
+    return DataStructs.BulkTanimotoSimilarity(generator.GetFingerprint(Chem.MolFromSmiles(query)), fingerprints)
+
+
+@pytest.fixture
+def smiles(library):
+    return [s for s, _ in library]
+
+
+@pytest.fixture
+def index(tmp_path, smiles):
+    index = similarity.SimilarityIndex(str(tmp_path / "index"))
+    assert index.add(smiles) == len(smiles)
+    return index
+
+
+def test_add_skips_duplicates_and_invalid_smiles(index, smiles):
+    assert index.add(smiles[:10] + ["not_a_smiles", "", smiles[0]]) == 0
+    assert index.add(["CCCCCCCCCCCCCCCCCCCCCCCCCCCCCCCCCCN", "not_a_smiles"]) == 1
+    assert len(index) == len(smiles) + 1
+    assert index.smiles(len(smiles)) == "CCCCCCCCCCCCCCCCCCCCCCCCCCCCCCCCCCN"
+    assert os.path.getsize(os.path.join(index.directory, "fingerprints.u64")) == len(index) * index.words * 8
+
+
+@pytest.mark.parametrize("chunk_rows", [similarity.SEARCH_CHUNK_ROWS, 7, 1])
+def test_top_k_matches_rdkit_across_chunks(index, smiles, monkeypatch, chunk_rows):
+    # Small chunks put the best matches in different chunks, some smaller than k.
+    monkeypatch.setattr(similarity, "SEARCH_CHUNK_ROWS", chunk_rows)
+    k = 5
+    results = index.search(QUERIES, k=k)
+
+    assert results[-1] == []
+    for query, hits in zip(QUERIES[:-1], results):
+        expected = rdkit_scores(query, smiles)
+        assert [score for _, score in hits] == [round(s, 4) for s in sorted(expected, reverse=True)[:k]]
+        for hit, score in hits:
+            assert score == round(expected[smiles.index(hit)], 4)
+    # A query that is itself indexed finds itself first.
+    assert results[0][0] == ("CCCCN", 1.0)
+
+
+def test_min_similarity_and_k_larger_than_the_index(index, smiles):
+    (hits,) = index.search(["CCCCN"], k=len(smiles) + 10, min_similarity=0.3)
+    expected = [s for s in rdkit_scores("CCCCN", smiles) if s >= 0.3]
+    assert len(hits) == len(expected) and all(score >= 0.3 for _, score in hits)
+    assert index.search(["CCCCN"], k=0) == [[]]
+
+
+def test_reopened_index_memory_maps_the_same_rows(index, smiles):
+    before = index.search(QUERIES, k=3)
+    reopened = similarity.SimilarityIndex(index.directory)
+
+    assert len(reopened) == len(smiles)
+    assert reopened.search(QUERIES, k=3) == before
+    assert isinstance(reopened._fingerprints, np.memmap)
+    # Appends are picked up by the next search.
+    assert reopened.add(["Oc1ccccc1"]) == 1
+    assert reopened.search(["Oc1ccccc1"], k=1) == [[("Oc1ccccc1", 1.0)]]
+
+
+def test_rows_written_after_the_last_meta_update_are_truncated(index, smiles):
+    directory = index.directory
+    # A crash mid-append: rows written to the data files, but meta.json not updated.
+    with open(os.path.join(directory, "fingerprints.u64"), "ab") as f:
+        f.write(b"\xff" * (index.words * 8 + 3))
+    with open(os.path.join(directory, "popcounts.u16"), "ab") as f:
+        f.write(b"\x01")
+    with open(os.path.join(directory, "smiles.txt"), "a") as f:
+        f.write("Nc1ccccc1\nc1cc")
+
+    reopened = similarity.SimilarityIndex(directory)
+    assert len(reopened) == len(smiles)
+    assert os.path.getsize(os.path.join(directory, "fingerprints.u64")) == len(smiles) * index.words * 8
+    assert os.path.getsize(os.path.join(directory, "popcounts.u16")) == len(smiles) * 2
+    assert "Nc1ccccc1" not in [hit for hit, _ in reopened.search(["Nc1ccccc1"], k=len(smiles))[0]]
+
+    # The lost compound can be added again, in line with the other files.
+    assert reopened.add(["Nc1ccccc1"]) == 1
+    assert similarity.SimilarityIndex(directory).search(["Nc1ccccc1"], k=1) == [[("Nc1ccccc1", 1.0)]]
+
+
+def test_missing_smiles_rows_are_an_error(index):
+    with open(os.path.join(index.directory, "smiles.txt"), "w") as f:
+        f.write("CCO\n")
+    with pytest.raises(ValueError, match="fewer rows"):
+        similarity.SimilarityIndex(index.directory)
+
+
+def test_sync_adds_only_the_compounds_cached_since_the_last_sync(tmp_path, cache, smiles, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(prediction_cache.time, "time", lambda: now[0])
+    index = similarity.SimilarityIndex(str(tmp_path / "index"))
+
+    cache.put_many("clintox", [(s, True, "(B)") for s in smiles[:30]])
+    cache.put_many("bbbp", [(s, False, "(A)") for s in smiles[:10]])
+    assert index.sync(cache) == 30
+    assert index.sync(cache) == 0
+
+    now[0] += 1
+    cache.put_many("bbbp", [(s, False, "(A)") for s in smiles[20:40]])
+    # Already indexed compounds are skipped; only the ten new ones are added.
+    assert index.sync(cache) == 10
+    assert len(index) == 40 and index.meta["synced_until"] == 1001.0
+    assert similarity.SimilarityIndex(index.directory).meta["synced_until"] == 1001.0
@@ -0,0 +1,106 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Test cases for surrogate models trained on a synthetic prediction cache, with a stand-in endpoint."""
+
+import itertools
+from types import SimpleNamespace
+
+import pytest
+
+from drug_discovery_agent.screening import surrogate
+from drug_discovery_agent.specialists.compound_analyzer.tools import predict_toxicity
+
+from conftest import synthetic_library
+
+THRESHOLD = 0.8
+
+
+class StandInEndpoint:
+    """Answers ClinTox prompts by the synthetic rule: amines and amides are toxic."""
+
+    def __init__(self, labels: dict):
+        self.labels = labels
+        self.calls = 0
+
+    def predict(self, instances, timeout=None):
+        self.calls += 1
+        answers = []
+        for instance in instances:
+            smiles = instance["prompt"].rsplit("Drug SMILES: ", 1)[1]
+            answers.append("(B) Has a toxicity risk" if self.labels[smiles] else "(A) No toxicity risk")
+        return SimpleNamespace(predictions=answers)
+
+
+@pytest.fixture
+def trained(tmp_path, cache):
+    """A clintox surrogate trained on 120 cached endpoint answers; returns (Surrogates, new compounds)."""
+    compounds = synthetic_library(200)
+    seen, unseen = compounds[:120], compounds[120:]
+    cache.put_many("clintox", [(smiles, toxic, f"({'B' if toxic else 'A'})") for smiles, toxic in seen])
+    meta = surrogate.train("clintox", cache=cache, directory=str(tmp_path), min_examples=40, threshold=THRESHOLD)
+    assert meta["examples"] == 120 and meta["accuracy"] >= 0.9
+    return surrogate.Surrogates(directory=str(tmp_path), threshold=THRESHOLD, audit_rate=0.25), unseen
+
+
+def test_untrained_task_defers_to_the_endpoint(trained):
+    surrogates, unseen = trained
+    assert surrogates.predict("bbbp", unseen[0][0]) == (None, False)
+    assert surrogates.report() == {}
+
+
+def test_confident_guesses_are_served_and_a_sample_is_audited(trained, monkeypatch):
+    surrogates, unseen = trained
+    # Every fourth confident guess falls under the audit rate.
+    draws = itertools.cycle([0.1, 0.5, 0.9, 0.6])
+    monkeypatch.setattr(surrogate.random, "random", lambda: next(draws))
+    endpoint = StandInEndpoint(dict(unseen))
+
+    served = confident = 0
+    for smiles, toxic in unseen:
+        guess, serve = surrogates.predict("clintox", smiles)
+        confident += guess[1] >= THRESHOLD
+        if serve:
+            served += 1
+            assert guess[0] == toxic
+            continue
+        answer = endpoint.predict([{"prompt": predict_toxicity.clintox_prompt(smiles)}]).predictions[0]
+        surrogates.compare("clintox", guess, predict_toxicity.parse_clintox(answer))
+
+    report = surrogates.report()["clintox"]
+    assert served > len(unseen) / 2
+    assert report["served"] == served and report["deferred"] == len(unseen) - served
+    assert report["audits"] == confident - served == endpoint.calls - report["deferred_comparisons"]
+    assert report["agreement_rate"] == 1.0
+    assert report["endpoint_calls_avoided_fraction"] == round(served / len(unseen), 4)
+    assert endpoint.calls == len(unseen) - served
+
+
+def test_tool_serves_a_confident_surrogate_answer_without_the_endpoint(trained, cache, monkeypatch):
+    surrogates, unseen = trained
+    endpoint = StandInEndpoint(dict(unseen))
+    monkeypatch.setattr(surrogates, "audit_rate", 0.0)
+    monkeypatch.setattr(predict_toxicity, "default_surrogates", lambda: surrogates)
+    monkeypatch.setattr(predict_toxicity, "txgemma_endpoint", lambda: endpoint)
+    monkeypatch.setattr(predict_toxicity, "default_cache", lambda: cache)
+
+    smiles = next(s for s, _ in unseen if surrogates.guess("clintox", s)[1] >= THRESHOLD)
+    answer = predict_toxicity.predict_clinical_toxicity(smiles)
+    assert "surrogate model, confidence" in answer and endpoint.calls == 0
+
+    monkeypatch.setattr(surrogates, "threshold", 1.01)
+    answer = predict_toxicity.predict_clinical_toxicity(smiles)
+    assert "surrogate model" not in answer and endpoint.calls == 1
+    # The endpoint's answer is cached as new training data.
+    assert cache.get("clintox", smiles) == dict(unseen)[smiles]
@@ -0,0 +1,174 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Coordinator topology helpers.
+
+* "hierarchical": every specialist is wrapped in an `AgentTool`, so each call
+  runs a full sub-agent LLM loop with its own prompt.
+* "direct": the coordinator calls the specialists' leaf function tools itself.
+  Tools are namespaced as `<specialist>__<tool>`, and their docs, with a short
+  usage note per specialist, are merged into the coordinator instruction.
+  Specialists that need a code executor stay wrapped, since their tools cannot
+  run without it.
+
+Either way, every sub-agent and tool call runs under its share of the
+invocation deadline (see deadline.py).
+"""
+
+import functools
+import inspect
+import os
+
+from google.adk.tools import FunctionTool
+from google.adk.tools.agent_tool import AgentTool
+
+from .deadline import AGENT_BUDGET_SHARE, budgeted_tool
+
+HIERARCHICAL = "hierarchical"
+DIRECT = "direct"
+TOPOLOGIES = (HIERARCHICAL, DIRECT)
+
+# Selected per deployment (see deployment/deploy.py).
+TOPOLOGY = os.getenv("AGENT_TOPOLOGY", HIERARCHICAL)
+
+
+def _check(topology: str) -> str:
+    if topology not in TOPOLOGIES:
+        raise ValueError(f"Unknown topology '{topology}'. Expected one of {TOPOLOGIES}.")
+    return topology
+
+
+def _leaf_function(tool):
+    """Returns the plain Python callable behind a specialist tool entry."""
+    func = tool.func if isinstance(tool, FunctionTool) else tool
+    return getattr(func, "budgeted", func)
+
+
+def _is_flattenable(agent) -> bool:
+    if getattr(agent, "code_executor", None) is not None:
+        return False
+    return all(callable(_leaf_function(t)) for t in agent.tools)
+
+
+def namespaced_tool(namespace: str, func):
+    """Wraps `func` so the model sees it as `<namespace>__<name>`."""
+    if inspect.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            return await func(*args, **kwargs)
+    else:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            return func(*args, **kwargs)
+
+    wrapper.__name__ = f"{namespace}__{func.__name__}"
+    wrapper.__qualname__ = wrapper.__name__
+    return wrapper
+
+
+class BudgetedAgentTool(AgentTool):
+    """An AgentTool whose sub-agent runs get AGENT_BUDGET_SHARE of the time left."""
+
+    async def run_async(self, *, args, tool_context):
+        run = budgeted_tool(super().run_async, name=self.name, share=AGENT_BUDGET_SHARE)
+        return await run(args=args, tool_context=tool_context)
+
+
+def _budgeted(tool):
+    if type(tool) is FunctionTool:
+        return FunctionTool(budgeted_tool(tool.func))
+    if callable(tool):
+        return budgeted_tool(tool)
+    return tool
+
+
+def budget_agent_tools(agent):
+    """A copy of the agent whose function tools each run under their share of the deadline.
+
+    The specialists are module-level singletons shared by every coordinator
+    built, so they are copied rather than changed.
+    """
+    return agent.model_copy(update={"tools": [_budgeted(tool) for tool in agent.tools]})
+
+
+def coordinator_tools(specialists: list, topology: str = TOPOLOGY) -> list:
+    """Builds the coordinator's tool list for the given topology."""
+    if _check(topology) == HIERARCHICAL:
+        return [BudgetedAgentTool(agent=budget_agent_tools(s)) for s in specialists]
+
+    tools = []
+    for specialist in specialists:
+        if not _is_flattenable(specialist):
+            tools.append(BudgetedAgentTool(agent=budget_agent_tools(specialist)))
+            continue
+        for tool in specialist.tools:
+            tools.append(budgeted_tool(namespaced_tool(specialist.name, _leaf_function(tool))))
+    return tools
+
+
+def merged_tool_docs(specialists: list, usage_notes: dict = None) -> str:
+    """Renders the specialists' tool docs, and a short usage note per specialist, for a flat coordinator.
+
+    The specialists' own instructions are left out: their answer-format rules
+    are meant for a sub-agent, not for the coordinator writing the final answer.
+    """
+    usage_notes = usage_notes or {}
+    sections = []
+    for specialist in specialists:
+        if not _is_flattenable(specialist):
+            continue
+        header = f"**{specialist.name}**"
+        if specialist.description:
+            header += f" ({specialist.description})"
+        lines = [header]
+        for tool in specialist.tools:
+            func = _leaf_function(tool)
+            doc = _tool_doc(func)
+            lines.append(f"* `{specialist.name}__{func.__name__}`: {doc}")
+        if usage_notes.get(specialist.name):
+            lines.append(f"Usage: {usage_notes[specialist.name]}")
+        sections.append("\n".join(lines))
+    return "\n\n".join(sections)
+
+
+def _tool_doc(func) -> str:
+    """A tool's description and Args section, without its Returns/Raises sections."""
+    doc = inspect.getdoc(func) or ""
+    kept = []
+    for line in doc.splitlines():
+        if line.strip() in ("Returns:", "Raises:", "Yields:"):
+            break
+        kept.append(line)
+    return "\n  ".join(line for line in kept if line.strip())
+
+
+def coordinator_instruction(
+    base_prompt: str, specialists: list, topology: str = TOPOLOGY, usage_notes: dict = None
+) -> str:
+    """Returns the coordinator instruction, with merged tool docs in direct mode.
+
+    Args:
+        usage_notes: Short note per specialist name on how to use its tools.
+    """
+    if _check(topology) == HIERARCHICAL:
+        return base_prompt
+    return (
+        f"{base_prompt}\n\n"
+        "**Direct Tools:**\n"
+        "The specialists above are exposed as direct tools named "
+        "`<specialist>__<tool>`. Call them yourself, following the usage "
+        "notes, and write the final answer as your own instructions say.\n\n"
+        f"{merged_tool_docs(specialists, usage_notes)}\n"
+    )
@@ -0,0 +1,48 @@
+"""
+Measures time-to-first-byte of DrugDiscoveryApp.stream_query with a local runner.
+
+Usage: python measure_ttfb.py "List my VMs in us-central1-a"
+"""
+
+import asyncio
+import os
+import sys
+import time
+
+from dotenv import load_dotenv
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "deployment"))
+from deploy import DrugDiscoveryApp  # noqa: E402
+
+
+async def main(query: str):
+    app = DrugDiscoveryApp(os.getenv("GOOGLE_CLOUD_PROJECT"), os.getenv("SERPAPI_API_KEY"))
+
+    start = time.perf_counter()
+    first_item_at = None
+    streamed = False
+    async for item in app.stream_query(input=query):
+        now = time.perf_counter() - start
+        if first_item_at is None:
+            first_item_at = now
+        if item["type"] == "text":
+            # Complete turns repeat the partial chunks; print them only if nothing was streamed.
+            if item["partial"] or not streamed:
+                print(item["text"], end="", flush=True)
+            streamed = item["partial"]
+        elif item["type"] == "tool_text":
+            print(item["text"], end="", flush=True)
+        elif item["type"] in ("tool_call_start", "tool_call_finish"):
+            print(f"\n[{now:6.2f}s] {item['type']}: {item['name']}")
+        elif item["type"] in ("error", "usage"):
+            print(f"\n[{now:6.2f}s] {item}")
+
+    print(f"\n⏱️  First stream item: {first_item_at:.2f}s")
+
+
+if __name__ == "__main__":
+    load_dotenv()
+    if len(sys.argv) < 2:
+        print('Usage: python measure_ttfb.py "<QUERY>"')
+        sys.exit(1)
+    asyncio.run(main(sys.argv[1]))
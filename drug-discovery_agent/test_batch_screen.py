@@ -0,0 +1,81 @@
+# test_batch_screen.py
+"""
+Screens a generated library in batch mode with the local batch backend and a
+stand-in TxGemma endpoint (no GCP or PubChem needed).
+
+Checks that every compound ends up with predictions from one batch job, that
+the answers land in the prediction cache, and that a re-run needs no job.
+
+Usage: python test_batch_screen.py [--compounds 60]
+"""
+import argparse
+import asyncio
+import glob
+import os
+import tempfile
+from types import SimpleNamespace
+
+import pyarrow.dataset as ds
+
+from drug_discovery_agent.screening import pipeline
+from drug_discovery_agent.screening.batch import LocalBatchJobs, LocalStorage, run_batch_screen
+from drug_discovery_agent.screening.prediction_cache import PredictionCache
+
+
+class StandInEndpoint:
+    """Answers (B) to toxicity prompts and (A) to everything else."""
+
+    def __init__(self):
+        self.requests = 0
+        self.instances = 0
+
+    def predict(self, instances, timeout=None):
+        self.requests += 1
+        self.instances += len(instances)
+        return SimpleNamespace(predictions=["(B)" if "toxicity" in i["prompt"] else "(A)" for i in instances])
+
+
+def write_library(path: str, compounds: int):
+    # Straight-chain alcohols, amines and acids: valid, distinct and drug-like enough to pass the pre-filter.
+    smiles = [f"{'C' * n}{group}" for n in range(1, compounds) for group in ("O", "N", "C(=O)O")][:compounds]
+    with open(path, "w") as f:
+        for i, s in enumerate(smiles):
+            f.write(f"{s} compound-{i}\n")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--compounds", type=int, default=60)
+    args = parser.parse_args()
+    # The generated compounds are not looked up in PubChem; unknown compounds are still predicted.
+    pipeline.lookup_compound = lambda smiles: None
+
+    with tempfile.TemporaryDirectory() as tmp:
+        library = os.path.join(tmp, "library.smi")
+        output_dir = os.path.join(tmp, "screen")
+        write_library(library, args.compounds)
+        cache = PredictionCache(os.path.join(tmp, "predictions.sqlite"))
+        endpoint = StandInEndpoint()
+        storage, jobs = LocalStorage(os.path.join(tmp, "batch")), LocalBatchJobs(endpoint)
+
+        summary = await run_batch_screen(library, output_dir, storage=storage, jobs=jobs, cache=cache,
+                                         poll_seconds=0.2, prefilter="none", use_surrogates=False)
+        print(f"counts: {summary['counts']}")
+        print(f"batch:  {summary['batch']}")
+        print(f"stand-in endpoint: {endpoint.requests} requests, {endpoint.instances} instances; "
+              f"online calls during the screen: {summary['endpoint_calls']}")
+        parts = glob.glob(os.path.join(output_dir, "part-*.parquet"))
+        rows = ds.dataset(parts, format="parquet").to_table().to_pylist()
+        assert summary["complete"] and len(rows) == args.compounds
+        assert all(row["toxic"] is True and row["crosses_bbb"] is False for row in rows)
+        assert summary["batch"]["imported"] == 2 * args.compounds and summary["endpoint_calls"] == 0
+        assert cache.count() == 2 * args.compounds
+
+        rerun = await run_batch_screen(library, os.path.join(tmp, "rescreen"), storage=storage, jobs=jobs,
+                                       cache=cache, poll_seconds=0.2, prefilter="none", use_surrogates=False)
+        assert rerun["batch"]["instances"] == 0 and rerun["cache_hits"] == 2 * args.compounds
+        print("✅ Batch screen answered every compound with one job; the re-run was served from the cache.")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
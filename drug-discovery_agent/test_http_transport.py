@@ -0,0 +1,120 @@
+# test_http_transport.py
+"""
+Exercises the shared HTTP transport against a local stand-in REST server (no
+network needed).
+
+Checks that sequential calls reuse one keep-alive connection where a fresh
+client per call (like a bare `requests.get`) opens one per call, that gzip
+answers are decoded, that 503 answers are retried until they succeed, and that
+`transport_stats()` reports the host.
+
+Usage: python test_http_transport.py [--requests 50]
+"""
+import argparse
+import gzip
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+
+from drug_discovery_agent.http_transport import Transport
+
+
+class StandInServer(BaseHTTPRequestHandler):
+    """Answers gzip-compressed JSON; /flaky answers 503 to the first two calls of each query."""
+
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    connections = 0
+    failures = {}
+    lock = threading.Lock()
+
+    def setup(self):
+        super().setup()
+        with StandInServer.lock:
+            StandInServer.connections += 1
+
+    def do_GET(self):
+        if self.path.startswith("/flaky"):
+            with StandInServer.lock:
+                failures = StandInServer.failures[self.path] = StandInServer.failures.get(self.path, 0) + 1
+            if failures <= 2:
+                self.send_response(503)
+                self.send_header("Retry-After", "0")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+        body = json.dumps({"path": self.path, "results": ["aspirin"] * 200}).encode()
+        if "gzip" in self.headers.get("Accept-Encoding", ""):
+            body = gzip.compress(body)
+            self.send_response(200)
+            self.send_header("Content-Encoding", "gzip")
+        else:
+            self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def timed(fn, requests: int) -> float:
+    start = time.monotonic()
+    for i in range(requests):
+        fn(i)
+    return (time.monotonic() - start) / requests
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=50)
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandInServer)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_port}"
+
+    def fresh_client(i):
+        with httpx.Client() as client:
+            client.get(f"{base}/search?q={i}").raise_for_status()
+
+    StandInServer.connections = 0
+    fresh_latency = timed(fresh_client, args.requests)
+    fresh_connections = StandInServer.connections
+
+    transport = Transport(backoff_base_s=0.01)
+
+    def shared(i):
+        response = transport.request("GET", f"{base}/search?q={i}")
+        response.raise_for_status()
+        assert response.json()["path"] == f"/search?q={i}"
+        assert response.headers["Content-Encoding"] == "gzip"
+
+    StandInServer.connections = 0
+    shared_latency = timed(shared, args.requests)
+    shared_connections = StandInServer.connections
+
+    print(f"fresh client per call: {fresh_connections} connections, {fresh_latency * 1000:.2f} ms/request")
+    print(f"shared transport:      {shared_connections} connections, {shared_latency * 1000:.2f} ms/request")
+    assert fresh_connections == args.requests
+    assert shared_connections == 1
+
+    response = transport.request("GET", f"{base}/flaky?q=caffeine")
+    assert response.status_code == 200 and response.json()["path"] == "/flaky?q=caffeine"
+
+    stats = transport.stats()["127.0.0.1"]
+    print(json.dumps(stats, indent=2))
+    assert stats["requests"] == args.requests + 1 and stats["retries"] == 2
+    assert stats["statuses"] == {"2xx": args.requests + 1, "5xx": 2}
+
+    transport.close()
+    server.shutdown()
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+# test_mcp_batch.py
+"""
+Runs McpClientCache.run_batch against a local stub MCP server (no GCP needed).
+
+Usage: python test_mcp_batch.py
+(The script re-launches itself with --serve as the stdio MCP server.)
+"""
+import asyncio
+import sys
+import time
+
+SLOW_ZONE = "us-west1-b"
+
+
+def serve():
+    from mcp.server.fastmcp import FastMCP
+
+    server = FastMCP("stub-compute")
+
+    @server.tool(name="compute.instances.list")
+    async def list_instances(zone: str) -> dict:
+        # Every call takes 1s; one zone hangs to exercise the per-call timeout.
+        await asyncio.sleep(10 if zone == SLOW_ZONE else 1)
+        return {"zone": zone, "items": [{"name": f"vm-{zone}-1"}]}
+
+    @server.tool(name="list_node_pools")
+    async def list_node_pools(parent: str) -> dict:
+        await asyncio.sleep(1)
+        return {"nodePools": [{"name": "default-pool", "parent": parent}]}
+
+    server.run("stdio")
+
+
+async def main():
+    from google.adk.tools.mcp_tool.mcp_session_manager import StdioConnectionParams
+    from google.adk.tools.mcp_tool.mcp_toolset import McpToolset
+    from mcp import StdioServerParameters
+
+    from drug_discovery_agent.specialists.infrastructure_specialist.tools.mcp_client import McpClientCache
+
+    def stub_toolset(service, server_name):
+        return McpToolset(connection_params=StdioConnectionParams(
+            server_params=StdioServerParameters(command=sys.executable, args=[__file__, "--serve"]),
+            timeout=30,
+        ))
+
+    clients = McpClientCache("local", {"compute": "stub", "gke": "stub"}, toolset_factory=stub_toolset)
+    try:
+        await check_batch(clients)
+    finally:
+        # Stops the stub servers before the event loop goes away.
+        await clients.aclose()
+    assert clients._entries == {}
+
+
+async def check_batch(clients):
+    print(f"🔥 Warm-up: {await clients.warm_up()}")
+
+    zones = ["us-central1-a", "us-central1-b", "us-east1-b", "europe-west1-b", SLOW_ZONE]
+    invocations = [{"service": "compute", "tool_name": "compute.instances.list", "arguments": {"zone": z}}
+                   for z in zones]
+    invocations.append({"service": "gke", "tool_name": "list_node_pools",
+                        "arguments": {"parent": "projects/p/locations/us-central1/clusters/c"}})
+    invocations.append({"service": "gke", "tool_name": "no_such_tool"})
+
+    start = time.perf_counter()
+    results = await clients.run_batch(invocations, max_concurrency=4, timeout_seconds=3)
+    elapsed = time.perf_counter() - start
+
+    for item in results:
+        status = "❌ " + item["error"] if "error" in item else "✅"
+        print(f"[{item['index']}] {item['tool_name']} ({item['elapsed_s']}s) {status}")
+    print(f"\n⏱️  {len(invocations)} calls in {elapsed:.2f}s (sequential would take ~{len(zones) + 1 + 10}s)")
+
+    assert [item["index"] for item in results] == list(range(len(invocations)))
+    assert "Timed out" in results[len(zones) - 1]["error"]
+    assert "not found" in results[-1]["error"]
+
+    # Repeated read-only calls are served from the read cache, with their age.
+    again = await clients.run("compute", "compute.instances.list", {"zone": zones[0]})
+    print(f"\n♻️  Repeat list: cached={again['cached']} age={again['cache_age_seconds']}s")
+    assert again["cached"]
+
+
+if __name__ == "__main__":
+    if "--serve" in sys.argv:
+        serve()
+    else:
+        asyncio.run(main())
@@ -0,0 +1,122 @@
+# test_scheduler.py
+"""
+Exercises the local Slurm-compatible scheduler with short shell jobs (no
+cluster needed).
+
+Checks EASY backfill (a short job may run ahead of a blocked job, a long one
+may not), that `%N` array throttling caps the running tasks, that
+cancelling a job kills its tasks and releases their CPU slots to the next job,
+and that jobs get only the allow-listed environment and scripts from the jobs
+directory.
+
+Usage: python test_scheduler.py
+"""
+import os
+import tempfile
+import time
+
+from drug_discovery_agent.specialists.infrastructure_specialist.tools.scheduler import (
+    CANCELLED,
+    COMPLETED,
+    TERMINAL_STATES,
+    LocalSchedulerBackend,
+)
+
+
+def wait(backend, job_id: str, timeout_s: float = 30) -> dict:
+    deadline = time.time() + timeout_s
+    while time.time() < deadline:
+        status = backend.status(job_id)
+        if status["state"] in TERMINAL_STATES:
+            return status
+        time.sleep(0.05)
+    raise TimeoutError(f"job {job_id} did not finish: {backend.status(job_id)}")
+
+
+def spans(backend, job_id: str) -> list:
+    """(start, end) of each task of a finished job."""
+    job = backend._jobs[int(job_id)]
+    return [(t.started_at, t.ended_at) for t in job.tasks]
+
+
+def check_backfill(backend):
+    running = backend.submit("local", "sleep 1", cpus_per_task=3, time_limit_minutes=10)
+    time.sleep(0.3)
+    blocked = backend.submit("local", "sleep 0.3", cpus_per_task=4, time_limit_minutes=10)
+    long_job = backend.submit("local", "sleep 0.3", cpus_per_task=1, time_limit_minutes=20)
+    short_job = backend.submit("local", "sleep 0.3", cpus_per_task=1, time_limit_minutes=5)
+    for job_id in (running, blocked, long_job, short_job):
+        assert wait(backend, job_id)["state"] == COMPLETED
+
+    (blocked_span,), (long_span,), (short_span,) = (spans(backend, j) for j in (blocked, long_job, short_job))
+    # The short job ends before the blocked job's reservation, so it backfills the free slot.
+    assert short_span[0] < blocked_span[0]
+    # The long job would delay the blocked job, so it waits behind it.
+    assert long_span[0] >= blocked_span[0]
+    print(f"backfill: short job started {blocked_span[0] - short_span[0]:.2f}s before the blocked job; "
+          f"long job waited for it")
+
+
+def check_array_throttling(backend):
+    job_id = backend.submit("local", "sleep 0.3", cpus_per_task=1, array="0-5%2")
+    status = wait(backend, job_id)
+    assert status["state"] == COMPLETED and status["tasks"] == {COMPLETED: 6}
+    events = sorted([(start, 1) for start, _ in spans(backend, job_id)] +
+                    [(end, -1) for _, end in spans(backend, job_id)], key=lambda e: (e[0], e[1]))
+    running = peak = 0
+    for _, delta in events:
+        running += delta
+        peak = max(peak, running)
+    assert peak == 2, peak
+    print(f"array throttling: 6 tasks, at most {peak} running")
+
+
+def check_cancel_releases_slots(backend):
+    hog = backend.submit("local", "sleep 30", cpus_per_task=4, array="0-1")
+    time.sleep(0.3)
+    assert backend.utilization()["used_cpus"] == 4
+    waiting = backend.submit("local", "echo done", cpus_per_task=2)
+    assert backend.status(waiting)["state"] == "PENDING"
+
+    status = backend.cancel(hog)
+    assert status["state"] == CANCELLED and status["tasks"] == {CANCELLED: 2}
+    assert wait(backend, waiting, timeout_s=5)["state"] == COMPLETED
+    assert wait(backend, hog)["state"] == CANCELLED
+    time.sleep(0.3)
+    assert backend.utilization() == {"used_cpus": 0, "total_cpus": 4, "pending_tasks": 0}
+    print("cancel: tasks killed, slots released to the waiting job")
+
+
+def check_environment_and_script_paths(backend):
+    os.environ["TXGEMMA_API_KEY"] = "secret"
+    with open(os.path.join(backend.jobs_dir, "dump_env.sh"), "w") as f:
+        f.write("#!/bin/bash\nenv > $RESULT_DIR/env.txt\n")
+    job_id = backend.submit("local", "sbatch dump_env.sh")
+    assert wait(backend, job_id)["state"] == COMPLETED
+    with open(os.path.join(backend.root, job_id, "results", "env.txt")) as f:
+        names = {line.split("=", 1)[0] for line in f.read().splitlines()}
+    assert "TXGEMMA_API_KEY" not in names and {"PATH", "SLURM_JOB_ID", "RESULT_DIR"} <= names, names
+
+    # Host files outside the jobs directory are not read as scripts.
+    for path in ("/etc/hostname", os.path.relpath("/etc/hostname", backend.jobs_dir), os.path.abspath(__file__)):
+        try:
+            backend.submit("local", path)
+        except PermissionError:
+            continue
+        raise AssertionError(f"{path} was read as a job script")
+    print("environment: secrets not passed to jobs; scripts only read from the jobs directory")
+
+
+def main():
+    with tempfile.TemporaryDirectory() as root:
+        backend = LocalSchedulerBackend(root=root, total_cpus=4, poll_interval=0.05,
+                                        jobs_dir=os.path.join(root, "scripts"))
+        check_backfill(backend)
+        check_array_throttling(backend)
+        check_cancel_releases_slots(backend)
+        check_environment_and_script_paths(backend)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+# test_sessions.py
+"""
+Exercises the SQLite session service locally (no GCP needed).
+
+Checks that events and state survive a round trip through a fresh service,
+that appending through a truncated session copy (get_session with
+num_recent_events) neither overwrites stored events nor leaves a truncated
+session in the hot cache, that evicted sessions are reloaded from disk, and
+that app-, user- and session-scoped state deltas are persisted.
+
+Usage: python test_sessions.py
+"""
+import asyncio
+import os
+import tempfile
+
+from google.adk.events import Event, EventActions
+from google.adk.sessions.base_session_service import GetSessionConfig
+from google.genai import types
+
+from drug_discovery_agent.sessions import SqliteSessionService
+
+APP = "drug_discovery_app"
+USER = "chemist"
+
+
+def event(text: str, state_delta: dict = None) -> Event:
+    return Event(
+        author="user",
+        content=types.Content(role="user", parts=[types.Part(text=text)]),
+        actions=EventActions(state_delta=state_delta or {}),
+    )
+
+
+def texts(session) -> list:
+    return [e.content.parts[0].text for e in session.events]
+
+
+async def main():
+    db_path = os.path.join(tempfile.mkdtemp(), "sessions.db")
+    service = SqliteSessionService(db_path, max_hot_sessions=1)
+
+    session = await service.create_session(app_name=APP, user_id=USER, session_id="s1", state={"target": "EGFR"})
+    for i in range(3):
+        await service.append_event(session, event(f"turn {i}", {"turn": i, "user:units": "nM", "app:model": "txgemma"}))
+
+    # Appending through a truncated copy must not reuse an existing sequence number.
+    recent = await service.get_session(app_name=APP, user_id=USER, session_id="s1",
+                                       config=GetSessionConfig(num_recent_events=1))
+    assert texts(recent) == ["turn 2"]
+    await service.append_event(recent, event("turn 3", {"turn": 3}))
+    session = await service.get_session(app_name=APP, user_id=USER, session_id="s1")
+    assert texts(session) == ["turn 0", "turn 1", "turn 2", "turn 3"], texts(session)
+
+    # A second session evicts the first (max_hot_sessions=1); it is reloaded from disk.
+    other = await service.create_session(app_name=APP, user_id=USER, session_id="s2")
+    await service.append_event(other, event("other turn"))
+    assert service.stats()["evictions"] >= 1
+    cold_loads = service.stats()["cold_loads"]
+    session = await service.get_session(app_name=APP, user_id=USER, session_id="s1")
+    assert service.stats()["cold_loads"] == cold_loads + 1
+    assert texts(session) == ["turn 0", "turn 1", "turn 2", "turn 3"]
+    await service.append_event(session, event("turn 4", {"turn": 4}))
+
+    # Everything survives a fresh service on the same database.
+    reopened = SqliteSessionService(db_path)
+    session = await reopened.get_session(app_name=APP, user_id=USER, session_id="s1")
+    assert texts(session) == ["turn 0", "turn 1", "turn 2", "turn 3", "turn 4"]
+    assert session.state == {"target": "EGFR", "turn": 4, "user:units": "nM", "app:model": "txgemma"}, session.state
+    other = await reopened.get_session(app_name=APP, user_id=USER, session_id="s2")
+    assert texts(other) == ["other turn"]
+    assert other.state == {"user:units": "nM", "app:model": "txgemma"}, other.state
+
+    listed = await reopened.list_sessions(app_name=APP, user_id=USER)
+    assert sorted(s.id for s in listed.sessions) == ["s1", "s2"]
+    print(reopened.stats())
+    print("OK")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -14,11 +14,18 @@
 
 """Deployment script for Medical Research Agent."""
 
+import copy
 import os
 import vertexai
 from absl import app, flags
 from dotenv import load_dotenv
-from medical_research.agent import root_agent
+from medical_research import topology
+from medical_research.agent import build_medical_coordinator
+from medical_research.deadline import deadline_stats
+from medical_research.endpoint_guard import endpoint_stats
+from medical_research.model_policy import policy_stats
+from medical_research.singleflight import singleflight_stats
+from medical_research.sub_agents.medical_analyst.descriptors import prefilter_stats
 from vertexai import agent_engines
 from vertexai.preview.reasoning_engines import AdkApp
 
@@ -30,13 +37,59 @@ flags.DEFINE_string("resource_id", None, "Agent Engine resource ID.")
 flags.DEFINE_bool("create", False, "Creates a new agent.")
 flags.DEFINE_bool("delete", False, "Deletes an existing agent.")
 flags.DEFINE_bool("list", False, "Lists all agents.")
+flags.DEFINE_enum("topology", topology.TOPOLOGY, list(topology.TOPOLOGIES),
+                  "Coordinator tool topology: 'hierarchical' or 'direct'.")
 flags.mark_bool_flags_as_mutual_exclusive(["create", "delete", "list"])
 
 
+class MedicalResearchApp(AdkApp):
+    """AdkApp that also reports the agent's runtime stats."""
+
+    STATS_OPERATIONS = ["policy_stats", "endpoint_stats", "deadline_stats", "dedup_stats", "prefilter_stats"]
+
+    def register_operations(self):
+        operations = super().register_operations()
+        operations[""] = operations[""] + self.STATS_OPERATIONS
+        return operations
+
+    def clone(self):
+        # agent_engines.create deploys a clone; AdkApp.clone() would drop the subclass.
+        attrs = self._tmpl_attrs
+        return type(self)(
+            agent=copy.deepcopy(attrs.get("agent")),
+            enable_tracing=attrs.get("enable_tracing"),
+            session_service_builder=attrs.get("session_service_builder"),
+            artifact_service_builder=attrs.get("artifact_service_builder"),
+            memory_service_builder=attrs.get("memory_service_builder"),
+            env_vars=attrs.get("env_vars"),
+        )
+
+    def policy_stats(self) -> dict:
+        """Calls and latency per model tier, and the flash-to-pro escalation rate per agent."""
+        return policy_stats()
+
+    def endpoint_stats(self) -> dict:
+        """Concurrency limit, rejections, breaker state and per-class queue waits of each Gemma endpoint."""
+        return endpoint_stats()
+
+    def deadline_stats(self) -> dict:
+        """Calls, deadline-exceeded and cancelled counts per tool, sub-agent and run."""
+        return deadline_stats()
+
+    def dedup_stats(self) -> dict:
+        """Calls, executions and dedup ratio of each single-flight group."""
+        return singleflight_stats()
+
+    def prefilter_stats(self) -> dict:
+        """Endpoint calls saved by rejecting pre-filter rules (predict_bbb_crossing)."""
+        return prefilter_stats()
+
+
 def create_agent(env_vars):
     """Creates a new Agent Engine for the Medical Research agent."""
-    # Wrap the root agent in an AdkApp instance
-    adk_app = AdkApp(agent=root_agent)
+    # Wrap the root agent in an AdkApp instance that also serves the runtime stats
+    root_agent = build_medical_coordinator(FLAGS.topology)
+    adk_app = MedicalResearchApp(agent=root_agent)
     remote_agent = agent_engines.create(
         adk_app,
         display_name="medical_research",
@@ -44,6 +97,8 @@ def create_agent(env_vars):
             "google-adk>=1.0.0",
             "google-cloud-aiplatform>=1.93",
             "python-dotenv>=1.0.1",
+            "rdkit",
+            "numpy",
         ],
         extra_packages=[
             "./medical_research"
@@ -82,6 +137,7 @@ def main(_):
 
     env_vars["TXGEMMA_ENDPOINT_ID"] = os.getenv("TXGEMMA_ENDPOINT_ID")
     env_vars["MEDGEMMA_ENDPOINT_ID"] = os.getenv("MEDGEMMA_ENDPOINT_ID")
+    env_vars["AGENT_TOPOLOGY"] = FLAGS.topology
 
     if not all([project_id, location, bucket]):
         raise ValueError(
@@ -15,9 +15,11 @@
 """Medical_Research: Medical advice, chemical compound and protein analysis."""
 
 from google.adk.agents import LlmAgent
-from google.adk.tools.agent_tool import AgentTool
 
+from . import deadline
+from . import model_policy
 from . import prompt
+from . import topology
 # The imports are now simpler, coming from the sub_agents package.
 from .sub_agents import medical_analyst_agent, medical_search_agent
 
@@ -25,21 +27,31 @@ from .sub_agents import medical_analyst_agent, medical_search_agent
 #from .sub_agents.academic_websearch import academic_websearch_agent
 
 
-MODEL = "gemini-2.5-pro"
+MODEL = model_policy.model_for("medical_coordinator")
 
 
-medical_coordinator = LlmAgent(
-    name="medical_coordinator",
-    model=MODEL,
-    description=(
-        "Responds to general medical questions and analyzes chemical"
-        " compounds and proteins."
-    ),
-    instruction=prompt.MEDICAL_COORDINATOR_PROMPT,
-    tools=[
-        AgentTool(agent=medical_search_agent),
-        AgentTool(agent=medical_analyst_agent),
-    ],
-)
+SPECIALISTS = [medical_search_agent, medical_analyst_agent]
+
+
+def build_medical_coordinator(topology_mode: str = topology.TOPOLOGY) -> LlmAgent:
+    """Builds the coordinator in 'hierarchical' or 'direct' tool topology."""
+    return LlmAgent(
+        name="medical_coordinator",
+        model=MODEL,
+        description=(
+            "Responds to general medical questions and analyzes chemical"
+            " compounds and proteins."
+        ),
+        instruction=topology.coordinator_instruction(
+            prompt.MEDICAL_COORDINATOR_PROMPT, SPECIALISTS, topology_mode,
+            usage_notes=prompt.DIRECT_TOOL_NOTES,
+        ),
+        tools=topology.coordinator_tools(SPECIALISTS, topology_mode),
+        # Runs not started through `deadline.invocation()` get their deadline here.
+        before_agent_callback=deadline.start_invocation,
+    )
+
+
+medical_coordinator = build_medical_coordinator()
 
 root_agent = medical_coordinator
\ No newline at end of file
@@ -41,4 +41,13 @@ Workflow:
     present it to the user in a clear and understandable format. If the backend
     agents did not provide you with enough answer, you can answer based on your knowledge
 
-"""
\ No newline at end of file
+"""
+# Short usage notes for the specialists' tools in the "direct" topology
+# (see topology.py); the specialists' own prompts are not merged.
+DIRECT_TOOL_NOTES = {
+    "medical_search_agent": "Pass general medical questions as they were asked.",
+    "medical_analyst_agent": (
+        "Pass the SMILES string from the question. Report the descriptors and"
+        " any rule that rejected the compound with the prediction."
+    ),
+}
@@ -0,0 +1,158 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Token streaming from the Gemma chat endpoints.
+
+`stream_generate` sends a prompt as a streaming raw-predict call in the
+OpenAI chat-completions format served by Model Garden's vLLM containers, and
+returns the full text. Each piece of text is also handed to the sink installed
+with `tool_text_sink` by whoever runs the agent. `stream_run` installs one
+around an ADK run, so partial tool text shows up in its event stream while
+the tool is still generating. Without a sink, the text is only returned.
+"""
+
+import asyncio
+import contextlib
+import contextvars
+import json
+import os
+
+from . import deadline
+from .endpoint_scheduler import INTERACTIVE, request_class
+
+GEMMA_STREAMING = os.getenv("GEMMA_STREAMING", "true").lower() == "true"
+GEMMA_STREAM_MAX_TOKENS = int(os.getenv("GEMMA_STREAM_MAX_TOKENS", "2048"))
+
+_sink = contextvars.ContextVar("tool_text_sink", default=None)
+_DONE = object()
+
+
+@contextlib.contextmanager
+def tool_text_sink(sink):
+    """Sends tool text streamed in this context (and tasks started from it) to `await sink(item)`."""
+    token = _sink.set(sink)
+    try:
+        yield
+    finally:
+        _sink.reset(token)
+
+
+async def emit_text(tool: str, text: str):
+    """Hands a piece of a tool's output to the installed sink, if any."""
+    sink = _sink.get()
+    if sink is not None and text:
+        await sink({"type": "tool_text", "name": tool, "text": text, "partial": True})
+
+
+def chat_request(prompt: str, max_tokens: int = GEMMA_STREAM_MAX_TOKENS) -> bytes:
+    return json.dumps({
+        "@requestFormat": "chatCompletions",
+        "messages": [{"role": "user", "content": prompt}],
+        "max_tokens": max_tokens,
+        "stream": True,
+    }).encode()
+
+
+def parse_sse(lines):
+    """Yields the text deltas of chat-completion server-sent events."""
+    done = False
+    # Reads to the end of the stream even after [DONE], so the call completes.
+    for chunk in lines:
+        chunk = getattr(chunk, "data", chunk)
+        for line in chunk.splitlines():
+            line = line.strip()
+            if done or not line.startswith(b"data:"):
+                continue
+            data = line[len(b"data:"):].strip()
+            if data == b"[DONE]":
+                done = True
+                continue
+            choice = (json.loads(data).get("choices") or [{}])[0]
+            text = (choice.get("delta") or {}).get("content") or choice.get("text") or ""
+            if text:
+                yield text
+
+
+async def stream_generate(endpoint, prompt: str, tool: str) -> str:
+    """Streams the answer to `prompt` from an EndpointPool, emitting text as it arrives.
+
+    Returns:
+        The complete answer.
+
+    Raises:
+        EndpointUnavailable: if the call is rejected or fails, also mid-stream.
+    """
+    texts = parse_sse(endpoint.stream(chat_request(prompt)))
+    parts = []
+    try:
+        # The endpoint client blocks, so each read happens in a worker thread.
+        while (text := await asyncio.to_thread(next, texts, _DONE)) is not _DONE:
+            parts.append(text)
+            await emit_text(tool, text)
+    finally:
+        with contextlib.suppress(ValueError):
+            texts.close()
+    return "".join(parts)
+
+
+async def stream_run(runner, **run_kwargs):
+    """Runs `runner.run_async(**run_kwargs)`, yielding its events and streamed tool text.
+
+    The run gets an INVOCATION_DEADLINE_SECONDS deadline, shared out among its
+    sub-agents and tools, and is cancelled when the caller stops reading.
+
+    Yields:
+        ADK events, interleaved with {"type": "tool_text", "name", "text", "partial"}
+        dicts while a tool streams its answer.
+
+    Raises:
+        DeadlineExceeded: if the run is still going when its deadline passes.
+    """
+    queue = asyncio.Queue(maxsize=64)
+
+    async def produce():
+        try:
+            async for event in runner.run_async(**run_kwargs):
+                await queue.put(event)
+        except asyncio.CancelledError:
+            # The reader has gone; waiting for room on a full queue would never end.
+            raise
+        except BaseException:
+            await queue.put(_DONE)
+            raise
+        await queue.put(_DONE)
+
+    with (tool_text_sink(queue.put), request_class(INTERACTIVE, session=run_kwargs.get("session_id")),
+          deadline.invocation(name="stream_run") as run_deadline):
+        # The task copies the current context: sink, request class and deadline.
+        producer = asyncio.create_task(produce())
+    finished = False
+    try:
+        while True:
+            try:
+                item = await asyncio.wait_for(queue.get(), run_deadline.remaining())
+            except TimeoutError:
+                raise deadline.DeadlineExceeded(run_deadline.name) from None
+            if item is _DONE:
+                break
+            yield item
+        await producer
+        finished = True
+    finally:
+        if not finished:
+            # Blocking tools still running stop at their next outbound call.
+            run_deadline.cancel()
+        deadline.stats.record(run_deadline.name, run_deadline)
+        producer.cancel()
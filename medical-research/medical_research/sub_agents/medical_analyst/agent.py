@@ -16,11 +16,12 @@
 
 from google.adk.agents import Agent
 from . import prompt
+from ... import model_policy
 # Import our new custom tool
 from . import tools
 
-# The agent will use a standard model to decide when to call the tool.
-MODEL = "gemini-2.5-pro"
+# Simple tool dispatch: starts on flash and escalates to pro (see model_policy).
+MODEL = model_policy.model_for("medical_analyst_agent")
 
 medical_analyst_agent = Agent(
     model=MODEL,
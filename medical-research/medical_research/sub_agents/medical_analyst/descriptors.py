@@ -0,0 +1,228 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Local descriptor pre-filter, run before the TxGemma BBB endpoint call.
+
+RDKit descriptors (MW, cLogP, TPSA, HBD/HBA, rotatable bonds, PAINS alerts and
+a CNS MPO score) are computed for a batch of SMILES into numpy arrays, and rule
+sets are evaluated over the whole batch at once. Each rule either rejects a
+compound (the properties it gates are not sent to the endpoint) or flags it
+(it is predicted as usual, with the flag reported).
+
+Rules are configured as 'name=action' pairs, e.g. PREFILTER_RULES="lipinski=reject,pains=flag".
+`prefilter_stats()` reports how many endpoint calls rejections saved, per tool.
+"""
+
+import os
+import threading
+from dataclasses import dataclass
+from typing import Callable
+
+import numpy as np
+from rdkit import Chem, RDLogger
+from rdkit.Chem import Crippen, Descriptors, Lipinski, rdMolDescriptors
+from rdkit.Chem.FilterCatalog import FilterCatalog, FilterCatalogParams
+
+RDLogger.DisableLog("rdApp.*")
+
+PREFILTER_RULES = os.getenv("PREFILTER_RULES", "lipinski=flag,pains=flag,cns_mpo=flag")
+CNS_MPO_THRESHOLD = float(os.getenv("CNS_MPO_THRESHOLD", "4.0"))
+
+REJECT = "reject"
+FLAG = "flag"
+
+NUMERIC_DESCRIPTORS = ("mw", "clogp", "tpsa", "hbd", "hba", "rotatable_bonds", "lipinski_violations", "cns_mpo")
+_pains_catalog = None
+
+
+def _pains():
+    global _pains_catalog
+    if _pains_catalog is None:
+        params = FilterCatalogParams()
+        params.AddCatalog(FilterCatalogParams.FilterCatalogs.PAINS)
+        _pains_catalog = FilterCatalog(params)
+    return _pains_catalog
+
+
+def _desirability(values: np.ndarray, low: float, high: float) -> np.ndarray:
+    """1 at or below `low`, 0 above `high`, linear in between."""
+    return np.clip((high - values) / (high - low), 0.0, 1.0)
+
+
+def cns_mpo(clogp: np.ndarray, mw: np.ndarray, tpsa: np.ndarray, hbd: np.ndarray) -> np.ndarray:
+    """CNS MPO score (Wager et al., 2010) on a 0-6 scale.
+
+    pKa and cLogD are not computed locally, so the four RDKit-computable
+    components are averaged and rescaled to the usual 0-6 range.
+    """
+    tpsa_score = np.where(tpsa <= 40, np.clip((tpsa - 20) / 20, 0.0, 1.0), _desirability(tpsa, 90, 120))
+    components = (
+        _desirability(clogp, 3, 5),
+        _desirability(mw, 360, 500),
+        tpsa_score,
+        _desirability(hbd, 0.5, 3.5),
+    )
+    return np.sum(components, axis=0) * 6 / len(components)
+
+
+def compute_descriptors(smiles_list: list) -> dict:
+    """Descriptors of a batch of SMILES as aligned arrays.
+
+    Returns:
+        {"valid": bool array, "pains": list of alert-name lists, and one float
+        array per name in NUMERIC_DESCRIPTORS (NaN where the SMILES is invalid)}.
+    """
+    n = len(smiles_list)
+    raw = {name: np.full(n, np.nan) for name in ("mw", "clogp", "tpsa", "hbd", "hba", "rotatable_bonds")}
+    valid = np.zeros(n, dtype=bool)
+    pains = [[] for _ in range(n)]
+    catalog = _pains()
+    for i, smiles in enumerate(smiles_list):
+        mol = Chem.MolFromSmiles(smiles) if smiles else None
+        if mol is None:
+            continue
+        valid[i] = True
+        raw["mw"][i] = Descriptors.MolWt(mol)
+        raw["clogp"][i] = Crippen.MolLogP(mol)
+        raw["tpsa"][i] = rdMolDescriptors.CalcTPSA(mol)
+        raw["hbd"][i] = Lipinski.NumHDonors(mol)
+        raw["hba"][i] = Lipinski.NumHAcceptors(mol)
+        raw["rotatable_bonds"][i] = rdMolDescriptors.CalcNumRotatableBonds(mol)
+        pains[i] = [match.GetDescription() for match in catalog.GetMatches(mol)]
+
+    raw["lipinski_violations"] = (
+        (raw["mw"] > 500).astype(float) + (raw["clogp"] > 5) + (raw["hbd"] > 5) + (raw["hba"] > 10)
+    )
+    raw["lipinski_violations"][~valid] = np.nan
+    raw["cns_mpo"] = cns_mpo(raw["clogp"], raw["mw"], raw["tpsa"], raw["hbd"])
+    return {"valid": valid, "pains": pains, **raw}
+
+
+@dataclass(frozen=True)
+class Rule:
+    """A drug-likeness rule evaluated over a batch of descriptors."""
+
+    name: str
+    description: str
+    passes: Callable[[dict], np.ndarray]
+    tasks: tuple = ()  # properties the rule gates; empty means every property
+
+
+RULES = {
+    "lipinski": Rule(
+        "lipinski", "Rule of 5 (at most one of MW > 500, cLogP > 5, HBD > 5, HBA > 10)",
+        lambda d: d["lipinski_violations"] <= 1,
+    ),
+    "veber": Rule(
+        "veber", "Veber oral bioavailability (rotatable bonds <= 10, TPSA <= 140)",
+        lambda d: (d["rotatable_bonds"] <= 10) & (d["tpsa"] <= 140),
+    ),
+    "pains": Rule(
+        "pains", "No PAINS substructure alerts",
+        lambda d: np.array([not alerts for alerts in d["pains"]], dtype=bool),
+    ),
+    "cns_mpo": Rule(
+        "cns_mpo", f"CNS MPO >= {CNS_MPO_THRESHOLD:g}",
+        lambda d: d["cns_mpo"] >= CNS_MPO_THRESHOLD,
+        tasks=("bbbp",),
+    ),
+}
+
+
+def parse_rules(spec: str = None) -> list:
+    """Turns 'lipinski=reject,pains=flag' into [(Rule, action)]; 'none' disables the pre-filter."""
+    spec = PREFILTER_RULES if spec is None else spec
+    if spec.strip().lower() in ("", "none", "off"):
+        return []
+    rules = []
+    for item in spec.split(","):
+        name, _, action = item.strip().partition("=")
+        action = action.strip() or FLAG
+        if name not in RULES:
+            raise ValueError(f"Unknown pre-filter rule '{name}'. Available: {sorted(RULES)}")
+        if action not in (REJECT, FLAG):
+            raise ValueError(f"Pre-filter action for '{name}' must be '{REJECT}' or '{FLAG}', not '{action}'.")
+        rules.append((RULES[name], action))
+    return rules
+
+
+def prefilter(smiles_list: list, rules: list = None) -> list:
+    """Computes descriptors and evaluates `rules` (from parse_rules) for a batch.
+
+    Returns:
+        One dict per SMILES: {"descriptors": {...} or None if the SMILES is
+        invalid, "flags": names of failed rules, "rejected_by": [Rule]}.
+    """
+    rules = parse_rules() if rules is None else rules
+    d = compute_descriptors(smiles_list)
+    failed = {rule.name: ~rule.passes(d) & d["valid"] for rule, _ in rules}
+
+    results = []
+    for i in range(len(smiles_list)):
+        if not d["valid"][i]:
+            results.append({"descriptors": None, "flags": [], "rejected_by": []})
+            continue
+        descriptors = {name: round(float(d[name][i]), 2) for name in NUMERIC_DESCRIPTORS}
+        descriptors["pains"] = d["pains"][i]
+        results.append({
+            "descriptors": descriptors,
+            "flags": [rule.name for rule, _ in rules if failed[rule.name][i]],
+            "rejected_by": [rule for rule, action in rules if action == REJECT and failed[rule.name][i]],
+        })
+    return results
+
+
+def blocked_tasks(result: dict, tasks: list) -> list:
+    """The tasks among `tasks` that a rejecting rule keeps away from the endpoint."""
+    blocked = set()
+    for rule in result["rejected_by"]:
+        blocked.update(rule.tasks or tasks)
+    return [task for task in tasks if task in blocked]
+
+
+_saved_lock = threading.Lock()
+_saved_calls = {}  # tool -> endpoint calls not made because of a rejecting rule
+
+
+def record_saved_call(tool: str, calls: int = 1):
+    """Counts endpoint calls a rejecting rule kept `tool` from making."""
+    if calls:
+        with _saved_lock:
+            _saved_calls[tool] = _saved_calls.get(tool, 0) + calls
+
+
+def prefilter_stats() -> dict:
+    """Endpoint calls saved by rejecting rules since the process started, per tool and in total."""
+    with _saved_lock:
+        return {"endpoint_calls_saved": dict(_saved_calls), "total": sum(_saved_calls.values())}
+
+
+def describe(result: dict) -> str:
+    """One-line summary of a pre-filter result for tool output."""
+    d = result["descriptors"]
+    if d is None:
+        return "Descriptors: invalid SMILES."
+    text = (
+        f"Descriptors: MW {d['mw']}, cLogP {d['clogp']}, TPSA {d['tpsa']}, HBD {int(d['hbd'])}, "
+        f"HBA {int(d['hba'])}, rotatable bonds {int(d['rotatable_bonds'])}, CNS MPO {d['cns_mpo']}"
+    )
+    if d["pains"]:
+        text += f", PAINS alerts: {', '.join(d['pains'])}"
+    if result["flags"]:
+        rejected = {rule.name for rule in result["rejected_by"]}
+        failed = [f"{name} [{RULES[name].description}]" + (" (rejected)" if name in rejected else "")
+                  for name in result["flags"]]
+        text += f". Failed rules: {'; '.join(failed)}"
+    return text + "."
@@ -26,5 +26,8 @@ Instructions:
 1.  Receive the user's question containing a SMILES string.
 2.  Extract the SMILES string from the question.
 3.  Call the `predict_bbb_crossing` tool with the extracted SMILES string.
-4.  Return the prediction from the tool directly to the user.
+4.  Return the prediction from the tool directly to the user, together with the
+    descriptors and any failed drug-likeness rules it reports. Do not ask for the
+    descriptors separately. If the tool did not call the model because a rule
+    rejected the compound, say so rather than guessing a prediction.
 """
\ No newline at end of file
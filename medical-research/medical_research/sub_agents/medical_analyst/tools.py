@@ -19,6 +19,9 @@ import os
 import vertexai
 from google.cloud.aiplatform import Endpoint
 
+from ...endpoint_guard import EndpointUnavailable, endpoint_pool
+from . import descriptors
+
 # Initialize the Vertex AI SDK
 vertexai.init(
     project=os.environ.get("GOOGLE_CLOUD_PROJECT"),
@@ -28,20 +31,37 @@ vertexai.init(
 def predict_bbb_crossing(smiles_string: str) -> str:
     """
     Predicts whether a drug crosses the blood-brain barrier (BBB).
+    The compound's descriptors (MW, cLogP, TPSA, HBD/HBA, rotatable bonds, PAINS alerts,
+    CNS MPO) are computed locally first and returned with the prediction. Rejecting is opt-in:
+    by default every rule only flags, and only compounds failing a rule set to 'reject' in
+    PREFILTER_RULES (e.g. 'cns_mpo=reject') are kept from the endpoint.
 
     Args:
         smiles_string: The SMILES string representation of the drug.
 
     Returns:
-        A string containing the prediction.
+        A string containing the prediction and the compound's descriptors, or a
+        structured error if the endpoint is overloaded, failing or timed out.
     """
-    endpoint = Endpoint(
+    result = descriptors.prefilter([smiles_string])[0]
+    if result["descriptors"] is None:
+        return f"Error: '{smiles_string}' is not a valid SMILES string."
+    summary = descriptors.describe(result)
+    if descriptors.blocked_tasks(result, ["bbbp"]):
+        descriptors.record_saved_call("predict_bbb_crossing")
+        rules = ", ".join(rule.name for rule in result["rejected_by"])
+        return (
+            f"BBB crossing was not predicted for '{smiles_string}': it fails the {rules} pre-filter, "
+            f"so no endpoint call was made.\n{summary}"
+        )
+
+    endpoint = endpoint_pool("txgemma", os.environ["TXGEMMA_ENDPOINT_ID"], lambda location, endpoint_id: Endpoint(
         endpoint_name=(
             f"projects/{os.environ['GOOGLE_CLOUD_PROJECT']}"
-            f"/locations/{os.environ['GOOGLE_CLOUD_LOCATION']}"
-            f"/endpoints/{os.environ['TXGEMMA_ENDPOINT_ID']}"
+            f"/locations/{location or os.environ['GOOGLE_CLOUD_LOCATION']}"
+            f"/endpoints/{endpoint_id}"
         )
-    )
+    ))
 
     prompt = (
         "Instructions: Answer the following question about drug properties.\n"
@@ -56,9 +76,12 @@ def predict_bbb_crossing(smiles_string: str) -> str:
         f"Drug SMILES: {smiles_string}"
     )
 
-    response = endpoint.predict(instances=[{"prompt": prompt}])
-    
+    try:
+        response = endpoint.predict(instances=[{"prompt": prompt}])
+    except EndpointUnavailable as e:
+        return f"{e.message()}\n{summary}"
+
     # Corrected line: Access the prediction as a direct string element.
     prediction = response.predictions[0]
 
-    return prediction
\ No newline at end of file
+    return f"{prediction}\n{summary}"
\ No newline at end of file
@@ -14,44 +14,57 @@
 
 """Custom tool for interacting with the MedGemma endpoint."""
 
+import asyncio
 import os
 from google.cloud.aiplatform import Endpoint
 
 import vertexai
 
+from ...endpoint_guard import EndpointUnavailable, endpoint_pool
+from ...streaming import GEMMA_STREAMING, emit_text, stream_generate
+
 # Initialize the Vertex AI SDK
 vertexai.init(
     project=os.environ.get("GOOGLE_CLOUD_PROJECT"),
     location=os.environ.get("GOOGLE_CLOUD_LOCATION"),
 )
 
-def query_medical_knowledge(question: str) -> str:
+DISCLAIMER = (
+    "\n\nThis information is for educational purposes only. Please consult "
+    "a qualified healthcare professional for any medical concerns."
+)
+
+
+async def query_medical_knowledge(question: str) -> str:
     """
     Answers a general medical question using the MedGemma model.
+    The answer is streamed as it is generated (GEMMA_STREAMING).
 
     Args:
         question: The user's question about a medical topic.
 
     Returns:
-        A string containing the answer from the MedGemma model.
+        A string containing the answer from the MedGemma model, or a structured
+        error if the endpoint is overloaded, failing or timed out.
     """
-    endpoint = Endpoint(
+    endpoint = endpoint_pool("medgemma", os.environ["MEDGEMMA_ENDPOINT_ID"], lambda location, endpoint_id: Endpoint(
         endpoint_name=(
             f"projects/{os.environ['GOOGLE_CLOUD_PROJECT']}"
-            f"/locations/{os.environ['GOOGLE_CLOUD_LOCATION']}"
-            f"/endpoints/{os.environ['MEDGEMMA_ENDPOINT_ID']}"
+            f"/locations/{location or os.environ['GOOGLE_CLOUD_LOCATION']}"
+            f"/endpoints/{endpoint_id}"
         )
-    )
+    ))
 
     # Send the user's question directly to the MedGemma endpoint
-    response = endpoint.predict(instances=[{"prompt": question}])
-
-    # Extract the prediction string from the response
-    prediction = response.predictions[0]
+    try:
+        if GEMMA_STREAMING:
+            prediction = await stream_generate(endpoint, question, "query_medical_knowledge")
+        else:
+            response = await asyncio.to_thread(endpoint.predict, [{"prompt": question}])
+            prediction = response.predictions[0]
+    except EndpointUnavailable as e:
+        return e.message()
 
-    # Append the required disclaimer
-    disclaimer = (
-        "\n\nThis information is for educational purposes only. Please consult "
-        "a qualified healthcare professional for any medical concerns."
-    )
-    return prediction + disclaimer
\ No newline at end of file
+    # Append the required disclaimer, after everything that was streamed.
+    await emit_text("query_medical_knowledge", DISCLAIMER)
+    return prediction + DISCLAIMER
@@ -0,0 +1,179 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Test cases for invocation deadlines, tool budgets and cancellation."""
+
+import asyncio
+import contextvars
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from medical_research import deadline
+from medical_research.deadline import DeadlineExceeded, budgeted_tool, call_timeout, invocation, run_bounded
+from medical_research.endpoint_guard import EndpointUnavailable, GuardedEndpoint, TIMEOUT
+from medical_research.singleflight import single_flight
+
+pytest_plugins = ("pytest_asyncio",)
+
+
+class HangingUpstream:
+    """Blocks for `delay_s` (or until released) like an upstream that stopped answering."""
+
+    def __init__(self, delay_s: float = 5.0):
+        self.delay_s = delay_s
+        self.released = threading.Event()
+
+    def fetch(self, query: str) -> str:
+        self.released.wait(self.delay_s)
+        return f"answer to {query}"
+
+    def predict(self, instances, timeout=None):
+        if not self.released.wait(min(self.delay_s, timeout)):
+            raise TimeoutError(f"no answer after {timeout:g}s")
+        return SimpleNamespace(predictions=["(B)"] * len(instances))
+
+
+def test_budgets_are_shares_of_the_time_left():
+    assert call_timeout(30) == 30 and deadline.current_deadline() is None
+    with invocation(10) as run:
+        with deadline.budget("medical_search_agent", 0.8) as agent:
+            with deadline.budget("query_medical_knowledge", 0.5) as tool:
+                assert tool.remaining() == pytest.approx(4, abs=0.05)
+                assert call_timeout(30) == pytest.approx(4, abs=0.05)
+                assert call_timeout(1) == 1
+            assert agent.remaining() == pytest.approx(8, abs=0.05)
+        assert run.remaining() == pytest.approx(10, abs=0.05)
+        # A nested run cannot outlive the outer one.
+        with invocation(60) as nested:
+            assert nested.expires_at == run.expires_at
+
+
+def test_blocking_calls_without_a_timeout_stop_at_the_deadline():
+    upstream = HangingUpstream()
+    with invocation(0.2):
+        start = time.monotonic()
+        with pytest.raises(DeadlineExceeded):
+            run_bounded(upstream.fetch, "aspirin")
+        assert time.monotonic() - start < 0.5
+        # Out of time: the next outbound call does not even start.
+        time.sleep(0.05)
+        with pytest.raises(DeadlineExceeded):
+            call_timeout()
+    upstream.released.set()
+    assert run_bounded(upstream.fetch, "aspirin") == "answer to aspirin"
+
+
+def test_a_tool_that_runs_out_of_time_returns_an_error_and_is_counted():
+    upstream = HangingUpstream()
+
+    @budgeted_tool
+    def search_literature(query: str) -> str:
+        """Stands in for a tool that catches its client's errors itself."""
+        try:
+            return run_bounded(upstream.fetch, query)
+        except TimeoutError as e:
+            return f"An error occurred: {e}"
+
+    @budgeted_tool(share=0.5)
+    def fetch_abstract(query: str) -> str:
+        return run_bounded(upstream.fetch, query)
+
+    with invocation(0.4):
+        assert search_literature("aspirin").startswith("An error occurred")
+    with invocation(0.4):
+        message = fetch_abstract("aspirin")
+    assert message.startswith("Error: deadline exceeded") and '"tool": "fetch_abstract"' in message
+    assert search_literature.budgeted.__name__ == "search_literature"
+
+    stats = deadline.deadline_stats()
+    assert stats["search_literature"]["exceeded"] == 1 and stats["fetch_abstract"]["exceeded"] == 1
+    upstream.released.set()
+
+
+@pytest.mark.asyncio
+async def test_async_tools_are_cancelled_when_their_budget_runs_out():
+    finished = []
+
+    @budgeted_tool(share=0.5)
+    async def ask_expert(question: str) -> str:
+        await asyncio.sleep(5)
+        finished.append(question)
+        return "answer"
+
+    with invocation(0.4):
+        start = time.monotonic()
+        message = await ask_expert("what is aspirin?")
+    assert time.monotonic() - start < 0.5
+    assert '"reason": "deadline_exceeded"' in message and finished == []
+
+
+def test_cancelling_a_run_stops_its_blocking_work():
+    upstream = HangingUpstream()
+    outcome = []
+
+    with invocation(30) as run:
+        @budgeted_tool
+        def slow_tool():
+            return run_bounded(upstream.fetch, "aspirin")
+
+        # Like a blocking tool that ADK runs in a worker thread under the run's context.
+        context = contextvars.copy_context()
+        worker = threading.Thread(target=context.run, args=(lambda: outcome.append(slow_tool()),))
+        worker.start()
+    time.sleep(0.1)
+    run.cancel()  # The user disconnected.
+    worker.join(timeout=1)
+
+    assert not worker.is_alive()
+    assert '"reason": "cancelled"' in outcome[0]
+    assert deadline.deadline_stats()["slow_tool"]["cancelled"] == 1
+    upstream.released.set()
+
+
+def test_single_flight_followers_stop_waiting_at_their_own_deadline():
+    upstream = HangingUpstream(delay_s=1.0)
+    fetch = single_flight("test.deadline")(upstream.fetch)
+    leader = threading.Thread(target=fetch, args=("aspirin",))
+    leader.start()
+    time.sleep(0.05)
+
+    with invocation(0.2):
+        start = time.monotonic()
+        with pytest.raises(DeadlineExceeded):
+            fetch("aspirin")
+        assert time.monotonic() - start < 0.5
+    upstream.released.set()
+    leader.join()
+
+
+def test_endpoint_calls_cut_short_by_the_deadline_do_not_count_against_the_endpoint():
+    upstream = HangingUpstream()
+    guarded = GuardedEndpoint("txgemma", lambda: upstream)
+
+    with invocation(0.2):
+        with pytest.raises(EndpointUnavailable) as error:
+            guarded.predict([{"prompt": "caffeine"}])
+        assert error.value.reason == TIMEOUT and "deadline" in error.value.detail
+        # Once out of time, calls are not even attempted.
+        with pytest.raises(EndpointUnavailable):
+            guarded.predict([{"prompt": "caffeine"}])
+
+    stats = guarded.stats()
+    assert stats["deadline_exceeded"] == 2 and stats[TIMEOUT] == 0
+    assert stats["breaker_state"] == "closed" and stats["inflight"] == 0
+    assert stats["calls"] == 1
+    upstream.released.set()
@@ -0,0 +1,64 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Test cases for the local descriptor pre-filter of the BBB tool."""
+
+import pytest
+
+from medical_research.sub_agents.medical_analyst import descriptors, tools
+
+CAFFEINE = "Cn1c(=O)c2c(ncn2C)n(C)c1=O"
+RHODANINE = "O=C1NC(=S)SC1=Cc1ccccc1"
+LIPID = "CCCCCCCCCCCCCCCCCCCCCCCCCCCCCCCCCCCC(=O)NC(CCCCCCCCCCCCCCCCCCC)C(=O)O"
+
+
+def test_batch_descriptors_and_rules():
+    rules = descriptors.parse_rules("lipinski=reject,pains=flag,cns_mpo=flag")
+    caffeine, rhodanine, lipid, invalid = descriptors.prefilter([CAFFEINE, RHODANINE, LIPID, "C1CC"], rules)
+
+    assert caffeine["descriptors"]["mw"] == pytest.approx(194.19, abs=0.01)
+    assert caffeine["descriptors"]["cns_mpo"] >= descriptors.CNS_MPO_THRESHOLD
+    assert caffeine["flags"] == [] and descriptors.blocked_tasks(caffeine, ["bbbp"]) == []
+
+    assert rhodanine["flags"] == ["pains"] and rhodanine["descriptors"]["pains"]
+    assert descriptors.blocked_tasks(rhodanine, ["bbbp"]) == []
+
+    assert lipid["flags"] == ["lipinski", "cns_mpo"]
+    assert descriptors.blocked_tasks(lipid, ["bbbp"]) == ["bbbp"]
+
+    assert invalid["descriptors"] is None
+
+
+def test_cns_mpo_rule_only_gates_bbb():
+    result = descriptors.prefilter([LIPID], descriptors.parse_rules("cns_mpo=reject"))[0]
+    assert descriptors.blocked_tasks(result, ["clintox", "bbbp"]) == ["bbbp"]
+
+
+def test_unknown_rule_is_rejected():
+    with pytest.raises(ValueError):
+        descriptors.parse_rules("lipinski=drop")
+
+
+def test_rejected_compound_skips_the_endpoint(monkeypatch):
+    def no_endpoint(**kwargs):
+        raise AssertionError("the endpoint must not be called")
+
+    monkeypatch.setattr(tools, "Endpoint", no_endpoint)
+    # The default only flags; rejection has to be configured.
+    monkeypatch.setattr(descriptors, "PREFILTER_RULES", "lipinski=reject,pains=flag,cns_mpo=flag")
+    saved = descriptors.prefilter_stats()["endpoint_calls_saved"].get("predict_bbb_crossing", 0)
+    answer = tools.predict_bbb_crossing(LIPID)
+    assert "no endpoint call was made" in answer
+    assert "MW 860.53" in answer
+    assert descriptors.prefilter_stats()["endpoint_calls_saved"]["predict_bbb_crossing"] == saved + 1
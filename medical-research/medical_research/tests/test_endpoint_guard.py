@@ -0,0 +1,241 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Test cases for the endpoint limiter, circuit breaker and replica pool, using fault-injecting stand-in endpoints."""
+
+import itertools
+import statistics
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from medical_research import endpoint_guard
+from medical_research.endpoint_guard import (
+    AdaptiveLimiter,
+    CircuitBreaker,
+    EndpointPool,
+    EndpointUnavailable,
+    GuardedEndpoint,
+)
+from medical_research.sub_agents.medical_analyst import tools
+
+CAFFEINE = "Cn1c(=O)c2c(ncn2C)n(C)c1=O"
+
+
+class HttpError(Exception):
+    def __init__(self, code: int):
+        super().__init__(f"HTTP {code}")
+        self.code = code
+
+
+class FaultyEndpoint:
+    """Answers '(B)' after `latency_s` (seconds, or a function returning them), or fails
+    with the next queued HTTP status."""
+
+    def __init__(self, latency_s: float = 0.0):
+        self.latency_s = latency_s
+        self.faults = []
+        self.calls = 0
+        self.inflight = 0
+        self.max_inflight = 0
+        self._lock = threading.Lock()
+
+    def predict(self, instances, timeout=None):
+        with self._lock:
+            self.calls += 1
+            self.inflight += 1
+            self.max_inflight = max(self.max_inflight, self.inflight)
+            fault = self.faults.pop(0) if self.faults else None
+        latency_s = self.latency_s() if callable(self.latency_s) else self.latency_s
+        try:
+            if fault:
+                raise HttpError(fault)
+            if timeout is not None and latency_s > timeout:
+                time.sleep(timeout)
+                raise TimeoutError("deadline exceeded")
+            time.sleep(latency_s)
+            return SimpleNamespace(predictions=["(B) crosses the BBB"] * len(instances))
+        finally:
+            with self._lock:
+                self.inflight -= 1
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_limit_grows_on_success_and_halves_on_overload():
+    stand_in = FaultyEndpoint()
+    guarded = GuardedEndpoint("txgemma", lambda: stand_in, limiter=AdaptiveLimiter(initial=4, maximum=8))
+    for _ in range(20):
+        guarded.predict([{"prompt": "q"}])
+    grown = guarded.limiter.limit
+    assert grown > 4
+
+    stand_in.faults = [429]
+    with pytest.raises(EndpointUnavailable) as error:
+        guarded.predict([{"prompt": "q"}])
+    assert error.value.reason == endpoint_guard.OVERLOADED
+    assert guarded.limiter.limit == pytest.approx(grown / 2)
+    assert guarded.stats()["overloaded"] == 1
+
+
+def test_saturated_endpoint_rejects_beyond_the_limit():
+    stand_in = FaultyEndpoint(latency_s=0.3)
+    guarded = GuardedEndpoint("txgemma", lambda: stand_in, limiter=AdaptiveLimiter(initial=2, maximum=2),
+                              queue_timeout_s=0.05)
+    outcomes = []
+
+    def call():
+        try:
+            guarded.predict([{"prompt": "q"}])
+            outcomes.append("ok")
+        except EndpointUnavailable as e:
+            outcomes.append(e.reason)
+
+    threads = [threading.Thread(target=call) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert stand_in.max_inflight == 2
+    assert outcomes.count("ok") == 2 and outcomes.count(endpoint_guard.OVERLOADED) == 4
+    assert guarded.stats()["rejected"] == 4
+
+
+def test_timeouts_are_reported_and_shrink_the_limit():
+    stand_in = FaultyEndpoint(latency_s=1.0)
+    guarded = GuardedEndpoint("txgemma", lambda: stand_in, limiter=AdaptiveLimiter(initial=4), timeout_s=0.05)
+    with pytest.raises(EndpointUnavailable) as error:
+        guarded.predict([{"prompt": "q"}])
+    assert error.value.reason == endpoint_guard.TIMEOUT
+    assert guarded.limiter.limit == 2
+
+
+def test_breaker_opens_fails_fast_and_closes_after_a_probe():
+    clock = Clock()
+    stand_in = FaultyEndpoint()
+    stand_in.faults = [503, 503, 500]
+    guarded = GuardedEndpoint("txgemma", lambda: stand_in,
+                              breaker=CircuitBreaker(failure_threshold=3, reset_timeout_s=30, clock=clock))
+    for _ in range(3):
+        with pytest.raises(EndpointUnavailable):
+            guarded.predict([{"prompt": "q"}])
+    assert guarded.breaker.state == endpoint_guard.OPEN
+
+    with pytest.raises(EndpointUnavailable) as error:
+        guarded.predict([{"prompt": "q"}])
+    assert error.value.reason == endpoint_guard.CIRCUIT_OPEN
+    assert error.value.retry_after_s == 30
+    assert stand_in.calls == 3
+
+    # A failed probe re-opens the breaker, a successful one closes it.
+    clock.now = 31
+    stand_in.faults = [503]
+    with pytest.raises(EndpointUnavailable):
+        guarded.predict([{"prompt": "q"}])
+    assert guarded.breaker.state == endpoint_guard.OPEN
+    clock.now = 62
+    assert guarded.predict([{"prompt": "q"}]).predictions
+    stats = guarded.stats()
+    assert stats["breaker_state"] == endpoint_guard.CLOSED
+    assert stats["breaker_opened"] == 2 and stats["short_circuited"] == 1
+
+
+def test_client_errors_do_not_open_the_breaker():
+    stand_in = FaultyEndpoint()
+    stand_in.faults = [400] * 5
+    guarded = GuardedEndpoint("txgemma", lambda: stand_in, breaker=CircuitBreaker(failure_threshold=2))
+    for _ in range(5):
+        with pytest.raises(EndpointUnavailable):
+            guarded.predict([{"prompt": "q"}])
+    assert guarded.breaker.state == endpoint_guard.CLOSED
+
+
+def test_tool_returns_a_structured_error(monkeypatch):
+    stand_in = FaultyEndpoint()
+    stand_in.faults = [503] * endpoint_guard.GEMMA_BREAKER_FAILURES
+    monkeypatch.setattr(endpoint_guard, "_endpoints", {})
+    monkeypatch.setattr(tools, "Endpoint", lambda **kwargs: stand_in)
+    monkeypatch.setenv("GOOGLE_CLOUD_PROJECT", "project")
+    monkeypatch.setenv("GOOGLE_CLOUD_LOCATION", "location")
+    monkeypatch.setenv("TXGEMMA_ENDPOINT_ID", "1")
+
+    for _ in range(endpoint_guard.GEMMA_BREAKER_FAILURES):
+        assert '"reason": "overloaded"' in tools.predict_bbb_crossing(CAFFEINE)
+    answer = tools.predict_bbb_crossing(CAFFEINE)
+    assert answer.startswith("Error: model endpoint unavailable")
+    assert '"reason": "circuit_open"' in answer and "MW 194.19" in answer
+    assert stand_in.calls == endpoint_guard.GEMMA_BREAKER_FAILURES
+    assert endpoint_guard.endpoint_stats()["txgemma"]["replicas"]["txgemma/1"]["breaker_state"] == endpoint_guard.OPEN
+
+
+def test_endpoint_ids_list_replicas_across_regions():
+    assert endpoint_guard.parse_endpoint_ids("111, europe-west4/222,") == [(None, "111"), ("europe-west4", "222")]
+
+
+def test_pool_prefers_the_least_loaded_replica_and_fails_over():
+    busy, idle = FaultyEndpoint(), FaultyEndpoint()
+    replicas = [GuardedEndpoint("busy", lambda: busy), GuardedEndpoint("idle", lambda: idle)]
+    pool = EndpointPool("txgemma", replicas, hedging=False)
+    replicas[0].limiter.inflight = 2
+    for _ in range(5):
+        pool.predict([{"prompt": "q"}])
+    assert (busy.calls, idle.calls) == (0, 5)
+
+    # A failing replica is skipped once its breaker opens.
+    replicas[0].limiter.inflight = 0
+    failing = FaultyEndpoint()
+    failing.faults = [503] * 10
+    replicas[0] = GuardedEndpoint("failing", lambda: failing, breaker=CircuitBreaker(failure_threshold=2))
+    pool.replicas = replicas
+    for _ in range(10):
+        assert pool.predict([{"prompt": "q"}]).predictions
+    assert failing.calls == 2
+    assert pool.stats()["failovers"] == 2
+    assert pool.stats()["replicas"]["failing"]["breaker_state"] == endpoint_guard.OPEN
+
+
+def _latencies(pool: EndpointPool, calls: int) -> list:
+    latencies = []
+    for _ in range(calls):
+        start = time.monotonic()
+        pool.predict([{"prompt": "q"}])
+        latencies.append(time.monotonic() - start)
+    return latencies
+
+
+def test_hedging_cuts_tail_latency():
+    def pool(hedging: bool) -> EndpointPool:
+        # Every 25th call, to whichever replica, is 30x slower.
+        calls = itertools.count(1)
+        stand_ins = [FaultyEndpoint(lambda: 0.3 if next(calls) % 25 == 0 else 0.01) for _ in range(2)]
+        replicas = [GuardedEndpoint(f"r{i}", lambda e=e: e) for i, e in enumerate(stand_ins)]
+        return EndpointPool("txgemma", replicas, hedging=hedging, min_hedge_samples=20)
+
+    plain, hedged = pool(False), pool(True)
+    plain_latencies, hedged_latencies = _latencies(plain, 75), _latencies(hedged, 75)
+
+    assert max(plain_latencies) >= 0.3
+    assert endpoint_guard._percentile(hedged_latencies, 99) < 0.15
+    assert statistics.median(hedged_latencies) < 0.05
+    assert hedged.stats()["hedge_wins"] >= 2
+    assert hedged.stats()["hedged"] <= 0.1 * 75
@@ -0,0 +1,137 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Test cases for priority classes, fair queuing and SLO shedding in front of the endpoints."""
+
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from medical_research import endpoint_guard
+from medical_research.endpoint_guard import AdaptiveLimiter, EndpointUnavailable, GuardedEndpoint
+from medical_research.endpoint_scheduler import (
+    BATCH,
+    INTERACTIVE,
+    PREFETCH,
+    FairQueue,
+    current_request,
+    request_class,
+)
+
+
+class RecordingEndpoint:
+    """Answers after `latency_s`, recording the order in which prompts were served."""
+
+    def __init__(self, latency_s: float = 0.05):
+        self.latency_s = latency_s
+        self.served = []
+        self._lock = threading.Lock()
+
+    def predict(self, instances, timeout=None):
+        with self._lock:
+            self.served += [instance["prompt"] for instance in instances]
+        time.sleep(self.latency_s)
+        return SimpleNamespace(predictions=["(B)"] * len(instances))
+
+
+def single_slot(stand_in, slos=None) -> GuardedEndpoint:
+    limiter = AdaptiveLimiter(initial=1, maximum=1, queue=FairQueue(slos=slos))
+    return GuardedEndpoint("txgemma", lambda: stand_in, limiter=limiter)
+
+
+def call_in_thread(guarded, prompt: str, priority: str, session: str = None, outcomes: list = None):
+    def run():
+        with request_class(priority, session=session):
+            try:
+                guarded.predict([{"prompt": prompt}])
+                result = "ok"
+            except EndpointUnavailable as e:
+                result = e.reason
+        if outcomes is not None:
+            outcomes.append((prompt, result))
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    return thread
+
+
+def test_request_class_is_context_local():
+    assert current_request() == (INTERACTIVE, None)
+    with request_class(BATCH, session="screen-1"):
+        with request_class(PREFETCH):
+            assert current_request() == (PREFETCH, "screen-1")
+        assert current_request() == (BATCH, "screen-1")
+    assert current_request() == (INTERACTIVE, None)
+    with pytest.raises(ValueError):
+        with request_class("urgent"):
+            pass
+
+
+def test_interactive_calls_overtake_queued_batch_work():
+    stand_in = RecordingEndpoint()
+    guarded = single_slot(stand_in)
+    threads = []
+    for i in range(10):
+        threads.append(call_in_thread(guarded, f"batch-{i}", BATCH, session="screen"))
+        time.sleep(0.005)
+    threads.append(call_in_thread(guarded, "chat", INTERACTIVE, session="user"))
+    for thread in threads:
+        thread.join()
+
+    # Only the call already holding the slot (and at most the one it was handed to) goes first.
+    assert stand_in.served.index("chat") <= 2
+    queues = guarded.stats()["queues"]
+    assert queues[BATCH]["admitted"] == 10 and queues[INTERACTIVE]["admitted"] == 1
+    assert queues[INTERACTIVE]["wait_p99_s"] < queues[BATCH]["wait_p99_s"]
+
+
+def test_sessions_in_a_class_share_the_endpoint_fairly():
+    stand_in = RecordingEndpoint(latency_s=0.02)
+    guarded = single_slot(stand_in)
+    threads = []
+    for i in range(8):
+        threads.append(call_in_thread(guarded, f"a-{i}", BATCH, session="screen-a"))
+        time.sleep(0.002)
+    for i in range(2):
+        threads.append(call_in_thread(guarded, f"b-{i}", BATCH, session="screen-b"))
+        time.sleep(0.002)
+    for thread in threads:
+        thread.join()
+
+    # Screen b's calls alternate with screen a's backlog instead of waiting behind it.
+    assert max(stand_in.served.index("b-0"), stand_in.served.index("b-1")) <= 5
+
+
+def test_calls_that_would_miss_their_slo_are_shed():
+    stand_in = RecordingEndpoint(latency_s=0.2)
+    guarded = single_slot(stand_in, slos={PREFETCH: 0.3})
+    guarded.predict([{"prompt": "warm-up"}])  # Teaches the limiter the service time.
+
+    outcomes = []
+    threads = [call_in_thread(guarded, f"batch-{i}", BATCH, outcomes=outcomes) for i in range(3)]
+    time.sleep(0.05)
+    start = time.monotonic()
+    with request_class(PREFETCH):
+        with pytest.raises(EndpointUnavailable) as error:
+            guarded.predict([{"prompt": "prefetch"}])
+    assert time.monotonic() - start < 0.1
+    assert error.value.reason == endpoint_guard.OVERLOADED and "prefetch queue SLO" in error.value.detail
+    for thread in threads:
+        thread.join()
+
+    assert [result for _, result in outcomes] == ["ok"] * 3
+    assert guarded.stats()["queues"][PREFETCH]["shed"] == 1
+    assert "prefetch" not in stand_in.served
@@ -0,0 +1,112 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Test cases for the model tiering policy, using stub models."""
+
+import pytest
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.genai import types
+
+from medical_research import model_policy
+
+
+class StubLlm(BaseLlm):
+    """Returns a canned function call (or text) and counts its calls."""
+
+    call_name: str = ""
+    calls: int = 0
+
+    async def generate_content_async(self, llm_request, stream=False):
+        self.calls += 1
+        if self.call_name:
+            part = types.Part(function_call=types.FunctionCall(name=self.call_name, args={}))
+        else:
+            part = types.Part(text="ok")
+        yield LlmResponse(content=types.Content(role="model", parts=[part]))
+
+
+def _request():
+    request = LlmRequest()
+    request.tools_dict = {"predict_bbb_crossing": object()}
+    return request
+
+
+@pytest.fixture(autouse=True)
+def reset_stats():
+    model_policy.stats.reset()
+
+
+async def _run(llm, request):
+    return [r async for r in llm.generate_content_async(request)]
+
+
+async def test_env_override(monkeypatch):
+    monkeypatch.setenv("MODEL_MEDICAL_COORDINATOR", "gemini-2.5-flash")
+    assert model_policy.model_for("medical_coordinator") == "gemini-2.5-flash"
+
+
+async def test_valid_tool_call_stays_on_first_tier(monkeypatch):
+    monkeypatch.setenv("MODEL_MEDICAL_ANALYST_AGENT", "flash>pro")
+    stubs = {"flash": StubLlm(model="flash", call_name="predict_bbb_crossing"),
+             "pro": StubLlm(model="pro", call_name="predict_bbb_crossing")}
+    llm = model_policy.model_for("medical_analyst_agent", llm_factory=stubs.__getitem__)
+
+    await _run(llm, _request())
+
+    assert (stubs["flash"].calls, stubs["pro"].calls) == (1, 0)
+    assert model_policy.stats.snapshot()["escalation_rate"]["medical_analyst_agent"] == 0.0
+
+
+async def test_unknown_tool_call_escalates(monkeypatch):
+    monkeypatch.setenv("MODEL_MEDICAL_ANALYST_AGENT", "flash>pro")
+    stubs = {"flash": StubLlm(model="flash", call_name="predict_bbb"),
+             "pro": StubLlm(model="pro", call_name="predict_bbb_crossing")}
+    llm = model_policy.model_for("medical_analyst_agent", llm_factory=stubs.__getitem__)
+
+    responses = await _run(llm, _request())
+
+    assert responses[-1].content.parts[0].function_call.name == "predict_bbb_crossing"
+    snapshot = model_policy.stats.snapshot()
+    assert snapshot["escalation_rate"]["medical_analyst_agent"] == 1.0
+    assert set(snapshot["tiers"]) == {"flash", "pro"}
+
+
+async def test_validator_rejection_escalates(monkeypatch):
+    monkeypatch.setenv("MODEL_MEDICAL_SEARCH_AGENT", "flash>pro")
+    stubs = {"flash": StubLlm(model="flash"), "pro": StubLlm(model="pro")}
+    llm = model_policy.model_for(
+        "medical_search_agent",
+        validator=lambda response: False,
+        llm_factory=stubs.__getitem__,
+    )
+
+    await _run(llm, _request())
+
+    assert (stubs["flash"].calls, stubs["pro"].calls) == (1, 1)
+
+
+async def test_streamed_request_passes_responses_through_without_escalating(monkeypatch):
+    monkeypatch.setenv("MODEL_MEDICAL_ANALYST_AGENT", "flash>pro")
+    stubs = {"flash": StubLlm(model="flash", call_name="predict_bbb"),
+             "pro": StubLlm(model="pro", call_name="predict_bbb_crossing")}
+    llm = model_policy.model_for("medical_analyst_agent", llm_factory=stubs.__getitem__)
+
+    responses = [r async for r in llm.generate_content_async(_request(), stream=True)]
+
+    # Partial responses reach the caller as they arrive, so the first tier's answer stands.
+    assert responses[-1].content.parts[0].function_call.name == "predict_bbb"
+    assert (stubs["flash"].calls, stubs["pro"].calls) == (1, 0)
+    assert model_policy.policy_stats()["escalation_rate"]["medical_analyst_agent"] == 0.0
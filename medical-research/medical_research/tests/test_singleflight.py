@@ -0,0 +1,166 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Test cases for single-flight deduplication of concurrent identical calls."""
+
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import pytest
+
+from medical_research.endpoint_guard import EndpointPool, GuardedEndpoint
+from medical_research.endpoint_scheduler import BATCH, INTERACTIVE, request_class
+from medical_research.singleflight import FlightGroup, normalize_text, single_flight
+
+pytest_plugins = ("pytest_asyncio",)
+
+
+class SlowUpstream:
+    """Counts calls and answers after `delay_s`, or raises `error`."""
+
+    def __init__(self, delay_s: float = 0.2, error: Exception = None):
+        self.delay_s = delay_s
+        self.error = error
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def fetch(self, query: str) -> str:
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.delay_s)
+        if self.error:
+            raise self.error
+        return f"answer to {query}"
+
+    def predict(self, instances, timeout=None):
+        self.fetch("predict")
+        return SimpleNamespace(predictions=["(B) crosses the BBB"] * len(instances))
+
+
+def test_concurrent_identical_calls_share_one_execution():
+    upstream = SlowUpstream()
+    fetch = single_flight("test.shared", key=normalize_text)(upstream.fetch)
+    queries = ["Aspirin", " aspirin ", "ASPIRIN", "ibuprofen"] * 3
+    with ThreadPoolExecutor(max_workers=len(queries)) as executor:
+        answers = list(executor.map(fetch, queries))
+
+    assert upstream.calls == 2
+    assert answers.count("answer to Aspirin") == 9 and answers.count("answer to ibuprofen") == 3
+    stats = fetch.flights.stats()
+    assert (stats["calls"], stats["executions"], stats["shared"], stats["in_flight"]) == (12, 2, 10, 0)
+    assert stats["dedup_ratio"] == pytest.approx(10 / 12, abs=1e-4)
+
+
+def test_calls_that_do_not_overlap_are_not_cached():
+    upstream = SlowUpstream(delay_s=0)
+    fetch = single_flight("test.sequential")(upstream.fetch)
+    fetch("aspirin")
+    fetch("aspirin")
+    assert upstream.calls == 2 and fetch.flights.stats()["shared"] == 0
+
+
+def test_errors_reach_every_waiter_and_are_not_remembered():
+    upstream = SlowUpstream(error=ConnectionError("PubChem is down"))
+    fetch = single_flight("test.errors")(upstream.fetch)
+
+    def call(_):
+        with pytest.raises(ConnectionError):
+            fetch("aspirin")
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        list(executor.map(call, range(4)))
+    assert upstream.calls == 1
+    assert fetch.flights.stats()["errors"] == 1
+
+    upstream.error = None
+    assert fetch("aspirin") == "answer to aspirin"
+    assert upstream.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_a_cancelled_waiter_does_not_cancel_the_others():
+    runs = []
+
+    async def fetch(query: str) -> str:
+        runs.append(query)
+        await asyncio.sleep(0.2)
+        return f"answer to {query}"
+
+    group = FlightGroup("test.cancel_one")
+    first = asyncio.create_task(group.do_async("q", fetch, "q"))
+    second = asyncio.create_task(group.do_async("q", fetch, "q"))
+    await asyncio.sleep(0.05)
+    first.cancel()
+
+    assert await second == "answer to q"
+    with pytest.raises(asyncio.CancelledError):
+        await first
+    assert runs == ["q"]
+    assert group.stats()["cancelled"] == 0
+
+
+@pytest.mark.asyncio
+async def test_the_execution_is_cancelled_when_every_waiter_is():
+    finished = []
+
+    async def fetch(query: str) -> str:
+        await asyncio.sleep(0.2)
+        finished.append(query)
+        return query
+
+    group = FlightGroup("test.cancel_all")
+    waiters = [asyncio.create_task(group.do_async("q", fetch, "q")) for _ in range(3)]
+    await asyncio.sleep(0.05)
+    for waiter in waiters:
+        waiter.cancel()
+    await asyncio.gather(*waiters, return_exceptions=True)
+    await asyncio.sleep(0.3)
+
+    assert finished == []
+    stats = group.stats()
+    assert stats["cancelled"] == 1 and stats["in_flight"] == 0
+    # A new call starts a fresh execution.
+    assert await group.do_async("q", fetch, "q") == "q"
+
+
+def test_pool_shares_identical_predict_calls():
+    upstream = SlowUpstream()
+    pool = EndpointPool("txgemma-dedup", [GuardedEndpoint("r0", lambda: upstream)], hedging=False)
+    instances = [[{"prompt": "caffeine"}]] * 4 + [[{"prompt": "nicotine"}]]
+    with ThreadPoolExecutor(max_workers=len(instances)) as executor:
+        responses = list(executor.map(pool.predict, instances))
+
+    assert upstream.calls == 2
+    assert all(response.predictions for response in responses)
+    assert pool.flights.stats()["shared"] == 3
+
+
+def test_pool_does_not_share_predict_calls_across_request_classes():
+    upstream = SlowUpstream()
+    pool = EndpointPool("txgemma-classes", [GuardedEndpoint("r0", lambda: upstream)], hedging=False)
+
+    def predict(priority):
+        with request_class(priority):
+            return pool.predict([{"prompt": "caffeine"}])
+
+    priorities = [INTERACTIVE, INTERACTIVE, BATCH, BATCH]
+    with ThreadPoolExecutor(max_workers=len(priorities)) as executor:
+        responses = list(executor.map(predict, priorities))
+
+    assert upstream.calls == 2
+    assert all(response.predictions for response in responses)
+    assert pool.flights.stats()["shared"] == 2
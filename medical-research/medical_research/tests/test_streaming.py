@@ -0,0 +1,134 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Test cases for streamed MedGemma answers, using a local stand-in server."""
+
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from medical_research import endpoint_guard, streaming
+from medical_research.sub_agents.medical_search import tools
+
+pytest_plugins = ("pytest_asyncio",)
+
+TOKENS = ["Diabetes ", "often ", "causes ", "thirst."]
+TOKEN_DELAY_S = 0.1
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """Streams TOKENS as chat-completion events; answers 503 while `status` says so."""
+
+    status = 200
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        if self.status != 200:
+            self.send_response(self.status)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.end_headers()
+        assert body["stream"] and body["messages"][0]["role"] == "user"
+        for token in TOKENS:
+            event = {"choices": [{"delta": {"content": token}}]}
+            self.wfile.write(f"data: {json.dumps(event)}\n\n".encode())
+            self.wfile.flush()
+            time.sleep(TOKEN_DELAY_S)
+        self.wfile.write(b"data: [DONE]\n\n")
+
+
+@pytest.fixture
+def stand_in(monkeypatch):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandInHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    monkeypatch.setattr(endpoint_guard, "_endpoints", {})
+    monkeypatch.setattr(StandInHandler, "status", 200)
+    monkeypatch.setenv("MEDGEMMA_ENDPOINT_ID", f"http://127.0.0.1:{server.server_port}/v1/endpoints/medgemma")
+    yield StandInHandler
+    server.shutdown()
+
+
+def test_parse_sse_reads_line_and_chunk_streams():
+    lines = [b'data: {"choices": [{"delta": {"content": "a"}}]}', b"", b'data: {"choices": [{"text": "b"}]}',
+             b"data: [DONE]", b'data: {"choices": [{"text": "ignored"}]}']
+    assert list(streaming.parse_sse(lines)) == ["a", "b"]
+    assert list(streaming.parse_sse([b"\n".join(lines)])) == ["a", "b"]
+
+
+@pytest.mark.asyncio
+async def test_answer_streams_before_the_disclaimer(stand_in):
+    received = []
+
+    async def sink(item):
+        received.append((time.monotonic(), item))
+
+    start = time.monotonic()
+    with streaming.tool_text_sink(sink):
+        answer = await tools.query_medical_knowledge("What are the symptoms of diabetes?")
+    elapsed = time.monotonic() - start
+
+    texts = [item["text"] for _, item in received]
+    assert texts == TOKENS + [tools.DISCLAIMER]
+    assert answer == "".join(TOKENS) + tools.DISCLAIMER
+    assert all(item["name"] == "query_medical_knowledge" for _, item in received)
+    # The first token arrives long before the generation is complete.
+    assert received[0][0] - start < elapsed - 2 * TOKEN_DELAY_S
+    (replica,) = endpoint_guard.endpoint_stats()["medgemma"]["replicas"].values()
+    assert replica["successes"] == 1 and replica["inflight"] == 0
+
+
+@pytest.mark.asyncio
+async def test_overloaded_stream_returns_a_structured_error(stand_in):
+    stand_in.status = 503
+    answer = await tools.query_medical_knowledge("What are the symptoms of diabetes?")
+    assert answer.startswith("Error: model endpoint unavailable")
+    assert '"reason": "overloaded"' in answer
+
+
+@pytest.mark.asyncio
+async def test_stream_run_interleaves_tool_text_with_events(stand_in):
+    class Runner:
+        async def run_async(self, **kwargs):
+            yield "tool_call"
+            yield await tools.query_medical_knowledge(kwargs["question"])
+
+    items = [item async for item in streaming.stream_run(Runner(), question="Symptoms of diabetes?")]
+    assert items[0] == "tool_call"
+    assert [item["text"] for item in items[1:-1]] == TOKENS + [tools.DISCLAIMER]
+    assert items[-1].endswith(tools.DISCLAIMER)
+
+
+@pytest.mark.asyncio
+async def test_stream_run_producer_stops_when_the_reader_leaves_a_full_queue():
+    class Runner:
+        async def run_async(self, **kwargs):
+            for i in range(1000):
+                yield i
+
+    stream = streaming.stream_run(Runner())
+    assert await anext(stream) == 0
+    await asyncio.sleep(0.05)  # the producer fills the queue and blocks
+    producers = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+    await stream.aclose()
+    done, pending = await asyncio.wait(producers, timeout=1)
+    assert not pending and all(task.cancelled() for task in done)
@@ -0,0 +1,50 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Test cases for the coordinator's tool topologies."""
+
+from google.adk.tools import FunctionTool
+
+from medical_research import topology
+from medical_research.agent import SPECIALISTS, build_medical_coordinator
+
+
+def is_budgeted(tool) -> bool:
+    func = tool.func if isinstance(tool, FunctionTool) else tool
+    return getattr(func, "budgeted", None) is not None
+
+
+def function_tools(agent) -> list:
+    return [tool for tool in agent.tools if isinstance(tool, FunctionTool) or callable(tool)]
+
+
+def test_building_coordinators_leaves_the_specialists_unchanged():
+    before = {specialist.name: list(specialist.tools) for specialist in SPECIALISTS}
+    coordinators = [build_medical_coordinator(topology.HIERARCHICAL) for _ in range(2)]
+
+    for specialist in SPECIALISTS:
+        assert specialist.tools == before[specialist.name]
+        assert not any(is_budgeted(tool) for tool in function_tools(specialist))
+    for coordinator in coordinators:
+        for agent_tool, specialist in zip(coordinator.tools, SPECIALISTS):
+            assert isinstance(agent_tool, topology.BudgetedAgentTool)
+            assert agent_tool.agent is not specialist and agent_tool.agent.name == specialist.name
+            assert len(agent_tool.agent.tools) == len(specialist.tools)
+            assert all(is_budgeted(tool) for tool in function_tools(agent_tool.agent))
+
+
+def test_direct_topology_budgets_the_flattened_tools():
+    tools = topology.coordinator_tools(SPECIALISTS, topology.DIRECT)
+    assert tools and all(isinstance(tool, topology.BudgetedAgentTool) or is_budgeted(tool) for tool in tools)
+    assert not any(is_budgeted(tool) for specialist in SPECIALISTS for tool in function_tools(specialist))